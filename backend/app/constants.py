@@ -7,6 +7,14 @@ import os
 # Redis cache expiration time in seconds
 CACHE_EXPIRATION_SECONDS = int(os.getenv("CACHE_EXPIRATION_SECONDS", 3600))
 
+# Adaptive cache TTL configuration
+CACHE_ADAPTIVE_TTL = os.getenv("CACHE_ADAPTIVE_TTL", "true").lower() == "true"
+CACHE_TTL_MIN_SECONDS = int(os.getenv("CACHE_TTL_MIN_SECONDS", 900))
+CACHE_TTL_MAX_SECONDS = int(os.getenv("CACHE_TTL_MAX_SECONDS", 4 * 3600))
+CACHE_TTL_SIZE_REFERENCE_BYTES = int(os.getenv("CACHE_TTL_SIZE_REFERENCE_BYTES", 4096))
+CACHE_MEMORY_BUDGET_BYTES = int(os.getenv("CACHE_MEMORY_BUDGET_BYTES", 0))
+CACHE_SKETCH_WIDTH = int(os.getenv("CACHE_SKETCH_WIDTH", 1 << 16))
+
 # MongoDB configuration
 MONGODB_COLLECTION_NAME = os.getenv("MONGODB_COLLECTION_NAME", "interactions")
 MONGODB_URI = os.getenv("MONGODB_URI", "mongodb://localhost:27017")
@@ -15,22 +23,235 @@ MONGODB_URI = os.getenv("MONGODB_URI", "mongodb://localhost:27017")
 ELASTICSEARCH_INDEX_NAME = os.getenv("ELASTICSEARCH_INDEX_NAME", "qa_pairs")
 ELASTICSEARCH_URI = os.getenv("ELASTICSEARCH_URI", "http://172.18.0.2:9200")
 
+# Hybrid search configuration
+EMBEDDER_NAME = os.getenv("EMBEDDER_NAME", "hashing")
+EMBEDDING_DIMENSIONS = int(os.getenv("EMBEDDING_DIMENSIONS", 256))
+HYBRID_SEARCH_SIZE = int(os.getenv("HYBRID_SEARCH_SIZE", 10))
+HYBRID_NUM_CANDIDATES = int(os.getenv("HYBRID_NUM_CANDIDATES", 100))
+RRF_RANK_CONSTANT = int(os.getenv("RRF_RANK_CONSTANT", 60))
+
+# Local search configuration
+LOCAL_SEARCH_SNAPSHOT_PATH = os.getenv("LOCAL_SEARCH_SNAPSHOT_PATH", "local_search.snapshot")
+LOCAL_SEARCH_SNAPSHOT_EVERY = int(os.getenv("LOCAL_SEARCH_SNAPSHOT_EVERY", 500))
+
+# Prompt suggestion configuration
+SUGGEST_MAX_PROMPTS = int(os.getenv("SUGGEST_MAX_PROMPTS", 1000000))
+SUGGEST_MAX_PROMPT_CHARS = int(os.getenv("SUGGEST_MAX_PROMPT_CHARS", 200))
+SUGGEST_DELTA_LIMIT = int(os.getenv("SUGGEST_DELTA_LIMIT", 2000))
+
+# File analysis configuration
+ANALYZE_CHUNK_TOKENS = int(os.getenv("ANALYZE_CHUNK_TOKENS", 1000))
+ANALYZE_MAX_CONCURRENCY = int(os.getenv("ANALYZE_MAX_CONCURRENCY", 4))
+ANALYZE_MAX_FILES = int(os.getenv("ANALYZE_MAX_FILES", 200))
+ANALYSIS_PROMPT_VERSION = os.getenv("ANALYSIS_PROMPT_VERSION", "1")
+ANALYSIS_MANIFEST_TTL_SECONDS = int(os.getenv("ANALYSIS_MANIFEST_TTL_SECONDS", 30 * 24 * 3600))
+
 # Logging configuration
 LOGGING_FORMAT = os.getenv(
     "LOGGING_FORMAT", "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
 )
 LOGGING_DATE_FORMAT = os.getenv("LOGGING_DATE_FORMAT", "%Y-%m-%d %H:%M:%S")
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO")
+LOG_QUEUE_SIZE = int(os.getenv("LOG_QUEUE_SIZE", 10000))
+LOG_PAYLOAD_PREVIEW_CHARS = int(os.getenv("LOG_PAYLOAD_PREVIEW_CHARS", 200))
+LOG_SAMPLE_RATES = os.getenv("LOG_SAMPLE_RATES", "")
 
 # OpenAI configuration
 DEFAULT_OPENAI_MODEL = os.getenv("DEFAULT_OPENAI_MODEL", "gpt-4o-mini")
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY", "your-default-api-key")
 
+# Token budgeting configuration
+TOKEN_COUNTER = os.getenv("TOKEN_COUNTER", "approximate")
+LLM_MAX_OUTPUT_TOKENS = int(os.getenv("LLM_MAX_OUTPUT_TOKENS", 1024))
+LLM_PROMPT_BUDGET_TOKENS = int(os.getenv("LLM_PROMPT_BUDGET_TOKENS", 8000))
+LLM_MAX_REQUEST_TOKENS = int(os.getenv("LLM_MAX_REQUEST_TOKENS", 64000))
+
+# Model routing configuration
+ROUTER_LARGE_MODEL = os.getenv("ROUTER_LARGE_MODEL", "gpt-4o")
+ROUTER_LARGE_PROMPT_TOKENS = int(os.getenv("ROUTER_LARGE_PROMPT_TOKENS", 4000))
+ROUTER_LARGE_LANGUAGES = [language for language in os.getenv("ROUTER_LARGE_LANGUAGES", "").split(",") if language]
+ROUTER_LATENCY_SLO_MS = float(os.getenv("ROUTER_LATENCY_SLO_MS", 20000))
+ROUTER_MAX_ERROR_RATE = float(os.getenv("ROUTER_MAX_ERROR_RATE", 0.5))
+ROUTER_STATS_WINDOW = int(os.getenv("ROUTER_STATS_WINDOW", 50))
+
+# LLM scheduling configuration
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", 8))
+LLM_INTERACTIVE_RESERVED = int(os.getenv("LLM_INTERACTIVE_RESERVED", 2))
+LLM_STARVATION_SECONDS = float(os.getenv("LLM_STARVATION_SECONDS", 30))
+
+# Idempotency configuration
+IDEMPOTENCY_TTL_SECONDS = int(os.getenv("IDEMPOTENCY_TTL_SECONDS", 24 * 3600))
+IDEMPOTENCY_PENDING_SECONDS = int(os.getenv("IDEMPOTENCY_PENDING_SECONDS", 300))
+IDEMPOTENCY_WAIT_SECONDS = float(os.getenv("IDEMPOTENCY_WAIT_SECONDS", 60))
+
+# Circuit breaker configuration
+BREAKER_FAILURE_RATE = float(os.getenv("BREAKER_FAILURE_RATE", 0.5))
+BREAKER_WINDOW = int(os.getenv("BREAKER_WINDOW", 20))
+BREAKER_MIN_CALLS = int(os.getenv("BREAKER_MIN_CALLS", 5))
+BREAKER_OPEN_SECONDS = float(os.getenv("BREAKER_OPEN_SECONDS", 30))
+BREAKER_HALF_OPEN_CALLS = int(os.getenv("BREAKER_HALF_OPEN_CALLS", 3))
+BREAKER_SLOW_CALL_SECONDS = os.getenv("BREAKER_SLOW_CALL_SECONDS", "redis=0.5,mongodb=2,elasticsearch=2,llm=60")
+REDIS_SOCKET_TIMEOUT_SECONDS = float(os.getenv("REDIS_SOCKET_TIMEOUT_SECONDS", 1))
+STALE_CACHE_TTL_SECONDS = int(os.getenv("STALE_CACHE_TTL_SECONDS", 7 * 24 * 3600))
+MONGO_SPOOL_MAX_DOCUMENTS = int(os.getenv("MONGO_SPOOL_MAX_DOCUMENTS", 10000))
+MONGO_SPOOL_RETRY_SECONDS = float(os.getenv("MONGO_SPOOL_RETRY_SECONDS", 1))
+
+# Health check configuration
+HEALTH_PROBE_TIMEOUT_SECONDS = float(os.getenv("HEALTH_PROBE_TIMEOUT_SECONDS", 2))
+HEALTH_CACHE_SECONDS = float(os.getenv("HEALTH_CACHE_SECONDS", 5))
+HEALTH_CRITICAL_DEPENDENCIES = [name for name in os.getenv("HEALTH_CRITICAL_DEPENDENCIES", "mongodb").split(",") if name]
+
+# Prompt heavy hitters and cache warming
+HEAVY_HITTERS_CAPACITY = int(os.getenv("HEAVY_HITTERS_CAPACITY", 10000))
+HEAVY_HITTERS_PERSIST_SECONDS = float(os.getenv("HEAVY_HITTERS_PERSIST_SECONDS", 300))
+HEAVY_HITTERS_MAX_PROMPT_CHARS = int(os.getenv("HEAVY_HITTERS_MAX_PROMPT_CHARS", 2000))
+CACHE_WARM_TOP_N = int(os.getenv("CACHE_WARM_TOP_N", 2000))
+CACHE_WARM_BATCH_SIZE = int(os.getenv("CACHE_WARM_BATCH_SIZE", 200))
+CACHE_WARM_RATE_PER_SECOND = float(os.getenv("CACHE_WARM_RATE_PER_SECOND", 1000))
+
+# Cache tags and invalidation
+CACHE_TAG_TTL_SECONDS = int(os.getenv("CACHE_TAG_TTL_SECONDS", STALE_CACHE_TTL_SECONDS))
+CACHE_INVALIDATION_BATCH_SIZE = int(os.getenv("CACHE_INVALIDATION_BATCH_SIZE", 500))
+CACHE_INVALIDATION_PAUSE_SECONDS = float(os.getenv("CACHE_INVALIDATION_PAUSE_SECONDS", 0.002))
+CACHE_TAG_PRUNE_SECONDS = float(os.getenv("CACHE_TAG_PRUNE_SECONDS", 3600))
+ADMIN_TOKEN = os.getenv("ADMIN_TOKEN", "")
+
+# Response deduplication
+RESPONSE_DEDUP_MIN_BYTES = int(os.getenv("RESPONSE_DEDUP_MIN_BYTES", 256))
+RESPONSE_RESOLVE_PAGE_SIZE = int(os.getenv("RESPONSE_RESOLVE_PAGE_SIZE", 500))
+
+# Interaction retention and archive
+INTERACTION_RETENTION_DAYS = int(os.getenv("INTERACTION_RETENTION_DAYS", 0))
+INTERACTION_ARCHIVE_DIR = os.getenv("INTERACTION_ARCHIVE_DIR", "archive")
+INTERACTION_ARCHIVE_BATCH_SIZE = int(os.getenv("INTERACTION_ARCHIVE_BATCH_SIZE", 1000))
+INTERACTION_ARCHIVE_INTERVAL_SECONDS = float(os.getenv("INTERACTION_ARCHIVE_INTERVAL_SECONDS", 3600))
+INTERACTION_ARCHIVE_LEASE_SECONDS = float(os.getenv("INTERACTION_ARCHIVE_LEASE_SECONDS", 300))
+
+# Interaction export
+EXPORT_BATCH_SIZE = int(os.getenv("EXPORT_BATCH_SIZE", 2000))
+EXPORT_ROW_GROUP_SIZE = int(os.getenv("EXPORT_ROW_GROUP_SIZE", 10000))
+EXPORT_CHECKPOINT_ROWS = int(os.getenv("EXPORT_CHECKPOINT_ROWS", 50000))
+
+# Bulk backfill
+BACKFILL_BATCH_SIZE = int(os.getenv("BACKFILL_BATCH_SIZE", 1000))
+BACKFILL_WORKERS = int(os.getenv("BACKFILL_WORKERS", 4))
+BACKFILL_MAX_PENDING_BATCHES = int(os.getenv("BACKFILL_MAX_PENDING_BATCHES", 8))
+BACKFILL_REPORT_SECONDS = float(os.getenv("BACKFILL_REPORT_SECONDS", 10))
+
+# Search index sync
+SEARCH_SYNC_MODE = os.getenv("SEARCH_SYNC_MODE", "auto")
+SEARCH_SYNC_BATCH_SIZE = int(os.getenv("SEARCH_SYNC_BATCH_SIZE", 500))
+SEARCH_SYNC_MAX_WAIT_SECONDS = float(os.getenv("SEARCH_SYNC_MAX_WAIT_SECONDS", 0.5))
+SEARCH_SYNC_POLL_SECONDS = float(os.getenv("SEARCH_SYNC_POLL_SECONDS", 1.0))
+SEARCH_SYNC_LEASE_SECONDS = float(os.getenv("SEARCH_SYNC_LEASE_SECONDS", 60))
+
+# Conversation sessions
+CONVERSATION_CONTEXT_TOKENS = int(os.getenv("CONVERSATION_CONTEXT_TOKENS", 4000))
+CONVERSATION_SUMMARY_TURNS = int(os.getenv("CONVERSATION_SUMMARY_TURNS", 4))
+CONVERSATION_MAX_TURNS = int(os.getenv("CONVERSATION_MAX_TURNS", 500))
+CONVERSATION_TTL_SECONDS = int(os.getenv("CONVERSATION_TTL_SECONDS", 24 * 3600))
+
+# WebSocket channel
+WS_MAX_IN_FLIGHT = int(os.getenv("WS_MAX_IN_FLIGHT", 16))
+WS_SEND_QUEUE_SIZE = int(os.getenv("WS_SEND_QUEUE_SIZE", 256))
+
 # ---------------------
 # Constants Explanation
 # ---------------------
-# CACHE_EXPIRATION_SECONDS: Defines the default TTL for Redis cache entries.
+# CACHE_EXPIRATION_SECONDS: Defines the default TTL for Redis cache entries; used for every entry when CACHE_ADAPTIVE_TTL is off.
+# CACHE_ADAPTIVE_TTL: Whether response cache TTLs adapt to each entry's access frequency and size.
+# CACHE_TTL_MIN_SECONDS: TTL of a response accessed once; each further recent access doubles it.
+# CACHE_TTL_MAX_SECONDS: Upper bound of adaptive TTLs. Hits keep extending hot entries, so a high bound mostly keeps
+#   formerly popular entries alive after interest moved on.
+# CACHE_TTL_SIZE_REFERENCE_BYTES: Response size above which adaptive TTLs shrink in proportion to size.
+# CACHE_MEMORY_BUDGET_BYTES: Redis memory use above which adaptive TTLs shrink by the overshoot; 0 disables it.
+# CACHE_SKETCH_WIDTH: Counters per row of the access frequency sketch (4 rows of one byte each).
 # MONGODB_COLLECTION_NAME: MongoDB collection for storing interactions.
 # ELASTICSEARCH_INDEX_NAME: Elasticsearch index for storing question-answer pairs.
+# EMBEDDER_NAME: The registered embedder used for the `embedding` vector field.
+# EMBEDDING_DIMENSIONS: Number of dimensions of the embedding vectors.
+# HYBRID_SEARCH_SIZE: Number of results returned by /history?query=.
+# HYBRID_NUM_CANDIDATES: Candidates considered per shard by the kNN query.
+# RRF_RANK_CONSTANT: Rank constant of the reciprocal-rank fusion of kNN and BM25 results.
+# LOCAL_SEARCH_SNAPSHOT_PATH: File the in-process search index is persisted to for fast restarts.
+# LOCAL_SEARCH_SNAPSHOT_EVERY: Number of indexed interactions between automatic snapshots.
+# SUGGEST_MAX_PROMPTS: Maximum number of distinct prompts held by the suggestion index.
+# SUGGEST_MAX_PROMPT_CHARS: Prompts longer than this (e.g. pasted code) are not suggested.
+# SUGGEST_DELTA_LIMIT: Number of new prompts buffered before they are merged into the suggestion index.
+# ANALYZE_CHUNK_TOKENS: Token budget of the code in each chunk sent to the LLM by /analyze.
+# ANALYZE_MAX_CONCURRENCY: Maximum number of chunks analyzed in parallel per /analyze request.
+# ANALYZE_MAX_FILES: Maximum number of files accepted by one /analyze request.
+# ANALYSIS_PROMPT_VERSION: Part of every chunk hash; bump it to invalidate cached analyses.
+# ANALYSIS_MANIFEST_TTL_SECONDS: TTL of the per-file chunk manifests cached in Redis (MongoDB keeps them durably).
 # LOGGING_FORMAT: The format used across application logs.
 # LOGGING_DATE_FORMAT: The date-time format for logs.
+# LOG_LEVEL: The root log level for the application.
+# LOG_QUEUE_SIZE: Maximum number of log records waiting for the background writer; extra records are dropped.
+# LOG_PAYLOAD_PREVIEW_CHARS: Maximum number of characters of a prompt or cached value written to the logs.
+# LOG_SAMPLE_RATES: Per-logger sampling of INFO/DEBUG records, e.g. "redis_service=0.1,openai_service=0.5".
 # DEFAULT_OPENAI_MODEL: Specifies the OpenAI model to use if none is explicitly defined.
+# TOKEN_COUNTER: "tiktoken" to count tokens with tiktoken's encoding files (must be available offline), otherwise "approximate".
+# LLM_MAX_OUTPUT_TOKENS: Cap on the output tokens of every model response.
+# LLM_PROMPT_BUDGET_TOKENS: Token budget of a prompt; code context beyond it is trimmed by priority.
+# LLM_MAX_REQUEST_TOKENS: Requests larger than this are rejected up front instead of being trimmed.
+# ROUTER_LARGE_MODEL: Model used for large tasks; set it to the default model to disable routing.
+# ROUTER_LARGE_PROMPT_TOKENS: Prompt size from which a request goes to the large model (half that with code context).
+# ROUTER_LARGE_LANGUAGES: Comma-separated languages whose code always goes to the large model.
+# ROUTER_LATENCY_SLO_MS: Moving-average latency above which a model is avoided while the other one is healthy.
+# ROUTER_MAX_ERROR_RATE: Recent error rate above which a model is avoided while the other one is healthy.
+# ROUTER_STATS_WINDOW: Number of recent calls per model the error rate is computed over.
+# LLM_MAX_CONCURRENCY: Maximum number of LLM calls in flight across all requests.
+# LLM_INTERACTIVE_RESERVED: LLM call slots kept free of bulk work (e.g. /analyze) for interactive requests.
+# LLM_STARVATION_SECONDS: Queue wait after which a bulk LLM call is admitted ahead of interactive ones.
+# IDEMPOTENCY_TTL_SECONDS: How long the result of a /submit with an Idempotency-Key is replayed to retries.
+# IDEMPOTENCY_PENDING_SECONDS: How long a key stays claimed by a request in flight, bounding the effect of a crashed worker.
+# IDEMPOTENCY_WAIT_SECONDS: Maximum time a retry waits for the original request before getting a 409.
+# BREAKER_FAILURE_RATE: Share of failed or slow calls in the window at which a dependency's circuit opens.
+# BREAKER_WINDOW: Number of recent calls per dependency the failure rate is computed over.
+# BREAKER_MIN_CALLS: Calls needed in the window before a circuit may open.
+# BREAKER_OPEN_SECONDS: Time an open circuit rejects calls before letting probe calls through.
+# BREAKER_HALF_OPEN_CALLS: Successful probe calls needed to close a circuit again.
+# BREAKER_SLOW_CALL_SECONDS: Per-dependency duration, e.g. "redis=0.5,llm=60", above which a call counts as failed.
+# REDIS_SOCKET_TIMEOUT_SECONDS: Connect and read timeout of Redis calls, so a stalled server fails calls instead of hanging them.
+# STALE_CACHE_TTL_SECONDS: TTL of the stale copies of /submit responses, served while the LLM circuit is open.
+# MONGO_SPOOL_MAX_DOCUMENTS: Maximum number of interactions held in memory while MongoDB is unavailable.
+# MONGO_SPOOL_RETRY_SECONDS: Pause between the background attempts to write the spooled interactions.
+# HEALTH_PROBE_TIMEOUT_SECONDS: Time after which a dependency probe of the health endpoints counts as failed.
+# HEALTH_CACHE_SECONDS: How long dependency probe results are reused, bounding the probe load of frequent health checks.
+# HEALTH_CRITICAL_DEPENDENCIES: Comma-separated dependencies without which /health/ready reports the instance unready.
+# HEAVY_HITTERS_CAPACITY: Number of prompts the request frequency summary tracks; prompts above 1/capacity of traffic are always tracked.
+# HEAVY_HITTERS_PERSIST_SECONDS: Interval at which a background task writes the prompt frequency summary to MongoDB.
+# HEAVY_HITTERS_MAX_PROMPT_CHARS: Prompts longer than this are not tracked, as they are rarely asked twice.
+# CACHE_WARM_TOP_N: Number of most requested prompts whose stored answers are loaded into Redis at startup; 0 disables warming.
+# CACHE_WARM_BATCH_SIZE: Prompts per MongoDB query and Redis pipeline while warming the cache.
+# CACHE_WARM_RATE_PER_SECOND: Maximum prompts loaded per second while warming, so MongoDB keeps serving live traffic.
+# CACHE_TAG_TTL_SECONDS: TTL of the per-tag sets indexing cache entries, renewed on every write; must exceed every tagged entry's TTL.
+# CACHE_INVALIDATION_BATCH_SIZE: Cache entries deleted per Redis round trip by a tag invalidation, bounding how long each command holds Redis.
+# CACHE_INVALIDATION_PAUSE_SECONDS: Pause between invalidation batches, leaving Redis to serve other clients.
+# CACHE_TAG_PRUNE_SECONDS: Interval at which expired entries are removed from the tag sets.
+# ADMIN_TOKEN: Token required in the X-Admin-Token header of the /admin endpoints; empty disables them.
+# RESPONSE_DEDUP_MIN_BYTES: Responses at least this large are stored once in the responses collection and referenced by hash.
+# RESPONSE_RESOLVE_PAGE_SIZE: Interactions whose response references are resolved per query when reading history.
+# INTERACTION_RETENTION_DAYS: Age in days from which interactions move from MongoDB to the archive files; 0 keeps them in MongoDB.
+# INTERACTION_ARCHIVE_DIR: Directory of the monthly gzip JSONL archive files; should be shared by all hosts.
+# INTERACTION_ARCHIVE_BATCH_SIZE: Interactions moved to the archive per batch.
+# INTERACTION_ARCHIVE_INTERVAL_SECONDS: Interval between archiving runs.
+# INTERACTION_ARCHIVE_LEASE_SECONDS: Lease held by the worker archiving, so only one worker archives at a time.
+# EXPORT_BATCH_SIZE: Documents fetched per MongoDB cursor round trip by interaction exports.
+# EXPORT_ROW_GROUP_SIZE: Rows per row group of Parquet exports, bounding the rows held in memory.
+# EXPORT_CHECKPOINT_ROWS: Rows between the checkpoints of file exports, i.e. the most work a resumed export redoes.
+# BACKFILL_BATCH_SIZE: Documents per bulk write of a backfill to MongoDB, Elasticsearch and Redis.
+# BACKFILL_WORKERS: Batches a backfill writes in parallel.
+# BACKFILL_MAX_PENDING_BATCHES: Batches read ahead of the workers, bounding a backfill's memory use.
+# BACKFILL_REPORT_SECONDS: Interval between the progress reports of a backfill.
+# SEARCH_SYNC_MODE: How new interactions reach Elasticsearch: "change_stream", "outbox" (polling marked interactions), or "auto".
+# SEARCH_SYNC_BATCH_SIZE: Interactions per bulk request of the search index sync.
+# SEARCH_SYNC_MAX_WAIT_SECONDS: Longest the sync waits for more changes before indexing a partial batch.
+# SEARCH_SYNC_POLL_SECONDS: Interval between outbox polls once the backlog is indexed, and the pause after failures.
+# SEARCH_SYNC_LEASE_SECONDS: Lease held by the worker syncing the search index, so only one worker indexes at a time.
+# CONVERSATION_CONTEXT_TOKENS: Token budget of a conversation turn's context: the summary, the recent turns and the new prompt.
+# CONVERSATION_SUMMARY_TURNS: Turns older than the recent half of the context budget that are folded into the summary at once.
+# CONVERSATION_MAX_TURNS: Maximum number of turns of a conversation; MongoDB keeps every turn in the conversation's document.
+# CONVERSATION_TTL_SECONDS: TTL of the compact conversation state cached in Redis, renewed on every turn (MongoDB keeps it durably).
+# WS_MAX_IN_FLIGHT: Maximum number of requests running at once on one /ws connection; further ones are rejected with status 429.
+# WS_SEND_QUEUE_SIZE: Outgoing messages buffered per /ws connection; when full, the connection's requests wait for the client to read.
@@ -0,0 +1,143 @@
+from fastapi import APIRouter, Depends, Header, HTTPException, Query
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel, Field
+from typing import Any, Dict, List, Literal, Optional
+from datetime import datetime
+from app.controllers.interaction_controller import db, redis_client, response_store, interaction_archive, heavy_hitters
+from app.services.cache_tags import CacheTagIndex, TAG_KINDS
+from app.services.interaction_export import ExportError, InteractionExporter
+from app.utils.logger import get_logger
+from app.constants import ADMIN_TOKEN
+import asyncio
+import hmac
+
+# Logger setup
+logger = get_logger("admin_controller")
+
+router = APIRouter(prefix="/admin")
+
+# Tag index of the response caches, deleting tagged entries in small batches
+tag_index = CacheTagIndex(redis_client) if redis_client else None
+
+# Streams interactions from MongoDB and the archive in constant memory
+exporter = InteractionExporter(db, response_store, interaction_archive)
+
+EXPORT_MEDIA_TYPES = {"jsonl": "application/gzip", "parquet": "application/vnd.apache.parquet"}
+EXPORT_EXTENSIONS = {"jsonl": "jsonl.gz", "parquet": "parquet"}
+
+
+def require_admin(x_admin_token: Optional[str] = Header(None, alias="X-Admin-Token")) -> None:
+    """
+    Rejects requests without the configured admin token. The endpoints are disabled while no token is configured.
+    """
+    if not ADMIN_TOKEN or not x_admin_token or not hmac.compare_digest(x_admin_token, ADMIN_TOKEN):
+        raise HTTPException(status_code=403, detail="Admin token missing or invalid.")
+
+
+# Request schema
+class InvalidateRequest(BaseModel):
+    tags: List[str] = Field(
+        ..., min_length=1, description=f"Tags as 'kind:value', with kind one of {', '.join(TAG_KINDS)}."
+    )
+
+
+@router.post(
+    "/cache/invalidate",
+    status_code=202,
+    summary="Invalidate cached responses by tag",
+    description="Deletes every cached response carrying any of the tags, in the background and without blocking Redis.",
+    tags=["Admin"],
+    dependencies=[Depends(require_admin)],
+)
+async def invalidate_cache(request: InvalidateRequest) -> Dict[str, Any]:
+    """
+    Starts a tag invalidation and returns its job report, to be polled at /admin/cache/invalidations/{id}.
+    """
+    if not tag_index:
+        raise HTTPException(status_code=503, detail="Redis is not available.")
+    try:
+        job = tag_index.start(request.tags)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    logger.info(f"Started cache invalidation {job['id']} of {', '.join(request.tags)}.")
+    return job
+
+
+@router.get(
+    "/cache/invalidations/{job_id}",
+    summary="Get the progress of a cache invalidation",
+    tags=["Admin"],
+    dependencies=[Depends(require_admin)],
+)
+async def invalidation_status(job_id: str) -> Dict[str, Any]:
+    """
+    Returns the report of a tag invalidation started on this instance.
+    """
+    job = tag_index.job(job_id) if tag_index else None
+    if not job:
+        raise HTTPException(status_code=404, detail="Unknown invalidation job.")
+    return job
+
+
+@router.get(
+    "/prompts/top",
+    summary="List the most requested prompts",
+    description="Returns the most requested prompts with their counts and possible overcounts.",
+    tags=["Admin"],
+    dependencies=[Depends(require_admin)],
+)
+async def top_prompts(limit: int = Query(10, ge=1, le=1000)) -> List[Dict[str, Any]]:
+    """
+    Returns the top prompts of the request frequency summary. /metrics only publishes their counts.
+    """
+    return [{"prompt": prompt, "count": count, "error": error} for prompt, count, error in heavy_hitters.top(limit)]
+
+
+@router.get(
+    "/storage/responses",
+    summary="Report response deduplication savings",
+    description="Compares the bytes stored for responses with the bytes inline copies would take.",
+    tags=["Admin"],
+    dependencies=[Depends(require_admin)],
+)
+async def response_storage() -> Dict[str, Any]:
+    """
+    Returns the storage savings of the deduplicated responses collection.
+    """
+    try:
+        return await asyncio.to_thread(response_store.savings, db)
+    except Exception as e:
+        logger.error(f"Failed to report response storage: {e}")
+        raise HTTPException(status_code=500, detail=f"Error reporting response storage: {str(e)}")
+
+
+@router.get(
+    "/export/interactions",
+    response_class=StreamingResponse,
+    summary="Export interactions",
+    description=(
+        "Streams every interaction created in the range, archived ones included, as gzip JSONL or Parquet. "
+        "Rows are ordered by id; to resume an interrupted download, pass the id of the last row received as `after`."
+    ),
+    tags=["Admin"],
+    dependencies=[Depends(require_admin)],
+)
+async def export_interactions(
+    format: Literal["jsonl", "parquet"] = Query("jsonl"),
+    since: Optional[datetime] = Query(None, description="Exports interactions created at or after this time."),
+    until: Optional[datetime] = Query(None, description="Exports interactions created before this time."),
+    after: Optional[str] = Query(None, description="Id of the last row already received."),
+) -> StreamingResponse:
+    """
+    Streams an interaction export. The cursor is iterated in the threadpool, one chunk at a time.
+    """
+    try:
+        body = exporter.encode(exporter.rows(since, until, after), format)
+    except ExportError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    logger.info(f"Exporting interactions as {format} (since={since}, until={until}, after={after}).")
+    return StreamingResponse(
+        body,
+        media_type=EXPORT_MEDIA_TYPES[format],
+        headers={"Content-Disposition": f'attachment; filename="interactions.{EXPORT_EXTENSIONS[format]}"'},
+    )
@@ -1,16 +1,59 @@
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, BackgroundTasks, Depends, Header, HTTPException, Query, Request, Response
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel, Field
-from typing import List, Optional
-from app.services.openai_service import OpenAIService
+from typing import Any, Callable, Dict, List, Optional
+from datetime import datetime, timezone
+from app.services.openai_service import OpenAIService, PromptTooLargeError
 from app.utils.database import get_database
 from app.utils.elasticsearch import get_elasticsearch_client
 from app.services.redis_service import RedisService
-from app.constants import CACHE_EXPIRATION_SECONDS, MONGODB_COLLECTION_NAME, ELASTICSEARCH_INDEX_NAME
-import logging
+from app.services.local_search_service import get_local_search_service
+from app.services.hybrid_search_service import HybridSearchService
+from app.services.suggestion_service import get_suggestion_service, prompt_counts
+from app.services.analysis_service import AnalysisService
+from app.services.analysis_store import AnalysisStore, CHUNK_CACHE_PREFIX, MANIFEST_CACHE_PREFIX
+from app.services.llm_scheduler import INTERACTIVE, BULK, CallCancelledError, parse_priority
+from app.services.circuit_breaker import CircuitOpenError, get_circuit_breaker
+from app.services.write_spool import WriteSpool
+from app.services.adaptive_ttl import get_adaptive_ttl
+from app.services.heavy_hitters import HeavyHitterTracker
+from app.services.cache_warmer import CacheWarmer
+from app.services.cache_tags import TAG_PREFIX, tag_entries
+from app.services.response_store import ResponseStore
+from app.services.interaction_archive import InteractionArchive, as_utc, id_range
+from app.services.search_sync import SearchSync
+from app.services.conversation_service import (
+    ConversationService,
+    ConversationConflictError,
+    ConversationNotFoundError,
+    CONVERSATION_CACHE_PREFIX,
+)
+from app.services.idempotency_service import (
+    IDEMPOTENCY_PREFIX,
+    IdempotencyService,
+    IdempotencyConflictError,
+    IdempotencyInProgressError,
+    fingerprint,
+)
+from app.utils.logger import get_logger, preview
+from app.utils.responses import ORJSONResponse, HISTORY_FIELDS, history_rows
+from app.utils.tokens import count_tokens
+from app.constants import (
+    STALE_CACHE_TTL_SECONDS,
+    MONGODB_COLLECTION_NAME,
+    ELASTICSEARCH_INDEX_NAME,
+    SUGGEST_MAX_PROMPT_CHARS,
+    ANALYZE_MAX_FILES,
+)
+import asyncio
+import hashlib
+import math
+import orjson
 import os
+import threading
 
 # Logging setup
-logger = logging.getLogger("interaction_controller")
+logger = get_logger("interaction_controller")
 
 # Envirement
 MONGO_URI = os.getenv("MONGODB_URI", "mongodb://localhost:27017")
@@ -23,12 +66,20 @@ OPENAI_MODEL = os.getenv("OPENAI_MODEL", "gpt-4o-mini")
 # Router setup
 router = APIRouter()
 
+# Fields read from the interactions for history rows; responses may be stored by reference
+HISTORY_PROJECTION = {"_id": 0, **{field: 1 for field in HISTORY_FIELDS}, "response_hash": 1, "user_id": 1}
+
 # Services initialization
 def initialize_services():
     try:
         # MongoDB initialization
         db_client = get_database()
-        db = db_client[MONGODB_COLLECTION_NAME]
+        db = db_client[MONGODB_COLLECTION_NAME]["interactions"]
+        # Serves per-user history, newest first or oldest first, from one index range
+        db.create_index([("user_id", 1), ("timestamp", -1)])
+        analysis_store = AnalysisStore(database=db.database)
+        # Distinct responses are stored once and referenced by content hash from the interactions
+        response_store = ResponseStore(db.database, get_circuit_breaker("mongodb"))
         logger.info("Connected to MongoDB successfully.")
     except Exception as db_error:
         logger.error(f"Failed to connect to MongoDB: {db_error}")
@@ -38,6 +89,7 @@ def initialize_services():
         # Redis initialization
         redis_service = RedisService(host=REDIS_HOST, port=REDIS_PORT)
         redis_client = redis_service.client
+        analysis_store.redis_client = redis_client
         logger.info("Redis client initialized successfully.")
     except Exception as redis_error:
         logger.error(f"Failed to initialize Redis client: {redis_error}")
@@ -59,30 +111,240 @@ def initialize_services():
         logger.error(f"Failed to initialize OpenAI Service: {openai_error}")
         raise RuntimeError("Failed to initialize OpenAI Service.")
 
-    return db, redis_client, elastic_client, openai_service
+    hybrid_search = None
+    if elastic_client:
+        # Hybrid kNN + BM25 search over the question-answer index
+        hybrid_search = HybridSearchService(elastic_client)
+        hybrid_search.ensure_index()
+
+    try:
+        # Local search initialization, rebuilt from MongoDB when the snapshot is out of date
+        local_search = get_local_search_service()
+        if local_search.count(ELASTICSEARCH_INDEX_NAME) != db.estimated_document_count():
+            local_search.rebuild(ELASTICSEARCH_INDEX_NAME, response_store.resolve_all(db.find({}, HISTORY_PROJECTION)))
+        logger.info("Local search initialized successfully.")
+    except Exception as local_search_error:
+        logger.error(f"Failed to initialize local search: {local_search_error}")
+        local_search = None
+
+    try:
+        # Prompt suggestions, ranked by how often each prompt was asked
+        suggestion_service = get_suggestion_service()
+        suggestion_service.build(prompt_counts(db))
+        logger.info("Suggestion index initialized successfully.")
+    except Exception as suggestion_error:
+        logger.error(f"Failed to initialize suggestion index: {suggestion_error}")
+        suggestion_service = None
+
+    # Chunked file analysis, storing chunk results by content hash and per-file chunk manifests
+    analysis_service = AnalysisService(openai_service, analysis_store)
+
+    # Replays the results of retried /submit requests carrying an Idempotency-Key
+    idempotency_service = IdempotencyService(redis_client)
+
+    # Interactions are held in memory while MongoDB's circuit is open and written once it closes
+    interaction_spool = WriteSpool(db, get_circuit_breaker("mongodb"))
+
+    return (
+        db, redis_client, elastic_client, openai_service, local_search, hybrid_search, suggestion_service,
+        analysis_service, idempotency_service, interaction_spool, response_store,
+    )
 
 
 # Initialization of service instances
-db, redis_client, elastic_client, openai_service = initialize_services()
+(
+    db, redis_client, elastic_client, openai_service, local_search, hybrid_search, suggestion_service,
+    analysis_service, idempotency_service, interaction_spool, response_store,
+) = initialize_services()
+
+# Circuit breakers of the dependencies called on the request path
+redis_breaker = get_circuit_breaker("redis")
+mongodb_breaker = get_circuit_breaker("mongodb")
+elasticsearch_breaker = get_circuit_breaker("elasticsearch")
+
+# TTLs of cached responses, adapted to each entry's access frequency and size
+ttl_policy = get_adaptive_ttl()
+if redis_client:
+    ttl_policy.memory_usage = lambda: redis_breaker.call(redis_client.info, "memory")["used_memory"]
+
+# Prefix of the long-lived copies of /submit responses served while the LLM is unavailable
+STALE_PREFIX = "stale:"
+# Prefixes of the app's own Redis keys; plain prompts starting with one are not used as cache keys
+RESERVED_KEY_PREFIXES = (
+    TAG_PREFIX, STALE_PREFIX, "submit:", "user:", "interaction:",
+    CONVERSATION_CACHE_PREFIX, IDEMPOTENCY_PREFIX, CHUNK_CACHE_PREFIX, MANIFEST_CACHE_PREFIX,
+)
+
+# Interactions older than the retention period, moved from MongoDB to compressed monthly files
+interaction_archive = InteractionArchive(db, response_store)
+
+# Indexes new interactions into Elasticsearch from the change stream, or from the outbox marker
+search_sync = SearchSync(db, hybrid_search, response_store) if hybrid_search else None
+
+# Most requested plain prompts, whose stored answers are loaded into Redis at startup
+heavy_hitters = HeavyHitterTracker(database=db.database)
+cache_warmer = CacheWarmer(
+    db, redis_client, ttl_policy.ttl, response_store=response_store,
+    extra_keys=lambda prompt, response: {STALE_PREFIX + prompt: (response, STALE_CACHE_TTL_SECONDS)},
+) if redis_client else None
 
 
+# Multi-turn conversations: turns in MongoDB, the compact state they are answered from in Redis.
+# Summaries are written by `compact_conversation`, which queues the LLM call on the event loop.
+conversation_service = ConversationService(db.database, redis_client, breaker=mongodb_breaker)
+
 
 # Pydantic models
 class SubmitRequest(BaseModel):
     prompt: str = Field(..., description="The user's question or task.")
     code: Optional[str] = Field("", description="Code snippet provided by the user.")
     language: Optional[str] = Field("", description="Programming language context.")
+    model: Optional[str] = Field(None, description="Model to use instead of the routed one.")
+    priority: Optional[str] = Field(None, description="Scheduling class, `interactive` (default) or `bulk`.")
+    private: bool = Field(False, description="Cache the answer for the calling user only; needs an X-User-Id.")
 
 
 class SubmitResponse(BaseModel):
     response: str = Field(..., description="The AI-generated response.")
 
 
+class ConversationTurnRequest(BaseModel):
+    prompt: str = Field(..., description="The new question or task; earlier turns are kept by the server.")
+    code: Optional[str] = Field("", description="Code snippet for this turn only; it is not kept in the conversation.")
+    language: Optional[str] = Field("", description="Programming language context.")
+    model: Optional[str] = Field(None, description="Model to use instead of the routed one.")
+    priority: Optional[str] = Field(None, description="Scheduling class, `interactive` (default) or `bulk`.")
+
+
+class ConversationTurnResponse(BaseModel):
+    response: str = Field(..., description="The AI-generated response.")
+    turn: int = Field(..., description="Number of turns of the conversation, this one included.")
+
+
 class HistoryResponse(BaseModel):
     prompt: str
     response: str
 
 
+class AnalyzeFile(BaseModel):
+    file_path: str = Field(..., description="Path of the file in the user's workspace.")
+    content: str = Field(..., description="Full content of the file.")
+    language: Optional[str] = Field("", description="Programming language of the file.")
+
+
+class AnalyzeRequest(BaseModel):
+    files: List[AnalyzeFile] = Field(..., min_length=1, max_length=ANALYZE_MAX_FILES, description="The files to analyze.")
+    workspace: Optional[str] = Field(None, description="Workspace identifier; when set, each file's chunk manifest is saved.")
+    priority: Optional[str] = Field(None, description="Scheduling class, `bulk` (default) or `interactive`.")
+
+
+class ChunkReference(BaseModel):
+    hash: str = Field(..., description="Content hash of the chunk.")
+    start_line: int = Field(..., ge=1, description="First line of the chunk, 1-based.")
+    end_line: int = Field(..., ge=1, description="Last line of the chunk, inclusive.")
+    content: Optional[str] = Field(None, description="The chunk text; only sent for chunks the server does not know.")
+
+
+class IncrementalAnalyzeRequest(BaseModel):
+    workspace: str = Field(..., min_length=1, description="Workspace identifier.")
+    file_path: str = Field(..., description="Path of the file in the user's workspace.")
+    language: Optional[str] = Field("", description="Programming language the chunks were hashed with.")
+    chunks: List[ChunkReference] = Field(..., description="The file's chunks, in order.")
+    priority: Optional[str] = Field(None, description="Scheduling class, `interactive` (default) or `bulk`.")
+
+
+class SuggestionResponse(BaseModel):
+    prompt: str = Field(..., description="A previously asked prompt.")
+    count: int = Field(..., description="How many times the prompt was asked.")
+
+
+def scheduling(
+    request: Request,
+    x_priority: Optional[str] = Header(None, description="Scheduling class of the request's LLM calls."),
+    x_user_id: Optional[str] = Header(None, description="The calling user, for fair queuing among users."),
+) -> Dict[str, Optional[str]]:
+    """
+    Returns the scheduling parameters of a request, and the id of the user whose history it belongs to.
+    Users without an id are told apart by address for scheduling, and their interactions belong to no user.
+    """
+    user = x_user_id or (request.client.host if request.client else "")
+    return {"user": user, "priority": x_priority, "user_id": x_user_id}
+
+
+def submit_cache_key(request: SubmitRequest, user_id: Optional[str] = None) -> str:
+    """
+    Returns the Redis key of a /submit response. Plain prompts keep the bare prompt as key, unless it
+    could name one of the app's own keys, e.g. a tag set; private prompts are namespaced by user, so
+    their answers are never served to another user.
+    """
+    if not request.code and not request.model and not request.prompt.startswith(RESERVED_KEY_PREFIXES):
+        key = request.prompt
+    else:
+        digest = hashlib.sha256(
+            f"{request.model or ''}\0{request.language}\0{request.prompt}\0{request.code}".encode("utf-8")
+        ).hexdigest()
+        key = f"submit:{digest}"
+    return f"user:{user_id}:{key}" if request.private and user_id else key
+
+
+def unavailable(error: CircuitOpenError) -> HTTPException:
+    """
+    Returns the 503 response of a request whose dependency's circuit is open.
+    """
+    return HTTPException(
+        status_code=503, detail=str(error), headers={"Retry-After": str(max(1, math.ceil(error.retry_after)))}
+    )
+
+
+def cache_get(key: str, track: bool = True) -> Optional[str]:
+    """
+    Reads a cached response. An unavailable Redis counts as a cache miss.
+    With `track`, the access is counted and a hit on a hot entry extends its TTL.
+    """
+    if not redis_client:
+        return None
+    if track:
+        ttl_policy.touch(key)
+    try:
+        value = redis_breaker.call(redis_client.get, key)
+        if track:
+            ttl_policy.count(bool(value))
+        if value and track:
+            ttl = ttl_policy.refreshed_ttl(key, len(value.encode("utf-8")))
+            if ttl:
+                redis_breaker.call(redis_client.expire, key, ttl)
+        return value
+    except CircuitOpenError:
+        return None
+    except Exception as e:
+        logger.error(f"Failed to read cache key '{preview(key)}': {e}")
+        return None
+
+
+def cache_response(key: str, response: str, tags: Optional[Dict[str, Optional[str]]] = None) -> None:
+    """
+    Caches a response, along with a long-lived stale copy, both indexed under `tags` for invalidation.
+    An unavailable Redis skips caching.
+    """
+    if not redis_client:
+        return
+
+    def write():
+        pipeline = redis_client.pipeline(transaction=False)
+        pipeline.set(key, response, ex=ttl_policy.ttl(key, len(response.encode("utf-8"))))
+        pipeline.set(STALE_PREFIX + key, response, ex=STALE_CACHE_TTL_SECONDS)
+        tag_entries(pipeline, [key, STALE_PREFIX + key], tags or {})
+        pipeline.execute()
+
+    try:
+        redis_breaker.call(write)
+        logger.info("Response cached in Redis.")
+    except CircuitOpenError:
+        pass
+    except Exception as e:
+        logger.error(f"Failed to cache response '{preview(key)}': {e}")
+
+
 @router.post(
     "/submit",
     response_model=SubmitResponse,
@@ -90,76 +352,442 @@ class HistoryResponse(BaseModel):
     description="Sends a prompt and optional code snippet to the AI model, returning a context-aware response.",
     tags=["AI Interaction"]
 )
-async def submit_interaction(request: SubmitRequest) -> SubmitResponse:
+async def submit_interaction(
+    request: SubmitRequest,
+    schedule: Dict[str, Optional[str]] = Depends(scheduling),
+    idempotency_key: Optional[str] = Header(
+        None, alias="Idempotency-Key", max_length=255, description="Makes retries of the request run it once."
+    ),
+) -> SubmitResponse:
     """
     Endpoint to process user input and generate an AI response.
+    With an `Idempotency-Key`, a retry waits for the original request or replays its stored result.
     """
+    if not idempotency_key:
+        return SubmitResponse(response=await process_submission(request, schedule))
+
+    payload_fingerprint = fingerprint(request.model_dump())
     try:
-        cached_response = None
-        if redis_client:
-            cached_response = redis_client.get(request.prompt)
-            if cached_response:
-                logger.info("Cache hit: Returning cached response.")
-                return SubmitResponse(response=cached_response)
+        stored_response = await idempotency_service.begin(idempotency_key, payload_fingerprint)
+    except IdempotencyConflictError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    except IdempotencyInProgressError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    if stored_response is not None:
+        return SubmitResponse(response=stored_response)
 
-        # Generate response using OpenAI
-        response = openai_service.generate_response(prompt=request.prompt)
+    try:
+        response = await process_submission(request, schedule)
+    except BaseException:
+        idempotency_service.abandon(idempotency_key)
+        raise
+    idempotency_service.complete(idempotency_key, payload_fingerprint, response)
+    return SubmitResponse(response=response)
 
-        # Save to Redis
-        if redis_client:
-            redis_client.set(request.prompt, response, ex=CACHE_EXPIRATION_SECONDS)
-            logger.info("Response cached in Redis.")
 
-        # Save to MongoDB
+async def process_submission(
+    request: SubmitRequest,
+    schedule: Dict[str, Optional[str]],
+    on_delta: Optional[Callable[[str], None]] = None,
+    cancelled: Optional[threading.Event] = None,
+) -> str:
+    """
+    Answers a submission from the cache or the model and records the interaction.
+    With `on_delta`, a model response is streamed to it as it is generated; setting `cancelled`
+    abandons the model call, and nothing is cached or recorded.
+    """
+    if request.private and not schedule.get("user_id"):
+        raise HTTPException(status_code=400, detail="Private prompts need an X-User-Id header.")
+    try:
+        # Suggestions are shared by all users, so private prompts stay out of them
+        if suggestion_service and not request.private:
+            suggestion_service.add(request.prompt)
+
+        cache_key = submit_cache_key(request, schedule.get("user_id"))
+        if cache_key == request.prompt:
+            heavy_hitters.add(request.prompt)
+        cached_response = cache_get(cache_key)
+        if cached_response:
+            logger.info("Cache hit: Returning cached response.")
+            return cached_response
+
+        # Generate response using OpenAI on the routed model, with the code context trimmed to the token budget
         try:
-            interaction = {"prompt": request.prompt, "response": response}
-            db.insert_one(interaction)
+            completion = await openai_service.agenerate(
+                request.prompt,
+                request.code or "",
+                request.language or "",
+                model=request.model,
+                priority=parse_priority(request.priority or schedule["priority"], INTERACTIVE),
+                user=schedule["user"],
+                private=request.private,
+                on_delta=on_delta,
+                cancelled=cancelled,
+            )
+        except CircuitOpenError as e:
+            stale_response = cache_get(STALE_PREFIX + cache_key, track=False)
+            if stale_response:
+                logger.warning("LLM circuit open: returning a stale cached response.")
+                return stale_response
+            raise unavailable(e)
+        response = completion.text
+
+        # Save to Redis, indexed for invalidation by model, language, template version and user
+        cache_response(cache_key, response, {
+            "model": completion.model,
+            "language": request.language,
+            "template": completion.template,
+            "user": schedule["user"],
+        })
+
+        # Save to MongoDB, or spool the interaction while MongoDB is unavailable
+        interaction = {
+            "prompt": request.prompt,
+            "response": response,
+            "cache_key": cache_key,
+            "usage": completion.usage(),
+            "timestamp": datetime.now(timezone.utc),
+        }
+        if schedule.get("user_id"):
+            interaction["user_id"] = schedule["user_id"]
+        if search_sync:
+            interaction.update(search_sync.pending_marker())
+        if await asyncio.to_thread(lambda: interaction_spool.insert(response_store.reference(interaction))):
             logger.info("Interaction saved to database successfully.")
-        except Exception as db_error:
-            logger.error(f"Failed to save interaction to database: {db_error}")
+        else:
+            logger.warning("MongoDB unavailable: interaction spooled.")
 
-        return SubmitResponse(response=response)
+        # Keep the local search index up to date
+        if local_search:
+            local_search.index_document(
+                ELASTICSEARCH_INDEX_NAME, {"prompt": request.prompt, "response": response, "user_id": schedule.get("user_id")}
+            )
+
+        return response
+    except (HTTPException, CallCancelledError):
+        raise
+    except PromptTooLargeError as e:
+        logger.warning(f"Rejected oversized request: {e}")
+        raise HTTPException(status_code=413, detail=str(e))
     except Exception as e:
         logger.error(f"Error in submit_interaction: {e}", exc_info=True)
         raise HTTPException(status_code=500, detail=f"Error processing request: {str(e)}")
 
 
+@router.post(
+    "/analyze",
+    summary="Analyze whole files",
+    description=(
+        "Splits the files into syntax-aware chunks, serves unchanged chunks from the cache and analyzes "
+        "the rest in parallel. Streams one JSON line per file as soon as the file is done."
+    ),
+    tags=["AI Interaction"]
+)
+async def analyze_files(request: AnalyzeRequest, schedule: Dict[str, Optional[str]] = Depends(scheduling)) -> StreamingResponse:
+    """
+    Endpoint to analyze many files in one request, streaming results per file as NDJSON.
+    """
+    files = [{**file.model_dump(), "workspace": request.workspace} for file in request.files]
+    priority = parse_priority(request.priority or schedule["priority"], BULK)
+
+    async def stream_results():
+        async for result in analysis_service.analyze_files(files, schedule["user"], priority):
+            yield orjson.dumps(result) + b"\n"
+
+    return StreamingResponse(stream_results(), media_type="application/x-ndjson")
+
+
+@router.post(
+    "/analyze/incremental",
+    response_class=ORJSONResponse,
+    summary="Re-analyze a file from its changed chunks",
+    description=(
+        "Takes the file's chunk hashes plus the content of changed chunks, re-runs only those and merges "
+        "the results. Returns `missing` hashes instead when unchanged chunks are unknown to the server."
+    ),
+    tags=["AI Interaction"]
+)
+async def analyze_incremental(
+    request: IncrementalAnalyzeRequest, schedule: Dict[str, Optional[str]] = Depends(scheduling)
+) -> ORJSONResponse:
+    """
+    Endpoint to re-analyze a file incrementally against its stored chunk manifest.
+    The developer is waiting on the active file, so its LLM calls are interactive by default.
+    """
+    try:
+        chunks = [chunk.model_dump() for chunk in request.chunks]
+        priority = parse_priority(request.priority or schedule["priority"], INTERACTIVE)
+        result = await analysis_service.analyze_incremental(
+            request.workspace, request.file_path, request.language or "", chunks, schedule["user"], priority
+        )
+        return ORJSONResponse(result)
+    except Exception as e:
+        logger.error(f"Error in analyze_incremental: {e}", exc_info=True)
+        raise HTTPException(status_code=500, detail=f"Error analyzing file: {str(e)}")
+
+
+@router.get(
+    "/analyze/manifest",
+    response_class=ORJSONResponse,
+    summary="Get the chunk manifest of a file",
+    description="Returns the language and ordered chunk hashes recorded at the file's last analysis.",
+    tags=["AI Interaction"]
+)
+async def get_manifest(workspace: str = Query(..., min_length=1), file_path: str = Query(...)) -> ORJSONResponse:
+    """
+    Endpoint to fetch a file's chunk manifest, e.g. after the client restarted.
+    """
+    manifest = await asyncio.to_thread(analysis_service.store.get_manifest, workspace, file_path) if analysis_service.store else None
+    if not manifest:
+        raise HTTPException(status_code=404, detail="No manifest recorded for this file.")
+    return ORJSONResponse(manifest)
+
+
+@router.post(
+    "/conversations",
+    status_code=201,
+    response_class=ORJSONResponse,
+    summary="Start a conversation",
+    description="Creates a conversation session; its turns are then sent one at a time to /conversations/{session_id}/turns.",
+    tags=["Conversations"]
+)
+async def create_conversation(schedule: Dict[str, Optional[str]] = Depends(scheduling)) -> ORJSONResponse:
+    """
+    Endpoint to start a conversation owned by the user given by X-User-Id, if any.
+    """
+    try:
+        session_id = await asyncio.to_thread(conversation_service.create, schedule.get("user_id"))
+    except CircuitOpenError as e:
+        raise unavailable(e)
+    except Exception as e:
+        logger.error(f"Error in create_conversation: {e}", exc_info=True)
+        raise HTTPException(status_code=500, detail=f"Error creating conversation: {str(e)}")
+    return ORJSONResponse({"session_id": session_id}, status_code=201)
+
+
+async def compact_conversation(session_id: str) -> None:
+    """
+    Summarizes a conversation's older turns after a response was sent, if enough of them accumulated.
+    The summary is bulk LLM work; it waits for its slot on the event loop, holding no worker thread.
+    """
+    try:
+        fold = await asyncio.to_thread(conversation_service.fold, session_id)
+        if fold is None:
+            return
+        completion = await openai_service.agenerate(
+            fold.transcript, template="summary", fields={"summary": fold.summary or "(none yet)"}, priority=BULK,
+        )
+        await asyncio.to_thread(conversation_service.save_summary, session_id, fold, completion.text)
+    except Exception as e:
+        logger.error(f"Failed to summarize conversation {session_id}: {e}")
+
+
+@router.post(
+    "/conversations/{session_id}/turns",
+    response_model=ConversationTurnResponse,
+    summary="Continue a conversation",
+    description=(
+        "Answers the new turn with the conversation's summary and recent turns as context, "
+        "so the client sends only the new prompt."
+    ),
+    tags=["Conversations"]
+)
+async def conversation_turn(
+    session_id: str,
+    request: ConversationTurnRequest,
+    background_tasks: BackgroundTasks,
+    schedule: Dict[str, Optional[str]] = Depends(scheduling),
+) -> ConversationTurnResponse:
+    """
+    Endpoint to answer and record a conversation turn. Turns of a conversation are answered one at a
+    time; a turn sent while another is in flight gets a 409 and can be sent again.
+    """
+    try:
+        context = await asyncio.to_thread(
+            conversation_service.context, session_id, schedule.get("user_id"), count_tokens(request.prompt)
+        )
+        completion = await openai_service.agenerate(
+            request.prompt,
+            request.code or "",
+            request.language or "",
+            model=request.model,
+            priority=parse_priority(request.priority or schedule["priority"], INTERACTIVE),
+            user=schedule["user"],
+            history=context.messages(),
+        )
+        turn = await asyncio.to_thread(conversation_service.append, session_id, context.count, request.prompt, completion.text)
+    except ConversationNotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except ConversationConflictError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    except CircuitOpenError as e:
+        raise unavailable(e)
+    except PromptTooLargeError as e:
+        logger.warning(f"Rejected oversized conversation turn: {e}")
+        raise HTTPException(status_code=413, detail=str(e))
+    except Exception as e:
+        logger.error(f"Error in conversation_turn: {e}", exc_info=True)
+        raise HTTPException(status_code=500, detail=f"Error processing turn: {str(e)}")
+
+    background_tasks.add_task(compact_conversation, session_id)
+    return ConversationTurnResponse(response=completion.text, turn=turn)
+
+
+@router.get(
+    "/conversations/{session_id}",
+    response_class=ORJSONResponse,
+    summary="Get a conversation",
+    description="Returns the number of turns, the summary of the earlier turns and the turns not summarized yet.",
+    tags=["Conversations"]
+)
+async def get_conversation(session_id: str, schedule: Dict[str, Optional[str]] = Depends(scheduling)) -> ORJSONResponse:
+    """
+    Endpoint to restore a conversation, e.g. after the client restarted.
+    """
+    try:
+        return ORJSONResponse(await asyncio.to_thread(conversation_service.get, session_id, schedule.get("user_id")))
+    except ConversationNotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except CircuitOpenError as e:
+        raise unavailable(e)
+
+
+@router.delete(
+    "/conversations/{session_id}",
+    status_code=204,
+    summary="Delete a conversation",
+    tags=["Conversations"]
+)
+async def delete_conversation(session_id: str, schedule: Dict[str, Optional[str]] = Depends(scheduling)) -> Response:
+    """
+    Endpoint to delete a conversation and its turns.
+    """
+    try:
+        await asyncio.to_thread(conversation_service.delete, session_id, schedule.get("user_id"))
+    except ConversationNotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except CircuitOpenError as e:
+        raise unavailable(e)
+    return Response(status_code=204)
+
+
+def search_elasticsearch(query: str, user_id: Optional[str]) -> Optional[List[Dict[str, str]]]:
+    """
+    Searches a user's history in ElasticSearch. Returns None if ElasticSearch is unavailable.
+    """
+    logger.info(f"Searching ElasticSearch for query: {preview(query)}")
+    try:
+        return history_rows(elasticsearch_breaker.call(hybrid_search.search, query, scoped=True, user_id=user_id))
+    except CircuitOpenError:
+        logger.warning("ElasticSearch circuit open, skipping it.")
+    except Exception as es_error:
+        logger.error(f"Error querying ElasticSearch: {es_error}")
+    return None
+
+
+def history_cursor(user_id: Optional[str], since: Optional[datetime], until: Optional[datetime]) -> Any:
+    """
+    Returns the cursor of a user's interactions created in [since, until), oldest first, read from
+    the (user_id, timestamp) index. Interactions of no user predate timestamps, so they are bounded
+    by the creation time in their ObjectId instead.
+    """
+    if not user_id:
+        return db.find({"user_id": None, **id_range(since, until)}, HISTORY_PROJECTION)
+    bounds = {}
+    if since:
+        bounds["$gte"] = as_utc(since)
+    if until:
+        bounds["$lt"] = as_utc(until)
+    query = {"user_id": user_id, **({"timestamp": bounds} if bounds else {})}
+    return db.find(query, HISTORY_PROJECTION).sort("timestamp", 1)
+
+
 @router.get(
     "/history",
     response_model=List[HistoryResponse],
+    response_class=ORJSONResponse,
     summary="Get interaction history",
-    description="Retrieves the user's past interactions, with relevance-based search if a query is provided.",
+    description=(
+        "Retrieves the past interactions of the user given by X-User-Id (without it, those of no user), "
+        "with relevance-based search if a query is provided."
+    ),
     tags=["History"]
 )
-async def get_interactions(query: Optional[str] = None) -> List[HistoryResponse]:
+async def get_interactions(
+    query: Optional[str] = None,
+    since: Optional[datetime] = Query(None, description="Lists interactions created at or after this time (UTC if no offset)."),
+    until: Optional[datetime] = Query(None, description="Lists interactions created before this time (UTC if no offset)."),
+    x_user_id: Optional[str] = Header(None, description="The user whose history is returned."),
+) -> ORJSONResponse:
     """
     Endpoint to retrieve past interactions, optionally filtered by a relevance-based query.
+    Rows are emitted straight from the stored documents, skipping the `HistoryResponse` round trip.
+    Without a query, `since` and `until` bound the listing; the archive of interactions past the
+    retention period is only read when `since` reaches back into it.
     """
+    if since and until and since >= until:
+        raise HTTPException(status_code=422, detail="`since` must be before `until`.")
     try:
-        if query and elastic_client:
-            logger.info(f"Searching ElasticSearch for query: {query}")
-            try:
-                search_results = elastic_client.search(index=ELASTICSEARCH_INDEX_NAME, query={"match": {"prompt": query}})
-                interactions = [
-                    {"prompt": hit["_source"]["prompt"], "response": hit["_source"]["response"]}
-                    for hit in search_results["hits"]["hits"]
-                ]
-                logger.info(f"Retrieved {len(interactions)} interactions from ElasticSearch.")
-            except Exception as es_error:
-                logger.error(f"Error querying ElasticSearch: {es_error}")
-                interactions = []
+        interactions = await asyncio.to_thread(search_elasticsearch, query, x_user_id) if query and hybrid_search else None
+        if interactions is not None:
+            logger.info(f"Retrieved {len(interactions)} interactions from ElasticSearch.")
+        elif query and local_search:
+            logger.info(f"ElasticSearch unavailable or not configured, searching the local index for query: {preview(query)}")
+            interactions = history_rows(
+                local_search.search_documents(
+                    ELASTICSEARCH_INDEX_NAME, {"match": {"prompt": query}}, filters={"user_id": x_user_id}
+                )
+            )
+            logger.info(f"Retrieved {len(interactions)} interactions from the local index.")
+        elif query and hybrid_search:
+            # ElasticSearch failed and there is no local index to fall back to
+            interactions = []
         else:
-            if not elastic_client:
-                logger.warning("ElasticSearch client is None, skipping search functionality.")
+            if query:
+                logger.warning("No search backend available, skipping search functionality.")
             logger.info("Fetching all interactions from MongoDB.")
-            interactions = list(db.find({}, {"_id": 0}))
+            try:
+                interactions = await asyncio.to_thread(
+                    mongodb_breaker.call,
+                    lambda: history_rows(response_store.resolve_all(history_cursor(x_user_id, since, until))),
+                )
+            except CircuitOpenError as e:
+                raise unavailable(e)
             logger.info(f"Retrieved {len(interactions)} interactions from MongoDB.")
+            if interaction_archive.needed(since):
+                # Gunzipping monthly files takes a while; keep it off the event loop
+                archived = await asyncio.to_thread(
+                    lambda: history_rows(row for row in interaction_archive.read(since, until) if row.get("user_id") == x_user_id)
+                )
+                logger.info(f"Retrieved {len(archived)} interactions from the archive.")
+                interactions = archived + interactions
 
         if not interactions:
             logger.info("No interactions found.")
-            return []
 
-        return [HistoryResponse(**interaction) for interaction in interactions]
+        return ORJSONResponse(interactions)
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error in get_interactions: {e}", exc_info=True)
         raise HTTPException(status_code=500, detail=f"Error fetching history: {str(e)}")
+
+
+@router.get(
+    "/suggest",
+    response_model=List[SuggestionResponse],
+    response_class=ORJSONResponse,
+    summary="Suggest previously asked prompts",
+    description="Returns the most frequently asked prompts starting with the given prefix.",
+    tags=["AI Interaction"]
+)
+async def suggest_prompts(
+    prefix: str = Query(..., min_length=1, max_length=SUGGEST_MAX_PROMPT_CHARS),
+    limit: int = Query(10, ge=1, le=50),
+) -> ORJSONResponse:
+    """
+    Endpoint to autocomplete a prompt from the in-memory prefix index.
+    """
+    if not suggestion_service:
+        return ORJSONResponse([])
+    return ORJSONResponse(suggestion_service.suggest(prefix, limit))
@@ -0,0 +1,87 @@
+from fastapi import APIRouter, HTTPException, WebSocket
+from pydantic import BaseModel, ValidationError
+from typing import Any, Dict, Type, TypeVar
+from app.controllers.interaction_controller import (
+    AnalyzeRequest,
+    IncrementalAnalyzeRequest,
+    SubmitRequest,
+    analysis_service,
+    process_submission,
+    scheduling,
+)
+from app.services.llm_scheduler import INTERACTIVE, BULK, parse_priority
+from app.services.websocket_channel import ChannelRequest, WebSocketChannel
+from app.utils.logger import get_logger
+
+# Logger setup
+logger = get_logger("websocket_controller")
+
+router = APIRouter()
+
+Payload = TypeVar("Payload", bound=BaseModel)
+
+
+def parse_payload(model: Type[Payload], request: ChannelRequest) -> Payload:
+    """
+    Validates the `payload` of a channel request against the schema of the matching HTTP endpoint.
+    """
+    try:
+        return model.model_validate(request.message.get("payload") or {})
+    except ValidationError as e:
+        raise HTTPException(status_code=422, detail=e.errors(include_url=False, include_context=False))
+
+
+async def submit(request: ChannelRequest) -> Dict[str, Any]:
+    """
+    Runs the /submit pipeline, streaming the model's response as `delta` messages unless `stream` is false.
+    Cached responses come whole, in the `done` message.
+    """
+    payload = parse_payload(SubmitRequest, request)
+    on_delta = None
+    if request.message.get("stream", True):
+        on_delta = lambda text: request.send_threadsafe("delta", data=text)
+    response = await process_submission(payload, request.channel.context["schedule"], on_delta, request.cancelled)
+    return {"response": response}
+
+
+async def analyze(request: ChannelRequest) -> Dict[str, Any]:
+    """
+    Runs /analyze, sending each file's analysis as a `result` message as soon as the file is done.
+    """
+    payload = parse_payload(AnalyzeRequest, request)
+    schedule = request.channel.context["schedule"]
+    files = [{**file.model_dump(), "workspace": payload.workspace} for file in payload.files]
+    analyzed = 0
+    async for result in analysis_service.analyze_files(files, schedule["user"], parse_priority(payload.priority or schedule["priority"], BULK)):
+        await request.send("result", data=result)
+        analyzed += 1
+    return {"files": analyzed}
+
+
+async def analyze_incremental(request: ChannelRequest) -> Dict[str, Any]:
+    """
+    Runs /analyze/incremental for one file.
+    """
+    payload = parse_payload(IncrementalAnalyzeRequest, request)
+    schedule = request.channel.context["schedule"]
+    return await analysis_service.analyze_incremental(
+        payload.workspace, payload.file_path, payload.language or "", [chunk.model_dump() for chunk in payload.chunks],
+        schedule["user"], parse_priority(payload.priority or schedule["priority"], INTERACTIVE),
+    )
+
+
+HANDLERS = {"submit": submit, "analyze": analyze, "analyze_incremental": analyze_incremental}
+
+
+@router.websocket("/ws")
+async def websocket_channel(websocket: WebSocket) -> None:
+    """
+    Persistent channel multiplexing /submit, /analyze and /analyze/incremental requests by request id,
+    with streamed responses, cancellation and per-connection backpressure (see `WebSocketChannel`).
+    The X-User-Id and X-Priority headers of the handshake apply to every request of the connection.
+    """
+    await websocket.accept()
+    schedule = scheduling(websocket, websocket.headers.get("x-priority"), websocket.headers.get("x-user-id"))
+    logger.info(f"WebSocket channel opened for {schedule['user']}.")
+    await WebSocketChannel(websocket, HANDLERS, {"schedule": schedule}).serve()
+    logger.info(f"WebSocket channel closed for {schedule['user']}.")
@@ -5,15 +5,70 @@ from app.utils.database import get_database
 from app.utils.elasticsearch import get_elasticsearch_client
 from app.services.redis_service import RedisService
 from app.services.openai_service import OpenAIService
-from app.constants import MONGODB_COLLECTION_NAME
-from app.controllers.interaction_controller import router as interaction_router
+from app.services.local_search_service import get_local_search_service
+from app.services.llm_scheduler import get_llm_scheduler
+from app.services.circuit_breaker import OPEN, circuit_breaker_snapshot
+from app.services.health_service import HealthService
+from app.services.adaptive_ttl import get_adaptive_ttl
+from app.constants import (
+    MONGODB_COLLECTION_NAME,
+    HEALTH_PROBE_TIMEOUT_SECONDS,
+    HEALTH_CRITICAL_DEPENDENCIES,
+    CACHE_WARM_TOP_N,
+    CACHE_TAG_PRUNE_SECONDS,
+    HEAVY_HITTERS_PERSIST_SECONDS,
+    INTERACTION_ARCHIVE_INTERVAL_SECONDS,
+)
+from app.controllers.interaction_controller import (
+    router as interaction_router, interaction_spool, heavy_hitters, cache_warmer, interaction_archive, search_sync,
+)
+from app.controllers.admin_controller import router as admin_router, tag_index
+from app.controllers.websocket_controller import router as websocket_router
+from app.utils.logger import get_logger
+from app.utils.responses import ORJSONResponse
 from dotenv import load_dotenv
-
-import logging
+import asyncio
+import time
 
 # Logger setup
-logger = logging.getLogger("main")
-logger.setLevel(logging.INFO)
+logger = get_logger("main")
+
+# Process start, reported by the liveness probe
+STARTED_AT = time.monotonic()
+
+
+async def prune_cache_tags() -> None:
+    """
+    Periodically removes the entries that expired on their own from the cache tag sets.
+    """
+    while True:
+        await asyncio.sleep(CACHE_TAG_PRUNE_SECONDS)
+        try:
+            await asyncio.to_thread(tag_index.prune)
+        except Exception as e:
+            logger.error(f"Failed to prune the cache tag sets: {e}")
+
+
+async def persist_heavy_hitters() -> None:
+    """
+    Periodically writes the prompt frequency summary to MongoDB.
+    """
+    while True:
+        await asyncio.sleep(HEAVY_HITTERS_PERSIST_SECONDS)
+        await asyncio.to_thread(heavy_hitters.persist)
+
+
+async def archive_interactions() -> None:
+    """
+    Periodically moves the interactions past the retention period to the archive files.
+    """
+    while True:
+        try:
+            await asyncio.to_thread(interaction_archive.archive)
+        except Exception as e:
+            logger.error(f"Failed to archive interactions: {e}")
+        await asyncio.sleep(INTERACTION_ARCHIVE_INTERVAL_SECONDS)
+
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
@@ -23,6 +78,10 @@ async def lifespan(app: FastAPI):
     mongo_client = None
     elastic_client = None
     redis_client = None
+    health_service = None
+    prune_task = None
+    persist_task = None
+    archive_task = None
 
     try:
         # MongoDB Initialization
@@ -51,6 +110,34 @@ async def lifespan(app: FastAPI):
         app.state.elastic_client = elastic_client
         app.state.openai_service = openai_service
 
+        # Deep health probes, run concurrently in threads with strict timeouts and cached briefly
+        health_service = HealthService({
+            "mongodb": lambda: db.command("ping"),
+            "redis": redis_client.ping,
+            "elasticsearch": lambda: elastic_client.options(request_timeout=HEALTH_PROBE_TIMEOUT_SECONDS).ping(),
+            "openai": lambda: openai_service.ping(HEALTH_PROBE_TIMEOUT_SECONDS),
+        })
+        app.state.health_service = health_service
+
+        # Load the answers of the most requested prompts into Redis in the background
+        if cache_warmer and CACHE_WARM_TOP_N:
+            cache_warmer.start([(prompt, count) for prompt, count, _ in heavy_hitters.top(CACHE_WARM_TOP_N)])
+
+        # Save the prompt frequency summary so it survives restarts
+        persist_task = asyncio.create_task(persist_heavy_hitters())
+
+        # Keep the cache tag sets from accumulating expired entries
+        if tag_index:
+            prune_task = asyncio.create_task(prune_cache_tags())
+
+        # Index new interactions into Elasticsearch in the background
+        if search_sync:
+            search_sync.start()
+
+        # Bound the interactions collection to the retention period
+        if interaction_archive.enabled:
+            archive_task = asyncio.create_task(archive_interactions())
+
         logger.info("Application initialized successfully with all services.")
         yield
 
@@ -60,6 +147,18 @@ async def lifespan(app: FastAPI):
 
     finally:
         # Cleanup resources
+        if prune_task:
+            prune_task.cancel()
+        if persist_task:
+            persist_task.cancel()
+        if archive_task:
+            archive_task.cancel()
+        if search_sync:
+            search_sync.stop()
+        if health_service:
+            health_service.close()
+        heavy_hitters.persist()
+        interaction_spool.flush()
         if mongo_client:
             mongo_client.close()
             logger.info("MongoDB client closed.")
@@ -69,6 +168,7 @@ async def lifespan(app: FastAPI):
         if elastic_client:
             elastic_client.close()
             logger.info("Elasticsearch client closed.")
+        get_local_search_service().snapshot()
 
 
 # Initialize FastAPI application with lifespan context manager
@@ -80,6 +180,7 @@ app = FastAPI(
     ),
     version="0.0.1",
     lifespan=lifespan,
+    default_response_class=ORJSONResponse,
 )
 
 # CORS middleware setup
@@ -97,20 +198,94 @@ app.add_middleware(
 
 # Register API routes
 app.include_router(interaction_router)
+app.include_router(admin_router)
+app.include_router(websocket_router)
 
 # Health check endpoint
 @app.get("/health", tags=["Utility"])
 async def health_check():
     """
-    Health check endpoint that verifies the status of connected services.
+    Health check endpoint that verifies the status of connected services by probing them.
+    Probe results are cached briefly; the status is `degraded` while a dependency is down or its circuit is open.
     """
+    probes = await app.state.health_service.check()
+    breakers = circuit_breaker_snapshot()
+    healthy = all(probe.ok for probe in probes.values()) and not any(
+        breaker["state"] == OPEN for breaker in breakers.values()
+    )
     health_status = {
-        "status": "healthy",
+        "status": "healthy" if healthy else "degraded",
         "services": {
-            "mongodb": "connected" if app.state.db else "disconnected",
-            "redis": "connected" if app.state.redis_client else "disconnected",
-            "elasticsearch": "connected" if app.state.elastic_client else "disconnected",
-            "openai": "initialized" if app.state.openai_service else "uninitialized",
+            "mongodb": "connected" if probes["mongodb"].ok else "disconnected",
+            "redis": "connected" if probes["redis"].ok else "disconnected",
+            "elasticsearch": "connected" if probes["elasticsearch"].ok else "disconnected",
+            "openai": "initialized" if probes["openai"].ok else "unreachable",
         },
+        "probes": {name: probe.to_dict() for name, probe in probes.items()},
+        "circuit_breakers": breakers,
     }
     return health_status
+
+
+# Readiness probe endpoint
+@app.get("/health/ready", tags=["Utility"])
+async def readiness():
+    """
+    Readiness probe: 503 while a critical dependency (`HEALTH_CRITICAL_DEPENDENCIES`) fails its probe.
+    Other failing dependencies have fallbacks, so they only make the instance `degraded`.
+    """
+    probes = await app.state.health_service.check()
+    if not HealthService.all_ok(probes, HEALTH_CRITICAL_DEPENDENCIES):
+        status, status_code = "unready", 503
+    else:
+        status, status_code = ("ready" if HealthService.all_ok(probes, probes) else "degraded"), 200
+    return ORJSONResponse(
+        {"status": status, "probes": {name: probe.to_dict() for name, probe in probes.items()}},
+        status_code=status_code,
+    )
+
+
+# Liveness probe endpoint
+@app.get("/health/live", tags=["Utility"])
+async def liveness():
+    """
+    Liveness probe: answers as long as the event loop does, without waiting on any dependency, so an
+    outage elsewhere never gets the instance restarted. Reports the last cached probe results and
+    refreshes them in the background when they are stale.
+    """
+    health_service = app.state.health_service
+    loop = asyncio.get_running_loop()
+    started = loop.time()
+    await asyncio.sleep(0)
+    event_loop_lag_ms = (loop.time() - started) * 1000
+
+    age = health_service.age()
+    health_service.refresh_if_stale()
+    return {
+        "status": "alive",
+        "uptime_seconds": round(time.monotonic() - STARTED_AT, 1),
+        "event_loop_lag_ms": round(event_loop_lag_ms, 2),
+        "probes_age_seconds": None if age is None else round(age, 1),
+        "probes": {name: probe.to_dict() for name, probe in health_service.cached().items()},
+    }
+
+
+# Metrics endpoint
+@app.get("/metrics", tags=["Utility"])
+async def metrics():
+    """
+    Returns runtime metrics: LLM queue lengths and wait times per priority class, dependency circuit
+    states, the interactions spooled while MongoDB is unavailable, the response cache hit ratio, the
+    counts of the most requested prompts, the progress of the startup cache warm-up, the interaction archive and the
+    search index sync with its indexing lag.
+    """
+    return {
+        "llm_scheduler": get_llm_scheduler().snapshot(),
+        "circuit_breakers": circuit_breaker_snapshot(),
+        "mongodb_spool": interaction_spool.snapshot(),
+        "response_cache": get_adaptive_ttl().snapshot(),
+        "heavy_hitters": heavy_hitters.snapshot(),
+        "cache_warmer": cache_warmer.report() if cache_warmer else {"state": "disabled"},
+        "interaction_archive": interaction_archive.snapshot(),
+        "search_sync": await asyncio.to_thread(search_sync.snapshot) if search_sync else {"mode": "disabled"},
+    }
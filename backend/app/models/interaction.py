@@ -1,18 +1,22 @@
 from pydantic import BaseModel, Field, field_validator
 from typing import List, Optional
+from datetime import datetime, timezone
 from app.utils.database import get_database
 from app.utils.elasticsearch import get_elasticsearch_client
 from app.services.redis_service import RedisService
+from app.services.local_search_service import get_local_search_service
+from app.services.hybrid_search_service import HybridSearchService
+from app.services.interaction_archive import as_utc
+from app.utils.logger import get_logger
 from app.constants import (
     ELASTICSEARCH_INDEX_NAME,
     MONGODB_COLLECTION_NAME,
     CACHE_EXPIRATION_SECONDS
 )
-import logging
 import os
 from bson.errors import InvalidId
 
-logger = logging.getLogger(__name__)
+logger = get_logger(__name__)
 
 # Environment variables
 MONGO_URI = os.getenv("MONGODB_URI")
@@ -28,7 +32,7 @@ class InteractionModel(BaseModel):
     prompt: str = Field(..., description="The user's prompt or question.")
     response: str = Field(..., description="The AI-generated response.")
     user_id: Optional[str] = Field(None, description="The user ID, if available.")
-    timestamp: Optional[str] = Field(None, description="Timestamp of the interaction.")
+    timestamp: Optional[datetime] = Field(None, description="Timestamp of the interaction (UTC if no offset); defaults to when it is saved.")
 
     @field_validator("prompt")
     @classmethod
@@ -53,11 +57,15 @@ class InteractionDatabase:
 
             # Initialize Elasticsearch
             self.elasticsearch = get_elasticsearch_client(ELASTICSEARCH_URI)
+            self.hybrid_search = HybridSearchService(self.elasticsearch) if self.elasticsearch else None
 
             # Initialize Redis
             self.redis_service = RedisService(host=REDIS_HOST, port=REDIS_PORT)
             self.redis = self.redis_service.client
 
+            # Initialize the in-process search index used when Elasticsearch is unavailable
+            self.local_search = get_local_search_service()
+
             # Ensure indexes for efficient queries
             self.collection.create_index("user_id", sparse=True)
             self.collection.create_index("prompt")
@@ -74,17 +82,23 @@ class InteractionDatabase:
             interaction (InteractionModel): The interaction data to store.
         """
         try:
-            # Save to MongoDB
-            self.collection.insert_one(interaction.dict(exclude_unset=True))
+            # Save to MongoDB; the insert adds the document's `_id`. The timestamp is stored as a UTC
+            # datetime, which per-user history ranges filter and sort on
+            document = interaction.dict(exclude_unset=True)
+            document["timestamp"] = as_utc(interaction.timestamp) if interaction.timestamp else datetime.now(timezone.utc)
+            self.collection.insert_one(document)
             logger.info("Interaction saved to MongoDB successfully.")
 
-            # Save to Elasticsearch
+            # Save to Elasticsearch under the MongoDB id, routed to the user's shard like the scoped searches
             if self.elasticsearch:
-                self.elasticsearch.index(
-                    index=ELASTICSEARCH_INDEX_NAME,
-                    document=interaction.dict(exclude_unset=True),
-                )
+                _, errors = self.hybrid_search.bulk_index([document])
+                if errors:
+                    raise RuntimeError(f"Elasticsearch rejected the interaction: {errors[0]}")
                 logger.info("Interaction indexed in Elasticsearch successfully.")
+            self.local_search.index_document(
+                ELASTICSEARCH_INDEX_NAME,
+                {"prompt": interaction.prompt, "response": interaction.response, "user_id": interaction.user_id},
+            )
 
             # Save to Redis
             if self.redis:
@@ -97,35 +111,34 @@ class InteractionDatabase:
 
     def get_interactions(self, query: Optional[str] = None, user_id: Optional[str] = None) -> List[InteractionModel]:
         """
-        Retrieve interactions from the database or Elasticsearch.
+        Retrieve a user's interactions from the database or Elasticsearch.
 
         Args:
             query (Optional[str]): Search query for similar prompts.
-            user_id (Optional[str]): The ID of the user whose interactions are to be retrieved.
+            user_id (Optional[str]): The ID of the user whose interactions are to be retrieved; None
+                retrieves only the interactions of no user.
 
         Returns:
             List[InteractionModel]: A list of interaction records.
         """
         try:
             if query and self.elasticsearch:
-                # Search in Elasticsearch
-                search_results = self.elasticsearch.search(
-                    index=ELASTICSEARCH_INDEX_NAME,
-                    query={"match": {"prompt": query}},
-                )
-                interactions = [
-                    InteractionModel(
-                        prompt=hit["_source"]["prompt"],
-                        response=hit["_source"]["response"]
-                    )
-                    for hit in search_results["hits"]["hits"]
-                ]
+                # Hybrid kNN + BM25 search in Elasticsearch
+                sources = self.hybrid_search.search(query, scoped=True, user_id=user_id)
+                interactions = [InteractionModel(**source) for source in sources]
                 logger.info(f"Found {len(interactions)} interactions in Elasticsearch.")
                 return interactions
 
+            if query:
+                # Search the local index when Elasticsearch is unavailable
+                records = self.local_search.search_documents(
+                    ELASTICSEARCH_INDEX_NAME, {"match": {"prompt": query}}, filters={"user_id": user_id}
+                )
+                logger.info(f"Found {len(records)} interactions in the local index.")
+                return [InteractionModel(**record) for record in records]
+
             # Fallback to MongoDB
-            query_filter = {"user_id": user_id} if user_id else {}
-            records = list(self.collection.find(query_filter, {"_id": 0}))
+            records = list(self.collection.find({"user_id": user_id}, {"_id": 0}))
             logger.info(f"Retrieved {len(records)} interactions from MongoDB.")
             return [InteractionModel(**record) for record in records]
         except InvalidId as e:
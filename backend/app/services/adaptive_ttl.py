@@ -0,0 +1,246 @@
+from typing import Any, Callable, Dict, Optional
+import hashlib
+import threading
+import time
+from app.utils.logger import get_logger
+from app.constants import (
+    CACHE_EXPIRATION_SECONDS,
+    CACHE_ADAPTIVE_TTL,
+    CACHE_TTL_MIN_SECONDS,
+    CACHE_TTL_MAX_SECONDS,
+    CACHE_TTL_SIZE_REFERENCE_BYTES,
+    CACHE_MEMORY_BUDGET_BYTES,
+    CACHE_SKETCH_WIDTH,
+)
+
+# Logger setup
+logger = get_logger("adaptive_ttl")
+
+# Rows of the count-min sketch; each key is counted once per row
+SKETCH_DEPTH = 4
+# Counters saturate at this value (one byte each)
+MAX_COUNT = 255
+# Seconds between reads of the cache's memory usage
+MEMORY_CHECK_SECONDS = 30.0
+# Lowest factor the memory budget can scale TTLs by
+MIN_PRESSURE = 0.01
+
+
+class CountMinSketch:
+    """
+    Approximate access counts of an unbounded key space in fixed memory (`width` x 4 bytes).
+    Estimates never undercount; collisions can only overcount. All counters are halved every
+    `10 * width` increments, so counts reflect recent popularity rather than all-time totals.
+    """
+
+    def __init__(self, width: int):
+        self.width = width
+        self.rows = [bytearray(width) for _ in range(SKETCH_DEPTH)]
+        self.increments = 0
+        self.reset_every = 10 * width
+
+    def _indexes(self, key: str):
+        digest = hashlib.blake2b(key.encode("utf-8"), digest_size=16).digest()
+        first, second = int.from_bytes(digest[:8], "little"), int.from_bytes(digest[8:], "little") | 1
+        return [(first + row * second) % self.width for row in range(SKETCH_DEPTH)]
+
+    def add(self, key: str) -> int:
+        """
+        Counts one access of a key and returns its new estimated count.
+        """
+        estimate = MAX_COUNT
+        for row, index in zip(self.rows, self._indexes(key)):
+            if row[index] < MAX_COUNT:
+                row[index] += 1
+            estimate = min(estimate, row[index])
+        self.increments += 1
+        if self.increments >= self.reset_every:
+            self.age()
+        return estimate
+
+    def estimate(self, key: str) -> int:
+        """
+        Returns the estimated recent access count of a key.
+        """
+        return min(row[index] for row, index in zip(self.rows, self._indexes(key)))
+
+    def age(self) -> None:
+        """
+        Halves every counter.
+        """
+        halve = bytes(value >> 1 for value in range(256))
+        self.rows = [row.translate(halve) for row in self.rows]
+        self.increments = 0
+
+
+class AdaptiveTTL:
+    """
+    Chooses the TTL of each cache entry from its recent access frequency and size.
+
+    An entry accessed once gets `min_ttl`, and the TTL doubles with every further recent access up to
+    `max_ttl`. Entries larger than `size_reference` bytes get proportionally shorter TTLs, since they
+    cost more memory per hit. While the cache uses more memory than `memory_budget`, all TTLs keep
+    shrinking by the overshoot at every memory check, and grow back once usage is below the budget. With `enabled` off every entry gets `fixed_ttl`, the pre-existing behavior.
+    """
+    _instance: Optional["AdaptiveTTL"] = None
+
+    def __new__(cls, *args, **kwargs):
+        """
+        Singleton implementation so every cache writer shares the access statistics.
+        """
+        if cls._instance is None:
+            cls._instance = super(AdaptiveTTL, cls).__new__(cls)
+        return cls._instance
+
+    def __init__(
+        self,
+        enabled: bool = CACHE_ADAPTIVE_TTL,
+        fixed_ttl: int = CACHE_EXPIRATION_SECONDS,
+        min_ttl: int = CACHE_TTL_MIN_SECONDS,
+        max_ttl: int = CACHE_TTL_MAX_SECONDS,
+        size_reference: int = CACHE_TTL_SIZE_REFERENCE_BYTES,
+        memory_budget: int = CACHE_MEMORY_BUDGET_BYTES,
+        sketch_width: int = CACHE_SKETCH_WIDTH,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        """
+        Initializes the TTL policy.
+
+        Args:
+            enabled (bool): Whether TTLs adapt; otherwise `fixed_ttl` is used.
+            fixed_ttl (int): The TTL used when adaptation is off.
+            min_ttl (int): TTL of cold entries, and the lower bound of every TTL within the memory budget.
+            max_ttl (int): Upper bound of every TTL.
+            size_reference (int): Entry size in bytes from which TTLs shrink with size.
+            memory_budget (int): Cache memory in bytes above which TTLs shrink; 0 disables the budget.
+            sketch_width (int): Counters per row of the frequency sketch.
+            clock (Callable[[], float]): Monotonic time source, replaceable in replays.
+        """
+        if not hasattr(self, "sketch"):  # Ensure initialization happens only once
+            self.enabled = enabled
+            self.fixed_ttl = fixed_ttl
+            self.min_ttl = min_ttl
+            self.max_ttl = max_ttl
+            self.size_reference = size_reference
+            self.memory_budget = memory_budget
+            self.clock = clock
+            self.sketch = CountMinSketch(sketch_width)
+            # Reports the cache's current memory use in bytes, e.g. from Redis INFO
+            self.memory_usage: Optional[Callable[[], int]] = None
+            self.pressure = 1.0
+            self.memory_checked_at: Optional[float] = None
+            self.hits = 0
+            self.misses = 0
+            self.lock = threading.Lock()
+
+    def _refresh_pressure(self) -> None:
+        """
+        Re-reads the cache's memory use at most every MEMORY_CHECK_SECONDS. Must be called without the
+        lock held: the read is a round trip to Redis, which callers of `touch` and `ttl` must not wait on.
+        Meanwhile other callers go on with the previous pressure.
+        """
+        if not self.memory_budget or not self.memory_usage:
+            return
+        with self.lock:
+            now = self.clock()
+            if self.memory_checked_at is not None and now - self.memory_checked_at < MEMORY_CHECK_SECONDS:
+                return
+            # Claimed by this caller, so concurrent callers do not read it too
+            self.memory_checked_at = now
+        try:
+            used = self.memory_usage()
+        except Exception as e:
+            logger.error(f"Failed to read cache memory usage: {e}")
+            return
+        with self.lock:
+            # Multiplicative feedback: keeps tightening while over budget, relaxes once below it
+            self.pressure = max(MIN_PRESSURE, min(1.0, self.pressure * self.memory_budget / used)) if used else 1.0
+
+    def touch(self, key: str) -> int:
+        """
+        Records an access (hit or miss) of a cache key.
+
+        Args:
+            key (str): The cache key.
+
+        Returns:
+            int: The key's estimated recent access count.
+        """
+        if not self.enabled:
+            return 0
+        with self.lock:
+            return self.sketch.add(key)
+
+    def count(self, hit: bool) -> None:
+        """
+        Counts a cache lookup for the hit ratio report.
+        """
+        with self.lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+    def ttl(self, key: str, size: int) -> int:
+        """
+        Returns the TTL for writing or refreshing a cache entry.
+
+        Args:
+            key (str): The cache key.
+            size (int): The size of the cached value in bytes.
+
+        Returns:
+            int: The TTL in seconds.
+        """
+        if not self.enabled:
+            return self.fixed_ttl
+        self._refresh_pressure()
+        with self.lock:
+            accesses = max(1, self.sketch.estimate(key))
+            pressure = self.pressure
+        ttl = self.min_ttl * 2.0 ** min(accesses - 1, 32)
+        ttl *= min(1.0, self.size_reference / max(size, 1)) * pressure
+        # Under memory pressure the lower bound gives way too, or cold entries alone could exceed the budget
+        return int(min(self.max_ttl, max(self.min_ttl * pressure, ttl)))
+
+    def refreshed_ttl(self, key: str, size: int) -> Optional[int]:
+        """
+        Returns the TTL a cache hit should extend its entry to, or None to leave the entry's TTL alone
+        (adaptation is off, or the entry is not hot enough for a longer TTL than a cold one).
+
+        Args:
+            key (str): The cache key.
+            size (int): The size of the cached value in bytes.
+
+        Returns:
+            Optional[int]: The TTL in seconds, or None.
+        """
+        if not self.enabled:
+            return None
+        ttl = self.ttl(key, size)
+        return ttl if ttl > self.min_ttl else None
+
+    def snapshot(self) -> Dict[str, Any]:
+        """
+        Returns the policy's configuration, the cache hit ratio and the current memory pressure.
+        """
+        with self.lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+                "enabled": self.enabled,
+                "min_ttl": self.min_ttl,
+                "max_ttl": self.max_ttl,
+                "memory_budget_bytes": self.memory_budget,
+                "memory_pressure": round(self.pressure, 3),
+            }
+
+
+# Singleton getter
+def get_adaptive_ttl() -> AdaptiveTTL:
+    """
+    Returns a singleton instance of AdaptiveTTL.
+    """
+    return AdaptiveTTL()
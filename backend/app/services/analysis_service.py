@@ -0,0 +1,353 @@
+from dataclasses import dataclass
+from typing import Optional, Any, AsyncIterator, Dict, List
+import asyncio
+import hashlib
+import math
+from app.services.openai_service import OpenAIService
+from app.services.analysis_store import AnalysisStore
+from app.services.llm_scheduler import BULK
+from app.utils.logger import get_logger
+from app.constants import (
+    ANALYZE_CHUNK_TOKENS,
+    ANALYZE_MAX_CONCURRENCY,
+    ANALYSIS_PROMPT_VERSION,
+)
+
+# Logger setup
+logger = get_logger("analysis_service")
+
+# Average characters per token for English text and code
+CHARS_PER_TOKEN = 4
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    Approximates the token count of a text from its length.
+    """
+    return math.ceil(len(text) / CHARS_PER_TOKEN)
+
+
+@dataclass
+class Chunk:
+    """
+    A contiguous range of lines of a file, analyzed as one LLM call.
+    """
+    index: int
+    start_line: int
+    end_line: int
+    text: str
+    hash: str
+
+
+def chunk_hash(text: str, language: str) -> str:
+    """
+    Returns the content hash identifying a chunk's analysis in the cache.
+    The prompt version is part of the hash so instruction changes invalidate old results.
+    """
+    digest = hashlib.sha256(f"{ANALYSIS_PROMPT_VERSION}\0{language}\0{text}".encode("utf-8"))
+    return digest.hexdigest()
+
+
+def result_key(chunk: Chunk, file_path: str) -> str:
+    """
+    Returns the key of a chunk's analysis in the store.
+    The analysis prompt names the file and the absolute line range, and the response cites line
+    numbers, so a result is only reused for the same content at the same place in the same file.
+    """
+    digest = hashlib.sha256(f"{chunk.hash}\0{file_path}\0{chunk.start_line}\0{chunk.end_line}".encode("utf-8"))
+    return digest.hexdigest()
+
+
+class _Lines:
+    """
+    The lines of a file with prefix sums of their lengths, so range sizes are O(1).
+    """
+
+    def __init__(self, content: str):
+        self.lines = content.splitlines()
+        self.offsets = [0]
+        for line in self.lines:
+            self.offsets.append(self.offsets[-1] + len(line) + 1)
+
+    def tokens(self, start: int, end: int) -> int:
+        return math.ceil((self.offsets[end] - self.offsets[start]) / CHARS_PER_TOKEN)
+
+    def indent(self, number: int) -> int:
+        line = self.lines[number]
+        return len(line) - len(line.lstrip())
+
+    def starts_block(self, number: int) -> bool:
+        return bool(self.lines[number].strip()) and not self.lines[number - 1].strip()
+
+
+def _split(lines: _Lines, start: int, end: int, token_budget: int) -> List[tuple]:
+    """
+    Splits the line range [start, end) into ranges that fit the token budget.
+    Ranges are cut before lines that open a block at the shallowest indentation in the range
+    (e.g. top-level functions, then class members); oversized blocks are split one level deeper,
+    and as a last resort on line boundaries.
+    """
+    if lines.tokens(start, end) <= token_budget:
+        return [(start, end)]
+
+    starters = [number for number in range(start + 1, end) if lines.starts_block(number)]
+    if starters:
+        level = min(lines.indent(number) for number in starters)
+        cuts = [start] + [number for number in starters if lines.indent(number) == level] + [end]
+        if len(cuts) > 2:
+            ranges = []
+            for block_start, block_end in zip(cuts, cuts[1:]):
+                ranges.extend(_split(lines, block_start, block_end, token_budget))
+            return ranges
+
+    ranges = []
+    range_start = start
+    for number in range(start + 1, end):
+        if lines.tokens(range_start, number + 1) > token_budget:
+            ranges.append((range_start, number))
+            range_start = number
+    ranges.append((range_start, end))
+    return ranges
+
+
+def chunk_file(content: str, language: str = "", token_budget: int = ANALYZE_CHUNK_TOKENS) -> List[Chunk]:
+    """
+    Splits a file into chunks of whole syntactic blocks that fit the token budget.
+    Adjacent small blocks are packed together; blocks larger than the budget are split.
+
+    Args:
+        content (str): The file content.
+        language (str): The programming language, part of the chunk hash.
+        token_budget (int): Maximum estimated tokens of code per chunk.
+
+    Returns:
+        List[Chunk]: The chunks, in file order.
+    """
+    lines = _Lines(content)
+    if not lines.lines:
+        return []
+
+    packed = []
+    for range_start, range_end in _split(lines, 0, len(lines.lines), token_budget):
+        if packed:
+            combined = lines.tokens(packed[-1][0], range_end)
+            # Tiny leftovers such as an opening tag ride along with the next range, up to 10% over budget
+            tiny = lines.tokens(*packed[-1]) < token_budget // 10
+            if combined <= token_budget or (tiny and combined <= token_budget * 1.1):
+                packed[-1] = (packed[-1][0], range_end)
+                continue
+        packed.append((range_start, range_end))
+
+    chunks = []
+    for range_start, range_end in packed:
+        text = "\n".join(lines.lines[range_start:range_end])
+        if text.strip():
+            chunks.append(Chunk(
+                index=len(chunks),
+                start_line=range_start + 1,
+                end_line=range_end,
+                text=text,
+                hash=chunk_hash(text, language),
+            ))
+    return chunks
+
+
+class AnalysisService:
+    """
+    A service analyzing whole files chunk by chunk, serving unchanged chunks from the store.
+    """
+
+    def __init__(self, openai_service: OpenAIService, store: Optional[AnalysisStore] = None, max_concurrency: int = ANALYZE_MAX_CONCURRENCY):
+        """
+        Initializes the AnalysisService.
+
+        Args:
+            openai_service (OpenAIService): The service used to analyze chunks.
+            store (Optional[AnalysisStore]): Store of chunk results and file manifests. None disables both.
+            max_concurrency (int): Maximum number of chunks analyzed at the same time per request.
+        """
+        self.openai_service = openai_service
+        self.store = store
+        self.max_concurrency = max_concurrency
+
+    def _stored(self, file_path: str, chunks: List[Chunk]) -> List[Optional[str]]:
+        if not self.store:
+            return [None] * len(chunks)
+        return self.store.get_results([result_key(chunk, file_path) for chunk in chunks])
+
+    async def _analyze_chunk(
+        self, semaphore: asyncio.Semaphore, file_path: str, language: str, chunk: Chunk, user: str, priority: str
+    ) -> str:
+        fields = {"file_path": file_path, "start_line": chunk.start_line, "end_line": chunk.end_line}
+        async with semaphore:
+            completion = await self.openai_service.agenerate(
+                code=chunk.text, language=language, template="analysis", fields=fields,
+                priority=priority, user=user,
+            )
+        response = completion.text
+        if self.store:
+            await asyncio.to_thread(self.store.put_result, result_key(chunk, file_path), response)
+        return response
+
+    async def _analyze_chunks(
+        self,
+        semaphore: asyncio.Semaphore,
+        file_path: str,
+        language: str,
+        chunks: List[Chunk],
+        stored: List[Optional[str]],
+        user: str = "",
+        priority: str = BULK,
+    ) -> Dict[str, Any]:
+        """
+        Analyzes the chunks without a stored result and merges all results in chunk order.
+        """
+        pending = {
+            chunk.index: asyncio.create_task(self._analyze_chunk(semaphore, file_path, language, chunk, user, priority))
+            for chunk, response in zip(chunks, stored) if response is None
+        }
+
+        results = []
+        try:
+            for chunk, response in zip(chunks, stored):
+                error = None
+                if response is None:
+                    try:
+                        response = await pending[chunk.index]
+                    except Exception as e:
+                        logger.error(f"Failed to analyze chunk {chunk.index} of {file_path}: {e}")
+                        error = str(e)
+                results.append({
+                    "index": chunk.index,
+                    "start_line": chunk.start_line,
+                    "end_line": chunk.end_line,
+                    "hash": chunk.hash,
+                    "cached": chunk.index not in pending,
+                    "response": response,
+                    "error": error,
+                })
+        finally:
+            # A cancelled analysis drops its chunks still waiting for a slot
+            for task in pending.values():
+                task.cancel()
+
+        logger.info(f"Analyzed {file_path}: {len(chunks)} chunks, {len(chunks) - len(pending)} from cache.")
+        return {
+            "file_path": file_path,
+            "chunks": results,
+            "reanalyzed": len(pending),
+            "response": "\n\n".join(result["response"] for result in results if result["response"]),
+        }
+
+    async def analyze_file(
+        self,
+        semaphore: asyncio.Semaphore,
+        file_path: str,
+        content: str,
+        language: str = "",
+        workspace: Optional[str] = None,
+        user: str = "",
+        priority: str = BULK,
+    ) -> Dict[str, Any]:
+        """
+        Analyzes one file and returns the per-chunk results.
+
+        Args:
+            semaphore (asyncio.Semaphore): Bounds the LLM calls in flight for the request.
+            file_path (str): The path of the file, used in the prompt and the result.
+            content (str): The file content.
+            language (str): The programming language.
+            workspace (Optional[str]): The client's workspace. When set, the file's chunk manifest is saved.
+            user (str): The user the analysis runs for, for fair scheduling of LLM calls.
+            priority (str): The scheduling class of the LLM calls.
+
+        Returns:
+            Dict[str, Any]: The file path, its chunk results and the combined response.
+        """
+        chunks = chunk_file(content, language)
+        stored = await asyncio.to_thread(self._stored, file_path, chunks)
+        result = await self._analyze_chunks(semaphore, file_path, language, chunks, stored, user, priority)
+        if workspace and self.store:
+            await asyncio.to_thread(self.store.put_manifest, workspace, file_path, language, result["chunks"])
+        return result
+
+    async def analyze_incremental(
+        self,
+        workspace: str,
+        file_path: str,
+        language: str,
+        chunks: List[Dict[str, Any]],
+        user: str = "",
+        priority: str = BULK,
+    ) -> Dict[str, Any]:
+        """
+        Re-analyzes a file from its chunk list, where only changed chunks carry their content.
+        Chunks sent as a bare hash must already have a stored result for this file and line range; if any
+        do not, nothing is analyzed and their hashes are returned under `missing` so the client can resend
+        them with content.
+
+        Args:
+            workspace (str): The client's workspace.
+            file_path (str): The path of the file within the workspace.
+            language (str): The programming language the chunks were hashed with.
+            chunks (List[Dict[str, Any]]): Ordered chunks with `hash`, `start_line`, `end_line` and optional `content`.
+            user (str): The user the analysis runs for, for fair scheduling of LLM calls.
+            priority (str): The scheduling class of the LLM calls.
+
+        Returns:
+            Dict[str, Any]: The merged analysis of the file, or the file path and the `missing` hashes.
+        """
+        resolved = []
+        for index, chunk in enumerate(chunks):
+            content = chunk.get("content")
+            # The server computes the hash of submitted content itself so a client can never poison the store
+            hash_ = chunk_hash(content, language) if content is not None else chunk["hash"]
+            resolved.append(Chunk(index, chunk["start_line"], chunk["end_line"], content or "", hash_))
+
+        stored = await asyncio.to_thread(self._stored, file_path, resolved)
+        missing = [
+            chunk.hash for chunk, response in zip(resolved, stored)
+            if response is None and chunks[chunk.index].get("content") is None
+        ]
+        if missing:
+            logger.info(f"Incremental analysis of {file_path} needs the content of {len(missing)} chunks.")
+            return {"file_path": file_path, "missing": missing}
+
+        previous = await asyncio.to_thread(self.store.get_manifest, workspace, file_path) if self.store else None
+        previous_hashes = {chunk["hash"] for chunk in (previous or {}).get("chunks", [])}
+
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+        result = await self._analyze_chunks(semaphore, file_path, language, resolved, stored, user, priority)
+        result["changed"] = sum(1 for chunk in resolved if chunk.hash not in previous_hashes)
+        if self.store:
+            await asyncio.to_thread(self.store.put_manifest, workspace, file_path, language, result["chunks"])
+        return result
+
+    async def analyze_files(
+        self, files: List[Dict[str, str]], user: str = "", priority: str = BULK
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Analyzes many files concurrently and yields each file's result as soon as it completes.
+
+        Args:
+            files (List[Dict[str, str]]): Files with `file_path`, `content` and optional `language` and `workspace`.
+            user (str): The user the analysis runs for, for fair scheduling of LLM calls.
+            priority (str): The scheduling class of the LLM calls.
+
+        Yields:
+            Dict[str, Any]: One result per file, in completion order.
+        """
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+        tasks = [
+            asyncio.create_task(self.analyze_file(
+                semaphore, file["file_path"], file["content"], file.get("language") or "", file.get("workspace"),
+                user, priority,
+            ))
+            for file in files
+        ]
+        try:
+            for next_result in asyncio.as_completed(tasks):
+                yield await next_result
+        finally:
+            for task in tasks:
+                task.cancel()
@@ -0,0 +1,156 @@
+from datetime import datetime, timezone
+from typing import Optional, Any, Dict, List
+import orjson
+from app.utils.logger import get_logger
+from app.constants import CACHE_EXPIRATION_SECONDS, ANALYSIS_MANIFEST_TTL_SECONDS
+
+# Logger setup
+logger = get_logger("analysis_store")
+
+CHUNK_CACHE_PREFIX = "analysis:"
+MANIFEST_CACHE_PREFIX = "manifest:"
+CHUNK_COLLECTION_NAME = "analysis_chunks"
+MANIFEST_COLLECTION_NAME = "analysis_manifests"
+
+
+class AnalysisStore:
+    """
+    Stores chunk analyses by result key and per-file chunk manifests.
+    Redis serves the hot path; MongoDB keeps both durable once the Redis entries expire.
+    """
+
+    def __init__(self, redis_client: Optional[Any] = None, database: Optional[Any] = None):
+        """
+        Initializes the AnalysisStore.
+
+        Args:
+            redis_client (Optional[Any]): Redis client for cached chunk results and manifests.
+            database (Optional[Any]): MongoDB database holding the chunk and manifest collections.
+        """
+        self.redis_client = redis_client
+        self.chunks = database[CHUNK_COLLECTION_NAME] if database is not None else None
+        self.manifests = database[MANIFEST_COLLECTION_NAME] if database is not None else None
+        if self.manifests is not None:
+            try:
+                self.manifests.create_index([("workspace", 1), ("file_path", 1)], unique=True)
+            except Exception as e:
+                logger.error(f"Failed to create the manifest index: {e}")
+
+    @staticmethod
+    def _manifest_key(workspace: str, file_path: str) -> str:
+        return f"{MANIFEST_CACHE_PREFIX}{workspace}:{file_path}"
+
+    def get_results(self, hashes: List[str]) -> List[Optional[str]]:
+        """
+        Returns the stored analysis of each chunk hash, or None where there is none.
+
+        Args:
+            hashes (List[str]): The chunk hashes.
+
+        Returns:
+            List[Optional[str]]: The analyses, in the order of `hashes`.
+        """
+        results: List[Optional[str]] = [None] * len(hashes)
+        if not hashes:
+            return results
+        if self.redis_client:
+            try:
+                results = self.redis_client.mget([CHUNK_CACHE_PREFIX + chunk_hash for chunk_hash in hashes])
+            except Exception as e:
+                logger.error(f"Failed to read cached chunk analyses: {e}")
+
+        missing = [chunk_hash for chunk_hash, result in zip(hashes, results) if result is None]
+        if missing and self.chunks is not None:
+            try:
+                found = {document["_id"]: document["response"] for document in self.chunks.find({"_id": {"$in": missing}})}
+            except Exception as e:
+                logger.error(f"Failed to read chunk analyses from MongoDB: {e}")
+                found = {}
+            for position, chunk_hash in enumerate(hashes):
+                if results[position] is None and chunk_hash in found:
+                    results[position] = found[chunk_hash]
+            self._cache_results(found)
+        return results
+
+    def _cache_results(self, results: Dict[str, str]) -> None:
+        if not self.redis_client or not results:
+            return
+        try:
+            pipeline = self.redis_client.pipeline(transaction=False)
+            for chunk_hash, response in results.items():
+                pipeline.set(CHUNK_CACHE_PREFIX + chunk_hash, response, ex=CACHE_EXPIRATION_SECONDS)
+            pipeline.execute()
+        except Exception as e:
+            logger.error(f"Failed to cache chunk analyses: {e}")
+
+    def put_result(self, chunk_hash: str, response: str) -> None:
+        """
+        Stores the analysis of a chunk.
+
+        Args:
+            chunk_hash (str): The chunk hash.
+            response (str): The analysis.
+        """
+        self._cache_results({chunk_hash: response})
+        if self.chunks is not None:
+            try:
+                self.chunks.update_one({"_id": chunk_hash}, {"$set": {"response": response}}, upsert=True)
+            except Exception as e:
+                logger.error(f"Failed to save chunk analysis to MongoDB: {e}")
+
+    def get_manifest(self, workspace: str, file_path: str) -> Optional[Dict[str, Any]]:
+        """
+        Returns the chunk manifest of the last analysis of a file.
+
+        Args:
+            workspace (str): The workspace identifier.
+            file_path (str): The file path within the workspace.
+
+        Returns:
+            Optional[Dict[str, Any]]: The manifest with its language and ordered chunks, or None.
+        """
+        if self.redis_client:
+            try:
+                cached = self.redis_client.get(self._manifest_key(workspace, file_path))
+                if cached:
+                    return orjson.loads(cached)
+            except Exception as e:
+                logger.error(f"Failed to read cached manifest: {e}")
+        if self.manifests is not None:
+            try:
+                return self.manifests.find_one(
+                    {"workspace": workspace, "file_path": file_path},
+                    {"_id": 0, "language": 1, "chunks": 1},
+                )
+            except Exception as e:
+                logger.error(f"Failed to read manifest from MongoDB: {e}")
+        return None
+
+    def put_manifest(self, workspace: str, file_path: str, language: str, chunks: List[Dict[str, Any]]) -> None:
+        """
+        Stores the chunk manifest of a file.
+
+        Args:
+            workspace (str): The workspace identifier.
+            file_path (str): The file path within the workspace.
+            language (str): The programming language the chunks were hashed with.
+            chunks (List[Dict[str, Any]]): Ordered chunks with `hash`, `start_line` and `end_line`.
+        """
+        manifest = {
+            "language": language,
+            "chunks": [{key: chunk[key] for key in ("hash", "start_line", "end_line")} for chunk in chunks],
+        }
+        if self.redis_client:
+            try:
+                self.redis_client.set(self._manifest_key(workspace, file_path), orjson.dumps(manifest), ex=ANALYSIS_MANIFEST_TTL_SECONDS)
+            except Exception as e:
+                logger.error(f"Failed to cache manifest: {e}")
+        if self.manifests is not None:
+            try:
+                self.manifests.update_one(
+                    {"workspace": workspace, "file_path": file_path},
+                    {"$set": {**manifest, "updated_at": datetime.now(timezone.utc)}},
+                    upsert=True,
+                )
+            except Exception as e:
+                logger.error(f"Failed to save manifest to MongoDB: {e}")
@@ -0,0 +1,419 @@
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, Iterator, List, Optional, Set, Tuple
+import gzip
+import itertools
+import os
+import threading
+import time
+import orjson
+from bson import ObjectId
+from pymongo.errors import BulkWriteError
+from app.services.cache_tags import tag_entries
+from app.services.hybrid_search_service import HybridSearchService
+from app.services.response_store import ResponseStore
+from app.utils.logger import get_logger
+from app.constants import (
+    BACKFILL_BATCH_SIZE,
+    BACKFILL_WORKERS,
+    BACKFILL_MAX_PENDING_BATCHES,
+    BACKFILL_REPORT_SECONDS,
+)
+
+# Logger setup
+logger = get_logger("backfill")
+
+# MongoDB error code of a duplicate key, i.e. an interaction imported before
+DUPLICATE_KEY_ERROR = 11000
+
+
+class BackfillError(Exception):
+    """
+    Raised when a backfill cannot be started, e.g. for a checkpoint of another backfill.
+    """
+
+
+def interaction_document(row: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Returns the interaction document of an exported or archived row, keeping its id so a repeated import
+    is detected, and its creation time as `timestamp`, which per-user history is ordered by.
+    """
+    document = {key: value for key, value in row.items() if key not in ("id", "ts")}
+    if ObjectId.is_valid(row.get("id")):
+        document["_id"] = ObjectId(row["id"])
+    if "timestamp" not in document and isinstance(row.get("ts"), (int, float)):
+        document["timestamp"] = datetime.fromtimestamp(row["ts"], timezone.utc)
+    return document
+
+
+class JsonlSource:
+    """
+    Interactions read from a JSONL file, plain or gzip-compressed, such as an interaction export or
+    archive file. The position of a row is its line number.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.name = f"jsonl:{os.path.abspath(path)}"
+
+    def read(self, after: Optional[int] = None) -> Iterator[Tuple[int, Dict[str, Any]]]:
+        """
+        Yields the line number and interaction of each row after line `after`.
+        """
+        opener = gzip.open if self.path.endswith(".gz") else open
+        with opener(self.path, "rb") as file:
+            for number, line in enumerate(file, 1):
+                if (after and number <= after) or not line.strip():
+                    continue
+                yield number, interaction_document(orjson.loads(line))
+
+
+class MongoSource:
+    """
+    Interactions read from a MongoDB collection in id order, with their responses resolved.
+    The position of a document is its id.
+    """
+
+    def __init__(self, collection: Any, response_store: Optional[ResponseStore] = None, batch_size: int = BACKFILL_BATCH_SIZE):
+        self.collection = collection
+        self.response_store = response_store
+        self.batch_size = batch_size
+        self.name = f"mongodb:{collection.database.name}.{collection.name}"
+
+    def read(self, after: Optional[str] = None) -> Iterator[Tuple[str, Dict[str, Any]]]:
+        """
+        Yields the id and document of each interaction after id `after`.
+        """
+        query = {"_id": {"$gt": ObjectId(after)}} if after else {}
+        cursor = self.collection.find(query).sort("_id", 1).batch_size(self.batch_size)
+        documents = self.response_store.resolve_all(cursor) if self.response_store else cursor
+        for document in documents:
+            if isinstance(document.get("response"), str):
+                document.pop("response_hash", None)
+            yield str(document["_id"]), document
+
+
+class Backfill:
+    """
+    Writes interactions from a source to any of MongoDB, the Elasticsearch question-answer index and
+    the Redis response cache, in batches written by a pool of workers: `insert_many(ordered=False)`,
+    one bulk request with index refresh disabled for the run, and one Redis pipeline per batch.
+
+    Batches finish out of order, so the checkpoint records the position of the last batch up to which
+    every batch is written; a resumed backfill repeats at most the batches that were in flight.
+    Repeated writes are harmless for rows with an id: MongoDB skips them as duplicates and
+    Elasticsearch overwrites them. Rows without an id are inserted again.
+    """
+
+    def __init__(
+        self,
+        source: Any,
+        collection: Any = None,
+        hybrid_search: Optional[HybridSearchService] = None,
+        redis_client: Any = None,
+        response_store: Optional[ResponseStore] = None,
+        ttl: Optional[Callable[[str, int], int]] = None,
+        extra_keys: Optional[Callable[[str, str], Dict[str, Tuple[str, int]]]] = None,
+        batch_size: int = BACKFILL_BATCH_SIZE,
+        workers: int = BACKFILL_WORKERS,
+        max_pending: int = BACKFILL_MAX_PENDING_BATCHES,
+        report_seconds: float = BACKFILL_REPORT_SECONDS,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        """
+        Initializes the backfill. The targets are the ones given.
+
+        Args:
+            source (Any): A JsonlSource or MongoSource.
+            collection (Any): The MongoDB interactions collection to insert into.
+            hybrid_search (Optional[HybridSearchService]): The question-answer index to index into.
+            redis_client (Any): The Redis client of the response cache to load.
+            response_store (Optional[ResponseStore]): Stores the inserted interactions' responses by reference.
+            ttl (Optional[Callable[[str, int], int]]): Returns the TTL of a cache key from the key and value size.
+            extra_keys (Optional[Callable[[str, str], Dict[str, Tuple[str, int]]]]): Returns additional
+                keys to cache for a prompt and answer, mapped to (value, TTL), e.g. stale copies.
+            batch_size (int): Documents per batch.
+            workers (int): Batches written in parallel.
+            max_pending (int): Batches read ahead of the workers.
+            report_seconds (float): Interval between progress log lines.
+            clock (Callable[[], float]): Monotonic time source, replaceable in tests.
+        """
+        if redis_client is not None and ttl is None:
+            raise ValueError("Loading the response cache needs a TTL policy.")
+        self.source = source
+        self.collection = collection
+        self.hybrid_search = hybrid_search
+        self.redis_client = redis_client
+        self.response_store = response_store
+        self.ttl = ttl
+        self.extra_keys = extra_keys
+        self.batch_size = batch_size
+        self.workers = max(1, workers)
+        self.max_pending = max(self.workers, max_pending)
+        self.report_seconds = report_seconds
+        self.clock = clock
+        self.progress: Dict[str, Any] = {"state": "idle"}
+        self.lock = threading.Lock()
+
+    @property
+    def targets(self) -> List[str]:
+        targets = []
+        if self.collection is not None:
+            targets.append("mongodb")
+        if self.hybrid_search is not None:
+            targets.append("elasticsearch")
+        if self.redis_client is not None:
+            targets.append("redis")
+        return targets
+
+    def _write_mongodb(self, documents: List[Dict[str, Any]]) -> Tuple[int, int]:
+        """
+        Inserts a batch, skipping interactions already present. Returns the numbers inserted and skipped.
+        """
+        if self.response_store:
+            copies = self.response_store.reference_many(documents)
+        else:
+            copies = [dict(document) for document in documents]
+        try:
+            inserted = len(self.collection.insert_many(copies, ordered=False).inserted_ids)
+        except BulkWriteError as e:
+            errors = e.details.get("writeErrors", [])
+            if any(error.get("code") != DUPLICATE_KEY_ERROR for error in errors):
+                raise
+            inserted = e.details.get("nInserted", len(copies) - len(errors))
+        # insert_many assigns the ids of rows without one; the other targets reuse them
+        for document, copy in zip(documents, copies):
+            if "_id" in copy:
+                document.setdefault("_id", copy["_id"])
+        return inserted, len(copies) - inserted
+
+    def _write_elasticsearch(self, documents: List[Dict[str, Any]]) -> Tuple[int, int]:
+        """
+        Indexes a batch in one bulk request, without refreshing. Returns the numbers indexed and rejected.
+        """
+        indexed, errors = self.hybrid_search.bulk_index(documents)
+        if errors:
+            logger.warning(f"Elasticsearch rejected {len(errors)} documents of a batch, e.g. {errors[0]}")
+        return indexed, len(errors)
+
+    def _write_redis(self, documents: List[Dict[str, Any]]) -> int:
+        """
+        Caches the answers of a batch's plain prompts in one pipeline, leaving cached keys alone.
+        Returns the number of answers cached.
+        """
+        pipeline = self.redis_client.pipeline(transaction=False)
+        # Positions of the answers' own SETs among the pipeline's results
+        positions = []
+        commands = 0
+        for document in documents:
+            key, response = document.get("cache_key"), document.get("response")
+            if not key or not isinstance(response, str):
+                continue
+            pipeline.set(key, response, nx=True, ex=self.ttl(key, len(response.encode("utf-8"))))
+            positions.append(commands)
+            commands += 1
+            extra_keys = self.extra_keys(key, response) if self.extra_keys else {}
+            for extra_key, (value, ttl) in extra_keys.items():
+                pipeline.set(extra_key, value, nx=True, ex=ttl)
+                commands += 1
+            usage = document.get("usage") or {}
+            tags = {"model": usage.get("model"), "template": usage.get("template"), "user": document.get("user_id")}
+            tag_entries(pipeline, [key, *extra_keys], tags)
+            commands += 2 * sum(1 for value in tags.values() if value)
+        if not positions:
+            return 0
+        results = pipeline.execute()
+        return sum(1 for position in positions if results[position])
+
+    def write_batch(self, documents: List[Dict[str, Any]]) -> Dict[str, int]:
+        """
+        Writes a batch to every target.
+
+        Args:
+            documents (List[Dict[str, Any]]): The interactions of the batch.
+
+        Returns:
+            Dict[str, int]: The documents written to each target, and those skipped or rejected.
+        """
+        counts = {"documents": len(documents)}
+        if self.collection is not None:
+            counts["mongodb"], counts["duplicates"] = self._write_mongodb(documents)
+        if self.hybrid_search is not None:
+            counts["elasticsearch"], counts["rejected"] = self._write_elasticsearch(documents)
+        if self.redis_client is not None:
+            counts["redis"] = self._write_redis(documents)
+        return counts
+
+    def _disable_refresh(self) -> Optional[Dict[str, Any]]:
+        """
+        Turns off the periodic refresh of the index for the run. Returns the setting to restore.
+        """
+        if self.hybrid_search is None:
+            return None
+        client, index = self.hybrid_search.client, self.hybrid_search.index
+        settings = client.indices.get_settings(index=index, name="index.refresh_interval")
+        previous = next(iter(settings.values()), {}).get("settings", {}).get("index", {}).get("refresh_interval")
+        client.indices.put_settings(index=index, settings={"index": {"refresh_interval": "-1"}})
+        return {"refresh_interval": previous}
+
+    def _restore_refresh(self, saved: Optional[Dict[str, Any]]) -> None:
+        """
+        Restores the refresh interval (None resets it to the default) and makes the indexed documents searchable.
+        """
+        if saved is None:
+            return
+        client, index = self.hybrid_search.client, self.hybrid_search.index
+        try:
+            client.indices.put_settings(index=index, settings={"index": {"refresh_interval": saved["refresh_interval"]}})
+            client.indices.refresh(index=index)
+        except Exception as e:
+            logger.error(f"Failed to restore the refresh interval of {index} to {saved['refresh_interval']}: {e}")
+
+    def _batches(self, after: Any) -> Iterator[Tuple[Any, List[Dict[str, Any]]]]:
+        """
+        Yields the source's remaining documents in batches, with the position of each batch's last document.
+        """
+        rows = self.source.read(after)
+        while True:
+            batch = list(itertools.islice(rows, self.batch_size))
+            if not batch:
+                return
+            yield batch[-1][0], [document for _, document in batch]
+
+    def _load(self, checkpoint_path: Optional[str], resume: bool) -> Dict[str, Any]:
+        settings = {"source": self.source.name, "targets": self.targets}
+        checkpoint = {**settings, "position": None, "rows": 0, "done": False}
+        if resume and checkpoint_path and os.path.exists(checkpoint_path):
+            with open(checkpoint_path, "rb") as file:
+                saved = orjson.loads(file.read())
+            if {key: saved.get(key) for key in settings} != settings:
+                raise BackfillError(f"The checkpoint at {checkpoint_path} belongs to a backfill with other settings.")
+            checkpoint = saved
+        return checkpoint
+
+    @staticmethod
+    def _save(path: Optional[str], checkpoint: Dict[str, Any]) -> None:
+        """
+        Writes a checkpoint atomically.
+        """
+        if not path:
+            return
+        temporary = f"{path}.tmp"
+        with open(temporary, "wb") as file:
+            file.write(orjson.dumps(checkpoint))
+            file.flush()
+            os.fsync(file.fileno())
+        os.replace(temporary, path)
+
+    def run(self, checkpoint_path: Optional[str] = None, resume: bool = False) -> Dict[str, Any]:
+        """
+        Runs the backfill to the end of the source, or until a batch fails.
+
+        Args:
+            checkpoint_path (Optional[str]): File the progress is checkpointed to after every batch.
+            resume (bool): Continue from the checkpoint instead of starting over.
+
+        Returns:
+            Dict[str, Any]: The final progress report.
+
+        Raises:
+            BackfillError: If the checkpoint belongs to another backfill.
+        """
+        checkpoint = self._load(checkpoint_path, resume)
+        if checkpoint["done"]:
+            return {"state": "done", "resumed_rows": checkpoint["rows"]}
+        if checkpoint["rows"]:
+            logger.info(f"Resuming the backfill from {self.source.name} after {checkpoint['rows']} rows.")
+        started = last_report = self.clock()
+        reported_documents = 0
+        with self.lock:
+            self.progress = {
+                "state": "running", "source": self.source.name, "targets": self.targets,
+                "resumed_rows": checkpoint["rows"], "documents": 0, "batches": 0,
+                **{target: 0 for target in self.targets}, "duplicates": 0, "rejected": 0,
+                "docs_per_second": 0.0, "elapsed_seconds": 0.0,
+            }
+
+        # Sequence number of each pending batch, and the positions and sizes of the batches not yet checkpointed
+        pending: Dict[Future, int] = {}
+        batches: Dict[int, Tuple[Any, int]] = {}
+        finished: Set[int] = set()
+        next_checkpoint = 0
+        failure: Optional[Exception] = None
+
+        def collect(futures: Set[Future]) -> None:
+            nonlocal next_checkpoint, failure, last_report, reported_documents
+            for future in futures:
+                sequence = pending.pop(future)
+                try:
+                    counts = future.result()
+                except Exception as e:
+                    failure = failure or e
+                    continue
+                finished.add(sequence)
+                with self.lock:
+                    self.progress["batches"] += 1
+                    for key, value in counts.items():
+                        self.progress[key] = self.progress.get(key, 0) + value
+            # Advance the checkpoint over the batches written without a gap
+            advanced = False
+            while next_checkpoint in finished:
+                finished.remove(next_checkpoint)
+                position, size = batches.pop(next_checkpoint)
+                checkpoint["position"] = position
+                checkpoint["rows"] += size
+                next_checkpoint += 1
+                advanced = True
+            if advanced:
+                self._save(checkpoint_path, checkpoint)
+            now = self.clock()
+            with self.lock:
+                documents = self.progress["documents"]
+                overall = documents / max(now - started, 1e-9)
+                self.progress["elapsed_seconds"] = round(now - started, 1)
+                self.progress["docs_per_second"] = round(overall, 1)
+            if now - last_report >= self.report_seconds:
+                recent = (documents - reported_documents) / max(now - last_report, 1e-9)
+                logger.info(f"Backfilled {documents} documents: {recent:.0f} docs/s now, {overall:.0f} docs/s overall.")
+                last_report, reported_documents = now, documents
+
+        refresh = self._disable_refresh()
+        try:
+            with ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="backfill") as executor:
+                for sequence, (position, documents) in enumerate(self._batches(checkpoint["position"])):
+                    while len(pending) >= self.max_pending and failure is None:
+                        collect(wait(pending, return_when=FIRST_COMPLETED).done)
+                    if failure is not None:
+                        break
+                    batches[sequence] = (position, len(documents))
+                    pending[executor.submit(self.write_batch, documents)] = sequence
+                while pending:
+                    collect(wait(pending, return_when=FIRST_COMPLETED).done)
+        except Exception as e:
+            failure = failure or e
+        finally:
+            self._restore_refresh(refresh)
+
+        elapsed = self.clock() - started
+        with self.lock:
+            self.progress["elapsed_seconds"] = round(elapsed, 1)
+            self.progress["docs_per_second"] = round(self.progress["documents"] / max(elapsed, 1e-9), 1)
+            self.progress["checkpoint_rows"] = checkpoint["rows"]
+            if failure is not None:
+                self.progress.update(state="failed", error=str(failure))
+            else:
+                self.progress["state"] = "done"
+        if failure is not None:
+            logger.error(f"Backfill from {self.source.name} failed after {checkpoint['rows']} checkpointed rows: {failure}")
+        else:
+            checkpoint["done"] = True
+            self._save(checkpoint_path, checkpoint)
+            logger.info(f"Backfill from {self.source.name} done: {self.report()}")
+        return self.report()
+
+    def report(self) -> Dict[str, Any]:
+        """
+        Returns the progress of the current or last run.
+        """
+        with self.lock:
+            return dict(self.progress)
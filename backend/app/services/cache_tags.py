@@ -0,0 +1,201 @@
+from typing import Any, Callable, Dict, Iterable, List, Optional
+import itertools
+import threading
+import time
+import uuid
+from app.utils.logger import get_logger
+from app.constants import CACHE_TAG_TTL_SECONDS, CACHE_INVALIDATION_BATCH_SIZE, CACHE_INVALIDATION_PAUSE_SECONDS
+
+# Logger setup
+logger = get_logger("cache_tags")
+
+TAG_PREFIX = "tag:"
+# Kinds of tags cache entries are indexed by
+TAG_KINDS = ("model", "language", "template", "user")
+
+
+def tag_key(kind: str, value: str) -> str:
+    """
+    Returns the Redis key of the set indexing the cache entries with a tag.
+    """
+    return f"{TAG_PREFIX}{kind}:{value}"
+
+
+def parse_tag(tag: str) -> str:
+    """
+    Returns the set key of a "kind:value" tag.
+
+    Raises:
+        ValueError: If the tag is malformed or of an unknown kind.
+    """
+    kind, separator, value = tag.partition(":")
+    if not separator or not value or kind not in TAG_KINDS:
+        raise ValueError(f"Invalid cache tag '{tag}': expected one of {', '.join(TAG_KINDS)} followed by ':<value>'.")
+    return tag_key(kind, value)
+
+
+def tag_entries(pipeline: Any, keys: Iterable[str], tags: Dict[str, Optional[str]]) -> None:
+    """
+    Queues the commands indexing cache entries under their tags on a pipeline, so an entry and its
+    index are written in the same round trip. Tags without a value are skipped.
+
+    Args:
+        pipeline (Any): The Redis pipeline the entries are written with.
+        keys (Iterable[str]): The cache keys.
+        tags (Dict[str, Optional[str]]): Tag values by kind, e.g. {"model": "gpt-4o-mini"}.
+    """
+    keys = list(keys)
+    for kind, value in tags.items():
+        if not value:
+            continue
+        index = tag_key(kind, value)
+        pipeline.sadd(index, *keys)
+        # Outlives every tagged entry as long as the tag keeps being written
+        pipeline.expire(index, CACHE_TAG_TTL_SECONDS)
+
+
+class CacheTagIndex:
+    """
+    Invalidates cache entries by tag without blocking Redis.
+
+    Every cached entry is indexed in one Redis set per tag (`tag:model:gpt-4o`, `tag:user:alice`, ...).
+    An invalidation walks a tag's set with SSCAN and deletes each batch of entries with a pipelined
+    UNLINK, pausing between batches, so no single command holds the server for long no matter how many
+    entries a tag has. Entries that expired on their own are left in the sets until an invalidation
+    or `prune` removes them.
+    """
+
+    def __init__(
+        self,
+        redis_client: Any,
+        batch_size: int = CACHE_INVALIDATION_BATCH_SIZE,
+        pause_seconds: float = CACHE_INVALIDATION_PAUSE_SECONDS,
+        sleep: Callable[[float], None] = time.sleep,
+    ):
+        """
+        Initializes the CacheTagIndex.
+
+        Args:
+            redis_client (Any): The Redis client of the cache.
+            batch_size (int): Entries deleted per round trip.
+            pause_seconds (float): Pause between batches, leaving Redis to other clients.
+            sleep (Callable[[float], None]): Sleep function, replaceable in tests.
+        """
+        self.redis_client = redis_client
+        self.batch_size = batch_size
+        self.pause_seconds = pause_seconds
+        self.sleep = sleep
+        self.jobs: Dict[str, Dict[str, Any]] = {}
+        self.lock = threading.Lock()
+
+    def _is_set(self, index: str) -> bool:
+        """
+        Returns whether a tag key holds a set. Anything else was written over the index by mistake and
+        would fail every set command with WRONGTYPE.
+        """
+        if self.redis_client.type(index) in ("set", b"set"):
+            return True
+        logger.warning(f"Skipping cache tag key {index}: it does not hold a set.")
+        return False
+
+    def _batches(self, index: str) -> Iterable[List[str]]:
+        """
+        Yields the members of a tag set in batches of at most `batch_size`, or none if the key holds no set.
+        """
+        if not self._is_set(index):
+            return
+        members = self.redis_client.sscan_iter(index, count=self.batch_size)
+        while True:
+            batch = list(itertools.islice(members, self.batch_size))
+            if not batch:
+                return
+            yield batch
+
+    def invalidate(self, tags: List[str], progress: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """
+        Deletes every cache entry carrying any of the tags. Emptied tag sets disappear with their last member.
+
+        Args:
+            tags (List[str]): Tags as "kind:value", e.g. "model:gpt-4o".
+            progress (Optional[Dict[str, Any]]): Report updated in place as batches complete.
+
+        Returns:
+            Dict[str, Any]: The number of entries deleted and batches used.
+
+        Raises:
+            ValueError: If a tag is malformed.
+        """
+        indexes = [parse_tag(tag) for tag in tags]
+        progress = progress if progress is not None else {}
+        progress.update(deleted=0, batches=0)
+        for index in indexes:
+            for batch in self._batches(index):
+                pipeline = self.redis_client.pipeline(transaction=False)
+                pipeline.unlink(*batch)
+                pipeline.srem(index, *batch)
+                deleted, _ = pipeline.execute()
+                progress["deleted"] += deleted
+                progress["batches"] += 1
+                self.sleep(self.pause_seconds)
+        logger.info(f"Invalidated {progress['deleted']} cache entries tagged {', '.join(tags)}.")
+        return progress
+
+    def start(self, tags: List[str]) -> Dict[str, Any]:
+        """
+        Runs an invalidation in a background thread.
+
+        Args:
+            tags (List[str]): Tags as "kind:value".
+
+        Returns:
+            Dict[str, Any]: The job's initial report, including its id.
+
+        Raises:
+            ValueError: If a tag is malformed.
+        """
+        for tag in tags:
+            parse_tag(tag)
+        job = {"id": uuid.uuid4().hex, "tags": tags, "state": "running", "deleted": 0, "batches": 0}
+        with self.lock:
+            self.jobs[job["id"]] = job
+
+        def run():
+            started = time.monotonic()
+            try:
+                self.invalidate(tags, job)
+                job["state"] = "done"
+            except Exception as e:
+                logger.error(f"Cache invalidation of {', '.join(tags)} failed: {e}")
+                job.update(state="failed", error=str(e))
+            job["elapsed_seconds"] = round(time.monotonic() - started, 2)
+
+        threading.Thread(target=run, name="cache-invalidation", daemon=True).start()
+        return dict(job)
+
+    def job(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Returns the report of an invalidation job, or None if it is unknown.
+        """
+        with self.lock:
+            job = self.jobs.get(job_id)
+        return dict(job) if job else None
+
+    def prune(self) -> int:
+        """
+        Removes the entries that expired on their own from every tag set, in the same batches as an invalidation.
+
+        Returns:
+            int: The number of set members removed.
+        """
+        removed = 0
+        for index in self.redis_client.scan_iter(match=TAG_PREFIX + "*", count=self.batch_size):
+            for batch in self._batches(index):
+                pipeline = self.redis_client.pipeline(transaction=False)
+                for key in batch:
+                    pipeline.exists(key)
+                expired = [key for key, exists in zip(batch, pipeline.execute()) if not exists]
+                if expired:
+                    removed += self.redis_client.srem(index, *expired)
+                self.sleep(self.pause_seconds)
+        logger.info(f"Pruned {removed} expired entries from the cache tag sets.")
+        return removed
@@ -0,0 +1,175 @@
+from typing import Any, Callable, Dict, List, Optional, Tuple
+import threading
+import time
+from app.services.cache_tags import tag_entries
+from app.services.response_store import ResponseStore
+from app.utils.logger import get_logger, preview
+from app.constants import CACHE_WARM_BATCH_SIZE, CACHE_WARM_RATE_PER_SECOND
+
+# Logger setup
+logger = get_logger("cache_warmer")
+
+
+class CacheWarmer:
+    """
+    Loads the stored answers of the most requested prompts from MongoDB into Redis, so a cold cache
+    (after a Redis restart or a deploy) does not send the first hour of traffic to the LLM.
+
+    Prompts are loaded in batches, one aggregation and one pipelined Redis round trip each, and the
+    batches are paced to `rate_per_second` prompts so MongoDB keeps serving live traffic. Entries
+    already in Redis are left alone (SET NX), since they may be fresher than the stored answer.
+    """
+
+    def __init__(
+        self,
+        collection: Any,
+        redis_client: Any,
+        ttl: Callable[[str, int], int],
+        batch_size: int = CACHE_WARM_BATCH_SIZE,
+        rate_per_second: float = CACHE_WARM_RATE_PER_SECOND,
+        extra_keys: Optional[Callable[[str, str], Dict[str, Tuple[str, int]]]] = None,
+        response_store: Optional[ResponseStore] = None,
+    ):
+        """
+        Initializes the CacheWarmer.
+
+        Args:
+            collection (Any): The MongoDB interactions collection.
+            redis_client (Any): The Redis client of the response cache.
+            ttl (Callable[[str, int], int]): Returns the TTL of a cache key from the key and value size.
+            batch_size (int): Prompts loaded per batch.
+            rate_per_second (float): Maximum prompts loaded per second.
+            extra_keys (Optional[Callable[[str, str], Dict[str, Tuple[str, int]]]]): Returns additional
+                keys to write for a prompt and answer, mapped to (value, TTL), e.g. stale copies.
+            response_store (Optional[ResponseStore]): Resolves answers stored by reference.
+        """
+        self.collection = collection
+        self.redis_client = redis_client
+        self.ttl = ttl
+        self.batch_size = batch_size
+        self.rate_per_second = rate_per_second
+        self.extra_keys = extra_keys
+        self.response_store = response_store
+        self.thread: Optional[threading.Thread] = None
+        self.progress: Dict[str, Any] = {"state": "idle"}
+        self.lock = threading.Lock()
+        try:
+            self.collection.create_index("cache_key")
+        except Exception as e:
+            logger.error(f"Failed to create the cache key index: {e}")
+
+    def _update(self, **fields: Any) -> None:
+        with self.lock:
+            self.progress.update(fields)
+
+    def _latest_answers(self, prompts: List[str]) -> Dict[str, Dict[str, Any]]:
+        """
+        Returns the most recent stored answer of each prompt that has one, with the model and template
+        that produced it. Only interactions stored under the prompt's own cache key qualify; answers given
+        with code context or a chosen model do not.
+        """
+        rows = self.collection.aggregate([
+            {"$match": {"cache_key": {"$in": prompts}}},
+            {"$sort": {"_id": -1}},
+            {"$group": {
+                "_id": "$cache_key",
+                "response": {"$first": "$response"},
+                "response_hash": {"$first": "$response_hash"},
+                "model": {"$first": "$usage.model"},
+                "template": {"$first": "$usage.template"},
+            }},
+        ])
+        if self.response_store:
+            rows = self.response_store.resolve(list(rows))
+        return {row["_id"]: row for row in rows if isinstance(row.get("response"), str)}
+
+    def _write(self, answers: Dict[str, Dict[str, Any]]) -> int:
+        """
+        Writes answers to Redis in one pipeline, skipping keys already cached. Returns the number written.
+        """
+        pipeline = self.redis_client.pipeline(transaction=False)
+        # Positions of the answers' own SETs among the pipeline's results
+        positions = []
+        commands = 0
+        for prompt, answer in answers.items():
+            response = answer["response"]
+            pipeline.set(prompt, response, nx=True, ex=self.ttl(prompt, len(response.encode("utf-8"))))
+            positions.append(commands)
+            commands += 1
+            extra_keys = self.extra_keys(prompt, response) if self.extra_keys else {}
+            for key, (value, ttl) in extra_keys.items():
+                pipeline.set(key, value, nx=True, ex=ttl)
+                commands += 1
+            # Warmed entries stay invalidatable by the model and template that produced them
+            tags = {"model": answer.get("model"), "template": answer.get("template")}
+            tag_entries(pipeline, [prompt, *extra_keys], tags)
+            commands += 2 * sum(1 for value in tags.values() if value)
+        results = pipeline.execute()
+        return sum(1 for position in positions if results[position])
+
+    def warm(self, prompts: List[Tuple[str, int]]) -> Dict[str, Any]:
+        """
+        Loads the answers of the given prompts into Redis.
+
+        Args:
+            prompts (List[Tuple[str, int]]): The prompts with their request counts, most requested first.
+
+        Returns:
+            Dict[str, Any]: The final progress report.
+        """
+        total_requests = sum(count for _, count in prompts) or 1
+        started = time.monotonic()
+        self._update(
+            state="running", planned=len(prompts), processed=0, loaded=0, already_cached=0, not_found=0,
+            coverage=0.0, elapsed_seconds=0.0,
+        )
+        logger.info(f"Warming the response cache with {len(prompts)} prompts.")
+        covered = 0
+        processed = 0
+        try:
+            for offset in range(0, len(prompts), self.batch_size):
+                batch = prompts[offset:offset + self.batch_size]
+                batch_started = time.monotonic()
+                answers = self._latest_answers([prompt for prompt, _ in batch])
+                loaded = self._write(answers) if answers else 0
+                processed += len(batch)
+                covered += sum(count for prompt, count in batch if prompt in answers)
+                with self.lock:
+                    self.progress["processed"] = processed
+                    self.progress["loaded"] += loaded
+                    self.progress["already_cached"] += len(answers) - loaded
+                    self.progress["not_found"] += len(batch) - len(answers)
+                    # Share of the tracked requests whose prompt now has an answer in the cache
+                    self.progress["coverage"] = round(covered / total_requests, 4)
+                    self.progress["elapsed_seconds"] = round(time.monotonic() - started, 1)
+                # Pace the batches to the configured rate
+                time.sleep(max(0.0, len(batch) / self.rate_per_second - (time.monotonic() - batch_started)))
+            self._update(state="done", elapsed_seconds=round(time.monotonic() - started, 1))
+            logger.info(f"Cache warming done: {self.report()}")
+        except Exception as e:
+            logger.error(f"Cache warming failed after {processed} prompts: {preview(e)}")
+            self._update(state="failed", error=str(e), elapsed_seconds=round(time.monotonic() - started, 1))
+        return self.report()
+
+    def start(self, prompts: List[Tuple[str, int]]) -> bool:
+        """
+        Warms the cache in a background thread.
+
+        Args:
+            prompts (List[Tuple[str, int]]): The prompts with their request counts, most requested first.
+
+        Returns:
+            bool: False if a warm-up is already running.
+        """
+        if self.thread is not None and self.thread.is_alive():
+            return False
+        self.thread = threading.Thread(target=self.warm, args=(prompts,), name="cache-warmer", daemon=True)
+        self.thread.start()
+        return True
+
+    def report(self) -> Dict[str, Any]:
+        """
+        Returns the progress of the current or last warm-up.
+        """
+        with self.lock:
+            return dict(self.progress)
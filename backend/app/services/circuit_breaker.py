@@ -0,0 +1,234 @@
+from collections import deque
+from typing import Any, Callable, Deque, Dict, Optional
+import threading
+import time
+from app.utils.logger import get_logger, parse_sample_rates
+from app.constants import (
+    BREAKER_FAILURE_RATE,
+    BREAKER_WINDOW,
+    BREAKER_MIN_CALLS,
+    BREAKER_OPEN_SECONDS,
+    BREAKER_HALF_OPEN_CALLS,
+    BREAKER_SLOW_CALL_SECONDS,
+)
+
+# Logger setup
+logger = get_logger("circuit_breaker")
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class CircuitOpenError(RuntimeError):
+    """
+    Raised instead of calling a dependency whose circuit is open.
+    """
+
+    def __init__(self, name: str, retry_after: float):
+        super().__init__(f"{name} is unavailable (circuit open), retry in {retry_after:.0f}s.")
+        self.name = name
+        self.retry_after = retry_after
+
+
+class CircuitBreaker:
+    """
+    Fails fast on a dependency that keeps failing or responding slowly.
+
+    - closed: calls go through; once `min_calls` of the last `window` calls are recorded and the share of
+      failed or slow ones reaches `failure_rate`, the circuit opens.
+    - open: calls are rejected with `CircuitOpenError` for `open_seconds`, then the circuit turns half-open.
+    - half-open: up to `half_open_calls` probe calls go through. If all succeed the circuit closes,
+      the first failure opens it again.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        failure_rate: float = BREAKER_FAILURE_RATE,
+        window: int = BREAKER_WINDOW,
+        min_calls: int = BREAKER_MIN_CALLS,
+        open_seconds: float = BREAKER_OPEN_SECONDS,
+        half_open_calls: int = BREAKER_HALF_OPEN_CALLS,
+        slow_call_seconds: Optional[float] = None,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        """
+        Initializes the breaker.
+
+        Args:
+            name (str): The dependency name, used in logs and reports.
+            failure_rate (float): Share of failed calls in the window at which the circuit opens.
+            window (int): Number of recent calls the failure rate is computed over.
+            min_calls (int): Calls needed in the window before the failure rate is trusted.
+            open_seconds (float): Time the circuit stays open before probing the dependency.
+            half_open_calls (int): Successful probes needed to close the circuit.
+            slow_call_seconds (Optional[float]): Calls taking longer count as failures.
+            clock (Callable[[], float]): Monotonic time source, replaceable in tests.
+        """
+        self.name = name
+        self.failure_rate = failure_rate
+        self.min_calls = min_calls
+        self.open_seconds = open_seconds
+        self.half_open_calls = half_open_calls
+        self.slow_call_seconds = slow_call_seconds
+        self.clock = clock
+        self.state = CLOSED
+        self.outcomes: Deque[bool] = deque(maxlen=window)
+        self.opened_at = 0.0
+        self.probes = 0
+        self.probe_successes = 0
+        self.rejected = 0
+        self.times_opened = 0
+        self.lock = threading.Lock()
+
+    def _open(self) -> None:
+        """
+        Opens the circuit. Must be called with the lock held.
+        """
+        if self.state != OPEN:
+            logger.warning(f"Circuit of {self.name} opened.")
+        self.state = OPEN
+        self.opened_at = self.clock()
+        self.times_opened += 1
+        self.outcomes.clear()
+
+    def retry_after(self) -> float:
+        """
+        Returns the seconds until an open circuit lets a probe through.
+        """
+        return max(0.0, self.opened_at + self.open_seconds - self.clock()) if self.state == OPEN else 0.0
+
+    def allow(self) -> bool:
+        """
+        Returns whether a call may go through. A True answer must be followed by `record`, or by
+        `release` if the call ends without an outcome.
+        """
+        with self.lock:
+            if self.state == OPEN:
+                if self.clock() - self.opened_at < self.open_seconds:
+                    self.rejected += 1
+                    return False
+                self.state = HALF_OPEN
+                self.probes = self.probe_successes = 0
+                logger.info(f"Circuit of {self.name} half-open, probing.")
+            if self.state == HALF_OPEN:
+                if self.probes >= self.half_open_calls:
+                    self.rejected += 1
+                    return False
+                self.probes += 1
+            return True
+
+    def rejecting(self) -> bool:
+        """
+        Returns whether `allow` would reject a call now, without taking a half-open probe.
+        """
+        with self.lock:
+            if self.state == OPEN:
+                return self.clock() - self.opened_at < self.open_seconds
+            return self.state == HALF_OPEN and self.probes >= self.half_open_calls
+
+    def release(self) -> None:
+        """
+        Gives back a call let through by `allow` that ended without an outcome, e.g. one its caller
+        cancelled, so a half-open circuit can let another probe through instead.
+        """
+        with self.lock:
+            if self.state == HALF_OPEN and self.probes > 0:
+                self.probes -= 1
+
+    def record(self, ok: bool, seconds: float = 0.0) -> None:
+        """
+        Records the outcome of a call let through by `allow`.
+
+        Args:
+            ok (bool): Whether the call succeeded.
+            seconds (float): The call duration; calls over the slow-call threshold count as failures.
+        """
+        ok = ok and (self.slow_call_seconds is None or seconds <= self.slow_call_seconds)
+        with self.lock:
+            if self.state == HALF_OPEN:
+                if not ok:
+                    self._open()
+                    return
+                self.probe_successes += 1
+                if self.probe_successes >= self.half_open_calls:
+                    self.state = CLOSED
+                    logger.info(f"Circuit of {self.name} closed.")
+                return
+            if self.state == OPEN:
+                # A call admitted before the circuit opened; its outcome is stale
+                return
+            self.outcomes.append(ok)
+            if len(self.outcomes) >= self.min_calls and self.outcomes.count(False) / len(self.outcomes) >= self.failure_rate:
+                self._open()
+
+    def call(self, func: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+        """
+        Calls a function through the breaker.
+
+        Args:
+            func (Callable[..., Any]): The dependency call.
+            *args: Positional arguments of the call.
+            **kwargs: Keyword arguments of the call.
+
+        Returns:
+            Any: The result of the call.
+
+        Raises:
+            CircuitOpenError: If the circuit is open; the function is not called.
+        """
+        if not self.allow():
+            raise CircuitOpenError(self.name, self.retry_after())
+        started = time.perf_counter()
+        try:
+            result = func(*args, **kwargs)
+        except Exception:
+            self.record(False)
+            raise
+        self.record(True, time.perf_counter() - started)
+        return result
+
+    def snapshot(self) -> Dict[str, Any]:
+        """
+        Returns the state and recent statistics of the breaker.
+        """
+        with self.lock:
+            calls = len(self.outcomes)
+            return {
+                "state": self.state,
+                "failure_rate": self.outcomes.count(False) / calls if calls else 0.0,
+                "calls": calls,
+                "rejected": self.rejected,
+                "times_opened": self.times_opened,
+                "retry_after_seconds": round(self.retry_after(), 1),
+            }
+
+
+# Breakers of the app's dependencies, keyed by name
+BREAKERS: Dict[str, CircuitBreaker] = {}
+_registry_lock = threading.Lock()
+
+
+def get_circuit_breaker(name: str) -> CircuitBreaker:
+    """
+    Returns the shared breaker of a dependency, creating it with the configured thresholds.
+
+    Args:
+        name (str): The dependency name, e.g. `redis`, `mongodb`, `elasticsearch` or `llm`.
+
+    Returns:
+        CircuitBreaker: The breaker.
+    """
+    with _registry_lock:
+        if name not in BREAKERS:
+            slow_call_seconds = parse_sample_rates(BREAKER_SLOW_CALL_SECONDS).get(name)
+            BREAKERS[name] = CircuitBreaker(name, slow_call_seconds=slow_call_seconds)
+        return BREAKERS[name]
+
+
+def circuit_breaker_snapshot() -> Dict[str, Dict[str, Any]]:
+    """
+    Returns the state of every dependency breaker.
+    """
+    return {name: breaker.snapshot() for name, breaker in sorted(BREAKERS.items())}
@@ -0,0 +1,406 @@
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, List, Optional
+import uuid
+import orjson
+from app.services.circuit_breaker import CircuitBreaker
+from app.utils.logger import get_logger
+from app.utils.tokens import count_tokens
+from app.constants import (
+    CONVERSATION_CONTEXT_TOKENS,
+    CONVERSATION_SUMMARY_TURNS,
+    CONVERSATION_MAX_TURNS,
+    CONVERSATION_TTL_SECONDS,
+)
+
+# Logger setup
+logger = get_logger("conversation_service")
+
+CONVERSATION_COLLECTION_NAME = "conversations"
+CONVERSATION_CACHE_PREFIX = "conversation:"
+# Characters per token assumed when clipping the turns sent to be summarized
+CLIP_CHARS_PER_TOKEN = 4
+
+
+class ConversationNotFoundError(LookupError):
+    """
+    Raised for an unknown conversation, or one that belongs to another user.
+    """
+
+
+class ConversationConflictError(Exception):
+    """
+    Raised when a turn cannot be recorded: another turn was recorded first, or the conversation is full.
+    """
+
+
+def recent_turns(turns: List[List[Any]], budget: int) -> int:
+    """
+    Returns how many of the most recent turns fit a token budget.
+
+    Args:
+        turns (List[List[Any]]): Turns as `[prompt, response, tokens]`, oldest first.
+        budget (int): The token budget.
+
+    Returns:
+        int: The number of turns, counted from the newest.
+    """
+    used, kept = 0, 0
+    for turn in reversed(turns):
+        used += turn[2]
+        if used > budget:
+            break
+        kept += 1
+    return kept
+
+
+def clip(text: str, tokens: int) -> str:
+    """
+    Cuts a text to about `tokens` tokens.
+    """
+    if count_tokens(text) <= tokens:
+        return text
+    return text[:tokens * CLIP_CHARS_PER_TOKEN] + " [...]"
+
+
+@dataclass
+class Context:
+    """
+    What a conversation turn is answered with: the summary of the earlier turns and the most recent turns.
+    """
+    summary: str
+    turns: List[List[Any]]
+    count: int
+    tokens: int
+
+    def messages(self) -> List[Dict[str, str]]:
+        """
+        Returns the context as chat messages, to be placed between the system message and the new prompt.
+        """
+        messages = []
+        if self.summary:
+            messages.append({"role": "system", "content": f"Summary of the earlier conversation:\n{self.summary}"})
+        for prompt, response, _ in self.turns:
+            messages.append({"role": "user", "content": prompt})
+            messages.append({"role": "assistant", "content": response})
+        return messages
+
+
+@dataclass
+class Fold:
+    """
+    The turns of a conversation due to be folded into its summary, as a transcript.
+    """
+    summary: str
+    summarized: int
+    turns: int
+    transcript: str
+
+
+class ConversationService:
+    """
+    Keeps multi-turn conversations on the server, so a client sends only each new turn.
+
+    MongoDB keeps every turn in the conversation's document. Redis caches the compact state turns are
+    answered from, as one value: the summary of the earlier turns and the turns not yet summarized, each
+    as `[prompt, response, tokens]`. A turn is answered with the summary and as many recent turns as fit
+    the context budget; once enough turns fall out of the recent half of the budget, the LLM folds them
+    into the summary, so the context stays bounded however long the conversation runs.
+
+    Turns are recorded with a compare-and-set on the turn count, so concurrent turns of one conversation
+    cannot interleave. The Redis state is rewritten after each turn and dropped after each summary, and
+    is rebuilt from MongoDB whenever it is missing.
+    """
+
+    def __init__(
+        self,
+        database: Any,
+        redis_client: Optional[Any] = None,
+        summarize: Optional[Callable[[str, str], str]] = None,
+        breaker: Optional[CircuitBreaker] = None,
+        context_tokens: int = CONVERSATION_CONTEXT_TOKENS,
+        summary_turns: int = CONVERSATION_SUMMARY_TURNS,
+        max_turns: int = CONVERSATION_MAX_TURNS,
+        ttl: int = CONVERSATION_TTL_SECONDS,
+    ):
+        """
+        Initializes the ConversationService.
+
+        Args:
+            database (Any): MongoDB database holding the conversations collection.
+            redis_client (Optional[Any]): Redis client caching the compact conversation state.
+            summarize (Optional[Callable[[str, str], str]]): Returns the new summary from the previous one and
+                a transcript of the turns to add. Without it, turns beyond the budget are dropped from the context.
+            breaker (Optional[CircuitBreaker]): The breaker of the MongoDB dependency, if calls go through one.
+            context_tokens (int): Token budget of a turn's context, the new prompt included.
+            summary_turns (int): Turns past the recent half of the budget that are summarized at once.
+            max_turns (int): Maximum number of turns of a conversation.
+            ttl (int): TTL of the cached state in seconds.
+        """
+        self.conversations = database[CONVERSATION_COLLECTION_NAME]
+        self.redis_client = redis_client
+        self.summarize = summarize
+        self.breaker = breaker
+        self.context_tokens = context_tokens
+        self.summary_turns = summary_turns
+        self.max_turns = max_turns
+        self.ttl = ttl
+
+    def _call(self, function, *args, **kwargs):
+        return self.breaker.call(function, *args, **kwargs) if self.breaker else function(*args, **kwargs)
+
+    @staticmethod
+    def _cache_key(session_id: str) -> str:
+        return CONVERSATION_CACHE_PREFIX + session_id
+
+    def _cached(self, session_id: str) -> Optional[Dict[str, Any]]:
+        if not self.redis_client:
+            return None
+        try:
+            cached = self.redis_client.get(self._cache_key(session_id))
+            return orjson.loads(cached) if cached else None
+        except Exception as e:
+            logger.error(f"Failed to read cached conversation state: {e}")
+            return None
+
+    def _cache(self, session_id: str, state: Dict[str, Any]) -> None:
+        if not self.redis_client:
+            return
+        try:
+            self.redis_client.set(self._cache_key(session_id), orjson.dumps(state), ex=self.ttl)
+        except Exception as e:
+            logger.error(f"Failed to cache conversation state: {e}")
+
+    def _invalidate(self, session_id: str) -> None:
+        if not self.redis_client:
+            return
+        try:
+            self.redis_client.delete(self._cache_key(session_id))
+        except Exception as e:
+            logger.error(f"Failed to drop cached conversation state: {e}")
+
+    def _state(self, session_id: str) -> Dict[str, Any]:
+        """
+        Returns the compact state of a conversation, from Redis or else from MongoDB.
+
+        Raises:
+            ConversationNotFoundError: If the conversation does not exist.
+        """
+        state = self._cached(session_id)
+        if state is None:
+            document = self._call(self.conversations.find_one, {"_id": session_id})
+            if document is None:
+                raise ConversationNotFoundError(f"Conversation {session_id} not found.")
+            state = {
+                "user_id": document.get("user_id"),
+                "summary": document["summary"],
+                "summarized": document["summarized"],
+                "count": document["count"],
+                "turns": [[turn["prompt"], turn["response"], turn["tokens"]] for turn in document["turns"][document["summarized"]:]],
+            }
+            self._cache(session_id, state)
+        return state
+
+    def _load(self, session_id: str, user_id: Optional[str]) -> Dict[str, Any]:
+        """
+        Returns the compact state of a conversation of the user.
+
+        Raises:
+            ConversationNotFoundError: If the conversation does not exist or belongs to another user.
+        """
+        state = self._state(session_id)
+        if state["user_id"] != user_id:
+            raise ConversationNotFoundError(f"Conversation {session_id} not found.")
+        return state
+
+    def create(self, user_id: Optional[str] = None) -> str:
+        """
+        Starts a conversation.
+
+        Args:
+            user_id (Optional[str]): The user the conversation belongs to.
+
+        Returns:
+            str: The conversation's session id.
+        """
+        session_id = uuid.uuid4().hex
+        now = datetime.now(timezone.utc)
+        self._call(self.conversations.insert_one, {
+            "_id": session_id, "user_id": user_id, "summary": "", "summarized": 0, "count": 0, "turns": [],
+            "created_at": now, "updated_at": now,
+        })
+        self._cache(session_id, {"user_id": user_id, "summary": "", "summarized": 0, "count": 0, "turns": []})
+        return session_id
+
+    def get(self, session_id: str, user_id: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Returns a conversation's summary and the turns not summarized yet.
+
+        Args:
+            session_id (str): The session id.
+            user_id (Optional[str]): The calling user.
+
+        Returns:
+            Dict[str, Any]: The number of turns, the summary and the unsummarized turns, oldest first.
+
+        Raises:
+            ConversationNotFoundError: If the conversation does not exist or belongs to another user.
+        """
+        state = self._load(session_id, user_id)
+        return {
+            "session_id": session_id,
+            "turns": state["count"],
+            "summary": state["summary"],
+            "recent": [{"prompt": prompt, "response": response} for prompt, response, _ in state["turns"]],
+        }
+
+    def context(self, session_id: str, user_id: Optional[str] = None, reserved_tokens: int = 0) -> Context:
+        """
+        Returns the context of a conversation's next turn: the summary and the recent turns that fit the
+        budget left by the summary and the new prompt. Older unsummarized turns are left out.
+
+        Args:
+            session_id (str): The session id.
+            user_id (Optional[str]): The calling user.
+            reserved_tokens (int): Tokens of the budget taken by the new prompt.
+
+        Returns:
+            Context: The summary and recent turns, with the conversation's turn count.
+
+        Raises:
+            ConversationNotFoundError: If the conversation does not exist or belongs to another user.
+        """
+        state = self._load(session_id, user_id)
+        summary_tokens = count_tokens(state["summary"]) if state["summary"] else 0
+        kept = recent_turns(state["turns"], max(0, self.context_tokens - summary_tokens - reserved_tokens))
+        turns = state["turns"][len(state["turns"]) - kept:]
+        return Context(state["summary"], turns, state["count"], summary_tokens + sum(turn[2] for turn in turns))
+
+    def append(self, session_id: str, count: int, prompt: str, response: str) -> int:
+        """
+        Records a turn, provided the conversation still has `count` turns.
+
+        Args:
+            session_id (str): The session id.
+            count (int): The turn count the turn was answered at, as returned by `context`.
+            prompt (str): The developer's prompt.
+            response (str): The response.
+
+        Returns:
+            int: The new turn count.
+
+        Raises:
+            ConversationConflictError: If another turn was recorded first, or the conversation is full.
+        """
+        if count >= self.max_turns:
+            raise ConversationConflictError(f"The conversation reached its limit of {self.max_turns} turns.")
+        tokens = count_tokens(prompt) + count_tokens(response)
+        now = datetime.now(timezone.utc)
+        result = self._call(
+            self.conversations.update_one,
+            {"_id": session_id, "count": count},
+            {
+                "$push": {"turns": {"prompt": prompt, "response": response, "tokens": tokens, "at": now}},
+                "$inc": {"count": 1},
+                "$set": {"updated_at": now},
+            },
+        )
+        if not result.modified_count:
+            raise ConversationConflictError("Another turn of this conversation was recorded first; send the turn again.")
+
+        state = self._cached(session_id)
+        if state is not None and state["count"] == count:
+            state["turns"].append([prompt, response, tokens])
+            state["count"] = count + 1
+            self._cache(session_id, state)
+        else:
+            self._invalidate(session_id)
+        return count + 1
+
+    def fold(self, session_id: str) -> Optional[Fold]:
+        """
+        Returns the turns past the recent half of the context budget, once there are at least
+        `summary_turns` of them, to be summarized and saved with `save_summary`.
+
+        Args:
+            session_id (str): The session id.
+
+        Returns:
+            Optional[Fold]: The current summary and the transcript to fold into it, or None.
+        """
+        try:
+            state = self._state(session_id)
+        except ConversationNotFoundError:
+            return None
+        turns = state["turns"]
+        folded = turns[:len(turns) - recent_turns(turns, self.context_tokens // 2)]
+        if len(folded) < self.summary_turns:
+            return None
+
+        # Bound the summary request by the context budget, however many turns are folded
+        clip_tokens = max(1, self.context_tokens // (2 * len(folded)))
+        transcript = "\n\n".join(
+            f"Developer: {clip(prompt, clip_tokens)}\n\nAssistant: {clip(response, clip_tokens)}"
+            for prompt, response, _ in folded
+        )
+        return Fold(state["summary"], state["summarized"], len(folded), transcript)
+
+    def save_summary(self, session_id: str, fold: Fold, summary: str) -> bool:
+        """
+        Saves the summary of a fold. Folded turns never change, so turns recorded while the summary was
+        written do not invalidate it; only another summary saved meanwhile does.
+
+        Args:
+            session_id (str): The session id.
+            fold (Fold): The fold returned by `fold`.
+            summary (str): The previous summary with the fold's turns added.
+
+        Returns:
+            bool: True if the summary was updated.
+        """
+        result = self._call(
+            self.conversations.update_one,
+            {"_id": session_id, "summarized": fold.summarized},
+            {"$set": {"summary": summary, "summarized": fold.summarized + fold.turns, "updated_at": datetime.now(timezone.utc)}},
+        )
+        # The cached state, possibly rewritten by turns recorded meanwhile, lacks the summary; MongoDB has it right
+        self._invalidate(session_id)
+        if not result.modified_count:
+            logger.info(f"Conversation {session_id} was summarized meanwhile; dropping this summary.")
+            return False
+        logger.info(f"Summarized {fold.turns} turns of conversation {session_id}.")
+        return True
+
+    def compact(self, session_id: str) -> bool:
+        """
+        Folds the turns past the recent half of the context budget into the summary with `summarize`
+        (see `fold` and `save_summary`).
+
+        Args:
+            session_id (str): The session id.
+
+        Returns:
+            bool: True if the summary was updated.
+        """
+        if not self.summarize:
+            return False
+        fold = self.fold(session_id)
+        if fold is None:
+            return False
+        return self.save_summary(session_id, fold, self.summarize(fold.summary, fold.transcript))
+
+    def delete(self, session_id: str, user_id: Optional[str] = None) -> None:
+        """
+        Deletes a conversation.
+
+        Args:
+            session_id (str): The session id.
+            user_id (Optional[str]): The calling user.
+
+        Raises:
+            ConversationNotFoundError: If the conversation does not exist or belongs to another user.
+        """
+        result = self._call(self.conversations.delete_one, {"_id": session_id, "user_id": user_id})
+        self._invalidate(session_id)
+        if not result.deleted_count:
+            raise ConversationNotFoundError(f"Conversation {session_id} not found.")
@@ -1,14 +1,10 @@
 from elasticsearch import Elasticsearch, exceptions
-import logging
 from typing import Optional, Any, Dict, List
 import os
+from app.utils.logger import get_logger, preview
 
 # Logger setup
-logger = logging.getLogger("elasticsearch_service")
-logger.setLevel(logging.INFO)
-handler = logging.StreamHandler()
-handler.setFormatter(logging.Formatter("%(asctime)s - %(name)s - %(levelname)s - %(message)s"))
-logger.addHandler(handler)
+logger = get_logger("elasticsearch_service")
 
 class ElasticsearchService:
     """
@@ -50,7 +46,7 @@ class ElasticsearchService:
         """
         try:
             response = self.client.index(index=index, id=doc_id, document=document)
-            logger.info(f"Document indexed successfully in {index} with response: {response}")
+            logger.info(f"Document indexed successfully in {index} with response: {preview(response)}")
             return True
         except Exception as e:
             logger.error(f"Failed to index document in {index}: {e}")
@@ -69,7 +65,7 @@ class ElasticsearchService:
         """
         try:
             response = self.client.get(index=index, id=doc_id)
-            logger.info(f"Document retrieved successfully from {index}: {response}")
+            logger.info(f"Document retrieved successfully from {index}: {preview(response)}")
             return response["_source"]
         except exceptions.NotFoundError:
             logger.warning(f"Document with ID {doc_id} not found in {index}.")
@@ -0,0 +1,89 @@
+from abc import ABC, abstractmethod
+from typing import Callable, Dict, List, Optional
+import math
+import zlib
+from app.services.local_search_service import tokenize
+from app.utils.logger import get_logger
+from app.constants import EMBEDDER_NAME, EMBEDDING_DIMENSIONS
+
+# Logger setup
+logger = get_logger("embedding_service")
+
+
+class Embedder(ABC):
+    """
+    Base class for text embedders used to fill the `embedding` field of the search index.
+    """
+    dimensions: int
+
+    @abstractmethod
+    def embed(self, text: str) -> Optional[List[float]]:
+        """
+        Embeds a text into a unit-length vector.
+
+        Args:
+            text (str): The text to embed.
+
+        Returns:
+            Optional[List[float]]: The vector, or None if the text has nothing to embed.
+        """
+
+
+class HashingEmbedder(Embedder):
+    """
+    An offline embedder based on signed feature hashing of code-aware tokens and character trigrams.
+    Trigrams let paraphrases and inflections ("routes", "routing") land close to each other.
+    """
+
+    def __init__(self, dimensions: int = EMBEDDING_DIMENSIONS):
+        self.dimensions = dimensions
+
+    def _add(self, vector: List[float], feature: str, weight: float) -> None:
+        digest = zlib.crc32(feature.encode("utf-8"))
+        sign = 1.0 if digest & 0x80000000 else -1.0
+        vector[digest % self.dimensions] += sign * weight
+
+    def embed(self, text: str) -> Optional[List[float]]:
+        vector = [0.0] * self.dimensions
+        for token in tokenize(text):
+            self._add(vector, token, 1.0)
+            padded = f"#{token}#"
+            for i in range(len(padded) - 2):
+                self._add(vector, padded[i:i + 3], 0.5)
+
+        norm = math.sqrt(sum(value * value for value in vector))
+        if not norm:
+            return None
+        return [value / norm for value in vector]
+
+
+# Registry of available embedders, keyed by name
+EMBEDDERS: Dict[str, Callable[[], Embedder]] = {"hashing": HashingEmbedder}
+
+
+def register_embedder(name: str, factory: Callable[[], Embedder]) -> None:
+    """
+    Registers an embedder factory so it can be selected with the `EMBEDDER_NAME` env variable.
+
+    Args:
+        name (str): The embedder name.
+        factory (Callable[[], Embedder]): A callable returning an Embedder instance.
+    """
+    EMBEDDERS[name] = factory
+
+
+def get_embedder(name: Optional[str] = None) -> Embedder:
+    """
+    Returns an instance of the configured embedder.
+
+    Args:
+        name (Optional[str]): The embedder name. Defaults to the `EMBEDDER_NAME` env variable.
+
+    Returns:
+        Embedder: The embedder instance.
+    """
+    name = name or EMBEDDER_NAME
+    if name not in EMBEDDERS:
+        logger.error(f"Unknown embedder '{name}', falling back to the hashing embedder.")
+        name = "hashing"
+    return EMBEDDERS[name]()
@@ -0,0 +1,144 @@
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass, asdict
+from typing import Any, Callable, Dict, Iterable, Optional
+import asyncio
+import time
+from app.utils.logger import get_logger
+from app.constants import HEALTH_PROBE_TIMEOUT_SECONDS, HEALTH_CACHE_SECONDS
+
+# Logger setup
+logger = get_logger("health_service")
+
+
+@dataclass
+class ProbeResult:
+    """
+    The outcome of one dependency probe.
+    """
+    ok: bool
+    latency_ms: float
+    error: Optional[str] = None
+    checked_at: float = 0.0
+
+    def to_dict(self) -> Dict[str, Any]:
+        return asdict(self)
+
+
+class HealthService:
+    """
+    Probes the app's dependencies concurrently, each with a strict timeout, and caches the results so
+    frequent liveness and readiness probes do not turn into load on the dependencies.
+
+    Probes are blocking client calls run on a dedicated thread pool, so the event loop never waits on
+    them. A probe still running from an earlier check (e.g. a hung connection) is reported as timed out
+    instead of being started again, so stuck probes cannot pile up.
+    """
+
+    def __init__(
+        self,
+        probes: Dict[str, Callable[[], Any]],
+        timeout: float = HEALTH_PROBE_TIMEOUT_SECONDS,
+        cache_seconds: float = HEALTH_CACHE_SECONDS,
+    ):
+        """
+        Initializes the HealthService.
+
+        Args:
+            probes (Dict[str, Callable[[], Any]]): Dependency names mapped to blocking checks. A check
+                fails by raising or by returning False.
+            timeout (float): Seconds after which a probe counts as failed.
+            cache_seconds (float): Seconds the results of a check are reused.
+        """
+        self.probes = probes
+        self.timeout = timeout
+        self.cache_seconds = cache_seconds
+        self.executor = ThreadPoolExecutor(max_workers=max(1, len(probes)), thread_name_prefix="health-probe")
+        self.running: Dict[str, Future] = {}
+        self.results: Dict[str, ProbeResult] = {}
+        self.checked_at: Optional[float] = None
+        self.lock: Optional[asyncio.Lock] = None
+        self.refresh: Optional[asyncio.Task] = None
+
+    @staticmethod
+    def _run(probe: Callable[[], Any]) -> float:
+        """
+        Runs a probe in a worker thread and returns its duration in seconds.
+        """
+        started = time.perf_counter()
+        if probe() is False:
+            raise RuntimeError("probe returned False")
+        return time.perf_counter() - started
+
+    async def _probe(self, name: str) -> ProbeResult:
+        """
+        Runs one probe with the timeout, reusing a probe still running from an earlier check.
+        """
+        started = time.perf_counter()
+        future = self.running.get(name)
+        if future is None or future.done():
+            future = self.executor.submit(self._run, self.probes[name])
+            self.running[name] = future
+        try:
+            seconds = await asyncio.wait_for(asyncio.shield(asyncio.wrap_future(future)), self.timeout)
+            return ProbeResult(True, round(seconds * 1000, 1), checked_at=time.time())
+        except asyncio.TimeoutError:
+            error = f"timed out after {self.timeout}s"
+        except Exception as e:
+            error = f"{type(e).__name__}: {e}"
+        logger.warning(f"Health probe of {name} failed: {error}")
+        return ProbeResult(False, round((time.perf_counter() - started) * 1000, 1), error, time.time())
+
+    async def check(self, force: bool = False) -> Dict[str, ProbeResult]:
+        """
+        Returns the probe results of every dependency, probing them again if the cached ones are stale.
+        Concurrent callers share one round of probes.
+
+        Args:
+            force (bool): Probe even if the cached results are fresh.
+
+        Returns:
+            Dict[str, ProbeResult]: The result of every dependency.
+        """
+        if self.lock is None:
+            self.lock = asyncio.Lock()
+        async with self.lock:
+            fresh = self.checked_at is not None and time.monotonic() - self.checked_at < self.cache_seconds
+            if force or not fresh:
+                names = list(self.probes)
+                results = await asyncio.gather(*(self._probe(name) for name in names))
+                self.results = dict(zip(names, results))
+                self.checked_at = time.monotonic()
+            return dict(self.results)
+
+    def refresh_if_stale(self) -> None:
+        """
+        Starts a check in the background if the cached results are stale, without waiting for it.
+        """
+        age = self.age()
+        if (age is None or age >= self.cache_seconds) and (self.refresh is None or self.refresh.done()):
+            self.refresh = asyncio.create_task(self.check())
+
+    def cached(self) -> Dict[str, ProbeResult]:
+        """
+        Returns the results of the last check without probing.
+        """
+        return dict(self.results)
+
+    def age(self) -> Optional[float]:
+        """
+        Returns the seconds since the last check, or None if no check ran yet.
+        """
+        return None if self.checked_at is None else time.monotonic() - self.checked_at
+
+    @staticmethod
+    def all_ok(results: Dict[str, ProbeResult], names: Iterable[str]) -> bool:
+        """
+        Returns whether the named dependencies passed their probes. Names without a probe are ignored.
+        """
+        return all(results[name].ok for name in names if name in results)
+
+    def close(self) -> None:
+        """
+        Stops the probe threads without waiting for hung probes.
+        """
+        self.executor.shutdown(wait=False, cancel_futures=True)
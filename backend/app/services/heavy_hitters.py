@@ -0,0 +1,163 @@
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Tuple
+import heapq
+import threading
+from pymongo import ReplaceOne
+from app.utils.logger import get_logger
+from app.constants import HEAVY_HITTERS_CAPACITY, HEAVY_HITTERS_MAX_PROMPT_CHARS
+
+# Logger setup
+logger = get_logger("heavy_hitters")
+
+HEAVY_HITTERS_COLLECTION_NAME = "prompt_heavy_hitters"
+
+
+class SpaceSaving:
+    """
+    Space-Saving top-k summary: tracks at most `capacity` items, and any item more frequent than
+    1/capacity of the stream is guaranteed to be tracked. When a new item arrives at a full summary,
+    it replaces the least counted one and inherits its count, recorded as the item's possible overcount.
+    """
+
+    def __init__(self, capacity: int):
+        self.capacity = capacity
+        self.counts: Dict[str, int] = {}
+        self.errors: Dict[str, int] = {}
+        # Lazy min-heap of (count, item); entries whose count is outdated are skipped on pop
+        self.heap: List[Tuple[int, str]] = []
+
+    def _pop_min(self) -> Tuple[str, int]:
+        while True:
+            count, item = heapq.heappop(self.heap)
+            if self.counts.get(item) == count:
+                return item, count
+
+    def add(self, item: str, count: int = 1) -> None:
+        """
+        Counts `count` occurrences of an item.
+        """
+        if item in self.counts:
+            self.counts[item] += count
+        elif len(self.counts) < self.capacity:
+            self.counts[item] = count
+            self.errors[item] = 0
+        else:
+            evicted, floor = self._pop_min()
+            del self.counts[evicted], self.errors[evicted]
+            self.counts[item] = floor + count
+            self.errors[item] = floor
+        heapq.heappush(self.heap, (self.counts[item], item))
+        if len(self.heap) > 4 * self.capacity:
+            self.heap = [(count, item) for item, count in self.counts.items()]
+            heapq.heapify(self.heap)
+
+    def top(self, n: int) -> List[Tuple[str, int, int]]:
+        """
+        Returns the n most counted items as (item, count, possible overcount), most counted first.
+        """
+        return [(item, count, self.errors[item]) for item, count in heapq.nlargest(n, self.counts.items(), key=lambda entry: entry[1])]
+
+    def total(self) -> int:
+        return sum(self.counts.values())
+
+
+class HeavyHitterTracker:
+    """
+    Tracks the most frequently asked prompts. The application persists the summary to MongoDB
+    periodically from a background task, so the ranking survives restarts and can drive cache warming.
+    """
+
+    def __init__(
+        self,
+        database: Optional[Any] = None,
+        capacity: int = HEAVY_HITTERS_CAPACITY,
+        max_prompt_chars: int = HEAVY_HITTERS_MAX_PROMPT_CHARS,
+    ):
+        """
+        Initializes the tracker, resuming from the persisted summary if there is one.
+
+        Args:
+            database (Optional[Any]): MongoDB database holding the summary. None keeps it in memory only.
+            capacity (int): Number of prompts tracked.
+            max_prompt_chars (int): Longer prompts (e.g. pasted code) are not tracked.
+        """
+        self.collection = database[HEAVY_HITTERS_COLLECTION_NAME] if database is not None else None
+        self.max_prompt_chars = max_prompt_chars
+        self.summary = SpaceSaving(capacity)
+        self.lock = threading.Lock()
+        self.load()
+
+    def load(self) -> None:
+        """
+        Seeds the summary with the persisted one.
+        """
+        if self.collection is None:
+            return
+        try:
+            documents = list(self.collection.find({"count": {"$exists": True}}))
+        except Exception as e:
+            logger.error(f"Failed to load the prompt heavy hitters: {e}")
+            return
+        with self.lock:
+            for document in documents:
+                prompt = document["_id"]
+                self.summary.add(prompt, document["count"])
+                self.summary.errors[prompt] = max(self.summary.errors[prompt], document.get("error", 0))
+        logger.info(f"Loaded {len(self.summary.counts)} prompt heavy hitters.")
+
+    def add(self, prompt: str) -> None:
+        """
+        Counts one request of a prompt.
+
+        Args:
+            prompt (str): The prompt.
+        """
+        if len(prompt) > self.max_prompt_chars:
+            return
+        with self.lock:
+            self.summary.add(prompt)
+
+    def top(self, n: int) -> List[Tuple[str, int, int]]:
+        """
+        Returns the n most requested prompts as (prompt, count, possible overcount).
+        """
+        with self.lock:
+            return self.summary.top(n)
+
+    def persist(self) -> bool:
+        """
+        Writes the summary to MongoDB, one document per prompt, since the whole summary can exceed the
+        16 MB document limit. Prompts no longer tracked are deleted afterwards; with several workers, the
+        last one to persist wins.
+
+        Returns:
+            bool: True if the summary was written.
+        """
+        if self.collection is None:
+            return False
+        with self.lock:
+            items = self.summary.top(self.summary.capacity)
+        now = datetime.now(timezone.utc)
+        try:
+            if items:
+                self.collection.bulk_write([
+                    ReplaceOne({"_id": prompt}, {"count": count, "error": error, "updated_at": now}, upsert=True)
+                    for prompt, count, error in items
+                ], ordered=False)
+            self.collection.delete_many({"updated_at": {"$lt": now}})
+            return True
+        except Exception as e:
+            logger.error(f"Failed to persist the prompt heavy hitters: {e}")
+            return False
+
+    def snapshot(self, n: int = 10) -> Dict[str, Any]:
+        """
+        Returns the number of tracked prompts, the counted total and the counts of the top n prompts.
+        The prompt texts are left out, as they can contain user code; `top` returns them.
+        """
+        with self.lock:
+            return {
+                "tracked": len(self.summary.counts),
+                "total": self.summary.total(),
+                "top": [{"count": count, "error": error} for _, count, error in self.summary.top(n)],
+            }
@@ -0,0 +1,203 @@
+from elasticsearch import Elasticsearch, helpers
+from typing import Optional, Any, Dict, List, Sequence, Tuple
+from app.services.embedding_service import Embedder, get_embedder
+from app.utils.logger import get_logger, preview
+from app.constants import (
+    ELASTICSEARCH_INDEX_NAME,
+    HYBRID_SEARCH_SIZE,
+    HYBRID_NUM_CANDIDATES,
+    RRF_RANK_CONSTANT,
+)
+
+# Logger setup
+logger = get_logger("hybrid_search_service")
+
+SOURCE_FIELDS = ["prompt", "response"]
+# Fields of an interaction indexed by bulk writes
+INDEXED_FIELDS = ("prompt", "response", "user_id", "timestamp")
+
+
+def qa_pairs_mappings(dimensions: int) -> Dict[str, Any]:
+    """
+    Returns the mappings of the question-answer index, including the dense vector field.
+
+    Args:
+        dimensions (int): The number of dimensions of the embedding vectors.
+
+    Returns:
+        Dict[str, Any]: The index mappings.
+    """
+    return {
+        "properties": {
+            "prompt": {"type": "text"},
+            "response": {"type": "text"},
+            "timestamp": {"type": "date"},
+            "user_id": {"type": "keyword"},
+            "embedding": {"type": "dense_vector", "dims": dimensions, "index": True, "similarity": "cosine"},
+        }
+    }
+
+
+def reciprocal_rank_fusion(rankings: Sequence[Sequence[str]], k: int = RRF_RANK_CONSTANT) -> List[str]:
+    """
+    Fuses several ranked lists of document ids with reciprocal-rank fusion.
+
+    Args:
+        rankings (Sequence[Sequence[str]]): Ranked document ids, best first, one list per retriever.
+        k (int): The rank constant. Higher values flatten the contribution of top ranks.
+
+    Returns:
+        List[str]: Document ids ordered by fused score, best first.
+    """
+    scores: Dict[str, float] = {}
+    for ranking in rankings:
+        for rank, doc_id in enumerate(ranking, start=1):
+            scores[doc_id] = scores.get(doc_id, 0.0) + 1.0 / (k + rank)
+    return sorted(scores, key=scores.get, reverse=True)
+
+
+class HybridSearchService:
+    """
+    A service combining kNN vector search and BM25 keyword search over the question-answer index.
+    """
+
+    def __init__(self, client: Elasticsearch, embedder: Optional[Embedder] = None, index: str = ELASTICSEARCH_INDEX_NAME):
+        """
+        Initializes the service.
+
+        Args:
+            client (Elasticsearch): The Elasticsearch client.
+            embedder (Optional[Embedder]): The embedder for prompts and queries. Defaults to the configured one.
+            index (str): The name of the question-answer index.
+        """
+        self.client = client
+        self.embedder = embedder or get_embedder()
+        self.index = index
+
+    def ensure_index(self) -> None:
+        """
+        Creates the index with vector mappings, or adds the vector field to an existing index.
+        """
+        mappings = qa_pairs_mappings(self.embedder.dimensions)
+        try:
+            if not self.client.indices.exists(index=self.index):
+                self.client.indices.create(index=self.index, mappings=mappings)
+                logger.info(f"Created index {self.index} with vector mappings.")
+            else:
+                self.client.indices.put_mapping(index=self.index, properties=mappings["properties"])
+        except Exception as e:
+            logger.error(f"Failed to ensure vector mappings on {self.index}: {e}")
+
+    def prepare_document(self, document: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Returns a copy of an interaction document with its prompt embedding attached.
+
+        Args:
+            document (Dict[str, Any]): The interaction document.
+
+        Returns:
+            Dict[str, Any]: The document to index.
+        """
+        prepared = {key: value for key, value in document.items() if key != "_id"}
+        embedding = self.embedder.embed(document.get("prompt") or "")
+        if embedding is not None:
+            prepared["embedding"] = embedding
+        return prepared
+
+    def index_document(self, document: Dict[str, Any], doc_id: Optional[str] = None) -> bool:
+        """
+        Indexes an interaction document together with its embedding.
+
+        Returns:
+            bool: True if the document was indexed successfully, False otherwise.
+        """
+        try:
+            self.client.index(index=self.index, id=doc_id, document=self.prepare_document(document))
+            return True
+        except Exception as e:
+            logger.error(f"Failed to index document in {self.index}: {e}")
+            return False
+
+    def bulk_index(self, documents: List[Dict[str, Any]]) -> Tuple[int, List[Dict[str, Any]]]:
+        """
+        Indexes interaction documents with their embeddings in one bulk request, without refreshing.
+        Documents with a MongoDB `_id` are indexed under it, so writing them again overwrites them, and
+        documents of a user are routed by `user_id`, so all of a user's interactions share a shard.
+
+        Args:
+            documents (List[Dict[str, Any]]): The interaction documents.
+
+        Returns:
+            Tuple[int, List[Dict[str, Any]]]: The number of documents indexed and the errors of those rejected.
+        """
+        actions = []
+        for document in documents:
+            action = {
+                "_index": self.index,
+                "_source": self.prepare_document({field: document[field] for field in INDEXED_FIELDS if field in document}),
+            }
+            if "_id" in document:
+                action["_id"] = str(document["_id"])
+            if document.get("user_id"):
+                action["_routing"] = document["user_id"]
+            actions.append(action)
+        if not actions:
+            return 0, []
+        return helpers.bulk(self.client, actions, chunk_size=len(actions), raise_on_error=False, refresh=False)
+
+    def search(
+        self, query: str, size: int = HYBRID_SEARCH_SIZE, scoped: bool = False, user_id: Optional[str] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Runs the kNN and BM25 queries in one multi-search request and fuses them with RRF.
+
+        Args:
+            query (str): The user's search text.
+            size (int): The maximum number of results to return.
+            scoped (bool): Search only the interactions of `user_id`, on the user's shard, or with
+                `user_id` None only those of no user.
+            user_id (Optional[str]): The user whose interactions a scoped search covers.
+
+        Returns:
+            List[Dict[str, Any]]: The `_source` of the matching documents, limited to prompt and response.
+        """
+        header: Dict[str, Any] = {"index": self.index}
+        keyword_query: Dict[str, Any] = {"multi_match": {"query": query, "fields": ["prompt^2", "response"]}}
+        user_filter = None
+        if scoped:
+            if user_id:
+                header["routing"] = user_id
+                user_filter = {"term": {"user_id": user_id}}
+            else:
+                user_filter = {"bool": {"must_not": {"exists": {"field": "user_id"}}}}
+            keyword_query = {"bool": {"must": keyword_query, "filter": user_filter}}
+        keyword_search = {"size": size, "_source": SOURCE_FIELDS, "query": keyword_query}
+        searches: List[Dict[str, Any]] = [header, keyword_search]
+
+        vector = self.embedder.embed(query)
+        if vector is not None:
+            knn = {
+                "field": "embedding",
+                "query_vector": vector,
+                "k": size,
+                "num_candidates": max(HYBRID_NUM_CANDIDATES, size),
+            }
+            if user_filter is not None:
+                knn["filter"] = user_filter
+            searches += [header, {"size": size, "_source": SOURCE_FIELDS, "knn": knn}]
+
+        response = self.client.msearch(searches=searches)
+        sources: Dict[str, Dict[str, Any]] = {}
+        rankings = []
+        for result in response["responses"]:
+            if "error" in result:
+                logger.error(f"Hybrid search sub-query failed: {preview(result['error'])}")
+                continue
+            hits = result["hits"]["hits"]
+            rankings.append([hit["_id"] for hit in hits])
+            for hit in hits:
+                sources[hit["_id"]] = hit["_source"]
+
+        results = [sources[doc_id] for doc_id in reciprocal_rank_fusion(rankings)[:size]]
+        logger.info(f"Hybrid search for {preview(query)} returned {len(results)} hits.")
+        return results
@@ -0,0 +1,175 @@
+from typing import Optional, Any, Dict, Tuple
+import asyncio
+import hashlib
+import orjson
+from app.utils.logger import get_logger, preview
+from app.constants import (
+    IDEMPOTENCY_TTL_SECONDS,
+    IDEMPOTENCY_PENDING_SECONDS,
+    IDEMPOTENCY_WAIT_SECONDS,
+)
+
+# Logger setup
+logger = get_logger("idempotency_service")
+
+IDEMPOTENCY_PREFIX = "idem:"
+# Interval between Redis polls while waiting for a request in flight on another worker
+POLL_SECONDS = 0.2
+
+PENDING = "p"
+DONE = "d"
+
+
+class IdempotencyConflictError(Exception):
+    """
+    Raised when an idempotency key is reused with a different request payload.
+    """
+
+
+class IdempotencyInProgressError(Exception):
+    """
+    Raised when the original request of a key is still running after the wait limit.
+    """
+
+
+def fingerprint(payload: Dict[str, Any]) -> str:
+    """
+    Returns a compact fingerprint of a request payload, independent of key order.
+    """
+    return hashlib.sha256(orjson.dumps(payload, option=orjson.OPT_SORT_KEYS)).hexdigest()[:32]
+
+
+class IdempotencyService:
+    """
+    Makes retried requests with the same `Idempotency-Key` run once.
+    The first request claims the key with a short-lived pending record in Redis; retries wait for
+    its result (in-process through a future, across workers by polling Redis) or get the stored result.
+    """
+
+    def __init__(
+        self,
+        redis_client: Optional[Any] = None,
+        ttl: int = IDEMPOTENCY_TTL_SECONDS,
+        pending_ttl: int = IDEMPOTENCY_PENDING_SECONDS,
+        wait_seconds: float = IDEMPOTENCY_WAIT_SECONDS,
+    ):
+        """
+        Initializes the IdempotencyService.
+
+        Args:
+            redis_client (Optional[Any]): Redis client storing the records. Without it, only retries
+                arriving while the original request is in flight on this worker are deduplicated.
+            ttl (int): Seconds a completed result is kept.
+            pending_ttl (int): Seconds a claim is kept, so a crashed worker cannot block a key for long.
+            wait_seconds (float): Maximum seconds a retry waits for the original request.
+        """
+        self.redis_client = redis_client
+        self.ttl = ttl
+        self.pending_ttl = pending_ttl
+        self.wait_seconds = wait_seconds
+        # Requests running on this worker: key -> (payload fingerprint, future of the response)
+        self.in_flight: Dict[str, Tuple[str, asyncio.Future]] = {}
+
+    def _load(self, key: str) -> Optional[Dict[str, str]]:
+        if not self.redis_client:
+            return None
+        try:
+            value = self.redis_client.get(IDEMPOTENCY_PREFIX + key)
+            return orjson.loads(value) if value else None
+        except Exception as e:
+            logger.error(f"Failed to read idempotency record '{preview(key)}': {e}")
+            return None
+
+    def _claim(self, key: str, payload_fingerprint: str) -> bool:
+        if not self.redis_client:
+            return key not in self.in_flight
+        try:
+            record = orjson.dumps({"s": PENDING, "f": payload_fingerprint})
+            return bool(self.redis_client.set(IDEMPOTENCY_PREFIX + key, record, nx=True, ex=self.pending_ttl))
+        except Exception as e:
+            # Without Redis the request still runs, just without protection across workers
+            logger.error(f"Failed to claim idempotency key '{preview(key)}': {e}")
+            return key not in self.in_flight
+
+    async def begin(self, key: str, payload_fingerprint: str) -> Optional[str]:
+        """
+        Claims an idempotency key, or returns the result of the request that already claimed it.
+
+        Args:
+            key (str): The client's idempotency key.
+            payload_fingerprint (str): The fingerprint of the request payload.
+
+        Returns:
+            Optional[str]: The stored response of the original request, or None if the caller
+                claimed the key and must run the request, then call `complete` or `abandon`.
+
+        Raises:
+            IdempotencyConflictError: If the key was used with a different payload.
+            IdempotencyInProgressError: If the original request did not finish within the wait limit.
+        """
+        deadline = asyncio.get_running_loop().time() + self.wait_seconds
+        while True:
+            if self._claim(key, payload_fingerprint):
+                self.in_flight[key] = (payload_fingerprint, asyncio.get_running_loop().create_future())
+                return None
+
+            record = self._load(key)
+            if record and record["f"] != payload_fingerprint:
+                raise IdempotencyConflictError(f"Idempotency key '{key}' was already used with a different request.")
+            if record and record["s"] == DONE:
+                logger.info(f"Idempotency key '{preview(key)}' replayed from the stored result.")
+                return record["r"]
+
+            remaining = deadline - asyncio.get_running_loop().time()
+            if remaining <= 0:
+                raise IdempotencyInProgressError(f"A request with idempotency key '{key}' is still in progress.")
+
+            if key in self.in_flight:
+                running_fingerprint, future = self.in_flight[key]
+                if running_fingerprint != payload_fingerprint:
+                    raise IdempotencyConflictError(f"Idempotency key '{key}' was already used with a different request.")
+                try:
+                    response = await asyncio.wait_for(asyncio.shield(future), remaining)
+                except asyncio.TimeoutError:
+                    continue
+                if response is not None:
+                    logger.info(f"Idempotency key '{preview(key)}' attached to the request in flight.")
+                    return response
+                # The original request failed and released the key: try to claim it
+            else:
+                await asyncio.sleep(min(POLL_SECONDS, remaining))
+
+    def complete(self, key: str, payload_fingerprint: str, response: str) -> None:
+        """
+        Stores the result of a claimed key and hands it to retries waiting on this worker.
+
+        Args:
+            key (str): The idempotency key.
+            payload_fingerprint (str): The fingerprint of the request payload.
+            response (str): The response to replay.
+        """
+        if self.redis_client:
+            try:
+                record = orjson.dumps({"s": DONE, "f": payload_fingerprint, "r": response})
+                self.redis_client.set(IDEMPOTENCY_PREFIX + key, record, ex=self.ttl)
+            except Exception as e:
+                logger.error(f"Failed to store idempotency record '{preview(key)}': {e}")
+        _, future = self.in_flight.pop(key, (None, None))
+        if future is not None and not future.done():
+            future.set_result(response)
+
+    def abandon(self, key: str) -> None:
+        """
+        Releases a claimed key after the request failed, so a retry can run it again.
+
+        Args:
+            key (str): The idempotency key.
+        """
+        if self.redis_client:
+            try:
+                self.redis_client.delete(IDEMPOTENCY_PREFIX + key)
+            except Exception as e:
+                logger.error(f"Failed to release idempotency key '{preview(key)}': {e}")
+        _, future = self.in_flight.pop(key, (None, None))
+        if future is not None and not future.done():
+            future.set_result(None)
@@ -0,0 +1,261 @@
+from datetime import datetime, timedelta, timezone
+from typing import Any, Callable, Dict, Iterator, List, Optional
+import glob
+import gzip
+import os
+import socket
+import orjson
+from bson import ObjectId
+from pymongo.errors import DuplicateKeyError
+from app.services.response_store import ResponseStore
+from app.utils.logger import get_logger
+from app.constants import (
+    INTERACTION_RETENTION_DAYS,
+    INTERACTION_ARCHIVE_DIR,
+    INTERACTION_ARCHIVE_BATCH_SIZE,
+    INTERACTION_ARCHIVE_LEASE_SECONDS,
+)
+
+# Logger setup
+logger = get_logger("interaction_archive")
+
+LOCKS_COLLECTION_NAME = "locks"
+ARCHIVE_LOCK_ID = "interaction_archive"
+# Fields of an interaction kept in the archive
+ARCHIVED_FIELDS = ("prompt", "response", "cache_key", "usage", "user_id")
+
+
+def month_of(moment: datetime) -> str:
+    return moment.strftime("%Y-%m")
+
+
+def months_between(since: datetime, until: datetime) -> List[str]:
+    """
+    Returns the months ("YYYY-MM") overlapping [since, until].
+    """
+    months = []
+    year, month = since.year, since.month
+    while since < until and (year, month) <= (until.year, until.month):
+        months.append(f"{year:04d}-{month:02d}")
+        year, month = (year + 1, 1) if month == 12 else (year, month + 1)
+    return months
+
+
+def interaction_row(document: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Returns the archived form of an interaction: its id and creation time from the ObjectId, and its fields.
+    """
+    row = {"id": str(document["_id"]), "ts": document["_id"].generation_time.timestamp()}
+    row.update({field: document[field] for field in ARCHIVED_FIELDS if field in document})
+    return row
+
+
+def as_utc(moment: datetime) -> datetime:
+    return moment.replace(tzinfo=timezone.utc) if moment.tzinfo is None else moment.astimezone(timezone.utc)
+
+
+def id_range(since: Optional[datetime], until: Optional[datetime]) -> Dict[str, Any]:
+    """
+    Returns the filter of the interactions created in [since, until), using the creation time in their ObjectId.
+    """
+    bounds = {}
+    if since:
+        bounds["$gte"] = ObjectId.from_datetime(as_utc(since))
+    if until:
+        bounds["$lt"] = ObjectId.from_datetime(as_utc(until))
+    return {"_id": bounds} if bounds else {}
+
+
+class InteractionArchive:
+    """
+    Bounds the interactions collection, and with it its indexes and working set, to the last
+    `retention_days` of interactions. Older interactions are moved to gzip-compressed JSONL files,
+    one per month (`interactions-YYYY-MM.jsonl.gz`), with their responses resolved so the files are
+    self-contained.
+
+    Interactions are ordered by the creation time in their ObjectId, so no extra index is needed.
+    A batch is deleted from MongoDB only after it is flushed to disk; a crash in between leaves the
+    batch in both places, and readers drop the duplicates by id. The batch's references to stored
+    responses are then released, deleting the responses only archived interactions used. Only one worker archives at a time,
+    holding a lease in the `locks` collection. The archive directory should be shared by all hosts.
+    """
+
+    def __init__(
+        self,
+        collection: Any,
+        response_store: Optional[ResponseStore] = None,
+        directory: str = INTERACTION_ARCHIVE_DIR,
+        retention_days: int = INTERACTION_RETENTION_DAYS,
+        batch_size: int = INTERACTION_ARCHIVE_BATCH_SIZE,
+        lease_seconds: float = INTERACTION_ARCHIVE_LEASE_SECONDS,
+        now: Callable[[], datetime] = lambda: datetime.now(timezone.utc),
+    ):
+        """
+        Initializes the archive.
+
+        Args:
+            collection (Any): The MongoDB interactions collection.
+            response_store (Optional[ResponseStore]): Resolves responses stored by reference.
+            directory (str): Directory of the archive files.
+            retention_days (int): Age in days from which interactions are archived; 0 disables archiving.
+            batch_size (int): Interactions moved per batch.
+            lease_seconds (float): Duration of the lease a worker holds while archiving.
+            now (Callable[[], datetime]): Current time source, replaceable in tests.
+        """
+        self.collection = collection
+        self.locks = collection.database[LOCKS_COLLECTION_NAME]
+        self.response_store = response_store
+        self.directory = directory
+        self.retention_days = retention_days
+        self.batch_size = batch_size
+        self.lease_seconds = lease_seconds
+        self.now = now
+        self.holder = f"{socket.gethostname()}:{os.getpid()}"
+        self.last_run: Dict[str, Any] = {}
+
+    @property
+    def enabled(self) -> bool:
+        return self.retention_days > 0
+
+    def cutoff(self) -> Optional[datetime]:
+        """
+        Returns the creation time before which interactions are archived, or None if archiving is disabled.
+        """
+        return self.now() - timedelta(days=self.retention_days) if self.enabled else None
+
+    def path(self, month: str) -> str:
+        return os.path.join(self.directory, f"interactions-{month}.jsonl.gz")
+
+    def _acquire(self) -> bool:
+        """
+        Takes or renews the archiving lease. Returns False while another worker holds it.
+        """
+        now = self.now()
+        try:
+            self.locks.update_one(
+                {"_id": ARCHIVE_LOCK_ID, "$or": [{"expires_at": {"$lt": now}}, {"holder": self.holder}]},
+                {"$set": {"holder": self.holder, "expires_at": now + timedelta(seconds=self.lease_seconds)}},
+                upsert=True,
+            )
+            return True
+        except DuplicateKeyError:
+            return False
+
+    def _release(self) -> None:
+        self.locks.delete_one({"_id": ARCHIVE_LOCK_ID, "holder": self.holder})
+
+    def _append(self, month: str, documents: List[Dict[str, Any]]) -> None:
+        """
+        Appends documents to a month's file as a new gzip member and flushes it to disk.
+        """
+        os.makedirs(self.directory, exist_ok=True)
+        with open(self.path(month), "ab") as raw:
+            with gzip.GzipFile(fileobj=raw, mode="ab") as archive:
+                for document in documents:
+                    archive.write(orjson.dumps(document))
+                    archive.write(b"\n")
+            raw.flush()
+            os.fsync(raw.fileno())
+
+    def archive(self) -> Dict[str, Any]:
+        """
+        Moves the interactions older than the retention period to the archive files.
+
+        Returns:
+            Dict[str, Any]: The number of interactions archived, the responses deleted and the months written, or why nothing ran.
+        """
+        if not self.enabled:
+            return {"state": "disabled"}
+        if not self._acquire():
+            return {"state": "locked"}
+        report: Dict[str, Any] = {"state": "done", "archived": 0, "responses_deleted": 0, "months": []}
+        started = self.now()
+        try:
+            query = id_range(None, self.cutoff())
+            while True:
+                batch = list(self.collection.find(query).sort("_id", 1).limit(self.batch_size))
+                if not batch:
+                    break
+                if self.response_store:
+                    batch = self.response_store.resolve(batch)
+                by_month: Dict[str, List[Dict[str, Any]]] = {}
+                for document in batch:
+                    by_month.setdefault(month_of(document["_id"].generation_time), []).append(interaction_row(document))
+                for month, rows in by_month.items():
+                    self._append(month, rows)
+                    if month not in report["months"]:
+                        report["months"].append(month)
+                self.collection.delete_many({"_id": {"$in": [document["_id"] for document in batch]}})
+                report["archived"] += len(batch)
+                if self.response_store:
+                    report["responses_deleted"] += self.response_store.release(batch)
+                if not self._acquire():
+                    report["state"] = "lease lost"
+                    break
+            if report["archived"]:
+                logger.info(f"Archived {report['archived']} interactions into {', '.join(report['months'])}.")
+        except Exception as e:
+            logger.error(f"Archiving interactions failed after {report['archived']}: {e}")
+            report.update(state="failed", error=str(e))
+        finally:
+            self._release()
+        report["elapsed_seconds"] = round((self.now() - started).total_seconds(), 2)
+        self.last_run = report
+        return report
+
+    def needed(self, since: Optional[datetime]) -> bool:
+        """
+        Returns whether a history range starting at `since` reaches into the archive.
+        """
+        return self.enabled and since is not None and as_utc(since) < self.cutoff()
+
+    def months(self) -> List[str]:
+        """
+        Returns the months ("YYYY-MM") that have an archive file, oldest first.
+        """
+        pattern = os.path.join(self.directory, "interactions-*.jsonl.gz")
+        return sorted(os.path.basename(path)[len("interactions-"):-len(".jsonl.gz")] for path in glob.glob(pattern))
+
+    def read(self, since: Optional[datetime] = None, until: Optional[datetime] = None) -> Iterator[Dict[str, Any]]:
+        """
+        Yields the archived interactions created in [since, until), oldest month first, reading only
+        the files of the months the range overlaps.
+
+        Args:
+            since (Optional[datetime]): Start of the range; defaults to the oldest archived month.
+            until (Optional[datetime]): End of the range; defaults to the retention cutoff.
+
+        Returns:
+            Iterator[Dict[str, Any]]: The archived interactions.
+        """
+        months = self.months()
+        if not months:
+            return
+        since = as_utc(since) if since else datetime.strptime(months[0], "%Y-%m").replace(tzinfo=timezone.utc)
+        until = as_utc(until) if until else (self.cutoff() or self.now())
+        wanted = set(months_between(since, until))
+        for month in months:
+            if month not in wanted:
+                continue
+            path = self.path(month)
+            # A batch archived twice lands in the same month's file
+            seen = set()
+            with gzip.open(path, "rb") as archive:
+                for line in archive:
+                    row = orjson.loads(line)
+                    if row["id"] in seen or not since.timestamp() <= row["ts"] < until.timestamp():
+                        continue
+                    seen.add(row["id"])
+                    yield row
+
+    def snapshot(self) -> Dict[str, Any]:
+        """
+        Returns the retention configuration, the archive files' total size and the last run's report.
+        """
+        files = glob.glob(os.path.join(self.directory, "interactions-*.jsonl.gz"))
+        return {
+            "retention_days": self.retention_days,
+            "files": len(files),
+            "bytes": sum(os.path.getsize(path) for path in files),
+            "last_run": self.last_run,
+        }
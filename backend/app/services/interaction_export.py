@@ -0,0 +1,325 @@
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterable, Iterator, List, Optional
+import glob
+import gzip
+import itertools
+import os
+import zlib
+import orjson
+from bson import ObjectId
+from app.services.interaction_archive import InteractionArchive, as_utc, id_range, interaction_row
+from app.services.response_store import ResponseStore
+from app.utils.logger import get_logger
+from app.constants import EXPORT_BATCH_SIZE, EXPORT_ROW_GROUP_SIZE, EXPORT_CHECKPOINT_ROWS
+
+# Logger setup
+logger = get_logger("interaction_export")
+
+FORMATS = ("jsonl", "parquet")
+# Compressed bytes buffered before a chunk of a streamed JSONL export is emitted
+STREAM_CHUNK_BYTES = 64 * 1024
+
+
+class ExportError(Exception):
+    """
+    Raised when an export cannot be started, e.g. for an unavailable format or a mismatched checkpoint.
+    """
+
+
+def parquet_modules():
+    """
+    Returns pyarrow and pyarrow.parquet, which Parquet exports need.
+
+    Raises:
+        ExportError: If pyarrow is not installed.
+    """
+    try:
+        import pyarrow
+        import pyarrow.parquet
+    except ImportError:
+        raise ExportError("Parquet export needs pyarrow; install it or export JSONL.")
+    return pyarrow, pyarrow.parquet
+
+
+class _Sink:
+    """
+    Write-only file object collecting the bytes a writer produces, drained between writes.
+    """
+
+    def __init__(self):
+        self.chunks: List[bytes] = []
+        self.closed = False
+        self.position = 0
+
+    def write(self, data) -> int:
+        self.chunks.append(bytes(data))
+        self.position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self.position
+
+    def flush(self) -> None:
+        pass
+
+    def close(self) -> None:
+        self.closed = True
+
+    def drain(self) -> bytes:
+        data = b"".join(self.chunks)
+        self.chunks = []
+        return data
+
+
+class InteractionExporter:
+    """
+    Exports interactions, oldest first, with memory use independent of the collection size: rows are
+    read from the archive files and a MongoDB cursor fetching `batch_size` documents per round trip,
+    responses are resolved a page at a time, and the output is compressed as it is produced.
+
+    Every row carries the interaction's id, so an interrupted export resumes after the last row it got.
+    """
+
+    def __init__(
+        self,
+        collection: Any,
+        response_store: Optional[ResponseStore] = None,
+        archive: Optional[InteractionArchive] = None,
+        batch_size: int = EXPORT_BATCH_SIZE,
+        row_group_size: int = EXPORT_ROW_GROUP_SIZE,
+    ):
+        """
+        Initializes the exporter.
+
+        Args:
+            collection (Any): The MongoDB interactions collection.
+            response_store (Optional[ResponseStore]): Resolves responses stored by reference.
+            archive (Optional[InteractionArchive]): Archive of the interactions past the retention period.
+            batch_size (int): Documents fetched per cursor round trip.
+            row_group_size (int): Rows per Parquet row group.
+        """
+        self.collection = collection
+        self.response_store = response_store
+        self.archive = archive
+        self.batch_size = batch_size
+        self.row_group_size = row_group_size
+
+    def rows(
+        self,
+        since: Optional[datetime] = None,
+        until: Optional[datetime] = None,
+        after: Optional[str] = None,
+    ) -> Iterator[Dict[str, Any]]:
+        """
+        Yields the interactions created in [since, until), archived ones first, skipping those up to id `after`.
+
+        Args:
+            since (Optional[datetime]): Start of the range.
+            until (Optional[datetime]): End of the range.
+            after (Optional[str]): Id of the last row already exported.
+
+        Returns:
+            Iterator[Dict[str, Any]]: Rows with `id`, `ts` and the interaction's fields.
+
+        Raises:
+            ExportError: If `after` is not an interaction id.
+        """
+        if after and not ObjectId.is_valid(after):
+            raise ExportError(f"Invalid checkpoint id '{after}'.")
+        return self._rows(since, until, after)
+
+    def _rows(self, since: Optional[datetime], until: Optional[datetime], after: Optional[str]) -> Iterator[Dict[str, Any]]:
+        if self.archive and self.archive.months() and (since is None or self.archive.needed(since)):
+            for row in self.archive.read(since, until):
+                if not after or row["id"] > after:
+                    yield row
+
+        query = id_range(since, until)
+        if after:
+            query.setdefault("_id", {})["$gt"] = ObjectId(after)
+        cursor = self.collection.find(query).sort("_id", 1).batch_size(self.batch_size)
+        documents = self.response_store.resolve_all(cursor) if self.response_store else cursor
+        for document in documents:
+            yield interaction_row(document)
+
+    def jsonl_gzip(self, rows: Iterable[Dict[str, Any]]) -> Iterator[bytes]:
+        """
+        Encodes rows as one gzip-compressed JSONL stream, yielding compressed chunks as they fill up.
+        """
+        compressor = zlib.compressobj(6, zlib.DEFLATED, 31)
+        pending: List[bytes] = []
+        size = 0
+        for row in rows:
+            chunk = compressor.compress(orjson.dumps(row, option=orjson.OPT_APPEND_NEWLINE))
+            if chunk:
+                pending.append(chunk)
+                size += len(chunk)
+            if size >= STREAM_CHUNK_BYTES:
+                yield b"".join(pending)
+                pending, size = [], 0
+        pending.append(compressor.flush())
+        yield b"".join(pending)
+
+    def parquet(self, rows: Iterable[Dict[str, Any]]) -> Iterator[bytes]:
+        """
+        Encodes rows as a Parquet file written in row groups of `row_group_size`, yielding each row group's bytes.
+
+        Raises:
+            ExportError: If pyarrow is not installed.
+        """
+        pyarrow, parquet = parquet_modules()
+        schema = pyarrow.schema([
+            ("id", pyarrow.string()),
+            ("ts", pyarrow.timestamp("ms", tz="UTC")),
+            ("prompt", pyarrow.string()),
+            ("response", pyarrow.string()),
+            ("cache_key", pyarrow.string()),
+            ("usage", pyarrow.string()),
+            ("user_id", pyarrow.string()),
+        ])
+        sink = _Sink()
+        with parquet.ParquetWriter(sink, schema, compression="zstd") as writer:
+            rows = iter(rows)
+            while True:
+                group = list(itertools.islice(rows, self.row_group_size))
+                if not group:
+                    break
+                writer.write_table(pyarrow.Table.from_pylist([
+                    {
+                        "id": row["id"],
+                        "ts": datetime.fromtimestamp(row["ts"], timezone.utc),
+                        "prompt": row.get("prompt"),
+                        "response": row.get("response"),
+                        "cache_key": row.get("cache_key"),
+                        "usage": orjson.dumps(row["usage"]).decode() if row.get("usage") is not None else None,
+                        "user_id": row.get("user_id"),
+                    }
+                    for row in group
+                ], schema=schema))
+                yield sink.drain()
+        yield sink.drain()
+
+    def encode(self, rows: Iterable[Dict[str, Any]], format: str) -> Iterator[bytes]:
+        """
+        Encodes rows in an export format.
+
+        Raises:
+            ExportError: If the format is unknown or unavailable.
+        """
+        if format == "jsonl":
+            return self.jsonl_gzip(rows)
+        if format == "parquet":
+            parquet_modules()
+            return self.parquet(rows)
+        raise ExportError(f"Unknown export format '{format}', expected one of {', '.join(FORMATS)}.")
+
+    def export_to_file(
+        self,
+        path: str,
+        format: str = "jsonl",
+        since: Optional[datetime] = None,
+        until: Optional[datetime] = None,
+        resume: bool = False,
+        checkpoint_rows: int = EXPORT_CHECKPOINT_ROWS,
+    ) -> Dict[str, Any]:
+        """
+        Exports interactions to a file, checkpointing every `checkpoint_rows` rows so an interrupted
+        export can resume where it stopped.
+
+        A JSONL export is one `.jsonl.gz` file made of one gzip member per checkpoint; resuming truncates
+        whatever was written after the last checkpoint. A Parquet export is a directory of part files, one
+        per checkpoint. The checkpoint is kept next to the output in `<path>.checkpoint`.
+
+        Args:
+            path (str): The output file (JSONL) or directory (Parquet).
+            format (str): "jsonl" or "parquet".
+            since (Optional[datetime]): Start of the range.
+            until (Optional[datetime]): End of the range.
+            resume (bool): Continue from the checkpoint instead of starting over.
+            checkpoint_rows (int): Rows between checkpoints.
+
+        Returns:
+            Dict[str, Any]: The final checkpoint: rows exported, last id and whether the export is complete.
+
+        Raises:
+            ExportError: If the format is unavailable or the checkpoint belongs to another export.
+        """
+        if format not in FORMATS:
+            raise ExportError(f"Unknown export format '{format}', expected one of {', '.join(FORMATS)}.")
+        if format == "parquet":
+            parquet_modules()
+        checkpoint_path = f"{path}.checkpoint"
+        settings = {
+            "format": format,
+            "since": as_utc(since).isoformat() if since else None,
+            "until": as_utc(until).isoformat() if until else None,
+        }
+        checkpoint = {**settings, "after": None, "rows": 0, "offset": 0, "parts": 0, "done": False}
+        if resume and os.path.exists(checkpoint_path):
+            with open(checkpoint_path, "rb") as file:
+                saved = orjson.loads(file.read())
+            if {key: saved.get(key) for key in settings} != settings:
+                raise ExportError(f"The checkpoint at {checkpoint_path} belongs to an export with other settings.")
+            checkpoint = saved
+            if checkpoint["done"]:
+                return checkpoint
+            logger.info(f"Resuming the export after {checkpoint['rows']} rows.")
+        self._discard_uncheckpointed(path, format, checkpoint)
+
+        rows = self.rows(since, until, checkpoint["after"])
+        while True:
+            batch = list(itertools.islice(rows, checkpoint_rows))
+            if not batch:
+                break
+            if format == "jsonl":
+                with open(path, "ab") as file:
+                    file.write(gzip.compress(b"".join(orjson.dumps(row, option=orjson.OPT_APPEND_NEWLINE) for row in batch)))
+                    file.flush()
+                    os.fsync(file.fileno())
+                    checkpoint["offset"] = file.tell()
+            else:
+                os.makedirs(path, exist_ok=True)
+                part = os.path.join(path, f"part-{checkpoint['parts']:05d}.parquet")
+                with open(part, "wb") as file:
+                    for chunk in self.parquet(batch):
+                        file.write(chunk)
+                    file.flush()
+                    os.fsync(file.fileno())
+                checkpoint["parts"] += 1
+            checkpoint["rows"] += len(batch)
+            checkpoint["after"] = batch[-1]["id"]
+            self._save(checkpoint_path, checkpoint)
+            logger.info(f"Exported {checkpoint['rows']} interactions to {path}.")
+        if format == "jsonl" and not checkpoint["rows"]:
+            # An empty export is still a valid (empty) gzip file
+            with open(path, "wb") as file:
+                file.write(gzip.compress(b""))
+        checkpoint["done"] = True
+        self._save(checkpoint_path, checkpoint)
+        return checkpoint
+
+    @staticmethod
+    def _discard_uncheckpointed(path: str, format: str, checkpoint: Dict[str, Any]) -> None:
+        """
+        Removes the output written after the checkpoint (all of it for a fresh export).
+        """
+        if format == "jsonl":
+            if os.path.exists(path):
+                with open(path, "r+b") as file:
+                    file.truncate(checkpoint["offset"])
+            return
+        for part in glob.glob(os.path.join(path, "part-*.parquet")):
+            if int(os.path.basename(part)[len("part-"):-len(".parquet")]) >= checkpoint["parts"]:
+                os.remove(part)
+
+    @staticmethod
+    def _save(path: str, checkpoint: Dict[str, Any]) -> None:
+        """
+        Writes a checkpoint atomically.
+        """
+        temporary = f"{path}.tmp"
+        with open(temporary, "wb") as file:
+            file.write(orjson.dumps(checkpoint))
+            file.flush()
+            os.fsync(file.fileno())
+        os.replace(temporary, path)
@@ -0,0 +1,320 @@
+from collections import deque
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Optional, Callable, Deque, Dict, Iterator, List, Tuple
+import asyncio
+import heapq
+import itertools
+import threading
+import time
+from app.utils.logger import get_logger
+from app.constants import (
+    LLM_MAX_CONCURRENCY,
+    LLM_INTERACTIVE_RESERVED,
+    LLM_STARVATION_SECONDS,
+)
+
+# Logger setup
+logger = get_logger("llm_scheduler")
+
+INTERACTIVE = "interactive"
+BULK = "bulk"
+PRIORITIES = (INTERACTIVE, BULK)
+
+# Number of recent waits per class the percentiles are computed over
+WAIT_SAMPLES = 1000
+# Interval at which a cancellable queued call checks whether it was cancelled
+CANCEL_POLL_SECONDS = 0.1
+
+
+class CallCancelledError(Exception):
+    """
+    Raised when the caller cancels an LLM call, while it is queued or while its response streams.
+    """
+
+
+def parse_priority(value: Optional[str], default: str) -> str:
+    """
+    Returns the priority class named by a header or request field, or `default` if it names none.
+    """
+    value = (value or "").strip().lower()
+    return value if value in PRIORITIES else default
+
+
+@dataclass(order=True)
+class Ticket:
+    """
+    A queued request for one LLM call. Tickets of a class are served in order of their finish tag.
+    """
+    finish: float
+    sequence: int
+    priority: str = field(compare=False)
+    user: str = field(compare=False)
+    enqueued_at: float = field(compare=False)
+    granted: bool = field(default=False, compare=False)
+    wait_seconds: float = field(default=0.0, compare=False)
+    # Called, with the scheduler's condition held, once the ticket is granted
+    wake: Optional[Callable[[], None]] = field(default=None, compare=False, repr=False)
+
+
+class WaitStats:
+    """
+    Queue wait statistics of one priority class.
+    """
+
+    def __init__(self):
+        self.dispatched = 0
+        self.total_seconds = 0.0
+        self.max_seconds = 0.0
+        self.recent: Deque[float] = deque(maxlen=WAIT_SAMPLES)
+
+    def record(self, seconds: float) -> None:
+        self.dispatched += 1
+        self.total_seconds += seconds
+        self.max_seconds = max(self.max_seconds, seconds)
+        self.recent.append(seconds)
+
+    def snapshot(self) -> Dict[str, float]:
+        recent = sorted(self.recent)
+
+        def percentile(fraction: float) -> float:
+            return recent[min(len(recent) - 1, int(fraction * len(recent)))] * 1000 if recent else 0.0
+
+        return {
+            "dispatched": self.dispatched,
+            "mean_wait_ms": self.total_seconds / self.dispatched * 1000 if self.dispatched else 0.0,
+            "p50_wait_ms": percentile(0.5),
+            "p95_wait_ms": percentile(0.95),
+            "max_wait_ms": self.max_seconds * 1000,
+        }
+
+
+class LLMScheduler:
+    """
+    Admits LLM calls to the provider in priority order.
+
+    - Interactive calls always go before bulk calls, and `interactive_reserved` slots are kept free
+      of bulk work so an interactive call never waits for a batch to drain.
+    - Within a class, users share capacity by self-clocked weighted fair queuing: each call gets a
+      finish tag of max(class clock, the user's previous tag) + cost / weight, so a user queueing hundreds of
+      calls cannot push back the single call of another user.
+    - A bulk call waiting longer than `starvation_seconds` is admitted ahead of interactive calls.
+    """
+    _instance: Optional["LLMScheduler"] = None
+
+    def __new__(cls, *args, **kwargs):
+        """
+        Singleton implementation so every caller shares the provider's concurrency.
+        """
+        if cls._instance is None:
+            cls._instance = super(LLMScheduler, cls).__new__(cls)
+        return cls._instance
+
+    def __init__(
+        self,
+        max_concurrency: int = LLM_MAX_CONCURRENCY,
+        interactive_reserved: int = LLM_INTERACTIVE_RESERVED,
+        starvation_seconds: float = LLM_STARVATION_SECONDS,
+    ):
+        """
+        Initializes the scheduler.
+
+        Args:
+            max_concurrency (int): Maximum number of LLM calls in flight.
+            interactive_reserved (int): Slots bulk calls may not use.
+            starvation_seconds (float): Wait after which a bulk call is admitted ahead of interactive ones.
+        """
+        if not hasattr(self, "condition"):  # Ensure initialization happens only once
+            self.max_concurrency = max_concurrency
+            self.interactive_reserved = min(interactive_reserved, max_concurrency - 1)
+            self.starvation_seconds = starvation_seconds
+            self.condition = threading.Condition()
+            self.queues: Dict[str, List[Ticket]] = {priority: [] for priority in PRIORITIES}
+            self.running: Dict[str, int] = {priority: 0 for priority in PRIORITIES}
+            self.clock: Dict[str, float] = {priority: 0.0 for priority in PRIORITIES}
+            self.last_finish: Dict[Tuple[str, str], float] = {}
+            self.waits: Dict[str, WaitStats] = {priority: WaitStats() for priority in PRIORITIES}
+            self.sequence = itertools.count()
+
+    def _next_ticket(self, now: float) -> Optional[Ticket]:
+        """
+        Removes and returns the next ticket to admit, or None if none can be admitted.
+        Must be called with the condition held.
+        """
+        if sum(self.running.values()) >= self.max_concurrency:
+            return None
+        interactive, bulk = self.queues[INTERACTIVE], self.queues[BULK]
+        if bulk and self.running[BULK] < self.max_concurrency - self.interactive_reserved:
+            if not interactive:
+                return heapq.heappop(bulk)
+            oldest = min(bulk, key=lambda ticket: ticket.enqueued_at)
+            if now - oldest.enqueued_at >= self.starvation_seconds:
+                bulk.remove(oldest)
+                heapq.heapify(bulk)
+                return oldest
+        return heapq.heappop(interactive) if interactive else None
+
+    def _dispatch(self) -> None:
+        """
+        Admits queued tickets while there is capacity. Must be called with the condition held.
+        """
+        now = time.monotonic()
+        admitted = False
+        while (ticket := self._next_ticket(now)) is not None:
+            ticket.granted = True
+            ticket.wait_seconds = now - ticket.enqueued_at
+            self.running[ticket.priority] += 1
+            self.clock[ticket.priority] = max(self.clock[ticket.priority], ticket.finish)
+            self.waits[ticket.priority].record(ticket.wait_seconds)
+            if ticket.wake:
+                ticket.wake()
+            admitted = True
+        if admitted:
+            self.condition.notify_all()
+
+    def _enqueue(self, priority: str, user: str, cost: float, weight: float, wake: Optional[Callable[[], None]] = None) -> Ticket:
+        """
+        Queues a ticket with its fair-queuing finish tag and admits what can run. Must be called with the condition held.
+        """
+        key = (priority, user)
+        finish = max(self.clock[priority], self.last_finish.get(key, 0.0)) + max(cost, 1.0) / weight
+        self.last_finish[key] = finish
+        ticket = Ticket(finish, next(self.sequence), priority, user, time.monotonic(), wake=wake)
+        heapq.heappush(self.queues[priority], ticket)
+        self._dispatch()
+        return ticket
+
+    def _withdraw(self, ticket: Ticket) -> None:
+        """
+        Removes a ticket that was not granted from its queue. Must be called with the condition held.
+        """
+        self.queues[ticket.priority].remove(ticket)
+        heapq.heapify(self.queues[ticket.priority])
+
+    def _admitted(self) -> None:
+        """
+        Must be called with the condition held once a ticket was granted.
+        """
+        if not any(self.queues.values()):
+            # Everyone is served: forget per-user tags so the map does not grow without bound
+            self.last_finish.clear()
+
+    def release(self, ticket: Ticket) -> None:
+        """
+        Frees the slot of a ticket granted by `acquire`.
+        """
+        with self.condition:
+            self.running[ticket.priority] -= 1
+            self._dispatch()
+
+    async def acquire(self, priority: str = INTERACTIVE, user: str = "", cost: float = 1.0, weight: float = 1.0) -> Ticket:
+        """
+        Waits on the event loop until the call may run. Unlike `slot`, a queued call holds no thread, so
+        calls queued behind the bulk backlog never fill the executor the admitted calls run on.
+        Cancelling the waiting task gives up the call's place in the queue.
+
+        Args:
+            priority (str): The priority class, `interactive` or `bulk`.
+            user (str): The user the call is made for; users of a class share capacity fairly.
+            cost (float): The size of the call, e.g. its prompt tokens.
+            weight (float): The user's share relative to other users of the class.
+
+        Returns:
+            Ticket: The granted ticket, with the seconds it waited; its slot must be freed with `release`.
+        """
+        priority = parse_priority(priority, INTERACTIVE)
+        loop = asyncio.get_running_loop()
+        granted = loop.create_future()
+
+        def wake() -> None:
+            try:
+                loop.call_soon_threadsafe(lambda: granted.done() or granted.set_result(None))
+            except RuntimeError:
+                # The loop is closed; the ticket is released by the waiter's cleanup, if ever
+                pass
+
+        with self.condition:
+            ticket = self._enqueue(priority, user, cost, weight, wake)
+        try:
+            while not granted.done():
+                try:
+                    await asyncio.wait_for(asyncio.shield(granted), timeout=self.starvation_seconds)
+                except asyncio.TimeoutError:
+                    # Admit aged bulk tickets without waiting for a release, as `slot` does
+                    with self.condition:
+                        self._dispatch()
+        except BaseException:
+            with self.condition:
+                if ticket.granted:
+                    self.running[priority] -= 1
+                    self._dispatch()
+                else:
+                    self._withdraw(ticket)
+            raise
+        with self.condition:
+            self._admitted()
+        return ticket
+
+    @contextmanager
+    def slot(
+        self,
+        priority: str = INTERACTIVE,
+        user: str = "",
+        cost: float = 1.0,
+        weight: float = 1.0,
+        cancelled: Optional[threading.Event] = None,
+    ) -> Iterator[float]:
+        """
+        Blocks until the call may run, and holds its slot for the duration of the block. The calling thread
+        waits while the call is queued; code on an event loop awaits `acquire` instead.
+
+        Args:
+            priority (str): The priority class, `interactive` or `bulk`.
+            user (str): The user the call is made for; users of a class share capacity fairly.
+            cost (float): The size of the call, e.g. its prompt tokens.
+            weight (float): The user's share relative to other users of the class.
+            cancelled (Optional[threading.Event]): Set by the caller to give up its place in the queue.
+
+        Yields:
+            float: The seconds the call waited in the queue.
+
+        Raises:
+            CallCancelledError: If `cancelled` is set before the call is admitted.
+        """
+        priority = parse_priority(priority, INTERACTIVE)
+        with self.condition:
+            ticket = self._enqueue(priority, user, cost, weight)
+            while not ticket.granted:
+                if cancelled is not None and cancelled.is_set():
+                    self._withdraw(ticket)
+                    raise CallCancelledError("The LLM call was cancelled while queued.")
+                # Wake up periodically so aged bulk tickets get admitted without a release
+                self.condition.wait(timeout=CANCEL_POLL_SECONDS if cancelled is not None else self.starvation_seconds)
+                self._dispatch()
+            self._admitted()
+        try:
+            yield ticket.wait_seconds
+        finally:
+            self.release(ticket)
+
+    def snapshot(self) -> Dict[str, Dict[str, float]]:
+        """
+        Returns the queue length, calls in flight and wait statistics of every class.
+        """
+        with self.condition:
+            return {
+                priority: {
+                    "queued": len(self.queues[priority]),
+                    "running": self.running[priority],
+                    **self.waits[priority].snapshot(),
+                }
+                for priority in PRIORITIES
+            }
+
+
+# Singleton getter
+def get_llm_scheduler() -> LLMScheduler:
+    """
+    Returns a singleton instance of LLMScheduler.
+    """
+    return LLMScheduler()
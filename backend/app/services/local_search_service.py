@@ -0,0 +1,333 @@
+from array import array
+from typing import Optional, Any, Dict, List, Iterable
+import heapq
+import math
+import os
+import pickle
+import re
+import threading
+from app.utils.logger import get_logger, preview
+from app.constants import LOCAL_SEARCH_SNAPSHOT_PATH, LOCAL_SEARCH_SNAPSHOT_EVERY
+
+# Logger setup
+logger = get_logger("local_search_service")
+
+# BM25 parameters, same defaults as Elasticsearch
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+SEARCHABLE_FIELDS = ("prompt", "response")
+
+IDENTIFIER_PATTERN = re.compile(r"[A-Za-z_][A-Za-z0-9_]*|\d+")
+CAMEL_CASE_PATTERN = re.compile(r"[A-Z]+(?=[A-Z][a-z])|[A-Z]?[a-z]+|[A-Z]+|\d+")
+
+
+def tokenize(text: str) -> List[str]:
+    """
+    Splits text into code-aware search terms.
+    Identifiers are kept whole and also split on camelCase and snake_case boundaries,
+    so `getUserName` matches `get user name` and `user_id` matches `user`.
+
+    Args:
+        text (str): The text to tokenize.
+
+    Returns:
+        List[str]: Lowercased terms, in order of appearance.
+    """
+    terms = []
+    for identifier in IDENTIFIER_PATTERN.findall(text):
+        lowered = identifier.lower()
+        terms.append(lowered)
+        parts = [part.lower() for chunk in identifier.split("_") for part in CAMEL_CASE_PATTERN.findall(chunk)]
+        if len(parts) > 1:
+            terms.extend(parts)
+    return terms
+
+
+class FieldIndex:
+    """
+    Inverted index for one document field.
+    Postings are kept as parallel arrays of document ids and term frequencies.
+    """
+
+    def __init__(self):
+        self.postings: Dict[str, tuple] = {}
+        self.lengths = array("I")
+        self.total_length = 0
+
+    def add(self, doc_id: int, text: str) -> None:
+        terms = tokenize(text)
+        frequencies: Dict[str, int] = {}
+        for term in terms:
+            frequencies[term] = frequencies.get(term, 0) + 1
+        # The length goes in first so concurrent readers never see a posting without it
+        self.lengths.append(len(terms))
+        self.total_length += len(terms)
+        for term, frequency in frequencies.items():
+            posting = self.postings.get(term)
+            if posting is None:
+                posting = self.postings[term] = (array("I"), array("I"))
+            posting[0].append(doc_id)
+            posting[1].append(frequency)
+
+    def copy(self) -> "FieldIndex":
+        """
+        Returns a copy sharing no mutable state, so it can be pickled while the original keeps growing.
+        """
+        copied = FieldIndex()
+        copied.postings = {term: (doc_ids[:], frequencies[:]) for term, (doc_ids, frequencies) in self.postings.items()}
+        copied.lengths = self.lengths[:]
+        copied.total_length = self.total_length
+        return copied
+
+    def score(self, terms: Iterable[str], scores: Dict[int, float]) -> None:
+        """
+        Adds the BM25 score of every matching document to `scores`.
+        """
+        doc_count = len(self.lengths)
+        if not doc_count:
+            return
+        average_length = self.total_length / doc_count or 1.0
+        lengths = self.lengths
+        get_score = scores.get
+        # norm = k1 * (1 - b + b * length / average_length), split into a constant and a per-length factor
+        norm_base = BM25_K1 * (1 - BM25_B)
+        norm_per_token = BM25_K1 * BM25_B / average_length
+        for term in terms:
+            posting = self.postings.get(term)
+            if posting is None:
+                continue
+            doc_ids, frequencies = posting
+            idf = math.log(1 + (doc_count - len(doc_ids) + 0.5) / (len(doc_ids) + 0.5))
+            weight = idf * (BM25_K1 + 1)
+            for doc_id, frequency in zip(doc_ids, frequencies):
+                scores[doc_id] = get_score(doc_id, 0.0) + weight * frequency / (frequency + norm_base + norm_per_token * lengths[doc_id])
+
+
+class LocalIndex:
+    """
+    An in-process index over interaction documents.
+    """
+
+    def __init__(self):
+        self.documents: List[Dict[str, Any]] = []
+        self.fields: Dict[str, FieldIndex] = {field: FieldIndex() for field in SEARCHABLE_FIELDS}
+
+    def add(self, document: Dict[str, Any]) -> None:
+        doc_id = len(self.documents)
+        self.documents.append(document)
+        for field, field_index in self.fields.items():
+            value = document.get(field)
+            field_index.add(doc_id, value if isinstance(value, str) else "")
+
+    def copy(self) -> "LocalIndex":
+        copied = LocalIndex()
+        copied.documents = list(self.documents)
+        copied.fields = {field: field_index.copy() for field, field_index in self.fields.items()}
+        return copied
+
+    def search(
+        self, text: str, fields: Iterable[str], size: int, filters: Optional[Dict[str, Any]] = None
+    ) -> List[Dict[str, Any]]:
+        terms = set(tokenize(text))
+        scores: Dict[int, float] = {}
+        for field in fields:
+            if field in self.fields:
+                self.fields[field].score(terms, scores)
+        candidates = scores.items()
+        if filters:
+            candidates = [
+                (doc_id, score) for doc_id, score in candidates
+                if all(self.documents[doc_id].get(key) == value for key, value in filters.items())
+            ]
+        best = heapq.nlargest(size, candidates, key=lambda item: item[1])
+        return [self.documents[doc_id] for doc_id, _ in best]
+
+
+class LocalSearchService:
+    """
+    A service offering the `ElasticsearchService` search interface from an in-process BM25 index.
+    Used when Elasticsearch is unavailable, and suited to small deployments and tests.
+    """
+    _instance: Optional["LocalSearchService"] = None
+
+    def __new__(cls, *args, **kwargs):
+        """
+        Singleton implementation to ensure a single index across the app.
+        """
+        if cls._instance is None:
+            cls._instance = super(LocalSearchService, cls).__new__(cls)
+        return cls._instance
+
+    def __init__(self, snapshot_path: Optional[str] = LOCAL_SEARCH_SNAPSHOT_PATH, snapshot_every: int = LOCAL_SEARCH_SNAPSHOT_EVERY):
+        """
+        Initializes the index, restoring it from a snapshot when one exists.
+
+        Args:
+            snapshot_path (Optional[str]): File used to persist the index. None disables snapshots.
+            snapshot_every (int): Number of inserts between automatic snapshots, written on a background thread. 0 disables them.
+        """
+        if not hasattr(self, "indices"):  # Ensure initialization happens only once
+            self.snapshot_path = snapshot_path
+            self.snapshot_every = snapshot_every
+            self.indices: Dict[str, LocalIndex] = {}
+            self.pending_writes = 0
+            self.snapshot_due = False
+            self.lock = threading.Lock()
+            # Serializes snapshot writers, which run outside `lock`
+            self.snapshot_lock = threading.Lock()
+            self._load_snapshot()
+
+    def _load_snapshot(self) -> None:
+        if not self.snapshot_path or not os.path.exists(self.snapshot_path):
+            return
+        try:
+            with open(self.snapshot_path, "rb") as snapshot:
+                self.indices = pickle.load(snapshot)
+            logger.info(f"Loaded local search snapshot from {self.snapshot_path} ({self.count()} documents).")
+        except Exception as e:
+            logger.error(f"Failed to load local search snapshot {self.snapshot_path}: {e}")
+            self.indices = {}
+
+    def snapshot(self) -> bool:
+        """
+        Writes the index to disk atomically.
+        The index is copied under the lock and pickled outside it, so inserts and searches are not held up.
+
+        Returns:
+            bool: True if the snapshot was written, False otherwise.
+        """
+        if not self.snapshot_path:
+            return False
+        try:
+            with self.snapshot_lock:
+                with self.lock:
+                    indices = {name: local_index.copy() for name, local_index in self.indices.items()}
+                    written = self.pending_writes
+                temporary_path = f"{self.snapshot_path}.tmp"
+                with open(temporary_path, "wb") as snapshot:
+                    pickle.dump(indices, snapshot, protocol=pickle.HIGHEST_PROTOCOL)
+                os.replace(temporary_path, self.snapshot_path)
+                with self.lock:
+                    self.pending_writes -= written
+            logger.info(f"Local search snapshot written to {self.snapshot_path}.")
+            return True
+        except Exception as e:
+            logger.error(f"Failed to write local search snapshot {self.snapshot_path}: {e}")
+            return False
+
+    def _write_due_snapshot(self) -> None:
+        try:
+            self.snapshot()
+        finally:
+            with self.lock:
+                self.snapshot_due = False
+
+    def count(self, index: Optional[str] = None) -> int:
+        """
+        Returns the number of documents in one index, or in all of them.
+        """
+        if index is not None:
+            return len(self.indices[index].documents) if index in self.indices else 0
+        return sum(len(local_index.documents) for local_index in self.indices.values())
+
+    def index_document(self, index: str, document: Dict[str, Any], doc_id: Optional[str] = None) -> bool:
+        """
+        Adds a document to the index.
+
+        Args:
+            index (str): The name of the index.
+            document (Dict[str, Any]): The document to index.
+            doc_id (Optional[str]): Accepted for interface compatibility; documents are append-only.
+
+        Returns:
+            bool: True if the document was indexed successfully, False otherwise.
+        """
+        try:
+            source = {key: value for key, value in document.items() if key != "_id"}
+            with self.lock:
+                self.indices.setdefault(index, LocalIndex()).add(source)
+                self.pending_writes += 1
+                due = self.snapshot_every and self.pending_writes >= self.snapshot_every and not self.snapshot_due
+                if due:
+                    self.snapshot_due = True
+            if due:
+                threading.Thread(target=self._write_due_snapshot, name="local-search-snapshot", daemon=True).start()
+            return True
+        except Exception as e:
+            logger.error(f"Failed to index document in local index {index}: {e}")
+            return False
+
+    def rebuild(self, index: str, documents: Iterable[Dict[str, Any]]) -> int:
+        """
+        Replaces an index with a fresh one built from `documents`, e.g. from MongoDB at startup.
+        Searches keep using the previous index until the new one is complete.
+
+        Args:
+            index (str): The name of the index.
+            documents (Iterable[Dict[str, Any]]): The documents to index.
+
+        Returns:
+            int: The number of documents indexed.
+        """
+        local_index = LocalIndex()
+        for document in documents:
+            local_index.add({key: value for key, value in document.items() if key != "_id"})
+        with self.lock:
+            self.indices[index] = local_index
+        logger.info(f"Rebuilt local index {index} with {len(local_index.documents)} documents.")
+        self.snapshot()
+        return len(local_index.documents)
+
+    def search_documents(
+        self, index: str, query: Dict[str, Any], size: int = 10, filters: Optional[Dict[str, Any]] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Searches for documents with an Elasticsearch-style query.
+        Supports `match`, `multi_match` and `match_all`.
+
+        Args:
+            index (str): The name of the index.
+            query (Dict[str, Any]): The search query.
+            size (int): The maximum number of results to return. Default is 10.
+            filters (Optional[Dict[str, Any]]): Field values the results must have; None matches a missing field.
+
+        Returns:
+            List[Dict[str, Any]]: A list of matching documents, best first.
+        """
+        local_index = self.indices.get(index)
+        if local_index is None:
+            return []
+        try:
+            if "match_all" in query:
+                documents = local_index.documents
+                if filters:
+                    documents = [
+                        document for document in documents
+                        if all(document.get(key) == value for key, value in filters.items())
+                    ]
+                return documents[:size]
+            if "match" in query:
+                field, value = next(iter(query["match"].items()))
+                text = value["query"] if isinstance(value, dict) else value
+                fields = [field]
+            elif "multi_match" in query:
+                text = query["multi_match"]["query"]
+                fields = [field.split("^")[0] for field in query["multi_match"].get("fields", SEARCHABLE_FIELDS)]
+            else:
+                logger.error(f"Unsupported local search query: {preview(query)}")
+                return []
+            results = local_index.search(text, fields, size, filters)
+            logger.info(f"Local search completed in {index} with {len(results)} hits.")
+            return results
+        except Exception as e:
+            logger.error(f"Failed to search local index {index}: {e}")
+            return []
+
+
+# Singleton getter
+def get_local_search_service() -> LocalSearchService:
+    """
+    Returns a singleton instance of LocalSearchService.
+    """
+    return LocalSearchService()
@@ -0,0 +1,178 @@
+from collections import deque
+from dataclasses import dataclass
+from typing import Optional, Deque, Dict, List
+import threading
+from app.utils.logger import get_logger
+from app.constants import (
+    ROUTER_LARGE_MODEL,
+    ROUTER_LARGE_PROMPT_TOKENS,
+    ROUTER_LARGE_LANGUAGES,
+    ROUTER_LATENCY_SLO_MS,
+    ROUTER_MAX_ERROR_RATE,
+    ROUTER_STATS_WINDOW,
+)
+
+# Logger setup
+logger = get_logger("model_router")
+
+# Weight of the newest sample in the latency moving average
+LATENCY_EWMA_ALPHA = 0.2
+# Outcomes needed before a model's error rate is trusted
+MIN_ERROR_SAMPLES = 5
+# Every n-th request rerouted away from a model still goes to it, so its statistics can recover
+PROBE_EVERY = 20
+
+
+@dataclass
+class RoutingDecision:
+    """
+    The model chosen for a request, with a human-readable explanation.
+    """
+    model: str
+    reason: str
+
+
+class ModelStats:
+    """
+    Live latency and error statistics of one model.
+    """
+
+    def __init__(self, window: int):
+        self.latency_ms: Optional[float] = None
+        self.outcomes: Deque[bool] = deque(maxlen=window)
+        self.rerouted = 0
+
+    def record(self, latency_ms: float, ok: bool) -> None:
+        if ok:
+            if self.latency_ms is None:
+                self.latency_ms = latency_ms
+            else:
+                self.latency_ms += LATENCY_EWMA_ALPHA * (latency_ms - self.latency_ms)
+        self.outcomes.append(ok)
+
+    @property
+    def error_rate(self) -> float:
+        if len(self.outcomes) < MIN_ERROR_SAMPLES:
+            return 0.0
+        return self.outcomes.count(False) / len(self.outcomes)
+
+
+class ModelRouter:
+    """
+    Picks a model tier for each request: the small model for quick questions, the large one for big
+    or code-heavy tasks, steering away from a model that is failing or over its latency SLO.
+    """
+
+    def __init__(
+        self,
+        small_model: str,
+        large_model: str = ROUTER_LARGE_MODEL,
+        large_prompt_tokens: int = ROUTER_LARGE_PROMPT_TOKENS,
+        large_languages: Optional[List[str]] = None,
+        latency_slo_ms: float = ROUTER_LATENCY_SLO_MS,
+        max_error_rate: float = ROUTER_MAX_ERROR_RATE,
+        window: int = ROUTER_STATS_WINDOW,
+    ):
+        """
+        Initializes the router.
+
+        Args:
+            small_model (str): The model for interactive and small requests.
+            large_model (str): The model for large tasks. Routing is disabled if it equals `small_model`.
+            large_prompt_tokens (int): Prompt size from which a request counts as a large task (half that with code).
+            large_languages (Optional[List[str]]): Languages whose code is always sent to the large model.
+            latency_slo_ms (float): Latency above which a model's moving average counts as too slow.
+            max_error_rate (float): Error rate above which a model is avoided.
+            window (int): Number of recent calls the error rate is computed over.
+        """
+        self.small_model = small_model
+        self.large_model = large_model
+        self.large_prompt_tokens = large_prompt_tokens
+        if large_languages is None:
+            large_languages = ROUTER_LARGE_LANGUAGES
+        self.large_languages = {language.lower() for language in large_languages}
+        self.latency_slo_ms = latency_slo_ms
+        self.max_error_rate = max_error_rate
+        self.stats: Dict[str, ModelStats] = {model: ModelStats(window) for model in (small_model, large_model)}
+        self.lock = threading.Lock()
+
+    @property
+    def models(self) -> List[str]:
+        return list(self.stats)
+
+    def _problem(self, model: str) -> Optional[str]:
+        """
+        Returns why a model should be avoided right now, or None if it is healthy.
+        """
+        stats = self.stats[model]
+        if stats.error_rate > self.max_error_rate:
+            return f"{model} error rate {stats.error_rate:.0%} above {self.max_error_rate:.0%}"
+        if stats.latency_ms is not None and stats.latency_ms > self.latency_slo_ms:
+            return f"{model} latency {stats.latency_ms:.0f} ms above the {self.latency_slo_ms:.0f} ms SLO"
+        return None
+
+    def route(self, prompt_tokens: int, has_code: bool = False, language: str = "", override: Optional[str] = None) -> RoutingDecision:
+        """
+        Chooses the model for a request.
+
+        Args:
+            prompt_tokens (int): The token count of the rendered prompt.
+            has_code (bool): Whether the request carries code context.
+            language (str): The programming language of the code.
+            override (Optional[str]): A model requested explicitly by the client.
+
+        Returns:
+            RoutingDecision: The model and the explanation of the choice.
+        """
+        note = ""
+        if override:
+            if override in self.stats:
+                return RoutingDecision(override, f"override: {override} requested")
+            logger.warning(f"Ignoring unknown model override '{override}'.")
+            note = f"unknown override {override} ignored; "
+
+        if self.small_model == self.large_model:
+            return RoutingDecision(self.small_model, note + "single model configured")
+
+        reasons = []
+        if prompt_tokens >= self.large_prompt_tokens:
+            reasons.append(f"{prompt_tokens} prompt tokens >= {self.large_prompt_tokens}")
+        elif has_code and prompt_tokens >= self.large_prompt_tokens // 2:
+            # Reviewing code takes more reasoning per token than answering a question
+            reasons.append(f"code context with {prompt_tokens} prompt tokens")
+        if has_code and language.lower() in self.large_languages:
+            reasons.append(f"{language} code")
+        preferred, fallback = (self.large_model, self.small_model) if reasons else (self.small_model, self.large_model)
+        reason = note + ("large task: " + ", ".join(reasons) if reasons else f"small task: {prompt_tokens} prompt tokens")
+
+        with self.lock:
+            problem = self._problem(preferred)
+            if problem and not self._problem(fallback):
+                self.stats[preferred].rerouted += 1
+                if self.stats[preferred].rerouted % PROBE_EVERY:
+                    return RoutingDecision(fallback, f"{reason}; rerouted to {fallback} because {problem}")
+                return RoutingDecision(preferred, f"{reason}; probing {preferred} although {problem}")
+        return RoutingDecision(preferred, reason)
+
+    def record(self, model: str, latency_ms: float, ok: bool) -> None:
+        """
+        Records the outcome of a model call.
+
+        Args:
+            model (str): The model called.
+            latency_ms (float): The call duration in milliseconds.
+            ok (bool): Whether the call succeeded.
+        """
+        with self.lock:
+            if model in self.stats:
+                self.stats[model].record(latency_ms, ok)
+
+    def snapshot(self) -> Dict[str, Dict[str, Optional[float]]]:
+        """
+        Returns the current statistics of every model.
+        """
+        with self.lock:
+            return {
+                model: {"latency_ms": stats.latency_ms, "error_rate": stats.error_rate, "calls": len(stats.outcomes)}
+                for model, stats in self.stats.items()
+            }
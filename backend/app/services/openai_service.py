@@ -1,22 +1,97 @@
+from dataclasses import dataclass
+from langchain_core.messages import AIMessageChunk
 from langchain_openai import ChatOpenAI
 from app.services.redis_service import RedisService
-import logging
+import asyncio
 import os
-from typing import Optional
+import threading
+import time
+from typing import Optional, Any, Callable, Dict, List, Tuple
+from app.services.llm_scheduler import INTERACTIVE, CallCancelledError, get_llm_scheduler
+from app.services.circuit_breaker import CircuitOpenError, get_circuit_breaker
+from app.services.adaptive_ttl import get_adaptive_ttl
+from app.services.model_router import ModelRouter, RoutingDecision
+from app.services.prompt_templates import get_template
+from app.utils.logger import get_logger, preview
+from app.utils.tokens import count_tokens, trim_code
+from app.constants import LLM_MAX_OUTPUT_TOKENS, LLM_PROMPT_BUDGET_TOKENS, LLM_MAX_REQUEST_TOKENS
 
 # Setup logger
-logger = logging.getLogger("openai_service")
-logger.setLevel(logging.INFO)
-handler = logging.StreamHandler()
-handler.setFormatter(logging.Formatter("%(asctime)s - %(name)s - %(levelname)s - %(message)s"))
-logger.addHandler(handler)
+logger = get_logger("openai_service")
+
+# Tokens taken by the code fence around the code context
+CODE_FENCE_TOKENS = 8
+
+
+class PromptTooLargeError(ValueError):
+    """
+    Raised before any model call when a request cannot fit the token budget.
+    """
+
+
+@dataclass
+class Completion:
+    """
+    A model response with the token accounting of the call.
+    """
+    text: str
+    prompt_tokens: int
+    completion_tokens: int
+    trimmed_lines: int = 0
+    cached: bool = False
+    cached_prompt_tokens: int = 0
+    template: str = ""
+    model: str = ""
+    route: str = ""
+    priority: str = ""
+    queue_ms: float = 0.0
+
+    def usage(self) -> Dict[str, Any]:
+        return {
+            "prompt_tokens": self.prompt_tokens,
+            "completion_tokens": self.completion_tokens,
+            "cached_prompt_tokens": self.cached_prompt_tokens,
+            "trimmed_lines": self.trimmed_lines,
+            "cached": self.cached,
+            "template": self.template,
+            "model": self.model,
+            "route": self.route,
+            "priority": self.priority,
+            "queue_ms": self.queue_ms,
+        }
+
+
+@dataclass
+class Call:
+    """
+    A rendered and routed request, between its cache lookup and its model call.
+    """
+    messages: List[Dict[str, str]]
+    trimmed_lines: int
+    template_key: str
+    prompt_tokens: int
+    decision: RoutingDecision
+    cache_key: str
+    cached: bool = True
+    language: str = ""
+    priority: str = INTERACTIVE
+    user: str = ""
+
 
 class OpenAIService:
     """
     A service for interacting with OpenAI's chat models.
     """
 
-    def __init__(self, api_key: Optional[str] = None, model: Optional[str] = None, redis_service: Optional[RedisService] = None):
+    def __init__(
+        self,
+        api_key: Optional[str] = None,
+        model: Optional[str] = None,
+        redis_service: Optional[RedisService] = None,
+        max_tokens: int = LLM_MAX_OUTPUT_TOKENS,
+        prompt_budget: int = LLM_PROMPT_BUDGET_TOKENS,
+        router: Optional[ModelRouter] = None,
+    ):
         """
         Initializes the OpenAIService with the provided API key, chat model, and Redis service.
 
@@ -24,6 +99,10 @@ class OpenAIService:
             api_key (Optional[str]): The API key for OpenAI. If not provided, it will be loaded from the environment variable `OPENAI_API_KEY`.
             model (Optional[str]): The chat model name to use. Defaults to `gpt-4o-mini`.
             redis_service (Optional[RedisService]): An optional RedisService instance for caching responses.
+            max_tokens (int): The cap on output tokens per response.
+            prompt_budget (int): The token budget of the prompt; code context is trimmed to fit it.
+            router (Optional[ModelRouter]): Picks the model of each request. Defaults to routing between
+                `model` and the configured large model.
         """
         self.api_key = api_key or os.getenv("OPENAI_API_KEY")
         if not self.api_key:
@@ -31,7 +110,14 @@ class OpenAIService:
             raise ValueError("OpenAI API key is required.")
 
         self.model = model or "gpt-4o-mini"
-        self.llm = ChatOpenAI(api_key=self.api_key, model=self.model)
+        self.max_tokens = max_tokens
+        self.prompt_budget = prompt_budget
+        self.llm = ChatOpenAI(api_key=self.api_key, model=self.model, max_tokens=self.max_tokens)
+        self.clients: Dict[str, ChatOpenAI] = {}
+        self.router = router or ModelRouter(self.model)
+        self.scheduler = get_llm_scheduler()
+        self.breaker = get_circuit_breaker("llm")
+        self.ttl_policy = get_adaptive_ttl()
         self.redis_service = redis_service or self._initialize_redis()
 
         logger.info(f"OpenAIService initialized with model: {self.model}")
@@ -54,51 +140,363 @@ class OpenAIService:
             logger.error(f"Failed to initialize RedisService: {e}")
             return None
 
-    def generate_response(self, prompt: str) -> str:
+    def _client(self, model: str) -> ChatOpenAI:
         """
-        Generates a response from the AI model based on the provided prompt.
+        Returns the chat client of a model, creating it on first use.
+        """
+        if model == self.model:
+            return self.llm
+        if model not in self.clients:
+            self.clients[model] = ChatOpenAI(api_key=self.api_key, model=model, max_tokens=self.max_tokens)
+        return self.clients[model]
+
+    def ping(self, timeout: float) -> None:
+        """
+        Checks that the provider is reachable and knows the default model, without generating tokens.
 
         Args:
-            prompt (str): The input prompt for the AI model.
+            timeout (float): Seconds to wait for the provider.
+
+        Raises:
+            Exception: If the provider cannot be reached or rejects the request.
+        """
+        self.llm.root_client.with_options(timeout=timeout, max_retries=0).models.retrieve(self.model)
+
+    def _stream(
+        self,
+        model: str,
+        messages: List[Dict[str, str]],
+        cache_key: str,
+        on_delta: Callable[[str], None],
+        cancelled: Optional[threading.Event],
+    ) -> Any:
+        """
+        Streams a response, passing each piece of text to `on_delta`, and returns the whole message.
+        Closing the stream on cancellation drops the provider connection, which stops the generation.
+        """
+        message = None
+        stream = self._client(model).stream(messages, prompt_cache_key=cache_key, stream_usage=True)
+        try:
+            for chunk in stream:
+                if cancelled is not None and cancelled.is_set():
+                    raise CallCancelledError("The LLM call was cancelled while streaming.")
+                message = chunk if message is None else message + chunk
+                if chunk.content:
+                    on_delta(chunk.content)
+        finally:
+            stream.close()
+        return message if message is not None else AIMessageChunk(content="")
+
+    def build_prompt(
+        self,
+        prompt: str = "",
+        code: str = "",
+        language: str = "",
+        template: str = "submit",
+        fields: Optional[Dict[str, Any]] = None,
+        history: Optional[List[Dict[str, str]]] = None,
+    ) -> Tuple[List[Dict[str, str]], int]:
+        """
+        Renders a request with a prompt template, fitting it into the prompt budget.
+        The question and history are never trimmed; the code is trimmed by priority (see `trim_code`).
+
+        Args:
+            prompt (str): The user's question or task.
+            code (str): Optional code context.
+            language (str): The programming language of the code.
+            template (str): The name of the prompt template.
+            fields (Optional[Dict[str, Any]]): Additional placeholder values of the template.
+            history (Optional[List[Dict[str, str]]]): Earlier messages of a conversation, placed between the
+                system message and the request.
 
         Returns:
-            str: The generated response.
+            Tuple[List[Dict[str, str]], int]: The chat messages and the number of code lines trimmed.
 
         Raises:
-            Exception: If an error occurs during the generation process.
+            PromptTooLargeError: If the request is too large to be worth trimming, or the question alone exceeds the budget.
+        """
+        prompt_template = get_template(template)
+        prompt_tokens = count_tokens(prompt) + count_tokens(prompt_template.system)
+        prompt_tokens += sum(count_tokens(message["content"]) for message in history or [])
+        code_tokens = count_tokens(code) if code else 0
+        if prompt_tokens + code_tokens > LLM_MAX_REQUEST_TOKENS:
+            raise PromptTooLargeError(
+                f"The request has about {prompt_tokens + code_tokens} tokens; the limit is {LLM_MAX_REQUEST_TOKENS}."
+            )
+        if prompt_tokens > self.prompt_budget:
+            raise PromptTooLargeError(f"The prompt has about {prompt_tokens} tokens; the limit is {self.prompt_budget}.")
+
+        trimmed_lines = 0
+        if code:
+            code, trimmed_lines = trim_code(code, self.prompt_budget - prompt_tokens - CODE_FENCE_TOKENS, prompt)
+            if trimmed_lines:
+                logger.info(f"Trimmed {trimmed_lines} lines of code context to fit the prompt budget.")
+        code_block = f"\n\n```{language}\n{code}\n```" if code else ""
+        messages = prompt_template.render(
+            prompt=prompt, code=code, code_block=code_block, language=language or "source", **(fields or {})
+        )
+        if history:
+            messages = messages[:1] + history + messages[1:]
+        return messages, trimmed_lines
+
+    def _prepare(
+        self,
+        prompt: str,
+        code: str,
+        language: str,
+        template: str,
+        fields: Optional[Dict[str, Any]],
+        model: Optional[str],
+        priority: str,
+        user: str,
+        private: bool,
+        history: Optional[List[Dict[str, str]]],
+    ) -> Call:
+        """
+        Renders the request, routes it and derives its cache key.
+
+        Raises:
+            PromptTooLargeError: If the request cannot fit the budget.
+        """
+        messages, trimmed_lines = self.build_prompt(prompt, code, language, template, fields, history)
+        template_key = get_template(template).key
+        content = messages[-1]["content"]
+        prompt_tokens = sum(count_tokens(message["content"]) for message in messages)
+        decision = self.router.route(prompt_tokens, has_code=bool(code), language=language, override=model)
+        # Routed requests share cached responses; an explicit model only reuses its own
+        cache_key = f"{template_key}:{content}" if not model else f"{template_key}:{decision.model}:{content}"
+        if private:
+            cache_key = f"user:{user}:{cache_key}"
+        return Call(
+            messages, trimmed_lines, template_key, prompt_tokens, decision, cache_key,
+            cached=not history, language=language, priority=priority, user=user,
+        )
+
+    def _lookup(self, call: Call) -> Optional[Completion]:
+        """
+        Returns the cached response of a call, if any.
+
+        Raises:
+            CircuitOpenError: On a cache miss while the model provider's circuit is open.
+        """
+        logger.info(f"Generating response for prompt: {preview(call.messages[-1]['content'])}")
+
+        # Check Redis cache
+        if call.cached and self.redis_service:
+            self.ttl_policy.touch(call.cache_key)
+            cached_response = self.redis_service.get(call.cache_key)
+            if cached_response:
+                logger.info("Cache hit: Returning cached response.")
+                return Completion(
+                    cached_response, call.prompt_tokens, count_tokens(cached_response), call.trimmed_lines,
+                    cached=True, template=call.template_key, route="cached response",
+                )
+        elif not self.redis_service:
+            logger.warning("RedisService is not initialized. Skipping cache check.")
+
+        # Fail fast while the provider is down instead of queueing for a call that will time out
+        if self.breaker.rejecting():
+            raise CircuitOpenError(self.breaker.name, self.breaker.retry_after())
+        return None
+
+    def _complete(
+        self,
+        call: Call,
+        queue_seconds: float,
+        on_delta: Optional[Callable[[str], None]],
+        cancelled: Optional[threading.Event],
+    ) -> Completion:
+        """
+        Sends an admitted call to the model and caches the response. Must run while the call holds its slot.
         """
+        decision = call.decision
+        # Take a half-open probe only once admitted, so calls cancelled in the queue never hold one
+        if not self.breaker.allow():
+            raise CircuitOpenError(self.breaker.name, self.breaker.retry_after())
+
+        # Send the messages to the chat model; the cache key routes requests sharing a prefix to the same cache
+        logger.info(f"Routing to {decision.model}: {decision.reason}")
+        started = time.perf_counter()
         try:
-            logger.info(f"Generating response for prompt: {prompt}")
-
-            # Check Redis cache
-            if self.redis_service:
-                cached_response = self.redis_service.get(prompt)
-                if cached_response:
-                    logger.info("Cache hit: Returning cached response.")
-                    return cached_response
+            if on_delta:
+                response = self._stream(decision.model, call.messages, call.template_key, on_delta, cancelled)
             else:
-                logger.warning("RedisService is not initialized. Skipping cache check.")
+                response = self._client(decision.model).invoke(call.messages, prompt_cache_key=call.template_key)
+        except CallCancelledError:
+            self.breaker.release()
+            raise
+        except Exception:
+            self.router.record(decision.model, (time.perf_counter() - started) * 1000, ok=False)
+            self.breaker.record(False)
+            raise
+        self.router.record(decision.model, (time.perf_counter() - started) * 1000, ok=True)
+        self.breaker.record(True, time.perf_counter() - started)
 
-            # Send the prompt to the chat model
-            response = self.llm.invoke([{"role": "user", "content": prompt}])
+        # Extract content from response
+        if hasattr(response, "content"):
+            message_content = response.content
+        elif isinstance(response, list) and response:
+            message_content = response[0].get("content", "")
+        else:
+            logger.error(f"Unexpected response format: {preview(response)}")
+            raise ValueError("Unexpected response format received from ChatOpenAI.")
 
-            # Extract content from response
-            if hasattr(response, "content"):
-                message_content = response.content
-            elif isinstance(response, list) and response:
-                message_content = response[0].get("content", "")
-            else:
-                logger.error(f"Unexpected response format: {response}")
-                raise ValueError("Unexpected response format received from ChatOpenAI.")
+        # Prefer the provider's counts, estimating only when it reports none
+        usage = getattr(response, "usage_metadata", None) or {}
+        completion = Completion(
+            text=message_content,
+            prompt_tokens=usage.get("input_tokens") or call.prompt_tokens,
+            completion_tokens=usage.get("output_tokens") or count_tokens(message_content),
+            trimmed_lines=call.trimmed_lines,
+            cached_prompt_tokens=(usage.get("input_token_details") or {}).get("cache_read") or 0,
+            template=call.template_key,
+            model=decision.model,
+            route=decision.reason,
+            priority=call.priority,
+            queue_ms=queue_seconds * 1000,
+        )
+        logger.info(
+            f"Response generated successfully ({completion.prompt_tokens} prompt, "
+            f"{completion.cached_prompt_tokens} cached, {completion.completion_tokens} completion tokens)."
+        )
+
+        # Cache the response in Redis
+        if call.cached and self.redis_service:
+            ttl = self.ttl_policy.ttl(call.cache_key, len(message_content.encode("utf-8")))
+            self.redis_service.set(
+                call.cache_key, message_content, ex=ttl,
+                tags={"model": decision.model, "language": call.language, "template": call.template_key, "user": call.user},
+            )
+            logger.info("Response cached in Redis.")
+
+        return completion
+
+    def generate(
+        self,
+        prompt: str = "",
+        code: str = "",
+        language: str = "",
+        template: str = "submit",
+        fields: Optional[Dict[str, Any]] = None,
+        model: Optional[str] = None,
+        priority: str = INTERACTIVE,
+        user: str = "",
+        private: bool = False,
+        history: Optional[List[Dict[str, str]]] = None,
+        on_delta: Optional[Callable[[str], None]] = None,
+        cancelled: Optional[threading.Event] = None,
+    ) -> Completion:
+        """
+        Generates a response within the token budget and reports the tokens used. The calling thread
+        waits while the call is queued; code on an event loop should await `agenerate` instead.
+
+        Args:
+            prompt (str): The input prompt for the AI model.
+            code (str): Optional code context, trimmed to fit the budget.
+            language (str): The programming language of the code.
+            template (str): The name of the prompt template.
+            fields (Optional[Dict[str, Any]]): Additional placeholder values of the template.
+            model (Optional[str]): A model to use instead of the routed one.
+            priority (str): The scheduling class of the call, `interactive` or `bulk`.
+            user (str): The user the call is made for, for fair queuing among users.
+            private (bool): Cache the response under the user's namespace, unseen by other users.
+            history (Optional[List[Dict[str, str]]]): Earlier messages of a conversation. Answers in a
+                conversation depend on all of it, so they are not cached.
+            on_delta (Optional[Callable[[str], None]]): Streams the response, called with each piece of text
+                as it arrives. Cached responses are returned without calling it.
+            cancelled (Optional[threading.Event]): Set by the caller to abandon the call, queued or streaming.
+
+        Returns:
+            Completion: The response text, its token accounting and the routing decision.
+
+        Raises:
+            PromptTooLargeError: If the request cannot fit the budget. No model call is made.
+            CircuitOpenError: If the model provider's circuit is open. No model call is made.
+            CallCancelledError: If `cancelled` was set before the response was complete.
+            RuntimeError: If an error occurs during the generation process.
+        """
+        call = self._prepare(prompt, code, language, template, fields, model, priority, user, private, history)
+        try:
+            cached = self._lookup(call)
+            if cached:
+                return cached
+            with self.scheduler.slot(priority, user, cost=call.prompt_tokens, cancelled=cancelled) as queue_seconds:
+                return self._complete(call, queue_seconds, on_delta, cancelled)
+        except (CircuitOpenError, CallCancelledError):
+            raise
+        except Exception as e:
+            logger.error(f"Error in generate_response: {str(e)}", exc_info=True)
+            raise RuntimeError(f"An error occurred while generating the response: {str(e)}")
 
-            logger.info("Response generated successfully.")
+    async def agenerate(
+        self,
+        prompt: str = "",
+        code: str = "",
+        language: str = "",
+        template: str = "submit",
+        fields: Optional[Dict[str, Any]] = None,
+        model: Optional[str] = None,
+        priority: str = INTERACTIVE,
+        user: str = "",
+        private: bool = False,
+        history: Optional[List[Dict[str, str]]] = None,
+        on_delta: Optional[Callable[[str], None]] = None,
+        cancelled: Optional[threading.Event] = None,
+    ) -> Completion:
+        """
+        Same as `generate`, for code on the event loop. The call waits for its slot on the loop, so queued
+        calls hold no worker thread and cannot delay other work on the default executor; the cache lookup
+        and the admitted model call run in threads.
 
-            # Cache the response in Redis
-            if self.redis_service:
-                self.redis_service.set(prompt, message_content, ex=3600)  # Cache for 1 hour
-                logger.info("Response cached in Redis.")
+        Cancelling the awaiting task gives up the call's place in the queue. Once the call is admitted it
+        runs to completion unless `cancelled` is set, and its slot is held until then.
 
-            return message_content
+        Raises:
+            PromptTooLargeError: If the request cannot fit the budget. No model call is made.
+            CircuitOpenError: If the model provider's circuit is open. No model call is made.
+            CallCancelledError: If `cancelled` was set before the response was complete.
+            RuntimeError: If an error occurs during the generation process.
+        """
+        call = self._prepare(prompt, code, language, template, fields, model, priority, user, private, history)
+        try:
+            cached = await asyncio.to_thread(self._lookup, call)
+            if cached:
+                return cached
+            if cancelled is not None and cancelled.is_set():
+                raise CallCancelledError("The LLM call was cancelled while queued.")
+            ticket = await self.scheduler.acquire(priority, user, cost=call.prompt_tokens)
+
+            def complete() -> Completion:
+                try:
+                    return self._complete(call, ticket.wait_seconds, on_delta, cancelled)
+                finally:
+                    self.scheduler.release(ticket)
+
+            # The slot is freed by the thread, so it stays held if the awaiting task is cancelled meanwhile
+            running = asyncio.get_running_loop().run_in_executor(None, complete)
+            try:
+                return await asyncio.shield(running)
+            except asyncio.CancelledError:
+                running.add_done_callback(lambda future: future.cancelled() or future.exception())
+                raise
+        except (CircuitOpenError, CallCancelledError, asyncio.CancelledError):
+            raise
         except Exception as e:
             logger.error(f"Error in generate_response: {str(e)}", exc_info=True)
             raise RuntimeError(f"An error occurred while generating the response: {str(e)}")
+
+    def generate_response(self, prompt: str) -> str:
+        """
+        Generates a response from the AI model based on the provided prompt.
+
+        Args:
+            prompt (str): The input prompt for the AI model.
+
+        Returns:
+            str: The generated response.
+
+        Raises:
+            PromptTooLargeError: If the prompt exceeds the token budget.
+            Exception: If an error occurs during the generation process.
+        """
+        return self.generate(prompt).text
@@ -0,0 +1,139 @@
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional
+import hashlib
+
+# Shared preamble of every template. Providers cache identical prompt prefixes (OpenAI from 1024
+# tokens on), so this text and each template's instruction must stay byte-for-byte stable within a
+# version: no timestamps, ids or request data here, and any edit needs a new template version.
+SYSTEM_PREAMBLE = """You are CodeGPT Assistant, an expert PHP and Laravel engineer embedded in the developer's editor.
+
+Follow these rules in every answer:
+- Be direct. Lead with the answer, then the reasoning, then code.
+- Target the Laravel version and PHP features evident in the code; do not assume newer APIs are available.
+- Prefer framework facilities over hand-rolled code: Eloquent relationships and scopes, Form Requests for \
+validation, policies and gates for authorization, queued jobs for slow work, config() over env() outside \
+config files, and dependency injection over facades in domain classes.
+- Flag security issues explicitly: mass assignment without $fillable or $guarded, raw queries built from \
+input, missing authorization checks, unescaped output ({!! !!}), secrets in code and unsafe file handling.
+- Flag performance issues: N+1 queries (suggest with()/load()), unbounded get() on large tables (suggest \
+chunk() or cursor()), missing indexes implied by where clauses and work done inside loops that could be batched.
+- When you change code, show only the relevant part with enough context to locate it.
+- If the request is ambiguous, state the assumption you made instead of asking."""
+
+
+@dataclass(frozen=True)
+class PromptTemplate:
+    """
+    A versioned prompt layout: a stable system message first, the variable request last.
+    """
+    name: str
+    version: str
+    instruction: str
+    user: str
+
+    @property
+    def system(self) -> str:
+        """
+        The stable system message shared by every request rendered with this template.
+        """
+        return f"{SYSTEM_PREAMBLE}\n\n{self.instruction}"
+
+    @property
+    def key(self) -> str:
+        return f"{self.name}@{self.version}"
+
+    def prefix_digest(self) -> str:
+        """
+        Returns the SHA-256 of the stable prefix, used to detect edits made without a version bump.
+        """
+        return hashlib.sha256(self.system.encode("utf-8")).hexdigest()
+
+    def render(self, **fields: Any) -> List[Dict[str, str]]:
+        """
+        Renders the chat messages of a request.
+
+        Args:
+            **fields: The values of the placeholders of the user message.
+
+        Returns:
+            List[Dict[str, str]]: The system message followed by the user message.
+        """
+        return [
+            {"role": "system", "content": self.system},
+            {"role": "user", "content": self.user.format(**fields)},
+        ]
+
+
+# Registry of prompt templates, keyed by name, then version
+TEMPLATES: Dict[str, Dict[str, PromptTemplate]] = {}
+
+
+def register_template(template: PromptTemplate) -> None:
+    """
+    Registers a prompt template version.
+
+    Args:
+        template (PromptTemplate): The template.
+
+    Raises:
+        ValueError: If a different template is already registered under the same name and version.
+    """
+    versions = TEMPLATES.setdefault(template.name, {})
+    existing = versions.get(template.version)
+    if existing is not None and existing != template:
+        raise ValueError(f"Prompt template {template.key} is already registered with different content.")
+    versions[template.version] = template
+
+
+def get_template(name: str, version: Optional[str] = None) -> PromptTemplate:
+    """
+    Returns a registered prompt template.
+
+    Args:
+        name (str): The template name.
+        version (Optional[str]): The version. Defaults to the highest registered version.
+
+    Returns:
+        PromptTemplate: The template.
+
+    Raises:
+        KeyError: If the template or version is not registered.
+    """
+    versions = TEMPLATES[name]
+    if version is None:
+        version = max(versions, key=int)
+    return versions[version]
+
+
+register_template(PromptTemplate(
+    name="submit",
+    version="1",
+    instruction=(
+        "Task: answer the developer's question. When code context is attached, ground the answer in it; "
+        "lines marked as omitted were trimmed to fit the context window."
+    ),
+    user="{prompt}{code_block}",
+))
+
+register_template(PromptTemplate(
+    name="analysis",
+    version="1",
+    instruction=(
+        "Task: review one chunk of a source file. Explain what the code does, then list bugs, security "
+        "issues and Laravel best-practice violations with their line numbers. The chunk may start or end "
+        "mid-class; do not report missing code outside the given lines."
+    ),
+    user="File: {file_path} (lines {start_line}-{end_line}, {language})\n\n```\n{code}\n```",
+))
+
+register_template(PromptTemplate(
+    name="summary",
+    version="1",
+    instruction=(
+        "Task: update the running summary of a conversation with the developer so it can be continued "
+        "without the turns it replaces. Keep the developer's goal, decisions made, names of files, classes "
+        "and functions discussed, code the developer settled on and open questions. Drop pleasantries and "
+        "superseded attempts. Answer with the summary only, in at most 250 words."
+    ),
+    user="Summary so far:\n{summary}\n\nTurns to add:\n\n{prompt}",
+))
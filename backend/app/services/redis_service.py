@@ -1,13 +1,12 @@
 import redis
-import logging
-from typing import Optional, Any
+from typing import Dict, Optional, Any
+from app.services.cache_tags import tag_entries
+from app.services.circuit_breaker import CircuitOpenError, get_circuit_breaker
+from app.utils.logger import get_logger, preview
+from app.constants import REDIS_SOCKET_TIMEOUT_SECONDS
 
 # Logger setup
-logger = logging.getLogger("redis_service")
-logger.setLevel(logging.INFO)
-handler = logging.StreamHandler()
-handler.setFormatter(logging.Formatter("%(asctime)s - %(name)s - %(levelname)s - %(message)s"))
-logger.addHandler(handler)
+logger = get_logger("redis_service")
 
 
 class RedisService:
@@ -35,8 +34,17 @@ class RedisService:
             decode_responses (bool): Whether to decode Redis responses to strings. Default is True.
         """
         if not hasattr(self, "client"):  # Ensure initialization happens only once
+            # Shared with every other user of the Redis dependency; open, it turns cache calls into misses
+            self.breaker = get_circuit_breaker("redis")
             try:
-                self.client = redis.Redis(host=host, port=port, db=db, decode_responses=decode_responses)
+                self.client = redis.Redis(
+                    host=host,
+                    port=port,
+                    db=db,
+                    decode_responses=decode_responses,
+                    socket_timeout=REDIS_SOCKET_TIMEOUT_SECONDS,
+                    socket_connect_timeout=REDIS_SOCKET_TIMEOUT_SECONDS,
+                )
                 self.client.ping()  # Test the connection
                 logger.info(f"Successfully connected to Redis at {host}:{port}.")
             except Exception as e:
@@ -54,17 +62,19 @@ class RedisService:
             Optional[Any]: The value associated with the key, or None if the key does not exist.
         """
         try:
-            value = self.client.get(key)
+            value = self.breaker.call(self.client.get, key)
             if value is not None:
-                logger.info(f"Retrieved value for key '{key}'.")
+                logger.info(f"Retrieved value for key '{preview(key)}'.")
             else:
-                logger.warning(f"Key '{key}' does not exist in Redis.")
+                logger.info(f"Key '{preview(key)}' does not exist in Redis.")
             return value
+        except CircuitOpenError:
+            return None
         except Exception as e:
-            logger.error(f"Error retrieving key '{key}' from Redis: {e}")
+            logger.error(f"Error retrieving key '{preview(key)}' from Redis: {e}")
             return None
 
-    def set(self, key: str, value: Any, ex: Optional[int] = None) -> bool:
+    def set(self, key: str, value: Any, ex: Optional[int] = None, tags: Optional[Dict[str, Optional[str]]] = None) -> bool:
         """
         Sets a value in Redis with an optional expiration time.
 
@@ -72,16 +82,28 @@ class RedisService:
             key (str): The key to set.
             value (Any): The value to store.
             ex (Optional[int]): Expiration time in seconds (optional).
+            tags (Optional[Dict[str, Optional[str]]]): Tags to index the key under for invalidation, by kind (optional).
 
         Returns:
             bool: True if the operation was successful, False otherwise.
         """
         try:
-            self.client.set(key, value, ex=ex)
-            logger.info(f"Set key '{key}' with value: {value} (expires in {ex} seconds)")
+            if tags:
+                def write():
+                    pipeline = self.client.pipeline(transaction=False)
+                    pipeline.set(key, value, ex=ex)
+                    tag_entries(pipeline, [key], tags)
+                    pipeline.execute()
+
+                self.breaker.call(write)
+            else:
+                self.breaker.call(self.client.set, key, value, ex=ex)
+            logger.info(f"Set key '{preview(key)}' with value: {preview(value)} (expires in {ex} seconds)")
             return True
+        except CircuitOpenError:
+            return False
         except Exception as e:
-            logger.error(f"Error setting key '{key}' in Redis: {e}")
+            logger.error(f"Error setting key '{preview(key)}' in Redis: {e}")
             return False
 
     def delete(self, key: str) -> bool:
@@ -95,19 +117,22 @@ class RedisService:
             bool: True if the key was deleted successfully, False otherwise.
         """
         try:
-            result = self.client.delete(key)
+            result = self.breaker.call(self.client.delete, key)
             if result:
                 logger.info(f"Deleted key '{key}' from Redis.")
             else:
                 logger.warning(f"Key '{key}' does not exist in Redis.")
             return bool(result)
+        except CircuitOpenError:
+            return False
         except Exception as e:
             logger.error(f"Error deleting key '{key}' from Redis: {e}")
             return False
 
     def flush_db(self) -> bool:
         """
-        Flushes the current Redis database.
+        Flushes the current Redis database, including anything else sharing it.
+        Prefer invalidating cache entries by tag with CacheTagIndex.
 
         Returns:
             bool: True if the operation was successful, False otherwise.
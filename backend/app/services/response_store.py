@@ -0,0 +1,305 @@
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterable, Iterator, List, Optional
+import hashlib
+import itertools
+from pymongo import UpdateOne
+from app.services.circuit_breaker import CircuitBreaker, CircuitOpenError
+from app.utils.logger import get_logger
+from app.constants import RESPONSE_DEDUP_MIN_BYTES, RESPONSE_RESOLVE_PAGE_SIZE
+
+# Logger setup
+logger = get_logger("response_store")
+
+RESPONSES_COLLECTION_NAME = "responses"
+
+
+def response_hash(text: str) -> str:
+    """
+    Returns the content hash a response is stored under.
+    """
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+class ResponseStore:
+    """
+    Stores each distinct response once, in the `responses` collection keyed by content hash, and lets
+    interactions reference it by `response_hash` instead of carrying a full copy.
+
+    Responses shorter than `min_bytes` stay inline, as a reference would not be much smaller. Readers
+    accept both forms, so interactions written before the migration, or while the responses collection
+    could not be written, keep working.
+    """
+
+    def __init__(
+        self,
+        database: Any,
+        breaker: Optional[CircuitBreaker] = None,
+        min_bytes: int = RESPONSE_DEDUP_MIN_BYTES,
+        page_size: int = RESPONSE_RESOLVE_PAGE_SIZE,
+    ):
+        """
+        Initializes the ResponseStore.
+
+        Args:
+            database (Any): The MongoDB database holding the interactions.
+            breaker (Optional[CircuitBreaker]): The breaker of the MongoDB dependency, if writes go through one.
+            min_bytes (int): Responses at least this large are deduplicated.
+            page_size (int): Interactions resolved per query of the responses collection.
+        """
+        self.collection = database[RESPONSES_COLLECTION_NAME]
+        self.breaker = breaker
+        self.min_bytes = min_bytes
+        self.page_size = page_size
+
+    def _call(self, function, *args, **kwargs):
+        return self.breaker.call(function, *args, **kwargs) if self.breaker else function(*args, **kwargs)
+
+    def reference(self, interaction: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Stores an interaction's response once and returns the interaction referencing it by hash.
+        If the response cannot be stored, the interaction is returned with its response inline.
+
+        Args:
+            interaction (Dict[str, Any]): The interaction, with its `response`.
+
+        Returns:
+            Dict[str, Any]: The interaction to insert.
+        """
+        text = interaction.get("response")
+        if not isinstance(text, str) or len(text.encode("utf-8")) < self.min_bytes:
+            return interaction
+        digest = response_hash(text)
+        try:
+            self._call(
+                self.collection.update_one,
+                {"_id": digest},
+                {
+                    "$setOnInsert": {"text": text, "size": len(text.encode("utf-8")), "created_at": datetime.now(timezone.utc)},
+                    "$inc": {"refs": 1},
+                },
+                upsert=True,
+            )
+        except CircuitOpenError:
+            return interaction
+        except Exception as e:
+            logger.error(f"Failed to store response {digest}, keeping it inline: {e}")
+            return interaction
+        referenced = {key: value for key, value in interaction.items() if key != "response"}
+        referenced["response_hash"] = digest
+        return referenced
+
+    def reference_many(self, interactions: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        Stores the responses of a batch of interactions with one bulk write of their distinct responses,
+        and returns copies of the interactions referencing them. If the write fails, all responses stay inline.
+
+        Args:
+            interactions (List[Dict[str, Any]]): The interactions, with their `response`.
+
+        Returns:
+            List[Dict[str, Any]]: The interactions to insert, in the same order.
+        """
+        texts: Dict[str, str] = {}
+        references: Dict[str, int] = {}
+        digests: List[Optional[str]] = []
+        for interaction in interactions:
+            text = interaction.get("response")
+            if not isinstance(text, str) or len(text.encode("utf-8")) < self.min_bytes:
+                digests.append(None)
+                continue
+            digest = response_hash(text)
+            texts[digest] = text
+            references[digest] = references.get(digest, 0) + 1
+            digests.append(digest)
+        if not references:
+            return [dict(interaction) for interaction in interactions]
+
+        now = datetime.now(timezone.utc)
+        try:
+            self._call(self.collection.bulk_write, [
+                UpdateOne(
+                    {"_id": digest},
+                    {
+                        "$setOnInsert": {"text": texts[digest], "size": len(texts[digest].encode("utf-8")), "created_at": now},
+                        "$inc": {"refs": count},
+                    },
+                    upsert=True,
+                )
+                for digest, count in references.items()
+            ], ordered=False)
+        except CircuitOpenError:
+            return [dict(interaction) for interaction in interactions]
+        except Exception as e:
+            logger.error(f"Failed to store {len(references)} responses, keeping them inline: {e}")
+            return [dict(interaction) for interaction in interactions]
+
+        referenced = []
+        for interaction, digest in zip(interactions, digests):
+            document = {key: value for key, value in interaction.items() if digest is None or key != "response"}
+            if digest is not None:
+                document["response_hash"] = digest
+            referenced.append(document)
+        return referenced
+
+    def release(self, documents: Iterable[Dict[str, Any]]) -> int:
+        """
+        Drops the references of interactions removed from the interactions collection, e.g. archived
+        ones, and deletes the responses no interaction references any more. A response referenced again
+        meanwhile keeps a positive count, or is stored anew by its next reference.
+
+        Args:
+            documents (Iterable[Dict[str, Any]]): The removed interactions.
+
+        Returns:
+            int: The number of responses deleted.
+        """
+        references: Dict[str, int] = {}
+        for document in documents:
+            digest = document.get("response_hash")
+            if digest:
+                references[digest] = references.get(digest, 0) + 1
+        if not references:
+            return 0
+        # One update per distinct reference count, usually a single one for the whole batch
+        by_count: Dict[int, List[str]] = {}
+        for digest, count in references.items():
+            by_count.setdefault(count, []).append(digest)
+        for count, digests in by_count.items():
+            self._call(self.collection.update_many, {"_id": {"$in": digests}}, {"$inc": {"refs": -count}})
+        result = self._call(self.collection.delete_many, {"_id": {"$in": list(references)}, "refs": {"$lte": 0}})
+        return result.deleted_count
+
+    @staticmethod
+    def _unresolved(document: Dict[str, Any]) -> bool:
+        return document.get("response") is None and bool(document.get("response_hash"))
+
+    def resolve(self, documents: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        Fills in the `response` of referencing documents with one query for the whole page.
+        Documents whose response is missing from the store are left without one.
+
+        Args:
+            documents (List[Dict[str, Any]]): A page of interactions.
+
+        Returns:
+            List[Dict[str, Any]]: The same documents, updated in place.
+        """
+        hashes = {document["response_hash"] for document in documents if self._unresolved(document)}
+        if not hashes:
+            return documents
+        texts = {row["_id"]: row["text"] for row in self.collection.find({"_id": {"$in": list(hashes)}}, {"text": 1})}
+        missing = 0
+        for document in documents:
+            if self._unresolved(document):
+                if document["response_hash"] in texts:
+                    document["response"] = texts[document["response_hash"]]
+                else:
+                    missing += 1
+        if missing:
+            logger.warning(f"{missing} interactions reference responses missing from the store.")
+        return documents
+
+    def resolve_all(self, documents: Iterable[Dict[str, Any]]) -> Iterator[Dict[str, Any]]:
+        """
+        Resolves a stream of interactions (e.g. a cursor) page by page.
+        """
+        documents = iter(documents)
+        while True:
+            page = list(itertools.islice(documents, self.page_size))
+            if not page:
+                return
+            yield from self.resolve(page)
+
+    def migrate(self, interactions: Any, batch_size: int = 1000) -> Dict[str, int]:
+        """
+        Moves the inline responses of existing interactions into the store. Each batch upserts its
+        distinct responses first and then replaces the inline copies by references, so an interrupted
+        migration can simply be run again (the rerun may overcount `refs`, which only feeds `savings`).
+
+        Args:
+            interactions (Any): The interactions collection.
+            batch_size (int): Interactions converted per round of bulk writes.
+
+        Returns:
+            Dict[str, int]: The number of interactions scanned and converted, and the responses stored.
+        """
+        report = {"scanned": 0, "converted": 0, "responses_upserted": 0}
+        last_id = None
+        while True:
+            query = {"response": {"$type": "string"}}
+            if last_id is not None:
+                query["_id"] = {"$gt": last_id}
+            batch = list(interactions.find(query, {"response": 1}).sort("_id", 1).limit(batch_size))
+            if not batch:
+                break
+            last_id = batch[-1]["_id"]
+            report["scanned"] += len(batch)
+
+            references: Dict[str, List[Any]] = {}
+            texts: Dict[str, str] = {}
+            for document in batch:
+                text = document["response"]
+                if len(text.encode("utf-8")) < self.min_bytes:
+                    continue
+                digest = response_hash(text)
+                references.setdefault(digest, []).append(document["_id"])
+                texts[digest] = text
+            if not references:
+                continue
+
+            now = datetime.now(timezone.utc)
+            result = self.collection.bulk_write([
+                UpdateOne(
+                    {"_id": digest},
+                    {
+                        "$setOnInsert": {"text": texts[digest], "size": len(texts[digest].encode("utf-8")), "created_at": now},
+                        "$inc": {"refs": len(ids)},
+                    },
+                    upsert=True,
+                )
+                for digest, ids in references.items()
+            ], ordered=False)
+            report["responses_upserted"] += result.upserted_count
+            # Only documents still holding the same response are converted, in case one changed meanwhile
+            interactions.bulk_write([
+                UpdateOne({"_id": _id, "response": texts[digest]}, {"$set": {"response_hash": digest}, "$unset": {"response": ""}})
+                for digest, ids in references.items()
+                for _id in ids
+            ], ordered=False)
+            report["converted"] += sum(len(ids) for ids in references.values())
+            logger.info(f"Migrated {report['converted']} of {report['scanned']} scanned interactions.")
+        return report
+
+    def savings(self, interactions: Any) -> Dict[str, Any]:
+        """
+        Reports the storage saved by deduplication: the bytes the referenced responses would take
+        as inline copies against the bytes the store holds. Archived interactions no longer hold
+        references, so only the interactions in MongoDB are counted.
+
+        Args:
+            interactions (Any): The interactions collection.
+
+        Returns:
+            Dict[str, Any]: Document counts, logical and stored response bytes, and the savings.
+        """
+        totals = next(iter(self.collection.aggregate([
+            {"$group": {
+                "_id": None,
+                "responses": {"$sum": 1},
+                "stored_bytes": {"$sum": "$size"},
+                "logical_bytes": {"$sum": {"$multiply": ["$size", "$refs"]}},
+                "references": {"$sum": "$refs"},
+            }},
+        ])), {"responses": 0, "stored_bytes": 0, "logical_bytes": 0, "references": 0})
+        inline = interactions.count_documents({"response": {"$type": "string"}})
+        saved = totals["logical_bytes"] - totals["stored_bytes"]
+        return {
+            "interactions": interactions.estimated_document_count(),
+            "inline_responses": inline,
+            "referenced_responses": totals["references"],
+            "distinct_responses": totals["responses"],
+            "logical_bytes": totals["logical_bytes"],
+            "stored_bytes": totals["stored_bytes"],
+            "saved_bytes": saved,
+            "saved_ratio": round(saved / totals["logical_bytes"], 4) if totals["logical_bytes"] else 0.0,
+        }
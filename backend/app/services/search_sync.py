@@ -0,0 +1,303 @@
+from datetime import datetime, timedelta, timezone
+from typing import Any, Callable, Dict, List, Optional
+import os
+import socket
+import threading
+from pymongo.errors import DuplicateKeyError, OperationFailure
+from app.services.hybrid_search_service import HybridSearchService
+from app.services.interaction_archive import LOCKS_COLLECTION_NAME
+from app.services.response_store import ResponseStore
+from app.utils.logger import get_logger
+from app.constants import (
+    SEARCH_SYNC_MODE,
+    SEARCH_SYNC_BATCH_SIZE,
+    SEARCH_SYNC_MAX_WAIT_SECONDS,
+    SEARCH_SYNC_POLL_SECONDS,
+    SEARCH_SYNC_LEASE_SECONDS,
+)
+
+# Logger setup
+logger = get_logger("search_sync")
+
+CHANGE_STREAM = "change_stream"
+OUTBOX = "outbox"
+SYNC_STATE_COLLECTION_NAME = "sync_state"
+SYNC_ID = "elasticsearch"
+# Marks the interactions not yet indexed while the sync polls them (outbox mode)
+PENDING_FIELD = "es_pending"
+# MongoDB error code of a resume token that is no longer in the oplog
+CHANGE_STREAM_HISTORY_LOST = 286
+
+
+class SearchSync:
+    """
+    Keeps the Elasticsearch question-answer index in step with the interactions written to MongoDB.
+
+    On a replica set it tails the collection's change stream and bulk-indexes the inserted interactions,
+    saving the stream's resume token after each read, indexed batch or not; a reopened or restarted
+    stream continues from the token, so no interaction is skipped. Without change streams (a standalone server), interactions are
+    written with an `es_pending` marker, the outbox, and the sync polls the marked ones in batches,
+    clearing the marker once they are indexed. The marker is part of the interaction document, so it is
+    written atomically with it, which a separate outbox collection could not be without transactions.
+
+    Either way an interaction may be delivered twice after a crash, and is then indexed again under
+    the same id, which leaves a single copy. Only one worker syncs at a time, holding a lease in the
+    `locks` collection.
+    """
+
+    def __init__(
+        self,
+        collection: Any,
+        hybrid_search: HybridSearchService,
+        response_store: Optional[ResponseStore] = None,
+        mode: str = SEARCH_SYNC_MODE,
+        batch_size: int = SEARCH_SYNC_BATCH_SIZE,
+        max_wait_seconds: float = SEARCH_SYNC_MAX_WAIT_SECONDS,
+        poll_seconds: float = SEARCH_SYNC_POLL_SECONDS,
+        lease_seconds: float = SEARCH_SYNC_LEASE_SECONDS,
+        now: Callable[[], datetime] = lambda: datetime.now(timezone.utc),
+    ):
+        """
+        Initializes the sync.
+
+        Args:
+            collection (Any): The MongoDB interactions collection.
+            hybrid_search (HybridSearchService): The question-answer index.
+            response_store (Optional[ResponseStore]): Resolves responses stored by reference.
+            mode (str): "change_stream", "outbox", or "auto" to use change streams where the deployment supports them.
+            batch_size (int): Interactions indexed per bulk request.
+            max_wait_seconds (float): Longest a change stream read waits for more changes before a batch is indexed.
+            poll_seconds (float): Pause between outbox polls that found no backlog, and after failures.
+            lease_seconds (float): Duration of the lease the syncing worker holds.
+            now (Callable[[], datetime]): Current time source, replaceable in tests.
+        """
+        self.collection = collection
+        self.hybrid_search = hybrid_search
+        self.response_store = response_store
+        self.state = collection.database[SYNC_STATE_COLLECTION_NAME]
+        self.locks = collection.database[LOCKS_COLLECTION_NAME]
+        self.mode = None if mode == "auto" else mode
+        self.batch_size = batch_size
+        self.max_wait_seconds = max_wait_seconds
+        self.poll_seconds = poll_seconds
+        self.lease_seconds = lease_seconds
+        self.now = now
+        self.holder = f"{socket.gethostname()}:{os.getpid()}"
+        self.thread: Optional[threading.Thread] = None
+        self.stopping = threading.Event()
+        self.lock = threading.Lock()
+        self.leader = False
+        self.indexed = 0
+        self.rejected = 0
+        self.errors = 0
+        self.last_error: Optional[str] = None
+        # Creation time of the newest interaction indexed, and whether the source was drained since
+        self.indexed_until: Optional[datetime] = None
+        self.idle = False
+
+    def detect_mode(self) -> str:
+        """
+        Returns "change_stream" if the deployment supports change streams, "outbox" otherwise.
+        """
+        try:
+            with self.collection.watch(max_await_time_ms=1) as stream:
+                stream.try_next()
+            return CHANGE_STREAM
+        except Exception as e:
+            logger.info(f"Change streams are unavailable ({e}); indexing interactions through the outbox.")
+            return OUTBOX
+
+    def pending_marker(self) -> Dict[str, Any]:
+        """
+        Returns the fields to write into a new interaction so the sync indexes it.
+        """
+        return {PENDING_FIELD: True} if self.mode == OUTBOX else {}
+
+    def _acquire(self) -> bool:
+        """
+        Takes or renews the sync lease. Returns False while another worker holds it.
+        """
+        now = self.now()
+        try:
+            self.locks.update_one(
+                {"_id": SYNC_ID, "$or": [{"expires_at": {"$lt": now}}, {"holder": self.holder}]},
+                {"$set": {"holder": self.holder, "expires_at": now + timedelta(seconds=self.lease_seconds)}},
+                upsert=True,
+            )
+            return True
+        except DuplicateKeyError:
+            return False
+
+    def _release(self) -> None:
+        self.locks.delete_one({"_id": SYNC_ID, "holder": self.holder})
+
+    def _index(self, documents: List[Dict[str, Any]]) -> None:
+        """
+        Bulk-indexes a batch of interactions. Rejected documents are counted and skipped, since indexing
+        them again would fail again; failed requests raise, leaving the batch to be delivered again.
+        """
+        with self.lock:
+            self.idle = False
+        if self.response_store:
+            documents = self.response_store.resolve(documents)
+        indexed, errors = self.hybrid_search.bulk_index(documents)
+        if errors:
+            logger.warning(f"Elasticsearch rejected {len(errors)} interactions, e.g. {errors[0]}")
+        newest = max(document["_id"].generation_time for document in documents)
+        with self.lock:
+            self.indexed += indexed
+            self.rejected += len(errors)
+            self.indexed_until = max(self.indexed_until or newest, newest)
+
+    def poll(self) -> int:
+        """
+        Indexes the oldest batch of interactions marked as pending and clears their marker.
+
+        Returns:
+            int: The number of interactions indexed.
+        """
+        documents = list(self.collection.find({PENDING_FIELD: True}).sort("_id", 1).limit(self.batch_size))
+        if documents:
+            self._index(documents)
+            self.collection.update_many(
+                {"_id": {"$in": [document["_id"] for document in documents]}}, {"$unset": {PENDING_FIELD: ""}}
+            )
+        with self.lock:
+            self.idle = len(documents) < self.batch_size
+        return len(documents)
+
+    def tail(self, until: datetime) -> int:
+        """
+        Indexes the interactions inserted since the saved resume token, in batches, until `until`.
+
+        Args:
+            until (datetime): When to return, closing the stream, e.g. to renew the lease.
+
+        Returns:
+            int: The number of interactions indexed.
+        """
+        saved = (self.state.find_one({"_id": SYNC_ID}) or {}).get("resume_token")
+        total = 0
+        try:
+            with self.collection.watch(
+                [{"$match": {"operationType": "insert"}}],
+                resume_after=saved,
+                max_await_time_ms=int(self.max_wait_seconds * 1000),
+            ) as stream:
+                while not self.stopping.is_set() and self.now() < until:
+                    documents = []
+                    while len(documents) < self.batch_size:
+                        change = stream.try_next()
+                        if change is None:
+                            break
+                        documents.append(change["fullDocument"])
+                    if documents:
+                        self._index(documents)
+                        total += len(documents)
+                    # Save the token after empty reads too: it then holds the stream's position, so a stream
+                    # reopened after the lease renewal resumes where this one stopped instead of from now
+                    token = stream.resume_token
+                    if token is not None and token != saved:
+                        self.state.update_one({"_id": SYNC_ID}, {"$set": {"resume_token": token}}, upsert=True)
+                        saved = token
+                    with self.lock:
+                        self.idle = len(documents) < self.batch_size
+        except OperationFailure as e:
+            if e.code != CHANGE_STREAM_HISTORY_LOST:
+                raise
+            logger.error(
+                "The saved resume token is no longer in the oplog, so interactions may be missing from the index; "
+                "reindex them with `python -m tools.backfill --mongo --targets elasticsearch`. Continuing from now."
+            )
+            self.state.update_one({"_id": SYNC_ID}, {"$unset": {"resume_token": ""}})
+        return total
+
+    def _run(self) -> None:
+        while not self.stopping.is_set():
+            try:
+                leader = self._acquire()
+                with self.lock:
+                    self.leader = leader
+                if not leader:
+                    self.stopping.wait(self.poll_seconds)
+                elif self.mode == CHANGE_STREAM:
+                    # Return well before the lease expires to renew it
+                    self.tail(self.now() + timedelta(seconds=self.lease_seconds / 3))
+                elif self.poll() < self.batch_size:
+                    self.stopping.wait(self.poll_seconds)
+            except Exception as e:
+                logger.error(f"Search index sync failed, retrying: {e}")
+                with self.lock:
+                    self.errors += 1
+                    self.last_error = str(e)
+                self.stopping.wait(self.poll_seconds)
+        try:
+            self._release()
+        except Exception as e:
+            logger.error(f"Failed to release the search sync lease: {e}")
+
+    def start(self) -> bool:
+        """
+        Detects the mode if needed and syncs in a background thread.
+
+        Returns:
+            bool: False if the sync is already running.
+        """
+        if self.thread is not None and self.thread.is_alive():
+            return False
+        if self.mode is None:
+            self.mode = self.detect_mode()
+        if self.mode == OUTBOX:
+            try:
+                self.collection.create_index(PENDING_FIELD, partialFilterExpression={PENDING_FIELD: True})
+            except Exception as e:
+                logger.error(f"Failed to create the search sync outbox index: {e}")
+        self.stopping.clear()
+        self.thread = threading.Thread(target=self._run, name="search-sync", daemon=True)
+        self.thread.start()
+        logger.info(f"Syncing interactions to the search index by {self.mode}.")
+        return True
+
+    def stop(self, timeout: float = 5.0) -> None:
+        """
+        Stops the background sync and releases the lease.
+        """
+        self.stopping.set()
+        if self.thread is not None:
+            self.thread.join(timeout)
+
+    def lag_seconds(self) -> Optional[float]:
+        """
+        Returns how far the index trails MongoDB: 0 once the source was drained, otherwise the age of the
+        newest indexed interaction (None before the first batch).
+        """
+        with self.lock:
+            if self.idle:
+                return 0.0
+            if self.indexed_until is None:
+                return None
+            return round((self.now() - self.indexed_until).total_seconds(), 3)
+
+    def snapshot(self) -> Dict[str, Any]:
+        """
+        Returns the sync's mode, whether this worker holds the lease, its counters and the indexing lag.
+        """
+        lag = self.lag_seconds()
+        with self.lock:
+            snapshot = {
+                "mode": self.mode,
+                "running": self.thread is not None and self.thread.is_alive(),
+                "leader": self.leader,
+                "indexed": self.indexed,
+                "rejected": self.rejected,
+                "errors": self.errors,
+                "last_error": self.last_error,
+                "indexed_until": self.indexed_until.isoformat() if self.indexed_until else None,
+                "lag_seconds": lag,
+            }
+        if self.mode == OUTBOX:
+            try:
+                snapshot["pending"] = self.collection.count_documents({PENDING_FIELD: True})
+            except Exception as e:
+                logger.error(f"Failed to count the interactions pending indexing: {e}")
+        return snapshot
@@ -0,0 +1,292 @@
+from array import array
+from bisect import bisect_left, insort
+from typing import Any, Optional, Dict, Iterable, List, Tuple
+import heapq
+import threading
+from app.utils.logger import get_logger
+from app.constants import SUGGEST_MAX_PROMPTS, SUGGEST_MAX_PROMPT_CHARS, SUGGEST_DELTA_LIMIT
+
+# Logger setup
+logger = get_logger("suggestion_service")
+
+# Sorts after every character a prompt can contain, closing the range of keys sharing a prefix
+PREFIX_END = "\U0010ffff"
+# Cache keys of private prompts start with it; those prompts are never suggested to other users
+PRIVATE_KEY_PATTERN = "^user:"
+
+
+def prompt_counts(collection: Any) -> Iterable[Tuple[str, int]]:
+    """
+    Counts how often each prompt was asked, from the stored interactions, leaving out private prompts.
+
+    Args:
+        collection (Any): The MongoDB interactions collection.
+
+    Returns:
+        Iterable[Tuple[str, int]]: (prompt, count) pairs, to be passed to `SuggestionService.build`.
+    """
+    rows = collection.aggregate([
+        {"$match": {"cache_key": {"$not": {"$regex": PRIVATE_KEY_PATTERN}}}},
+        {"$group": {"_id": "$prompt", "count": {"$sum": 1}}},
+    ], allowDiskUse=True)
+    return ((row["_id"], row["count"]) for row in rows)
+
+
+def normalize(prompt: str) -> str:
+    """
+    Returns the lookup key of a prompt: lowercased, with runs of whitespace collapsed.
+    """
+    return " ".join(prompt.lower().split())
+
+
+class PrefixIndex:
+    """
+    An immutable-shape prefix index: prompts sorted by key, with a segment tree holding the
+    position of the most frequent prompt of every range. Counts can change in place.
+    """
+
+    def __init__(self, entries: List[Tuple[str, str, int]]):
+        """
+        Args:
+            entries (List[Tuple[str, str, int]]): (key, text, count) tuples sorted by key.
+        """
+        self.keys = [entry[0] for entry in entries]
+        self.texts = [entry[1] for entry in entries]
+        self.counts = array("I", (entry[2] for entry in entries))
+        self.size = len(entries)
+        self.tree = array("i", [-1]) * (2 * self.size)
+        for position in range(self.size):
+            self.tree[self.size + position] = position
+        for node in range(self.size - 1, 0, -1):
+            self.tree[node] = self._better(self.tree[2 * node], self.tree[2 * node + 1])
+
+    def _better(self, left: int, right: int) -> int:
+        if left < 0:
+            return right
+        if right < 0:
+            return left
+        return left if self.counts[left] >= self.counts[right] else right
+
+    def find(self, key: str) -> int:
+        """
+        Returns the position of `key`, or -1 if it is not indexed.
+        """
+        position = bisect_left(self.keys, key)
+        return position if position < self.size and self.keys[position] == key else -1
+
+    def increment(self, position: int) -> None:
+        self.counts[position] += 1
+        node = (position + self.size) // 2
+        while node:
+            self.tree[node] = self._better(self.tree[2 * node], self.tree[2 * node + 1])
+            node //= 2
+
+    def _range_best(self, low: int, high: int) -> int:
+        """
+        Returns the position of the most frequent prompt in [low, high), or -1 for an empty range.
+        """
+        best = -1
+        low += self.size
+        high += self.size
+        while low < high:
+            if low & 1:
+                best = self._better(best, self.tree[low])
+                low += 1
+            if high & 1:
+                high -= 1
+                best = self._better(best, self.tree[high])
+            low //= 2
+            high //= 2
+        return best
+
+    def top(self, prefix: str, limit: int) -> List[Tuple[int, str]]:
+        """
+        Returns up to `limit` (count, text) pairs for keys starting with `prefix`, most frequent first.
+        """
+        low = bisect_left(self.keys, prefix)
+        high = bisect_left(self.keys, prefix + PREFIX_END, low)
+        results = []
+        best = self._range_best(low, high)
+        heap = [(-self.counts[best], best, low, high)] if best >= 0 else []
+        while heap and len(results) < limit:
+            _, position, range_low, range_high = heapq.heappop(heap)
+            results.append((self.counts[position], self.texts[position]))
+            for sub_low, sub_high in ((range_low, position), (position + 1, range_high)):
+                sub_best = self._range_best(sub_low, sub_high)
+                if sub_best >= 0:
+                    heapq.heappush(heap, (-self.counts[sub_best], sub_best, sub_low, sub_high))
+        return results
+
+    def entries(self) -> Iterable[Tuple[str, str, int]]:
+        return zip(self.keys, self.texts, self.counts)
+
+
+class Delta:
+    """
+    A small sorted buffer of prompts not yet merged into the main index.
+    """
+
+    def __init__(self):
+        self.keys: List[str] = []
+        self.entries: Dict[str, List] = {}
+
+    def add(self, key: str, prompt: str) -> None:
+        self.entries[key] = [key if key == prompt else prompt, 1]
+        insort(self.keys, key)
+
+    def top(self, prefix: str) -> List[Tuple[int, str]]:
+        low = bisect_left(self.keys, prefix)
+        high = bisect_left(self.keys, prefix + PREFIX_END, low)
+        return [(self.entries[key][1], self.entries[key][0]) for key in self.keys[low:high]]
+
+
+class SuggestionService:
+    """
+    A service suggesting previously asked prompts by prefix, ranked by how often they were asked.
+    New prompts land in a small sorted delta that is merged into the main index in the background.
+    """
+    _instance: Optional["SuggestionService"] = None
+
+    def __new__(cls, *args, **kwargs):
+        """
+        Singleton implementation to ensure a single prefix index across the app.
+        """
+        if cls._instance is None:
+            cls._instance = super(SuggestionService, cls).__new__(cls)
+        return cls._instance
+
+    def __init__(self, max_prompts: int = SUGGEST_MAX_PROMPTS, delta_limit: int = SUGGEST_DELTA_LIMIT):
+        """
+        Initializes an empty index.
+
+        Args:
+            max_prompts (int): Maximum number of distinct prompts kept; the least frequent are dropped on merge.
+            delta_limit (int): Number of new prompts buffered before a background merge starts.
+        """
+        if not hasattr(self, "main"):  # Ensure initialization happens only once
+            self.max_prompts = max_prompts
+            self.delta_limit = delta_limit
+            self.main = PrefixIndex([])
+            self.delta = Delta()
+            self.frozen_delta = Delta()
+            self.replay: Optional[List[str]] = None
+            self.lock = threading.Lock()
+
+    def build(self, counts: Iterable[Tuple[str, int]]) -> int:
+        """
+        Replaces the index with prompts and their frequencies, e.g. aggregated from MongoDB at startup.
+
+        Args:
+            counts (Iterable[Tuple[str, int]]): (prompt, count) pairs.
+
+        Returns:
+            int: The number of distinct prompts indexed.
+        """
+        merged: Dict[str, List] = {}
+        for prompt, count in counts:
+            if not isinstance(prompt, str) or len(prompt) > SUGGEST_MAX_PROMPT_CHARS:
+                continue
+            key = normalize(prompt)
+            if key:
+                # Share the key string when the prompt is already normalized
+                merged.setdefault(key, [key if key == prompt else prompt, 0])[1] += count
+        main = self._make_index(merged)
+        with self.lock:
+            self.main = main
+            self.delta = Delta()
+        logger.info(f"Suggestion index built with {main.size} prompts.")
+        return main.size
+
+    def _make_index(self, entries: Dict[str, List]) -> PrefixIndex:
+        if len(entries) > self.max_prompts:
+            kept = heapq.nlargest(self.max_prompts, entries.items(), key=lambda item: item[1][1])
+            entries = dict(kept)
+        return PrefixIndex([(key, text, count) for key, (text, count) in sorted(entries.items())])
+
+    def add(self, prompt: str) -> None:
+        """
+        Records that a prompt was asked.
+
+        Args:
+            prompt (str): The prompt.
+        """
+        if len(prompt) > SUGGEST_MAX_PROMPT_CHARS:
+            return
+        key = normalize(prompt)
+        if not key:
+            return
+        with self.lock:
+            if self.replay is not None:
+                self.replay.append(key)
+            position = self.main.find(key)
+            if position >= 0:
+                self.main.increment(position)
+            elif key in self.frozen_delta.entries:
+                self.frozen_delta.entries[key][1] += 1
+            elif key in self.delta.entries:
+                self.delta.entries[key][1] += 1
+            else:
+                self.delta.add(key, prompt)
+            if len(self.delta.entries) >= self.delta_limit and self.replay is None:
+                self._start_merge()
+
+    def _start_merge(self) -> None:
+        """
+        Freezes the delta and merges it into a new main index on a background thread.
+        Must be called with the lock held.
+        """
+        old_main = self.main
+        snapshot = {key: [text, count] for key, text, count in old_main.entries()}
+        for key, (text, count) in self.delta.entries.items():
+            snapshot[key] = [text, count]
+        self.frozen_delta = self.delta
+        self.delta = Delta()
+        self.replay = []
+        threading.Thread(target=self._merge, args=(snapshot,), daemon=True).start()
+
+    def _merge(self, snapshot: Dict[str, List]) -> None:
+        try:
+            main = self._make_index(snapshot)
+            with self.lock:
+                # Apply the prompts asked while the new index was being built
+                for key in self.replay:
+                    position = main.find(key)
+                    if position >= 0:
+                        main.increment(position)
+                self.main = main
+                self.frozen_delta = Delta()
+                self.replay = None
+            logger.info(f"Suggestion index merged, now holding {main.size} prompts.")
+        except Exception as e:
+            logger.error(f"Failed to merge the suggestion index: {e}")
+            with self.lock:
+                self.replay = None
+
+    def suggest(self, prefix: str, limit: int = 10) -> List[Dict[str, object]]:
+        """
+        Returns the most frequently asked prompts starting with `prefix`.
+
+        Args:
+            prefix (str): The typed prefix.
+            limit (int): The maximum number of suggestions.
+
+        Returns:
+            List[Dict[str, object]]: Suggestions with their prompt and count, most frequent first.
+        """
+        key = normalize(prefix)
+        if prefix[-1:].isspace() and key:
+            key += " "
+        if not key:
+            return []
+
+        candidates = self.main.top(key, limit) + self.frozen_delta.top(key) + self.delta.top(key)
+        best = heapq.nlargest(limit, candidates, key=lambda candidate: candidate[0])
+        return [{"prompt": text, "count": count} for count, text in best]
+
+
+# Singleton getter
+def get_suggestion_service() -> SuggestionService:
+    """
+    Returns a singleton instance of SuggestionService.
+    """
+    return SuggestionService()
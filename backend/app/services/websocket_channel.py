@@ -0,0 +1,196 @@
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+import asyncio
+import threading
+import orjson
+from starlette.exceptions import HTTPException
+from starlette.websockets import WebSocket
+from app.services.llm_scheduler import CallCancelledError
+from app.utils.logger import get_logger
+from app.constants import WS_MAX_IN_FLIGHT, WS_SEND_QUEUE_SIZE
+
+# Logger setup
+logger = get_logger("websocket_channel")
+
+
+class ChannelRequest:
+    """
+    One request multiplexed over a channel: its id, its message, and the means to answer and cancel it.
+    """
+
+    def __init__(self, channel: "WebSocketChannel", request_id: str, message: Dict[str, Any]):
+        self.channel = channel
+        self.id = request_id
+        self.message = message
+        # Checked by work running in threads, e.g. a streaming LLM call, which task cancellation cannot reach
+        self.cancelled = threading.Event()
+
+    async def send(self, message_type: str, **fields: Any) -> None:
+        """
+        Sends a message tagged with the request's id, waiting while the connection's outbox is full.
+        """
+        await self.channel.send({"id": self.id, "type": message_type, **fields})
+
+    def send_threadsafe(self, message_type: str, **fields: Any) -> None:
+        """
+        Sends a message from a worker thread, blocking it while the outbox is full.
+
+        Raises:
+            CallCancelledError: If the request was cancelled, so the worker stops producing.
+        """
+        if self.cancelled.is_set():
+            raise CallCancelledError(f"Request {self.id} was cancelled.")
+        asyncio.run_coroutine_threadsafe(self.send(message_type, **fields), self.channel.loop).result()
+
+
+Handler = Callable[[ChannelRequest], Awaitable[Any]]
+
+
+class WebSocketChannel:
+    """
+    Multiplexes concurrent requests over one WebSocket connection.
+
+    Clients send JSON messages `{"id": ..., "type": ..., ...}`; each type is served by a handler running
+    as its own task, so a slow request never holds up the others. Handlers answer with any number of
+    messages tagged with the request's id (e.g. `delta` pieces of a streamed response) and finish with
+    `done`, `error` or `cancelled`. `{"id": ..., "type": "cancel"}` cancels a request in flight.
+
+    Backpressure is per connection: at most `max_in_flight` requests run at once, further ones are
+    rejected with status 429, and outgoing messages pass through a bounded outbox, so a client reading
+    slowly pauses its own producers (down to the LLM stream) instead of buffering without bound.
+    """
+
+    def __init__(
+        self,
+        websocket: WebSocket,
+        handlers: Dict[str, Handler],
+        context: Optional[Dict[str, Any]] = None,
+        max_in_flight: int = WS_MAX_IN_FLIGHT,
+        send_queue_size: int = WS_SEND_QUEUE_SIZE,
+    ):
+        """
+        Initializes the channel of an accepted WebSocket connection.
+
+        Args:
+            websocket (WebSocket): The accepted connection.
+            handlers (Dict[str, Handler]): Request handlers by message type.
+            context (Optional[Dict[str, Any]]): Connection-wide values handlers read, e.g. the calling user.
+            max_in_flight (int): Maximum number of requests running at once on the connection.
+            send_queue_size (int): Maximum number of outgoing messages buffered for the connection.
+        """
+        self.websocket = websocket
+        self.handlers = handlers
+        self.context = context or {}
+        self.max_in_flight = max_in_flight
+        self.outbox: asyncio.Queue = asyncio.Queue(maxsize=send_queue_size)
+        self.requests: Dict[str, Tuple[ChannelRequest, asyncio.Task]] = {}
+        self.loop: Optional[asyncio.AbstractEventLoop] = None
+        self.closed = False
+
+    async def send(self, message: Dict[str, Any]) -> None:
+        """
+        Queues a message for the client, waiting while the outbox is full.
+        """
+        await self.outbox.put(message)
+
+    async def _write(self) -> None:
+        """
+        Sends the queued messages in order. Once the connection is closed, messages are discarded,
+        so producers never wait on a client that is gone.
+        """
+        while True:
+            message = await self.outbox.get()
+            if message is None:
+                return
+            if self.closed:
+                continue
+            try:
+                await self.websocket.send_text(orjson.dumps(message).decode("utf-8"))
+            except Exception as e:
+                logger.info(f"WebSocket send failed, closing the channel: {e}")
+                self._close()
+
+    def _close(self) -> None:
+        self.closed = True
+        for request_id in list(self.requests):
+            self.cancel(request_id)
+
+    def cancel(self, request_id: str) -> bool:
+        """
+        Cancels a request in flight: its task, and through its `cancelled` event the work it runs in threads.
+
+        Returns:
+            bool: False if no request with this id is in flight.
+        """
+        entry = self.requests.get(request_id)
+        if entry is None:
+            return False
+        request, task = entry
+        request.cancelled.set()
+        task.cancel()
+        return True
+
+    async def _run(self, handler: Handler, request: ChannelRequest) -> None:
+        try:
+            result = await handler(request)
+            await request.send("done", data=result)
+        except (asyncio.CancelledError, CallCancelledError):
+            await request.send("cancelled")
+        except HTTPException as e:
+            await request.send("error", status=e.status_code, detail=e.detail)
+        except Exception as e:
+            logger.error(f"WebSocket request {request.id} failed: {e}", exc_info=True)
+            await request.send("error", status=500, detail=f"Error processing request: {str(e)}")
+        finally:
+            self.requests.pop(request.id, None)
+
+    async def _dispatch(self, message: Any) -> None:
+        """
+        Starts, cancels or rejects the request of one client message.
+        """
+        request_id = message.get("id") if isinstance(message, dict) else None
+        if not isinstance(request_id, str) or not request_id:
+            await self.send({"id": request_id, "type": "error", "status": 400, "detail": "Messages need a string `id`."})
+            return
+        message_type = message.get("type")
+        if message_type == "cancel":
+            if not self.cancel(request_id):
+                await self.send({"id": request_id, "type": "error", "status": 404, "detail": "No such request in flight."})
+            return
+        handler = self.handlers.get(message_type)
+        if handler is None:
+            detail = f"Unknown type {message_type!r}; expected one of {', '.join(sorted(self.handlers))} or cancel."
+            await self.send({"id": request_id, "type": "error", "status": 400, "detail": detail})
+        elif request_id in self.requests:
+            await self.send({"id": request_id, "type": "error", "status": 409, "detail": "A request with this id is in flight."})
+        elif len(self.requests) >= self.max_in_flight:
+            await self.send({
+                "id": request_id, "type": "error", "status": 429,
+                "detail": f"{self.max_in_flight} requests are in flight on this connection; send it once one finishes.",
+            })
+        else:
+            request = ChannelRequest(self, request_id, message)
+            self.requests[request_id] = (request, asyncio.create_task(self._run(handler, request)))
+
+    async def serve(self) -> None:
+        """
+        Serves the connection until the client disconnects, then cancels its requests in flight.
+        """
+        self.loop = asyncio.get_running_loop()
+        writer = asyncio.create_task(self._write())
+        try:
+            while True:
+                received = await self.websocket.receive()
+                if received["type"] == "websocket.disconnect":
+                    break
+                try:
+                    message = orjson.loads(received.get("text") or received.get("bytes") or b"")
+                except orjson.JSONDecodeError:
+                    await self.send({"id": None, "type": "error", "status": 400, "detail": "Messages must be JSON objects."})
+                    continue
+                await self._dispatch(message)
+        finally:
+            self._close()
+            tasks = [task for _, task in self.requests.values()]
+            await asyncio.gather(*tasks, return_exceptions=True)
+            await self.outbox.put(None)
+            await writer
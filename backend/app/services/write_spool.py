@@ -0,0 +1,140 @@
+from collections import deque
+from typing import Any, Deque, Dict, Optional
+import threading
+import time
+from app.services.circuit_breaker import CircuitBreaker, CircuitOpenError
+from app.utils.logger import get_logger
+from app.constants import MONGO_SPOOL_MAX_DOCUMENTS, MONGO_SPOOL_RETRY_SECONDS
+
+# Logger setup
+logger = get_logger("write_spool")
+
+# Documents written per insert_many when the spool is drained
+FLUSH_BATCH_SIZE = 500
+
+
+class WriteSpool:
+    """
+    Inserts documents into a MongoDB collection, holding them in memory while the collection's
+    circuit is open. A background thread replays them, in order, once it accepts writes again;
+    documents inserted meanwhile queue up behind them.
+    The spool lives in the worker's memory: it bridges outages, it is not a durable queue, and a write
+    that timed out after reaching the server may be stored twice.
+    """
+
+    def __init__(
+        self,
+        collection: Any,
+        breaker: CircuitBreaker,
+        max_documents: int = MONGO_SPOOL_MAX_DOCUMENTS,
+        retry_seconds: float = MONGO_SPOOL_RETRY_SECONDS,
+    ):
+        """
+        Initializes the spool.
+
+        Args:
+            collection (Any): The MongoDB collection written to.
+            breaker (CircuitBreaker): The breaker of the MongoDB dependency.
+            max_documents (int): Maximum number of spooled documents; the oldest are dropped beyond it.
+            retry_seconds (float): Pause of the replay thread between attempts to write the spool.
+        """
+        self.collection = collection
+        self.breaker = breaker
+        self.max_documents = max_documents
+        self.pending: Deque[Dict[str, Any]] = deque()
+        self.retry_seconds = retry_seconds
+        self.dropped = 0
+        self.thread: Optional[threading.Thread] = None
+        self.lock = threading.Lock()
+        # Serializes flushes, which write outside `lock` so inserts are not held up by them
+        self.flush_lock = threading.Lock()
+
+    def _spool(self, document: Dict[str, Any]) -> None:
+        """
+        Appends a document to the spool and starts the replay thread if it is not running.
+        Must be called with the lock held.
+        """
+        if len(self.pending) >= self.max_documents:
+            self.pending.popleft()
+            self.dropped += 1
+        self.pending.append(document)
+        if self.thread is None:
+            self.thread = threading.Thread(target=self._replay, name="mongodb-spool", daemon=True)
+            self.thread.start()
+
+    def _replay(self) -> None:
+        """
+        Flushes the spool until it is empty, pausing between attempts while MongoDB is unavailable.
+        """
+        while True:
+            self.flush()
+            with self.lock:
+                if not self.pending:
+                    self.thread = None
+                    return
+            time.sleep(self.retry_seconds)
+
+    def flush(self) -> int:
+        """
+        Writes spooled documents while the circuit allows it.
+
+        Returns:
+            int: The number of documents written.
+        """
+        written = 0
+        with self.flush_lock:
+            while True:
+                with self.lock:
+                    batch = [dict(self.pending[position]) for position in range(min(FLUSH_BATCH_SIZE, len(self.pending)))]
+                    dropped = self.dropped
+                if not batch:
+                    break
+                try:
+                    self.breaker.call(self.collection.insert_many, batch, ordered=True)
+                except Exception as e:
+                    if not isinstance(e, CircuitOpenError):
+                        logger.error(f"Failed to flush {len(self.pending)} spooled documents: {e}")
+                    break
+                with self.lock:
+                    # Documents of the batch dropped for space while it was written are already gone
+                    for _ in range(max(0, len(batch) - (self.dropped - dropped))):
+                        self.pending.popleft()
+                written += len(batch)
+        if written:
+            logger.info(f"Flushed {written} spooled documents to MongoDB.")
+        return written
+
+    def insert(self, document: Dict[str, Any]) -> bool:
+        """
+        Inserts a document, spooling it if MongoDB is unavailable or earlier documents are still spooled.
+
+        Args:
+            document (Dict[str, Any]): The document.
+
+        Returns:
+            bool: True if the document was written now, False if it was spooled.
+        """
+        with self.lock:
+            # Keep insertion order: while documents are spooled, new ones queue up behind them
+            if self.pending:
+                self._spool(document)
+                return False
+        try:
+            # Insert a copy: pymongo adds `_id` to the document it is given, which would make the
+            # spooled document collide with itself if the failed insert did reach the server
+            self.breaker.call(self.collection.insert_one, dict(document))
+            return True
+        except CircuitOpenError:
+            pass
+        except Exception as e:
+            logger.error(f"Failed to save document to MongoDB, spooling it: {e}")
+        with self.lock:
+            self._spool(document)
+        return False
+
+    def snapshot(self) -> Dict[str, int]:
+        """
+        Returns the number of spooled and dropped documents.
+        """
+        with self.lock:
+            return {"spooled": len(self.pending), "dropped": self.dropped}
@@ -1,15 +1,11 @@
-import logging
 from pymongo import MongoClient
 from pymongo.errors import ConnectionFailure, OperationFailure
 from typing import Optional
 import os
+from app.utils.logger import get_logger
 
 # Logging setup
-logger = logging.getLogger("database")
-logger.setLevel(logging.INFO)
-handler = logging.StreamHandler()
-handler.setFormatter(logging.Formatter("%(asctime)s - %(name)s - %(levelname)s - %(message)s"))
-logger.addHandler(handler)
+logger = get_logger("database")
 
 
 class DatabaseService:
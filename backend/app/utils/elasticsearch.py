@@ -1,15 +1,11 @@
 from elasticsearch import Elasticsearch
 from elasticsearch.exceptions import ConnectionError, AuthenticationException, TransportError
 from typing import Optional
-import logging
 import os
+from app.utils.logger import get_logger
 
 # Logger setup
-logger = logging.getLogger("elasticsearch")
-logger.setLevel(logging.INFO)
-handler = logging.StreamHandler()
-handler.setFormatter(logging.Formatter("%(asctime)s - %(name)s - %(levelname)s - %(message)s"))
-logger.addHandler(handler)
+logger = get_logger("elasticsearch")
 
 
 class ElasticsearchService:
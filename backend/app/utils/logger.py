@@ -0,0 +1,151 @@
+import atexit
+import logging
+import queue
+import random
+import sys
+from logging.handlers import QueueHandler, QueueListener
+from typing import Any, Dict, Optional
+
+from app.constants import (
+    LOG_LEVEL,
+    LOG_PAYLOAD_PREVIEW_CHARS,
+    LOG_QUEUE_SIZE,
+    LOG_SAMPLE_RATES,
+    LOGGING_DATE_FORMAT,
+    LOGGING_FORMAT,
+)
+
+
+class DroppingQueueHandler(QueueHandler):
+    """
+    A QueueHandler that never blocks the caller.
+    When the queue is full the record is dropped and counted instead of raising.
+    """
+
+    def __init__(self, log_queue: queue.Queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+class SamplingFilter(logging.Filter):
+    """
+    Keeps only a fraction of the INFO/DEBUG records for the configured loggers.
+    WARNING and above always pass.
+    """
+
+    def __init__(self, rates: Optional[Dict[str, float]] = None):
+        super().__init__()
+        self.rates = rates or {}
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno >= logging.WARNING:
+            return True
+        rate = self.rates.get(record.name)
+        if rate is None or rate >= 1.0:
+            return True
+        return random.random() < rate
+
+
+class LoggingPipeline:
+    """
+    Owns the bounded queue and the background listener that writes log records to stderr.
+    """
+    _instance: Optional["LoggingPipeline"] = None
+
+    def __new__(cls, *args, **kwargs):
+        """
+        Singleton implementation to ensure logging is configured only once.
+        """
+        if cls._instance is None:
+            cls._instance = super(LoggingPipeline, cls).__new__(cls)
+        return cls._instance
+
+    def __init__(self, level: str = LOG_LEVEL, queue_size: int = LOG_QUEUE_SIZE, stream=None):
+        """
+        Configures the root logger with a non-blocking queue handler.
+
+        Args:
+            level (str): The root log level. Default is the `LOG_LEVEL` env variable.
+            queue_size (int): Maximum number of pending records before new ones are dropped.
+            stream: The stream the background writer outputs to. Defaults to stderr.
+        """
+        if hasattr(self, "listener"):  # Ensure initialization happens only once
+            return
+
+        self.queue: queue.Queue = queue.Queue(maxsize=queue_size)
+        self.queue_handler = DroppingQueueHandler(self.queue)
+        self.queue_handler.addFilter(SamplingFilter(parse_sample_rates(LOG_SAMPLE_RATES)))
+
+        stream_handler = logging.StreamHandler(stream or sys.stderr)
+        stream_handler.setFormatter(logging.Formatter(LOGGING_FORMAT, LOGGING_DATE_FORMAT))
+        self.listener = QueueListener(self.queue, stream_handler, respect_handler_level=True)
+
+        root = logging.getLogger()
+        root.setLevel(level)
+        root.addHandler(self.queue_handler)
+        self.listener.start()
+        self.running = True
+        atexit.register(self.stop)
+
+    def stop(self) -> None:
+        """
+        Flushes pending records and stops the background writer.
+        """
+        if self.running:
+            self.listener.stop()
+            self.running = False
+
+
+def parse_sample_rates(raw: str) -> Dict[str, float]:
+    """
+    Parses a `name=rate,name=rate` string into a per-logger sampling map.
+
+    Args:
+        raw (str): The raw configuration string.
+
+    Returns:
+        Dict[str, float]: Logger names mapped to the fraction of records to keep.
+    """
+    rates = {}
+    for item in raw.split(","):
+        name, _, rate = item.partition("=")
+        if name.strip() and rate.strip():
+            rates[name.strip()] = float(rate)
+    return rates
+
+
+def preview(value: Any, limit: int = LOG_PAYLOAD_PREVIEW_CHARS) -> str:
+    """
+    Returns a size-capped representation of a payload for log messages.
+
+    Args:
+        value (Any): The payload to log.
+        limit (int): Maximum number of characters to keep.
+
+    Returns:
+        str: The payload, truncated with a note of how many characters were cut.
+    """
+    text = value if isinstance(value, str) else str(value)
+    if len(text) <= limit:
+        return text
+    return f"{text[:limit]}...(+{len(text) - limit} chars)"
+
+
+def get_logger(name: str) -> logging.Logger:
+    """
+    Returns a named logger that writes through the shared logging pipeline.
+
+    Args:
+        name (str): The logger name.
+
+    Returns:
+        logging.Logger: The logger instance.
+    """
+    LoggingPipeline()
+    return logging.getLogger(name)
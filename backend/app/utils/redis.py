@@ -1,14 +1,10 @@
 import redis
-import logging
 import os
 from typing import Optional
+from app.utils.logger import get_logger
 
 # Logger setup
-logger = logging.getLogger("redis_client")
-logger.setLevel(logging.INFO)
-handler = logging.StreamHandler()
-handler.setFormatter(logging.Formatter("%(asctime)s - %(name)s - %(levelname)s - %(message)s"))
-logger.addHandler(handler)
+logger = get_logger("redis_client")
 
 
 class RedisClient:
@@ -0,0 +1,45 @@
+from typing import Any, Dict, Iterable, List, Sequence
+import orjson
+from fastapi.responses import Response
+from app.utils.logger import get_logger
+
+# Logger setup
+logger = get_logger("responses")
+
+HISTORY_FIELDS = ("prompt", "response")
+
+
+class ORJSONResponse(Response):
+    """
+    A JSON response rendered with orjson.
+    Returning it from an endpoint bypasses the `response_model` validation round trip.
+    """
+    media_type = "application/json"
+
+    def render(self, content: Any) -> bytes:
+        return orjson.dumps(content)
+
+
+def history_rows(documents: Iterable[Dict[str, Any]], fields: Sequence[str] = HISTORY_FIELDS) -> List[Dict[str, Any]]:
+    """
+    Converts raw MongoDB or Elasticsearch `_source` documents into history rows.
+    Only the requested fields are kept, and rows where one of them is not a string are skipped.
+
+    Args:
+        documents (Iterable[Dict[str, Any]]): The raw documents.
+        fields (Sequence[str]): The fields every row must carry. Default is prompt and response.
+
+    Returns:
+        List[Dict[str, Any]]: Rows ready to be serialized.
+    """
+    rows = []
+    skipped = 0
+    for document in documents:
+        row = {field: document.get(field) for field in fields}
+        if all(type(value) is str for value in row.values()):
+            rows.append(row)
+        else:
+            skipped += 1
+    if skipped:
+        logger.warning(f"Skipped {skipped} malformed history rows.")
+    return rows
@@ -0,0 +1,153 @@
+from typing import Callable, List, Optional, Tuple
+import math
+import re
+from app.utils.logger import get_logger
+from app.constants import TOKEN_COUNTER
+
+# Logger setup
+logger = get_logger("tokens")
+
+# Mirrors the pre-tokenizer of OpenAI's BPE encodings: letter runs (with one leading space), digit groups,
+# symbols and whitespace runs
+PIECE_PATTERN = re.compile(r" ?[^\W\d_]+|\d{1,3}|\s+|[^\w\s]|_")
+IDENTIFIER_PATTERN = re.compile(r"[A-Za-z_][A-Za-z0-9_]{2,}")
+
+# Blocks longer than this are split, so one huge block cannot crowd out everything else
+MAX_BLOCK_LINES = 40
+
+# Letters per token assumed for word pieces. Real encodings fit most English words and common
+# identifiers in one token, so the approximation errs on the high side, which is the safe side for a budget.
+CHARS_PER_WORD_TOKEN = 6
+
+
+def approximate_tokens(text: str) -> int:
+    """
+    Estimates the token count of a text without a tokenizer vocabulary.
+
+    Args:
+        text (str): The text.
+
+    Returns:
+        int: The estimated token count, usually slightly above the real one.
+    """
+    count = 0
+    for piece in PIECE_PATTERN.findall(text):
+        word = piece.lstrip(" ")
+        count += math.ceil(len(word) / CHARS_PER_WORD_TOKEN) if word[:1].isalpha() else 1
+    return count
+
+
+def _load_counter() -> Callable[[str], int]:
+    """
+    Returns the configured token counter. `tiktoken` needs its encoding file available offline,
+    e.g. in `TIKTOKEN_CACHE_DIR`; if it cannot be loaded the approximation is used instead.
+    """
+    if TOKEN_COUNTER == "tiktoken":
+        try:
+            import tiktoken
+
+            encoding = tiktoken.get_encoding("o200k_base")
+            logger.info("Counting tokens with tiktoken (o200k_base).")
+            return lambda text: len(encoding.encode(text, disallowed_special=()))
+        except Exception as e:
+            logger.error(f"Failed to load the tiktoken encoding, falling back to the approximation: {e}")
+    return approximate_tokens
+
+
+_counter: Optional[Callable[[str], int]] = None
+
+
+def count_tokens(text: str) -> int:
+    """
+    Counts the tokens of a text with the configured counter.
+
+    Args:
+        text (str): The text.
+
+    Returns:
+        int: The token count.
+    """
+    global _counter
+    if _counter is None:
+        _counter = _load_counter()
+    return _counter(text)
+
+
+def _blocks(lines: List[str]) -> List[Tuple[int, int]]:
+    """
+    Splits code into blocks separated by blank lines, as (start, end) line ranges of at most MAX_BLOCK_LINES.
+    """
+    blocks = []
+    start = None
+    for number, line in enumerate(lines):
+        if line.strip():
+            if start is None:
+                start = number
+            elif number - start == MAX_BLOCK_LINES:
+                blocks.append((start, number))
+                start = number
+        elif start is not None:
+            blocks.append((start, number))
+            start = None
+    if start is not None:
+        blocks.append((start, len(lines)))
+    return blocks
+
+
+def trim_code(code: str, budget: int, question: str = "") -> Tuple[str, int]:
+    """
+    Trims code to a token budget, keeping whole blank-line separated blocks by priority:
+    blocks mentioning identifiers from the question first (ignoring words found in most blocks), then the first block (imports,
+    class header), then the remaining blocks from the top of the file. Kept blocks stay in
+    file order and every gap is marked with an omission comment.
+
+    Args:
+        code (str): The code context.
+        budget (int): The maximum number of tokens of the returned code.
+        question (str): The user's question, whose identifiers mark the most relevant blocks.
+
+    Returns:
+        Tuple[str, int]: The trimmed code and the number of omitted lines.
+    """
+    if count_tokens(code) <= budget:
+        return code, 0
+
+    lines = code.splitlines()
+    blocks = _blocks(lines)
+    identifiers = [set(IDENTIFIER_PATTERN.findall("\n".join(lines[start:end]))) for start, end in blocks]
+    mentioned = {
+        word for word in IDENTIFIER_PATTERN.findall(question)
+        if sum(word in block for block in identifiers) <= len(blocks) // 2
+    }
+
+    def priority(position: int) -> Tuple[int, int]:
+        return (0 if mentioned & identifiers[position] else 1 if position == 0 else 2, position)
+
+    marker_tokens = count_tokens("// ... 0000 lines omitted ...\n")
+    kept = set()
+    used = 0
+    for position in sorted(range(len(blocks)), key=priority):
+        start, end = blocks[position]
+        cost = count_tokens("\n".join(lines[start:end])) + 1 + marker_tokens
+        if used + cost <= budget:
+            kept.add(position)
+            used += cost
+
+    output = []
+    omitted = 0
+    cursor = 0
+    for position in sorted(kept):
+        start, end = blocks[position]
+        if start > cursor:
+            gap = lines[cursor:start]
+            if any(line.strip() for line in gap):
+                omitted += len(gap)
+                output.append(f"// ... {len(gap)} lines omitted ...")
+            else:
+                output.extend(gap)
+        output.extend(lines[start:end])
+        cursor = end
+    if any(line.strip() for line in lines[cursor:]):
+        omitted += len(lines) - cursor
+        output.append(f"// ... {len(lines) - cursor} lines omitted ...")
+    return "\n".join(output), omitted
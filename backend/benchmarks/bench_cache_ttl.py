@@ -0,0 +1,154 @@
+"""
+Replays a cache access trace against fixed and adaptive TTLs and reports hit ratio and memory.
+
+The default trace is synthetic: Zipf-distributed prompts whose popular set drifts every few hours,
+with log-normal response sizes. A recorded trace can be replayed instead: a JSONL file with one
+access per line, `{"prompt": ..., "response": ..., "ts": <epoch seconds>}` (`response` and `ts` optional),
+e.g. exported from the interactions collection.
+
+Usage:
+    python -m benchmarks.bench_cache_ttl [accesses | trace.jsonl] [memory_budget_mb]
+"""
+import bisect
+import heapq
+import itertools
+import random
+import sys
+from typing import Iterator, List, Optional, Tuple
+
+import orjson
+
+from app.services.adaptive_ttl import AdaptiveTTL
+
+# Per-entry overhead of a Redis string key, roughly
+KEY_OVERHEAD_BYTES = 100
+# Simulated seconds between memory samples
+SAMPLE_SECONDS = 60
+
+Access = Tuple[float, str, int]
+
+
+def synthetic_trace(accesses: int, keys: int = 50_000, per_second: float = 2.0) -> Iterator[Access]:
+    """
+    Yields (time, key, size) accesses: Zipf(1.1) popularity over `keys` prompts, with a popular set
+    that drifts by 10% every 6 hours.
+    """
+    random.seed(7)
+    weights = [1 / rank ** 1.1 for rank in range(1, keys + 1)]
+    cumulative = list(itertools.accumulate(weights))
+    sizes = [int(min(64_000, random.lognormvariate(7.6, 1.0))) for _ in range(keys)]
+    now = 0.0
+    for _ in range(accesses):
+        now += random.expovariate(per_second)
+        shift = int(now // (6 * 3600)) * keys // 10
+        rank = bisect.bisect_left(cumulative, random.random() * cumulative[-1])
+        key = (rank + shift) % keys
+        yield now, f"prompt:{key}", sizes[key]
+
+
+def recorded_trace(path: str) -> Iterator[Access]:
+    """
+    Yields (time, key, size) accesses from a JSONL trace, spacing accesses without a timestamp 1 s apart.
+    """
+    now = 0.0
+    start: Optional[float] = None
+    with open(path, "rb") as trace:
+        for line in trace:
+            if not line.strip():
+                continue
+            record = orjson.loads(line)
+            if "ts" in record:
+                start = record["ts"] if start is None else start
+                now = record["ts"] - start
+            else:
+                now += 1.0
+            size = len(record.get("response", "").encode("utf-8")) or 2000
+            yield now, record["prompt"], size
+
+
+def replay(trace: List[Access], policy: AdaptiveTTL) -> dict:
+    """
+    Replays a trace against a simulated cache with lazy expiry, using `policy` for TTLs.
+    """
+    clock = [0.0]
+    policy.clock = lambda: clock[0]
+    entries = {}  # key -> (expires_at, size)
+    expiries: List[Tuple[float, str]] = []
+    live_bytes = [0]
+    policy.memory_usage = lambda: live_bytes[0]
+
+    def expire(now: float) -> None:
+        while expiries and expiries[0][0] <= now:
+            expires_at, key = heapq.heappop(expiries)
+            entry = entries.get(key)
+            if entry and entry[0] == expires_at:
+                del entries[key]
+                live_bytes[0] -= entry[1] + KEY_OVERHEAD_BYTES
+
+    def store(key: str, size: int, ttl: int, now: float) -> None:
+        previous = entries.get(key)
+        if previous:
+            live_bytes[0] -= previous[1] + KEY_OVERHEAD_BYTES
+        entries[key] = (now + ttl, size)
+        live_bytes[0] += size + KEY_OVERHEAD_BYTES
+        heapq.heappush(expiries, (now + ttl, key))
+
+    hits = 0
+    samples = []
+    next_sample = 0.0
+    for now, key, size in trace:
+        clock[0] = now
+        expire(now)
+        while now >= next_sample:
+            samples.append(live_bytes[0])
+            next_sample += SAMPLE_SECONDS
+        policy.touch(key)
+        if key in entries:
+            hits += 1
+            ttl = policy.refreshed_ttl(key, size)
+            if ttl:
+                store(key, size, ttl, now)
+        else:
+            store(key, size, policy.ttl(key, size), now)
+
+    return {
+        "hit_ratio": hits / len(trace),
+        "mean_mb": sum(samples) / len(samples) / 2 ** 20,
+        "peak_mb": max(samples) / 2 ** 20,
+    }
+
+
+def make_policy(**kwargs) -> AdaptiveTTL:
+    AdaptiveTTL._instance = None
+    return AdaptiveTTL(**kwargs)
+
+
+def main() -> None:
+    source = sys.argv[1] if len(sys.argv) > 1 else "1000000"
+    budget_mb = float(sys.argv[2]) if len(sys.argv) > 2 else 0.0
+    trace = list(recorded_trace(source) if source.endswith(".jsonl") else synthetic_trace(int(source)))
+    budget = int(budget_mb * 2 ** 20)
+
+    policies = {
+        "fixed 1h": make_policy(enabled=False, fixed_ttl=3600),
+        "fixed 2h": make_policy(enabled=False, fixed_ttl=2 * 3600),
+        "fixed 4h": make_policy(enabled=False, fixed_ttl=4 * 3600),
+        "adaptive": make_policy(enabled=True),
+    }
+    if budget:
+        policies[f"adaptive, {budget_mb:g} MB budget"] = make_policy(enabled=True, memory_budget=budget)
+
+    print(f"accesses: {len(trace):,}  distinct keys: {len({key for _, key, _ in trace}):,}  "
+          f"span: {trace[-1][0] / 3600:.1f} h")
+    print(f"{'policy':<28} {'hit ratio':>9} {'mean MB':>9} {'peak MB':>9} {'hits/MB':>9}")
+    for name, policy in policies.items():
+        result = replay(trace, policy)
+        print(
+            f"{name:<28} {result['hit_ratio']:>9.3f} {result['mean_mb']:>9.1f} {result['peak_mb']:>9.1f} "
+            f"{result['hit_ratio'] * 100 / max(result['mean_mb'], 1e-9):>9.2f}"
+        )
+    AdaptiveTTL._instance = None
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+"""
+Compares a 24-turn conversation (by default) sent statelessly to /submit, each request resending the
+whole conversation, with the session API, where each request carries only the new turn: request
+payload size, prompt tokens sent to the model, and the server-side latency of loading the context and
+recording the turn against a live Redis and MongoDB.
+
+Summaries are produced by a stub instead of the LLM, so model latency is not part of the timings; the
+prompt tokens column is what drives it.
+
+Usage:
+    python -m benchmarks.bench_conversation [turns] [rounds]
+"""
+import os
+import statistics
+import sys
+import time
+
+import orjson
+import redis
+from pymongo import MongoClient
+
+from app.constants import MONGODB_URI
+from app.services.conversation_service import ConversationService
+from app.services.prompt_templates import get_template
+from app.utils.tokens import count_tokens
+
+DATABASE = "bench_conversation"
+SYSTEM_TOKENS = count_tokens(get_template("submit").system)
+
+
+def turn(index: int):
+    prompt = f"Step {index}: the OrderController index action still runs one query per order line. " * 2
+    response = (
+        f"For step {index}, eager load the relation and paginate instead of loading every order:\n\n"
+        "```php\n$orders = Order::with(['lines.product', 'customer'])->latest()->paginate(50);\n```\n\n"
+        "Add an index on orders(customer_id, created_at) so the ordering does not scan the table. " * 3
+    )
+    return prompt, response
+
+
+def stub_summary(summary: str, transcript: str) -> str:
+    return (summary + " " + transcript[:400]).strip()[-1200:]
+
+
+def percentiles(latencies):
+    latencies = sorted(latencies)
+    return statistics.median(latencies), latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))]
+
+
+def stateless(turns: int):
+    """
+    Returns the request bytes and model prompt tokens per turn when the client resends the conversation.
+    """
+    transcript, sizes, tokens = "", [], []
+    for index in range(turns):
+        prompt, response = turn(index)
+        body = orjson.dumps({"prompt": f"{transcript}Developer: {prompt}"})
+        sizes.append(len(body))
+        tokens.append(SYSTEM_TOKENS + count_tokens(transcript) + count_tokens(prompt))
+        transcript += f"Developer: {prompt}\n\nAssistant: {response}\n\n"
+    return sizes, tokens
+
+
+def session(service: ConversationService, turns: int):
+    """
+    Returns the request bytes, model prompt tokens and server-side milliseconds per turn of the session API.
+    """
+    session_id = service.create("bench")
+    sizes, tokens, latencies = [], [], []
+    for index in range(turns):
+        prompt, response = turn(index)
+        sizes.append(len(f"/conversations/{session_id}/turns".encode()) + len(orjson.dumps({"prompt": prompt})))
+        start = time.perf_counter()
+        context = service.context(session_id, "bench", count_tokens(prompt))
+        service.append(session_id, context.count, prompt, response)
+        latencies.append((time.perf_counter() - start) * 1000)
+        tokens.append(SYSTEM_TOKENS + context.tokens + count_tokens(prompt))
+        service.compact(session_id)
+    service.delete(session_id, "bench")
+    return sizes, tokens, latencies
+
+
+def main() -> None:
+    turns = int(sys.argv[1]) if len(sys.argv) > 1 else 24
+    rounds = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+
+    client = MongoClient(MONGODB_URI, serverSelectionTimeoutMS=5000)
+    client.admin.command("ping")
+    redis_client = redis.Redis(host=os.getenv("REDIS_HOST", "localhost"), port=int(os.getenv("REDIS_PORT", 6379)), decode_responses=True)
+    redis_client.ping()
+    client.drop_database(DATABASE)
+    service = ConversationService(client[DATABASE], redis_client, stub_summary)
+
+    try:
+        stateless_sizes, stateless_tokens = stateless(turns)
+        latencies = []
+        for _ in range(rounds):
+            session_sizes, session_tokens, round_latencies = session(service, turns)
+            latencies += round_latencies
+        p50, p99 = percentiles(latencies)
+
+        print(f"{'':>10} {'last request':>14} {'all requests':>14} {'last prompt':>12} {'all prompts':>12}")
+        print(f"{'':>10} {'(bytes)':>14} {'(bytes)':>14} {'(tokens)':>12} {'(tokens)':>12}")
+        for name, sizes, tokens in (("stateless", stateless_sizes, stateless_tokens), ("session", session_sizes, session_tokens)):
+            print(f"{name:>10} {sizes[-1]:14,} {sum(sizes):14,} {tokens[-1]:12,} {sum(tokens):12,}")
+        print(f"session context + record: p50 {p50:.2f} ms, p99 {p99:.2f} ms per turn ({turns} turns x {rounds} rounds)")
+    finally:
+        client.drop_database(DATABASE)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,61 @@
+"""
+Compares the rows/sec of the /history serialization paths.
+
+- models: build a `HistoryResponse` per row, then validate and encode them again through
+  the response model, as FastAPI does for a `response_model` endpoint.
+- raw rows: `history_rows` field check on the stored documents, rendered with orjson.
+
+Usage:
+    python -m benchmarks.bench_history
+"""
+import json
+import time
+from typing import List
+
+from fastapi.encoders import jsonable_encoder
+from pydantic import BaseModel, TypeAdapter
+
+from app.utils.responses import ORJSONResponse, history_rows
+
+ROWS = 20000
+ROUNDS = 5
+
+
+class HistoryResponse(BaseModel):
+    prompt: str
+    response: str
+
+
+def model_path(documents) -> bytes:
+    models = [HistoryResponse(**document) for document in documents]
+    validated = TypeAdapter(List[HistoryResponse]).validate_python(models)
+    return json.dumps(jsonable_encoder(validated)).encode("utf-8")
+
+
+def raw_path(documents) -> bytes:
+    return ORJSONResponse(history_rows(documents)).body
+
+
+def measure(path, documents) -> float:
+    best = float("inf")
+    for _ in range(ROUNDS):
+        start = time.perf_counter()
+        path(documents)
+        best = min(best, time.perf_counter() - start)
+    return len(documents) / best
+
+
+def main() -> None:
+    documents = [
+        {"prompt": f"How do I define a Laravel route number {i}?", "response": "Use Route::get(...) " * 20}
+        for i in range(ROWS)
+    ]
+    before = measure(model_path, documents)
+    after = measure(raw_path, documents)
+    print(f"models + response_model : {before:12,.0f} rows/sec")
+    print(f"raw rows + orjson       : {after:12,.0f} rows/sec")
+    print(f"speedup                 : {after / before:12.1f}x")
+
+
+if __name__ == "__main__":
+    main()
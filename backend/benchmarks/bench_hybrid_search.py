@@ -0,0 +1,79 @@
+"""
+Measures /history query latency against a live Elasticsearch cluster for growing index sizes,
+comparing the previous `match` on prompt with the hybrid kNN + BM25 search.
+
+Requires a reachable cluster at `ELASTICSEARCH_URI`. The benchmark writes to a throwaway
+index (`bench_qa_pairs`) and deletes it afterwards.
+
+Usage:
+    python -m benchmarks.bench_hybrid_search
+"""
+import random
+import statistics
+import time
+
+from elasticsearch import Elasticsearch, helpers
+
+from app.constants import ELASTICSEARCH_URI
+from app.services.hybrid_search_service import HybridSearchService
+
+INDEX = "bench_qa_pairs"
+SIZES = (1_000, 10_000, 100_000)
+QUERIES = 200
+VOCABULARY = (
+    "route controller middleware eloquent model migration blade queue job event listener "
+    "validation request response collection cache session auth policy gate factory seeder "
+    "relationship belongsTo hasMany artisan command schedule define create update delete"
+).split() + [f"term{i}" for i in range(2000)]
+
+
+def random_text(words: int) -> str:
+    return " ".join(random.choice(VOCABULARY) for _ in range(words))
+
+
+def percentiles(latencies):
+    latencies = sorted(latencies)
+    return statistics.median(latencies), latencies[int(len(latencies) * 0.99)]
+
+
+def main() -> None:
+    random.seed(7)
+    client = Elasticsearch(hosts=[ELASTICSEARCH_URI])
+    if not client.ping():
+        raise SystemExit(f"Elasticsearch is not reachable at {ELASTICSEARCH_URI}.")
+
+    service = HybridSearchService(client, index=INDEX)
+    client.options(ignore_status=404).indices.delete(index=INDEX)
+    service.ensure_index()
+
+    indexed = 0
+    print(f"{'documents':>10} {'match p50':>10} {'match p99':>10} {'hybrid p50':>11} {'hybrid p99':>11}  (ms)")
+    try:
+        for size in SIZES:
+            actions = (
+                {"_index": INDEX, "_source": service.prepare_document({"prompt": random_text(12), "response": random_text(80)})}
+                for _ in range(size - indexed)
+            )
+            helpers.bulk(client, actions, chunk_size=1000)
+            client.indices.refresh(index=INDEX)
+            indexed = size
+
+            match_latencies, hybrid_latencies = [], []
+            for _ in range(QUERIES):
+                query = random_text(4)
+                start = time.perf_counter()
+                client.search(index=INDEX, query={"match": {"prompt": query}})
+                match_latencies.append((time.perf_counter() - start) * 1000)
+                start = time.perf_counter()
+                service.search(query)
+                hybrid_latencies.append((time.perf_counter() - start) * 1000)
+
+            match_p50, match_p99 = percentiles(match_latencies)
+            hybrid_p50, hybrid_p99 = percentiles(hybrid_latencies)
+            print(f"{size:>10} {match_p50:10.2f} {match_p99:10.2f} {hybrid_p50:11.2f} {hybrid_p99:11.2f}")
+    finally:
+        client.indices.delete(index=INDEX)
+
+
+if __name__ == "__main__":
+    main()
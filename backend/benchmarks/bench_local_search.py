@@ -0,0 +1,58 @@
+"""
+Measures LocalSearchService query latency and snapshot restore time for growing index sizes.
+
+Usage:
+    python -m benchmarks.bench_local_search
+"""
+import os
+import random
+import statistics
+import tempfile
+import time
+
+from app.services.local_search_service import LocalSearchService
+
+SIZES = (1_000, 10_000, 50_000)
+QUERIES = 500
+LARAVEL_TERMS = (
+    "route controller middleware eloquent model migration blade queue job event listener "
+    "validation request response collection cache session auth policy gate factory seeder "
+    "relationship belongsTo hasMany getUserName user_id artisan command schedule"
+).split()
+VOCABULARY = LARAVEL_TERMS + [f"term{i}" for i in range(5000)]
+# Zipf-like weights: a handful of frequent terms and a long tail
+WEIGHTS = [1 / (rank + 1) for rank in range(len(VOCABULARY))]
+
+
+def random_text(words: int) -> str:
+    return " ".join(random.choices(VOCABULARY, weights=WEIGHTS, k=words))
+
+
+def main() -> None:
+    random.seed(7)
+    print(f"{'documents':>10} {'p50 (ms)':>9} {'p99 (ms)':>9} {'restore (ms)':>13}")
+    for size in SIZES:
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "local_search.snapshot")
+            LocalSearchService._instance = None
+            service = LocalSearchService(snapshot_path=path, snapshot_every=0)
+            service.rebuild("qa_pairs", ({"prompt": random_text(12), "response": random_text(60)} for _ in range(size)))
+
+            latencies = []
+            for _ in range(QUERIES):
+                query = {"match": {"prompt": random_text(3)}}
+                start = time.perf_counter()
+                service.search_documents("qa_pairs", query)
+                latencies.append((time.perf_counter() - start) * 1000)
+            latencies.sort()
+
+            LocalSearchService._instance = None
+            start = time.perf_counter()
+            LocalSearchService(snapshot_path=path)
+            restore_ms = (time.perf_counter() - start) * 1000
+
+            print(f"{size:>10} {statistics.median(latencies):9.3f} {latencies[int(QUERIES * 0.99)]:9.3f} {restore_ms:13.1f}")
+
+
+if __name__ == "__main__":
+    main()
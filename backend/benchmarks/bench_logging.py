@@ -0,0 +1,95 @@
+"""
+Measures the per-request logging overhead of the synchronous per-module StreamHandler setup
+against the shared queue-based pipeline.
+
+The sink models container stderr: every write blocks for a fixed syscall cost plus the time
+the log driver needs to drain the bytes. With an in-memory sink the two setups cost about the
+same CPU, since the background writer still shares the GIL; the gain comes from taking blocking
+writes and multi-KB payloads off the request path.
+
+Usage:
+    python -m benchmarks.bench_logging
+"""
+import logging
+import time
+
+from app.utils.logger import LoggingPipeline, preview
+
+REQUESTS = 2000
+PAYLOAD = "x" * 8000  # A typical multi-KB cached answer
+WRITE_LATENCY_S = 0.00002
+SINK_BYTES_PER_S = 50_000_000
+
+
+class BlockingSink:
+    """
+    A text stream whose writes block like a pipe to a container log driver.
+    """
+
+    def __init__(self):
+        self.bytes_written = 0
+
+    def write(self, data: str) -> int:
+        self.bytes_written += len(data)
+        time.sleep(WRITE_LATENCY_S + len(data) / SINK_BYTES_PER_S)
+        return len(data)
+
+    def flush(self) -> None:
+        pass
+
+
+def simulate_request(logger: logging.Logger, payload_formatter) -> None:
+    """
+    Emits the log lines a cache-miss /submit request produces.
+    """
+    logger.info(f"Generating response for prompt: {payload_formatter(PAYLOAD)}")
+    logger.info(f"Key '{payload_formatter(PAYLOAD)}' does not exist in Redis.")
+    logger.info("Response generated successfully.")
+    logger.info(f"Set key '{payload_formatter(PAYLOAD)}' with value: {payload_formatter(PAYLOAD)} (expires in 3600 seconds)")
+    logger.info("Interaction saved to database successfully.")
+
+
+def run(logger: logging.Logger, payload_formatter) -> float:
+    start = time.perf_counter()
+    for _ in range(REQUESTS):
+        simulate_request(logger, payload_formatter)
+    return (time.perf_counter() - start) / REQUESTS * 1e6
+
+
+def sync_logger(name: str, sink: BlockingSink) -> logging.Logger:
+    """
+    Builds a logger the way the modules used to: a StreamHandler attached directly to it.
+    """
+    logger = logging.getLogger(name)
+    logger.propagate = False
+    logger.setLevel(logging.INFO)
+    handler = logging.StreamHandler(sink)
+    handler.setFormatter(logging.Formatter("%(asctime)s - %(name)s - %(levelname)s - %(message)s"))
+    logger.addHandler(handler)
+    return logger
+
+
+def main() -> None:
+    full_sink = BlockingSink()
+    full_us = run(sync_logger("bench_sync_full", full_sink), str)
+
+    preview_sink = BlockingSink()
+    preview_us = run(sync_logger("bench_sync_preview", preview_sink), preview)
+
+    queued_sink = BlockingSink()
+    pipeline = LoggingPipeline(stream=queued_sink)
+    queued_us = run(logging.getLogger("bench_queued"), preview)
+    start = time.perf_counter()
+    pipeline.stop()
+    drain_us = (time.perf_counter() - start) / REQUESTS * 1e6
+
+    print(f"{'setup':<34} {'us/request':>10} {'bytes/request':>14}")
+    print(f"{'sync StreamHandler, full payloads':<34} {full_us:10.1f} {full_sink.bytes_written / REQUESTS:14.0f}")
+    print(f"{'sync StreamHandler, previews':<34} {preview_us:10.1f} {preview_sink.bytes_written / REQUESTS:14.0f}")
+    print(f"{'queue pipeline, previews':<34} {queued_us:10.1f} {queued_sink.bytes_written / REQUESTS:14.0f}")
+    print(f"background drain after the run: {drain_us:.1f} us/request (off the request path)")
+    print(f"records dropped by the queue: {pipeline.queue_handler.dropped}")
+
+
+if __name__ == "__main__":
+    main()
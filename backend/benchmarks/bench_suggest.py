@@ -0,0 +1,59 @@
+"""
+Measures /suggest lookup latency and memory for a large prefix index.
+
+Usage:
+    python -m benchmarks.bench_suggest [prompt_count]
+"""
+import random
+import resource
+import sys
+import time
+
+from app.services.suggestion_service import SuggestionService
+
+STARTERS = ["how do i", "how to", "what is", "why does", "explain", "refactor", "write a", "fix the", "create a", "laravel"]
+WORDS = (
+    "route controller middleware eloquent model migration blade queue job event listener validation "
+    "request response collection cache session auth policy gate factory seeder relationship artisan"
+).split()
+LOOKUPS = 20000
+
+
+def random_prompt() -> str:
+    words = random.choices(WORDS, k=random.randint(2, 8)) + [str(random.randint(0, 10 ** 6))]
+    return f"{random.choice(STARTERS)} {' '.join(words)}"
+
+
+def main() -> None:
+    prompt_count = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    random.seed(7)
+    prompts = [random_prompt() for _ in range(prompt_count)]
+    counts = [(prompt, random.randint(1, 50)) for prompt in prompts]
+
+    rss_before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    service = SuggestionService(max_prompts=prompt_count, delta_limit=2000)
+    start = time.perf_counter()
+    service.build(counts)
+    build_s = time.perf_counter() - start
+    rss_after = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+    for _ in range(1000):
+        service.add(random_prompt())
+
+    latencies = []
+    for _ in range(LOOKUPS):
+        prompt = random.choice(prompts)
+        prefix = prompt[:random.randint(1, min(len(prompt), 20))]
+        start = time.perf_counter()
+        service.suggest(prefix)
+        latencies.append((time.perf_counter() - start) * 1000)
+    latencies.sort()
+
+    print(f"prompts          : {service.main.size:,}")
+    print(f"build            : {build_s:.1f} s")
+    print(f"index memory     : ~{(rss_after - rss_before) / 1024:.0f} MB (max RSS growth, includes build garbage)")
+    print(f"lookup p50 / p99 : {latencies[len(latencies) // 2]:.3f} / {latencies[int(len(latencies) * 0.99)]:.3f} ms")
+
+
+if __name__ == "__main__":
+    main()
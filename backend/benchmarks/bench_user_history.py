@@ -0,0 +1,100 @@
+"""
+Measures per-user /history latency against a live MongoDB, with 10k users x 1k interactions by
+default, before and after the (user_id, timestamp desc) index: the query a scoped /history runs, a
+user's interactions in a time range, oldest first.
+
+Requires a reachable MongoDB at `MONGODB_URI`. The benchmark writes to a throwaway database
+(`bench_user_history`, about 3 GB at the default size) and drops it afterwards.
+
+Usage:
+    python -m benchmarks.bench_user_history [--users N] [--per-user N] [--queries N]
+"""
+import argparse
+import random
+import statistics
+import time
+from datetime import datetime, timedelta, timezone
+
+from pymongo import MongoClient
+
+from app.constants import MONGODB_URI
+
+DATABASE = "bench_user_history"
+BATCH_SIZE = 10_000
+# Full scans are slow at this size, so fewer queries are timed without the index
+UNINDEXED_QUERIES = 5
+START = datetime(2026, 1, 1, tzinfo=timezone.utc)
+PROJECTION = {"_id": 0, "prompt": 1, "response": 1, "response_hash": 1, "user_id": 1}
+
+
+def percentiles(latencies):
+    latencies = sorted(latencies)
+    return statistics.median(latencies), latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))]
+
+
+def load(collection, users: int, per_user: int) -> None:
+    """
+    Inserts the interactions in creation order, users interleaved as live traffic writes them.
+    """
+    total = users * per_user
+    started = time.perf_counter()
+    for offset in range(0, total, BATCH_SIZE):
+        collection.insert_many([
+            {
+                "user_id": f"user-{random.randrange(users)}",
+                "timestamp": START + timedelta(seconds=index),
+                "prompt": f"How do I write test number {index}?",
+                "response": "Use pytest fixtures and parametrize the cases. " * 4,
+                "cache_key": f"How do I write test number {index}?",
+            }
+            for index in range(offset, min(offset + BATCH_SIZE, total))
+        ], ordered=False)
+    print(f"loaded {total:,} interactions in {time.perf_counter() - started:.0f} s")
+
+
+def history_query(users: int, span: timedelta):
+    user = f"user-{random.randrange(users)}"
+    since = START + timedelta(seconds=random.randrange(int(span.total_seconds())))
+    return {"user_id": user, "timestamp": {"$gte": since, "$lt": since + span / 10}}
+
+
+def measure(collection, users: int, span: timedelta, queries: int):
+    latencies, rows = [], 0
+    for _ in range(queries):
+        query = history_query(users, span)
+        start = time.perf_counter()
+        rows += len(list(collection.find(query, PROJECTION).sort("timestamp", 1)))
+        latencies.append((time.perf_counter() - start) * 1000)
+    plan = collection.find(history_query(users, span), PROJECTION).sort("timestamp", 1).explain()
+    examined = plan["executionStats"]["totalDocsExamined"] if "executionStats" in plan else None
+    return percentiles(latencies), rows / queries, examined
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--users", type=int, default=10_000)
+    parser.add_argument("--per-user", type=int, default=1_000)
+    parser.add_argument("--queries", type=int, default=500)
+    args = parser.parse_args()
+    random.seed(7)
+
+    client = MongoClient(MONGODB_URI, serverSelectionTimeoutMS=5000)
+    client.admin.command("ping")
+    client.drop_database(DATABASE)
+    collection = client[DATABASE]["interactions"]
+    span = timedelta(seconds=args.users * args.per_user)
+
+    try:
+        load(collection, args.users, args.per_user)
+        print(f"{'index':>22} {'p50':>9} {'p99':>9} {'rows':>6} {'docs examined':>14}  (ms)")
+        (p50, p99), rows, examined = measure(collection, args.users, span, UNINDEXED_QUERIES)
+        print(f"{'none':>22} {p50:9.2f} {p99:9.2f} {rows:6.0f} {examined!s:>14}")
+        collection.create_index([("user_id", 1), ("timestamp", -1)])
+        (p50, p99), rows, examined = measure(collection, args.users, span, args.queries)
+        print(f"{'(user_id, timestamp -1)':>22} {p50:9.2f} {p99:9.2f} {rows:6.0f} {examined!s:>14}")
+    finally:
+        client.drop_database(DATABASE)
+
+
+if __name__ == "__main__":
+    main()
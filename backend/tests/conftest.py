@@ -29,3 +29,23 @@ def mock_elasticsearch():
         mock_instance.client.indices.exists.return_value = False
         mock_instance.client.indices.create.return_value = {"acknowledged": True}
         yield mock_instance
+
+class BulkResult:
+    def __init__(self, upserted_count):
+        self.upserted_count = upserted_count
+
+@pytest.fixture
+def replay_bulk_write():
+    """
+    Provide a function making a mongomock collection replay bulk UpdateOne operations one by one;
+    mongomock's bulk_write does not accept current pymongo operations.
+    """
+    def patch_collection(collection):
+        def bulk_write(operations, ordered=True):
+            upserted = 0
+            for operation in operations:
+                result = collection.update_one(operation._filter, operation._doc, upsert=operation._upsert)
+                upserted += result.upserted_id is not None
+            return BulkResult(upserted)
+        collection.bulk_write = bulk_write
+    return patch_collection
@@ -0,0 +1,89 @@
+import threading
+import pytest
+from app.services.adaptive_ttl import AdaptiveTTL, CountMinSketch
+
+
+@pytest.fixture
+def make_policy():
+    """
+    Creates fresh policy instances, restoring the app-wide singleton afterwards.
+    """
+    original = AdaptiveTTL._instance
+
+    def make(**kwargs):
+        AdaptiveTTL._instance = None
+        options = dict(enabled=True, fixed_ttl=3600, min_ttl=100, max_ttl=10_000, size_reference=1000, memory_budget=0)
+        options.update(kwargs)
+        return AdaptiveTTL(**options)
+
+    yield make
+    AdaptiveTTL._instance = original
+
+
+def test_sketch_counts_and_ages():
+    sketch = CountMinSketch(1024)
+    for _ in range(6):
+        sketch.add("hot")
+    sketch.add("cold")
+    assert sketch.estimate("hot") >= 6
+    assert sketch.estimate("cold") >= 1
+    assert sketch.estimate("never") <= sketch.estimate("hot")
+    sketch.age()
+    assert sketch.estimate("hot") == 3
+
+
+def test_ttl_grows_with_frequency_and_shrinks_with_size(make_policy):
+    policy = make_policy()
+    policy.touch("cold")
+    for _ in range(4):
+        policy.touch("hot")
+    assert policy.ttl("cold", 500) == 100
+    assert policy.ttl("hot", 500) == 800
+    assert policy.ttl("hot", 4000) == 200
+    assert policy.refreshed_ttl("cold", 500) is None
+    assert policy.refreshed_ttl("hot", 500) == 800
+    for _ in range(20):
+        policy.touch("hot")
+    assert policy.ttl("hot", 500) == 10_000
+
+
+def test_memory_budget_shrinks_ttls(make_policy):
+    used = [4000]
+    clock = [0.0]
+    policy = make_policy(memory_budget=1000, clock=lambda: clock[0])
+    policy.memory_usage = lambda: used[0]
+    for _ in range(4):
+        policy.touch("hot")
+    assert policy.ttl("hot", 500) == 200
+    assert policy.ttl("cold", 500) == 25
+    clock[0] = 60
+    used[0] = 500
+    assert policy.ttl("hot", 500) == 400
+
+
+def test_slow_memory_reads_do_not_block_other_callers(make_policy):
+    reading, release = threading.Event(), threading.Event()
+
+    def memory_usage():
+        reading.set()
+        release.wait(5)
+        return 4000
+
+    policy = make_policy(memory_budget=1000)
+    policy.memory_usage = memory_usage
+    reader = threading.Thread(target=policy.ttl, args=("hot", 500))
+    reader.start()
+    assert reading.wait(5)
+    # The read is in flight: other callers use the previous pressure instead of waiting on it
+    assert policy.touch("hot") >= 1
+    assert policy.ttl("cold", 500) == 100
+    release.set()
+    reader.join(5)
+    assert policy.pressure == 0.25
+
+
+def test_disabled_policy_uses_fixed_ttl(make_policy):
+    policy = make_policy(enabled=False)
+    policy.touch("key")
+    assert policy.ttl("key", 10) == 3600
+    assert policy.refreshed_ttl("key", 10) is None
@@ -0,0 +1,168 @@
+import asyncio
+import threading
+from unittest.mock import AsyncMock, MagicMock
+from app.services.analysis_service import AnalysisService, chunk_file, estimate_tokens
+from app.services.analysis_store import AnalysisStore
+from app.services.openai_service import Completion
+
+PHP_CLASS = "<?php\n\nclass UserController\n{\n" + "".join(
+    f"    public function action{i}()\n    {{\n" + "        $value = $this->repository->find($id);\n" * 20 + "    }\n\n"
+    for i in range(4)
+) + "}\n"
+
+
+def test_chunk_file_cuts_at_method_boundaries():
+    """
+    Test that oversized classes are split before member definitions and every chunk fits the budget.
+    """
+    chunks = chunk_file(PHP_CLASS, "php", token_budget=300)
+    assert len(chunks) == 4
+    assert chunks[1].text.startswith("    public function action1()")
+    assert all(estimate_tokens(chunk.text) <= 330 for chunk in chunks)
+    assert chunks[-1].end_line == len(PHP_CLASS.splitlines())
+
+
+def test_chunk_hash_depends_on_content_and_language():
+    """
+    Test that unchanged chunks keep their hash and edited chunks get a new one.
+    """
+    original = chunk_file(PHP_CLASS, "php", token_budget=300)
+    edited = chunk_file(PHP_CLASS.replace("action3()", "renamed()"), "php", token_budget=300)
+    assert [chunk.hash for chunk in original[:3]] == [chunk.hash for chunk in edited[:3]]
+    assert original[3].hash != edited[3].hash
+    assert chunk_file(PHP_CLASS, "python", token_budget=300)[0].hash != original[0].hash
+
+
+def test_chunk_file_empty_content():
+    """
+    Test that blank files produce no chunks.
+    """
+    assert chunk_file("", "php") == []
+    assert chunk_file("\n\n   \n", "php") == []
+
+
+class MemoryStore(AnalysisStore):
+    """
+    An AnalysisStore keeping results and manifests in dictionaries.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.results = {}
+        self.manifest_map = {}
+
+    def get_results(self, hashes):
+        return [self.results.get(chunk_hash) for chunk_hash in hashes]
+
+    def put_result(self, chunk_hash, response):
+        self.results[chunk_hash] = response
+
+    def get_manifest(self, workspace, file_path):
+        return self.manifest_map.get((workspace, file_path))
+
+    def put_manifest(self, workspace, file_path, language, chunks):
+        self.manifest_map[(workspace, file_path)] = {
+            "language": language,
+            "chunks": [{key: chunk[key] for key in ("hash", "start_line", "end_line")} for chunk in chunks],
+        }
+
+
+def test_analyze_files_uses_cache_and_bounds_concurrency():
+    """
+    Test that cached chunks skip the LLM and that at most max_concurrency calls run at once.
+    """
+    in_flight = []
+    peak = []
+    lock = threading.Lock()
+
+    async def generate(**kwargs):
+        with lock:
+            in_flight.append(kwargs["code"])
+            peak.append(len(in_flight))
+        await asyncio.sleep(0.01)
+        with lock:
+            in_flight.remove(kwargs["code"])
+        return Completion("analysis", 1, 1)
+
+    openai_service = MagicMock()
+    openai_service.agenerate = AsyncMock(side_effect=generate)
+    service = AnalysisService(openai_service, MemoryStore(), max_concurrency=2)
+    files = [{"file_path": f"F{i}.php", "content": PHP_CLASS.replace("UserController", f"C{i}"), "language": "php"} for i in range(3)]
+
+    async def collect():
+        return [result async for result in service.analyze_files(files)]
+
+    first = asyncio.run(collect())
+    calls = openai_service.agenerate.call_count
+    assert sorted(result["file_path"] for result in first) == ["F0.php", "F1.php", "F2.php"]
+    assert max(peak) <= 2
+
+    second = asyncio.run(collect())
+    assert openai_service.agenerate.call_count == calls
+    assert all(chunk["cached"] for result in second for chunk in result["chunks"])
+
+
+def test_analyze_incremental_reruns_only_changed_chunks():
+    """
+    Test that bare hashes must be known, and that only chunks sent with content are re-analyzed.
+    """
+    openai_service = MagicMock()
+    openai_service.agenerate = AsyncMock(return_value=Completion("analysis", 1, 1))
+    store = MemoryStore()
+    service = AnalysisService(openai_service, store)
+
+    first = asyncio.run(service.analyze_file(asyncio.Semaphore(2), "User.php", PHP_CLASS, "php", workspace="ws"))
+    assert store.get_manifest("ws", "User.php")["chunks"] == [
+        {key: chunk[key] for key in ("hash", "start_line", "end_line")} for chunk in first["chunks"]
+    ]
+    calls = openai_service.agenerate.call_count
+
+    # The client re-chunks the edited file; only the last chunk changed
+    edited = chunk_file(PHP_CLASS.replace("action3()", "renamed()"), "php")
+    references = [
+        {"hash": chunk.hash, "start_line": chunk.start_line, "end_line": chunk.end_line, "content": None}
+        for chunk in edited
+    ]
+    unknown = asyncio.run(service.analyze_incremental("ws", "User.php", "php", references))
+    assert unknown["missing"] == [edited[-1].hash]
+    assert openai_service.agenerate.call_count == calls
+
+    references[-1]["content"] = edited[-1].text
+    result = asyncio.run(service.analyze_incremental("ws", "User.php", "php", references))
+    assert openai_service.agenerate.call_count == calls + 1
+    assert result["reanalyzed"] == 1 and result["changed"] == 1
+    assert [chunk["hash"] for chunk in result["chunks"]] == [chunk.hash for chunk in edited]
+    assert store.get_manifest("ws", "User.php")["chunks"][-1]["hash"] == edited[-1].hash
+
+
+def test_cached_analysis_is_not_reused_at_another_location():
+    """
+    Test that a chunk's analysis, which cites file and line numbers, is only reused at the same location.
+    """
+    openai_service = MagicMock()
+    openai_service.agenerate = AsyncMock(return_value=Completion("analysis", 1, 1))
+    service = AnalysisService(openai_service, MemoryStore())
+
+    asyncio.run(service.analyze_file(asyncio.Semaphore(2), "User.php", PHP_CLASS, "php"))
+    copied = asyncio.run(service.analyze_file(asyncio.Semaphore(2), "Copy.php", PHP_CLASS, "php"))
+    assert not any(chunk["cached"] for chunk in copied["chunks"])
+
+    # A line inserted at the top moves every chunk down, so none of the old results apply
+    calls = openai_service.agenerate.call_count
+    shifted = asyncio.run(service.analyze_file(asyncio.Semaphore(2), "User.php", "\n" + PHP_CLASS, "php"))
+    assert openai_service.agenerate.call_count == calls + len(shifted["chunks"])
+    assert openai_service.agenerate.call_args.kwargs["fields"]["file_path"] == "User.php"
+
+
+def test_store_falls_back_to_mongo_and_refills_redis():
+    """
+    Test that chunk results expired from Redis are served from MongoDB and cached again.
+    """
+    redis_client = MagicMock()
+    redis_client.mget.return_value = ["cached", None]
+    database = MagicMock()
+    database.__getitem__.return_value.find.return_value = [{"_id": "b", "response": "durable"}]
+
+    store = AnalysisStore(redis_client, database)
+    assert store.get_results(["a", "b"]) == ["cached", "durable"]
+    redis_client.pipeline.return_value.set.assert_called_once()
@@ -0,0 +1,154 @@
+import gzip
+import threading
+import time
+from unittest.mock import MagicMock
+import orjson
+import pytest
+from bson import ObjectId
+from app.services.backfill import Backfill, BackfillError, JsonlSource, MongoSource
+from app.services.hybrid_search_service import HybridSearchService
+from app.services.response_store import ResponseStore
+
+mongomock = pytest.importorskip("mongomock")
+
+LONG_ANSWER = "print('hello')\n" * 40
+
+
+class PipelineRedis:
+    """
+    In-memory stand-in for the pipelined Redis commands the backfill sends.
+    """
+
+    def __init__(self):
+        self.data = {}
+        self.sets = {}
+        self.pipelines = 0
+
+    def pipeline(self, transaction=True):
+        self.pipelines += 1
+        redis, commands = self, []
+
+        class Pipeline:
+            def set(self, key, value, nx=False, ex=None):
+                commands.append(lambda: redis.data.setdefault(key, value) == value if nx else redis.data.update({key: value}) or True)
+
+            def sadd(self, key, *members):
+                commands.append(lambda: redis.sets.setdefault(key, set()).update(members))
+
+            def expire(self, key, seconds):
+                commands.append(lambda: True)
+
+            def execute(self):
+                return [command() for command in commands]
+
+        return Pipeline()
+
+
+def rows(count):
+    return [
+        {"id": str(ObjectId()), "ts": 0.0, "prompt": f"question {index}", "response": LONG_ANSWER if index % 2 else f"answer {index}",
+         "cache_key": f"question {index}", "usage": {"model": "gpt-4o-mini"}}
+        for index in range(count)
+    ]
+
+
+@pytest.fixture
+def database(replay_bulk_write):
+    database = mongomock.MongoClient()["test"]
+    replay_bulk_write(database["responses"])
+    return database
+
+
+@pytest.fixture
+def bulk(mocker):
+    indexed = {}
+
+    def bulk(client, actions, **kwargs):
+        for action in actions:
+            indexed[action["_id"]] = action["_source"]
+        return len(actions), []
+
+    mocker.patch("app.services.hybrid_search_service.helpers.bulk", side_effect=bulk)
+    return indexed
+
+
+def write_jsonl(path, data):
+    with gzip.open(path, "wb") as file:
+        for row in data:
+            file.write(orjson.dumps(row) + b"\n")
+
+
+def test_backfill_writes_every_target_and_disables_refresh(tmp_path, database, bulk):
+    path = str(tmp_path / "interactions.jsonl.gz")
+    data = rows(25)
+    write_jsonl(path, data)
+    client = MagicMock()
+    client.indices.get_settings.return_value = {"qa_pairs": {"settings": {"index": {"refresh_interval": "5s"}}}}
+    redis = PipelineRedis()
+    redis.data["question 0"] = "fresher answer"
+
+    backfill = Backfill(
+        JsonlSource(path), database["interactions"], HybridSearchService(client), redis, ResponseStore(database, min_bytes=100),
+        ttl=lambda key, size: 60, batch_size=4, workers=3,
+    )
+    report = backfill.run(str(tmp_path / "backfill.checkpoint"))
+
+    assert report["state"] == "done"
+    assert (report["documents"], report["mongodb"], report["elasticsearch"], report["redis"]) == (25, 25, 25, 24)
+    assert database["interactions"].count_documents({}) == 25
+    assert database["responses"].count_documents({}) == 1
+    assert sorted(bulk) == sorted(row["id"] for row in data)
+    assert "embedding" in bulk[data[1]["id"]] and bulk[data[1]["id"]]["response"] == LONG_ANSWER
+    assert redis.data["question 0"] == "fresher answer"
+    assert redis.sets["tag:model:gpt-4o-mini"] >= {"question 1", "question 24"}
+    assert redis.pipelines == 7
+    refresh_settings = [call.kwargs["settings"] for call in client.indices.put_settings.call_args_list]
+    assert refresh_settings == [{"index": {"refresh_interval": "-1"}}, {"index": {"refresh_interval": "5s"}}]
+    client.indices.refresh.assert_called_once()
+
+
+def test_resume_skips_checkpointed_batches_and_duplicates(tmp_path, database):
+    path = str(tmp_path / "interactions.jsonl")
+    with open(path, "wb") as file:
+        file.write(b"".join(orjson.dumps(row) + b"\n" for row in rows(20)))
+    checkpoint = str(tmp_path / "backfill.checkpoint")
+
+    class FailingBackfill(Backfill):
+        def write_batch(self, documents):
+            if documents[0]["prompt"] == "question 12":
+                raise ConnectionError("connection reset")
+            return super().write_batch(documents)
+
+    failed = FailingBackfill(JsonlSource(path), database["interactions"], batch_size=4, workers=1, max_pending=1).run(checkpoint)
+    assert failed["state"] == "failed" and failed["checkpoint_rows"] == 12
+    # Batches after the failed one may have been written; the resumed run skips them as duplicates
+    database["interactions"].insert_one(dict(next(JsonlSource(path).read(16))[1]))
+
+    resumed = Backfill(JsonlSource(path), database["interactions"], batch_size=4, workers=1).run(checkpoint, resume=True)
+    assert (resumed["resumed_rows"], resumed["documents"], resumed["mongodb"], resumed["duplicates"]) == (12, 8, 7, 1)
+    assert database["interactions"].count_documents({}) == 20
+    assert Backfill(JsonlSource(path), database["interactions"]).run(checkpoint, resume=True)["state"] == "done"
+    with pytest.raises(BackfillError):
+        Backfill(JsonlSource(path), database["interactions"], HybridSearchService(MagicMock())).run(checkpoint, resume=True)
+
+
+def test_workers_write_batches_in_parallel(database):
+    database["interactions"].insert_many([{"prompt": str(index), "response": "ok"} for index in range(40)])
+    lock = threading.Lock()
+    active, peak = [0], [0]
+
+    class SlowBackfill(Backfill):
+        def write_batch(self, documents):
+            with lock:
+                active[0] += 1
+                peak[0] = max(peak[0], active[0])
+            time.sleep(0.02)
+            with lock:
+                active[0] -= 1
+            return {"documents": len(documents)}
+
+    backfill = SlowBackfill(MongoSource(database["interactions"]), batch_size=2, workers=4, max_pending=4)
+    report = backfill.run()
+    assert report["documents"] == 40 and report["batches"] == 20
+    assert peak[0] == 4
+    assert report["docs_per_second"] > 0
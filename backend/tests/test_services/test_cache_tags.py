@@ -0,0 +1,183 @@
+import os
+import threading
+import time
+import pytest
+from app.services.cache_tags import CacheTagIndex, tag_entries, parse_tag
+
+# Size of the purge tests, per the invalidation requirements
+MILLION = 1_000_000
+
+
+class SetRedis:
+    """
+    Minimal in-memory stand-in for the Redis commands of the tag index, recording the number of
+    keys each command touches (the work Redis does while blocking other clients).
+    """
+
+    def __init__(self):
+        self.keys = set()
+        self.sets = {}
+        self.largest_command = 0
+
+    def _touch(self, count):
+        self.largest_command = max(self.largest_command, count)
+
+    def pipeline(self, transaction=True):
+        return SetPipeline(self)
+
+    def sscan_iter(self, key, count=10):
+        members = list(self.sets.get(key, ()))
+        for start in range(0, len(members), count):
+            batch = members[start:start + count]
+            self._touch(len(batch))
+            for member in batch:
+                if member in self.sets.get(key, ()):
+                    yield member
+
+    def scan_iter(self, match="*", count=10):
+        yield from [key for key in list(self.sets) + list(self.keys) if key.startswith(match.rstrip("*"))]
+
+    def type(self, key):
+        return "set" if key in self.sets else "string" if key in self.keys else "none"
+
+    def srem(self, key, *members):
+        self._touch(len(members))
+        members_set = self.sets.get(key, set())
+        removed = len(members_set & set(members))
+        members_set.difference_update(members)
+        if not members_set:
+            self.sets.pop(key, None)
+        return removed
+
+
+class SetPipeline:
+    def __init__(self, redis):
+        self.redis = redis
+        self.commands = []
+
+    def __getattr__(self, name):
+        return lambda *args, **kwargs: self.commands.append((name, args))
+
+    def execute(self):
+        results = []
+        for name, args in self.commands:
+            if name == "set":
+                self.redis.keys.add(args[0])
+                results.append(True)
+            elif name == "sadd":
+                self.redis.sets.setdefault(args[0], set()).update(args[1:])
+                results.append(len(args) - 1)
+            elif name == "expire":
+                results.append(True)
+            elif name == "exists":
+                results.append(int(args[0] in self.redis.keys))
+            elif name == "unlink":
+                self.redis._touch(len(args))
+                present = self.redis.keys & set(args)
+                self.redis.keys -= present
+                results.append(len(present))
+            elif name == "srem":
+                results.append(self.redis.srem(*args))
+        return results
+
+
+def fill(redis, count, tags, prefix="k"):
+    for start in range(0, count, 10_000):
+        pipeline = redis.pipeline()
+        keys = [f"{prefix}{index}" for index in range(start, min(count, start + 10_000))]
+        for key in keys:
+            pipeline.set(key, "v")
+        tag_entries(pipeline, keys, tags)
+        pipeline.execute()
+
+
+def test_parse_tag_rejects_unknown_kinds():
+    assert parse_tag("model:gpt-4o") == "tag:model:gpt-4o"
+    assert parse_tag("user:a:b") == "tag:user:a:b"
+    for tag in ("flavor:x", "model", "model:"):
+        with pytest.raises(ValueError):
+            parse_tag(tag)
+
+
+def test_tag_entries_skips_empty_tags():
+    redis = SetRedis()
+    pipeline = redis.pipeline()
+    tag_entries(pipeline, ["a", "stale:a"], {"model": "m", "language": "", "user": None})
+    pipeline.execute()
+    assert redis.sets == {"tag:model:m": {"a", "stale:a"}}
+
+
+def test_prune_drops_expired_members():
+    redis = SetRedis()
+    fill(redis, 10, {"template": "submit@1"})
+    redis.keys -= {"k1", "k2"}
+    index = CacheTagIndex(redis, batch_size=4, sleep=lambda _: None)
+    assert index.prune() == 2
+    assert len(redis.sets["tag:template:submit@1"]) == 8
+
+
+def test_keys_written_over_a_tag_set_are_skipped():
+    redis = SetRedis()
+    fill(redis, 10, {"model": "m", "template": "submit@1"})
+    redis.sets.pop("tag:model:m")
+    redis.keys.add("tag:model:m")
+    redis.keys -= {"k1"}
+    index = CacheTagIndex(redis, batch_size=4, sleep=lambda _: None)
+    assert index.prune() == 1
+    assert index.invalidate(["model:m"])["deleted"] == 0
+    assert index.invalidate(["template:submit@1"])["deleted"] == 9
+
+
+def test_purge_of_a_million_keys_is_batched():
+    redis = SetRedis()
+    fill(redis, MILLION, {"model": "old"})
+    fill(redis, 1000, {"model": "new"}, prefix="n")
+    pauses = []
+    index = CacheTagIndex(redis, batch_size=500, sleep=pauses.append)
+
+    report = index.invalidate(["model:old"])
+
+    assert report["deleted"] == MILLION
+    assert report["batches"] == MILLION // 500
+    assert len(pauses) == report["batches"]
+    # No command ever touched more than a batch of keys, so Redis was never blocked for long
+    assert redis.largest_command <= 500
+    assert "tag:model:old" not in redis.sets
+    assert redis.keys == {f"n{index}" for index in range(1000)}
+
+
+@pytest.mark.skipif(not os.getenv("REDIS_TEST_URL"), reason="needs a disposable Redis server in REDIS_TEST_URL")
+def test_purge_latency_on_live_redis():
+    import redis as redis_module
+
+    client = redis_module.Redis.from_url(os.environ["REDIS_TEST_URL"], decode_responses=True)
+    client.flushdb()
+    for start in range(0, MILLION, 10_000):
+        pipeline = client.pipeline(transaction=False)
+        keys = [f"k{index}" for index in range(start, start + 10_000)]
+        for key in keys:
+            pipeline.set(key, "v" * 100)
+        tag_entries(pipeline, keys, {"model": "old"})
+        pipeline.execute()
+
+    latencies = []
+    done = threading.Event()
+
+    def probe():
+        while not done.is_set():
+            started = time.perf_counter()
+            client.get("k0")
+            latencies.append(time.perf_counter() - started)
+            time.sleep(0.001)
+
+    prober = threading.Thread(target=probe)
+    prober.start()
+    report = CacheTagIndex(client).invalidate(["model:old"])
+    done.set()
+    prober.join()
+
+    latencies.sort()
+    assert report["deleted"] == MILLION
+    assert client.dbsize() == 0
+    assert latencies[int(len(latencies) * 0.99)] < 0.02
+    assert latencies[-1] < 0.1
@@ -0,0 +1,108 @@
+import pytest
+from app.services.circuit_breaker import CircuitBreaker, CircuitOpenError, CLOSED, OPEN, HALF_OPEN
+from app.services.write_spool import WriteSpool
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def fail():
+    raise ConnectionError("down")
+
+
+def make_breaker(clock, **kwargs):
+    options = dict(failure_rate=0.5, window=4, min_calls=4, open_seconds=10, half_open_calls=2, clock=clock)
+    options.update(kwargs)
+    return CircuitBreaker("test", **options)
+
+
+def test_opens_on_failure_rate_and_fails_fast():
+    breaker = make_breaker(FakeClock())
+    breaker.call(lambda: "ok")
+    breaker.call(lambda: "ok")
+    for _ in range(2):
+        with pytest.raises(ConnectionError):
+            breaker.call(fail)
+    assert breaker.state == OPEN
+
+    calls = []
+    with pytest.raises(CircuitOpenError) as error:
+        breaker.call(calls.append, 1)
+    assert not calls
+    assert error.value.retry_after == 10
+    assert breaker.snapshot()["rejected"] == 1
+
+
+def test_half_open_probes_close_or_reopen_the_circuit():
+    clock = FakeClock()
+    breaker = make_breaker(clock, min_calls=1, failure_rate=1.0)
+    with pytest.raises(ConnectionError):
+        breaker.call(fail)
+    clock.now = 10
+    assert breaker.allow()
+    assert breaker.state == HALF_OPEN
+    assert breaker.allow()
+    # Only `half_open_calls` probes are let through at once
+    assert not breaker.allow()
+    breaker.record(True)
+    breaker.record(True)
+    assert breaker.state == CLOSED
+
+    with pytest.raises(ConnectionError):
+        breaker.call(fail)
+    clock.now = 20
+    with pytest.raises(ConnectionError):
+        breaker.call(fail)
+    assert breaker.state == OPEN
+    assert breaker.retry_after() == 10
+
+
+def test_slow_calls_count_as_failures():
+    breaker = make_breaker(FakeClock(), min_calls=2, slow_call_seconds=0.5)
+    breaker.record(True, 0.1)
+    breaker.record(True, 2.0)
+    assert breaker.state == OPEN
+
+
+class FlakyCollection:
+    def __init__(self):
+        self.up = False
+        self.documents = []
+
+    def insert_one(self, document):
+        if not self.up:
+            raise ConnectionError("down")
+        self.documents.append(document)
+
+    def insert_many(self, documents, ordered=True):
+        if not self.up:
+            raise ConnectionError("down")
+        self.documents.extend(documents)
+
+
+def test_spool_holds_writes_until_the_circuit_closes():
+    clock = FakeClock()
+    collection = FlakyCollection()
+    breaker = make_breaker(clock, min_calls=1, failure_rate=1.0, half_open_calls=1)
+    spool = WriteSpool(collection, breaker, max_documents=2, retry_seconds=0.01)
+
+    assert not spool.insert({"n": 1})
+    assert not spool.insert({"n": 2})
+    assert not spool.insert({"n": 3})
+    assert spool.snapshot() == {"spooled": 2, "dropped": 1}
+    thread = spool.thread
+    assert thread is not None
+
+    # The replay thread writes the spool on its own once the circuit lets a probe through
+    collection.up = True
+    clock.now = 10
+    thread.join(timeout=5)
+    assert [document["n"] for document in collection.documents] == [2, 3]
+    assert spool.snapshot()["spooled"] == 0 and spool.thread is None
+    assert spool.insert({"n": 4})
+    assert [document["n"] for document in collection.documents] == [2, 3, 4]
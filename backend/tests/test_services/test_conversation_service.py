@@ -0,0 +1,122 @@
+import orjson
+import pytest
+from app.services.conversation_service import (
+    ConversationService,
+    ConversationConflictError,
+    ConversationNotFoundError,
+    CONVERSATION_CACHE_PREFIX,
+)
+from app.utils.tokens import count_tokens
+
+mongomock = pytest.importorskip("mongomock")
+
+
+class DictRedis:
+    """
+    Minimal in-memory stand-in for the Redis commands the service uses.
+    """
+
+    def __init__(self):
+        self.data = {}
+
+    def get(self, key):
+        return self.data.get(key)
+
+    def set(self, key, value, ex=None):
+        self.data[key] = value.decode() if isinstance(value, bytes) else value
+        return True
+
+    def delete(self, key):
+        self.data.pop(key, None)
+
+
+def turn(index):
+    return f"Question {index} about the OrderController?", f"Answer {index}: move the query into a scope. " * 5
+
+
+@pytest.fixture
+def database():
+    return mongomock.MongoClient()["test"]
+
+
+def test_context_keeps_the_recent_turns_that_fit_the_budget(database):
+    redis = DictRedis()
+    tokens = sum(count_tokens(text) for text in turn(0))
+    service = ConversationService(database, redis, context_tokens=tokens * 3 + 1)
+    session_id = service.create("alice")
+    for index in range(5):
+        assert service.append(session_id, service.context(session_id, "alice").count, *turn(index)) == index + 1
+
+    context = service.context(session_id, "alice")
+    assert context.count == 5 and [prompt for prompt, _, _ in context.turns] == [turn(2)[0], turn(3)[0], turn(4)[0]]
+    assert context.messages()[0] == {"role": "user", "content": turn(2)[0]}
+    # The new prompt takes part of the budget
+    assert len(service.context(session_id, "alice", reserved_tokens=tokens).turns) == 2
+
+    # The state is rebuilt from MongoDB once the cached copy is gone
+    redis.data.clear()
+    assert service.context(session_id, "alice") == context
+    assert orjson.loads(redis.data[CONVERSATION_CACHE_PREFIX + session_id])["count"] == 5
+
+
+def test_compact_folds_old_turns_into_the_summary(database):
+    redis = DictRedis()
+    transcripts = []
+
+    def summarize(summary, transcript):
+        transcripts.append(transcript)
+        return f"{summary} +{transcript.count('Developer:')} turns".strip()
+
+    tokens = sum(count_tokens(text) for text in turn(0))
+    service = ConversationService(database, redis, summarize, context_tokens=tokens * 4, summary_turns=3)
+    session_id = service.create()
+    for index in range(4):
+        service.append(session_id, index, *turn(index))
+    assert not service.compact(session_id)
+
+    for index in range(4, 7):
+        service.append(session_id, index, *turn(index))
+    assert service.compact(session_id)
+    assert transcripts[0].startswith(f"Developer: {turn(0)[0]}") and transcripts[0].count("Developer:") == 5
+
+    context = service.context(session_id, reserved_tokens=tokens)
+    assert context.summary == "+5 turns" and [prompt for prompt, _, _ in context.turns] == [turn(5)[0], turn(6)[0]]
+    assert context.messages()[0]["content"].endswith("+5 turns")
+    document = database["conversations"].find_one({"_id": session_id})
+    assert (document["summarized"], document["count"], len(document["turns"])) == (5, 7, 7)
+    assert service.get(session_id)["turns"] == 7 and len(service.get(session_id)["recent"]) == 2
+
+
+def test_turns_and_summaries_do_not_interleave(database):
+    redis = DictRedis()
+    service = ConversationService(database, redis, context_tokens=10, summary_turns=1, max_turns=3)
+    session_id = service.create("alice")
+    service.append(session_id, 0, *turn(0))
+    with pytest.raises(ConversationConflictError):
+        service.append(session_id, 0, *turn(1))
+
+    # A turn recorded while the summary is written does not discard it
+    def summarize(summary, transcript):
+        service.append(session_id, 1, *turn(1))
+        return "summary"
+
+    service.summarize = summarize
+    fold = service.fold(session_id)
+    assert service.compact(session_id)
+    assert database["conversations"].find_one({"_id": session_id})["summarized"] == 1
+    context = service.context(session_id, "alice")
+    assert context.count == 2 and context.summary == "summary"
+    # A second summary of the same turns is dropped
+    assert not service.save_summary(session_id, fold, "stale")
+    assert service.context(session_id, "alice").summary == "summary"
+
+    service.append(session_id, 2, *turn(2))
+    with pytest.raises(ConversationConflictError):
+        service.append(session_id, 3, *turn(3))
+    with pytest.raises(ConversationNotFoundError):
+        service.context(session_id, "bob")
+    with pytest.raises(ConversationNotFoundError):
+        service.delete(session_id, "bob")
+    service.delete(session_id, "alice")
+    with pytest.raises(ConversationNotFoundError):
+        service.context(session_id, "alice")
@@ -0,0 +1,55 @@
+import asyncio
+import threading
+import time
+from app.services.health_service import HealthService
+
+
+def test_probes_run_concurrently_and_report_latency():
+    def slow():
+        time.sleep(0.2)
+
+    service = HealthService({"a": slow, "b": slow, "c": lambda: None})
+    started = time.perf_counter()
+    results = asyncio.run(service.check())
+    assert time.perf_counter() - started < 0.35
+    assert all(result.ok for result in results.values())
+    assert results["a"].latency_ms >= 200
+    service.close()
+
+
+def test_failures_and_timeouts_are_reported():
+    release = threading.Event()
+    hung_calls = []
+
+    def hung():
+        hung_calls.append(1)
+        release.wait()
+
+    def broken():
+        raise ConnectionError("refused")
+
+    service = HealthService({"broken": broken, "hung": hung, "false": lambda: False}, timeout=0.1)
+    results = asyncio.run(service.check())
+    assert results["broken"].error == "ConnectionError: refused"
+    assert results["hung"].error == "timed out after 0.1s"
+    assert not results["false"].ok
+
+    # The hung probe is not started a second time while it is still running
+    assert not asyncio.run(service.check(force=True))["hung"].ok
+    assert len(hung_calls) == 1
+    release.set()
+    service.close()
+
+
+def test_results_are_cached():
+    calls = []
+    service = HealthService({"a": lambda: calls.append(1)}, cache_seconds=60)
+
+    async def scenario():
+        await asyncio.gather(*(service.check() for _ in range(5)))
+        await service.check()
+
+    asyncio.run(scenario())
+    assert len(calls) == 1
+    assert HealthService.all_ok(service.cached(), ["a", "unknown"])
+    service.close()
@@ -0,0 +1,151 @@
+import random
+from app.services.heavy_hitters import SpaceSaving, HeavyHitterTracker
+from app.services.cache_warmer import CacheWarmer
+
+
+class DictCollection:
+    """
+    Minimal in-memory stand-in for the MongoDB collection commands the services use.
+    """
+
+    def __init__(self, documents=None):
+        self.documents = list(documents or [])
+
+    def find_one(self, query):
+        return next((doc for doc in self.documents if doc["_id"] == query["_id"]), None)
+
+    def find(self, query):
+        field = next(iter(query))
+        return [doc for doc in self.documents if field in doc]
+
+    def replace_one(self, query, document, upsert=False):
+        self.documents = [doc for doc in self.documents if doc["_id"] != query["_id"]]
+        self.documents.append({"_id": query["_id"], **document})
+
+    def bulk_write(self, requests, ordered=True):
+        for request in requests:
+            self.replace_one(request._filter, request._doc, upsert=True)
+
+    def delete_many(self, query):
+        cutoff = query["updated_at"]["$lt"]
+        self.documents = [doc for doc in self.documents if doc["updated_at"] >= cutoff]
+
+    def create_index(self, field):
+        pass
+
+    def aggregate(self, pipeline):
+        wanted = set(pipeline[0]["$match"]["cache_key"]["$in"])
+        latest = {}
+        for doc in sorted(self.documents, key=lambda doc: doc["_id"]):
+            if doc.get("cache_key") in wanted:
+                latest[doc["cache_key"]] = {"response": doc["response"], **doc.get("usage", {})}
+        return [{"_id": key, **row} for key, row in latest.items()]
+
+
+class DictRedis:
+    def __init__(self, data=None):
+        self.data = dict(data or {})
+        self.expiry = {}
+        self.sets = {}
+
+    def pipeline(self, transaction=True):
+        return DictPipeline(self)
+
+
+class DictPipeline:
+    def __init__(self, redis):
+        self.redis = redis
+        self.commands = []
+
+    def set(self, key, value, nx=False, ex=None):
+        self.commands.append((key, value, nx, ex))
+
+    def sadd(self, key, *members):
+        self.commands.append(("sadd", key, members))
+
+    def expire(self, key, seconds):
+        self.commands.append(("expire", key, seconds))
+
+    def execute(self):
+        results = []
+        for command in self.commands:
+            if command[0] == "sadd":
+                self.redis.sets.setdefault(command[1], set()).update(command[2])
+                results.append(len(command[2]))
+                continue
+            if command[0] == "expire":
+                results.append(True)
+                continue
+            key, value, nx, ex = command
+            if nx and key in self.redis.data:
+                results.append(None)
+                continue
+            self.redis.data[key] = value
+            self.redis.expiry[key] = ex
+            results.append(True)
+        return results
+
+
+def test_space_saving_finds_frequent_items():
+    random.seed(1)
+    summary = SpaceSaving(50)
+    stream = [f"hot{rank}" for rank in range(5) for _ in range(200 - rank * 20)]
+    stream += [f"cold{index}" for index in range(2000)]
+    random.shuffle(stream)
+    for item in stream:
+        summary.add(item)
+    top = summary.top(5)
+    assert [item for item, _, _ in top] == [f"hot{rank}" for rank in range(5)]
+    for item, count, error in top:
+        true_count = stream.count(item)
+        assert count - error <= true_count <= count
+    assert len(summary.counts) == 50
+
+
+def test_tracker_persists_and_resumes():
+    database = {"prompt_heavy_hitters": DictCollection()}
+    tracker = HeavyHitterTracker(database, capacity=10, max_prompt_chars=20)
+    for _ in range(3):
+        tracker.add("how to sort a list")
+    tracker.add("x" * 21)
+    tracker.add("what is a tuple")
+    assert database["prompt_heavy_hitters"].documents == []
+    assert tracker.persist()
+    assert sorted((doc["_id"], doc["count"]) for doc in database["prompt_heavy_hitters"].documents) == [
+        ("how to sort a list", 3), ("what is a tuple", 1),
+    ]
+
+    resumed = HeavyHitterTracker(database, capacity=10)
+    assert [(prompt, count) for prompt, count, _ in resumed.top(2)] == [("how to sort a list", 3), ("what is a tuple", 1)]
+
+
+def test_tracker_snapshot_leaves_out_prompt_text():
+    tracker = HeavyHitterTracker(capacity=10)
+    for prompt in ("fix this: $apiKey = 'secret'", "fix this: $apiKey = 'secret'", "what is a tuple"):
+        tracker.add(prompt)
+    snapshot = tracker.snapshot()
+    assert snapshot["tracked"] == 2 and snapshot["total"] == 3
+    assert snapshot["top"] == [{"count": 2, "error": 0}, {"count": 1, "error": 0}]
+
+
+def test_warmer_loads_latest_answers_and_reports_coverage():
+    collection = DictCollection([
+        {"_id": 1, "cache_key": "a", "response": "old a"},
+        {"_id": 2, "cache_key": "a", "response": "new a", "usage": {"model": "gpt-4o-mini", "template": "submit@1"}},
+        {"_id": 3, "cache_key": "b", "response": "b"},
+        {"_id": 4, "cache_key": "submit:123", "prompt": "c", "response": "c with code"},
+    ])
+    redis = DictRedis({"b": "cached b"})
+    warmer = CacheWarmer(
+        collection, redis, lambda key, size: 100, batch_size=2, rate_per_second=1e6,
+        extra_keys=lambda prompt, response: {"stale:" + prompt: (response, 1000)},
+    )
+    report = warmer.warm([("a", 6), ("b", 3), ("c", 1)])
+    assert redis.data["a"] == "new a" and redis.expiry["a"] == 100
+    assert redis.data["stale:a"] == "new a" and redis.expiry["stale:a"] == 1000
+    assert redis.data["b"] == "cached b"
+    assert "c" not in redis.data
+    assert redis.sets["tag:model:gpt-4o-mini"] == {"a", "stale:a"}
+    assert report["state"] == "done"
+    assert (report["loaded"], report["already_cached"], report["not_found"]) == (1, 1, 1)
+    assert report["coverage"] == 0.9
@@ -0,0 +1,117 @@
+import math
+from unittest.mock import MagicMock
+from app.services.embedding_service import HashingEmbedder, get_embedder, register_embedder
+from app.services.hybrid_search_service import HybridSearchService, reciprocal_rank_fusion
+
+
+def cosine(a, b):
+    return sum(x * y for x, y in zip(a, b))
+
+
+def test_hashing_embedder_is_deterministic_and_normalized():
+    """
+    Test that the hashing embedder returns stable unit vectors.
+    """
+    embedder = HashingEmbedder(dimensions=64)
+    vector = embedder.embed("How do I define a route?")
+    assert vector == embedder.embed("How do I define a route?")
+    assert len(vector) == 64
+    assert math.isclose(sum(value * value for value in vector), 1.0)
+    assert embedder.embed("   ") is None
+
+
+def test_hashing_embedder_places_paraphrases_closer():
+    """
+    Test that related prompts are closer than unrelated ones.
+    """
+    embedder = HashingEmbedder()
+    query = embedder.embed("defining routes in laravel")
+    related = embedder.embed("How do I define a route in Laravel?")
+    unrelated = embedder.embed("Blade template inheritance")
+    assert cosine(query, related) > cosine(query, unrelated)
+
+
+def test_register_embedder():
+    """
+    Test that custom embedders can be registered and selected by name.
+    """
+    register_embedder("tiny", lambda: HashingEmbedder(dimensions=8))
+    assert get_embedder("tiny").dimensions == 8
+    assert isinstance(get_embedder("missing"), HashingEmbedder)
+
+
+def test_reciprocal_rank_fusion():
+    """
+    Test that documents ranked well by both retrievers come first.
+    """
+    assert reciprocal_rank_fusion([["a", "b", "c"], ["b", "d", "a"]]) == ["b", "a", "d", "c"]
+
+
+def test_search_fuses_knn_and_bm25():
+    """
+    Test that the hybrid search sends both queries in one msearch and fuses their hits.
+    """
+    client = MagicMock()
+    client.msearch.return_value = {
+        "responses": [
+            {"hits": {"hits": [{"_id": "1", "_source": {"prompt": "p1", "response": "r1"}},
+                               {"_id": "2", "_source": {"prompt": "p2", "response": "r2"}}]}},
+            {"hits": {"hits": [{"_id": "2", "_source": {"prompt": "p2", "response": "r2"}}]}},
+        ]
+    }
+    service = HybridSearchService(client, embedder=HashingEmbedder(dimensions=16), index="qa_pairs")
+
+    results = service.search("define a route", size=5)
+
+    assert results == [{"prompt": "p2", "response": "r2"}, {"prompt": "p1", "response": "r1"}]
+    searches = client.msearch.call_args.kwargs["searches"]
+    assert searches[1]["_source"] == ["prompt", "response"]
+    assert searches[1]["query"]["multi_match"]["fields"] == ["prompt^2", "response"]
+    assert searches[3]["knn"]["field"] == "embedding"
+    assert len(searches[3]["knn"]["query_vector"]) == 16
+
+
+def test_prepare_document_adds_embedding():
+    """
+    Test that indexed documents carry the prompt embedding and no MongoDB _id.
+    """
+    service = HybridSearchService(MagicMock(), embedder=HashingEmbedder(dimensions=16))
+    document = service.prepare_document({"_id": "abc", "prompt": "Queue workers", "response": "Use Horizon."})
+    assert "_id" not in document
+    assert len(document["embedding"]) == 16
+
+
+def test_scoped_search_routes_and_filters_by_user():
+    """
+    Test that a user's search goes to the user's shard and only matches the user's interactions.
+    """
+    client = MagicMock()
+    client.msearch.return_value = {"responses": [{"hits": {"hits": []}}, {"hits": {"hits": []}}]}
+    service = HybridSearchService(client, embedder=HashingEmbedder(dimensions=16), index="qa_pairs")
+
+    service.search("define a route", scoped=True, user_id="alice")
+    searches = client.msearch.call_args.kwargs["searches"]
+    assert searches[0] == searches[2] == {"index": "qa_pairs", "routing": "alice"}
+    assert searches[1]["query"]["bool"]["filter"] == {"term": {"user_id": "alice"}}
+    assert searches[3]["knn"]["filter"] == {"term": {"user_id": "alice"}}
+
+    service.search("define a route", scoped=True)
+    searches = client.msearch.call_args.kwargs["searches"]
+    assert "routing" not in searches[0]
+    assert searches[3]["knn"]["filter"] == {"bool": {"must_not": {"exists": {"field": "user_id"}}}}
+
+
+def test_bulk_index_routes_by_user(mocker):
+    """
+    Test that bulk-indexed interactions keep their MongoDB id and are routed by user.
+    """
+    bulk = mocker.patch("app.services.hybrid_search_service.helpers.bulk", return_value=(2, []))
+    service = HybridSearchService(MagicMock(), embedder=HashingEmbedder(dimensions=16), index="qa_pairs")
+    service.bulk_index([
+        {"_id": "a1", "prompt": "p", "response": "r", "user_id": "alice", "cache_key": "p"},
+        {"_id": "b2", "prompt": "p", "response": "r"},
+    ])
+    actions = bulk.call_args.args[1]
+    assert [(action["_id"], action.get("_routing")) for action in actions] == [("a1", "alice"), ("b2", None)]
+    assert set(actions[0]["_source"]) == {"prompt", "response", "user_id", "embedding"}
+
@@ -0,0 +1,92 @@
+import asyncio
+import pytest
+from app.services.idempotency_service import (
+    IdempotencyService,
+    IdempotencyConflictError,
+    IdempotencyInProgressError,
+    fingerprint,
+)
+
+
+class DictRedis:
+    """
+    Minimal in-memory stand-in for the Redis commands the service uses.
+    """
+
+    def __init__(self):
+        self.data = {}
+        self.expiry = {}
+
+    def get(self, key):
+        return self.data.get(key)
+
+    def set(self, key, value, nx=False, ex=None):
+        if nx and key in self.data:
+            return None
+        self.data[key] = value
+        self.expiry[key] = ex
+        return True
+
+    def delete(self, key):
+        self.data.pop(key, None)
+
+
+def test_fingerprint_ignores_key_order():
+    assert fingerprint({"prompt": "a", "code": "b"}) == fingerprint({"code": "b", "prompt": "a"})
+    assert fingerprint({"prompt": "a"}) != fingerprint({"prompt": "b"})
+
+
+def test_stored_result_is_replayed():
+    redis = DictRedis()
+    service = IdempotencyService(redis, ttl=60)
+    fp = fingerprint({"prompt": "a"})
+
+    async def scenario():
+        assert await service.begin("key", fp) is None
+        service.complete("key", fp, "answer")
+        return await service.begin("key", fp)
+
+    assert asyncio.run(scenario()) == "answer"
+    assert redis.expiry["idem:key"] == 60
+    with pytest.raises(IdempotencyConflictError):
+        asyncio.run(service.begin("key", fingerprint({"prompt": "b"})))
+
+
+def test_retry_attaches_to_request_in_flight():
+    service = IdempotencyService(DictRedis())
+    fp = fingerprint({"prompt": "a"})
+
+    async def scenario():
+        assert await service.begin("key", fp) is None
+        retry = asyncio.create_task(service.begin("key", fp))
+        await asyncio.sleep(0.01)
+        assert not retry.done()
+        service.complete("key", fp, "answer")
+        return await retry
+
+    assert asyncio.run(scenario()) == "answer"
+
+
+def test_abandoned_key_is_claimed_by_retry():
+    service = IdempotencyService(None)
+    fp = fingerprint({"prompt": "a"})
+
+    async def scenario():
+        assert await service.begin("key", fp) is None
+        retry = asyncio.create_task(service.begin("key", fp))
+        await asyncio.sleep(0.01)
+        service.abandon("key")
+        return await retry
+
+    # The retry runs the request itself after the original failed
+    assert asyncio.run(scenario()) is None
+    assert "key" in service.in_flight
+
+
+def test_wait_limit_raises_in_progress():
+    redis = DictRedis()
+    fp = fingerprint({"prompt": "a"})
+    # Another worker holds the claim and never finishes
+    asyncio.run(IdempotencyService(redis).begin("key", fp))
+    with pytest.raises(IdempotencyInProgressError):
+        asyncio.run(IdempotencyService(redis, wait_seconds=0.05).begin("key", fp))
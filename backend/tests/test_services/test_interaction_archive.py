@@ -0,0 +1,83 @@
+from datetime import datetime, timedelta, timezone
+import pytest
+from bson import ObjectId
+from app.services.interaction_archive import InteractionArchive, id_range
+from app.services.response_store import ResponseStore
+
+mongomock = pytest.importorskip("mongomock")
+
+NOW = datetime(2026, 3, 15, tzinfo=timezone.utc)
+
+
+@pytest.fixture
+def interactions():
+    collection = mongomock.MongoClient()["test"]["interactions"]
+    store = ResponseStore(collection.database, min_bytes=10)
+    for days_ago in (100, 70, 40, 5, 1):
+        created = NOW - timedelta(days=days_ago)
+        document = store.reference({"prompt": f"{days_ago} days ago", "response": f"answer from {days_ago} days ago"})
+        collection.insert_one({"_id": ObjectId.from_datetime(created), **document})
+    return collection
+
+
+def make_archive(interactions, directory, **kwargs):
+    options = dict(
+        response_store=ResponseStore(interactions.database, min_bytes=10),
+        directory=str(directory), retention_days=30, batch_size=2, now=lambda: NOW,
+    )
+    options.update(kwargs)
+    return InteractionArchive(interactions, **options)
+
+
+def test_old_interactions_move_to_monthly_files(interactions, tmp_path):
+    archive = make_archive(interactions, tmp_path)
+    report = archive.archive()
+
+    assert report["state"] == "done" and report["archived"] == 3
+    assert sorted(report["months"]) == ["2025-12", "2026-01", "2026-02"]
+    assert sorted(path.name for path in tmp_path.iterdir()) == [
+        "interactions-2025-12.jsonl.gz", "interactions-2026-01.jsonl.gz", "interactions-2026-02.jsonl.gz",
+    ]
+    assert interactions.count_documents({}) == 2
+    assert archive.archive()["archived"] == 0
+    assert interactions.database["locks"].count_documents({}) == 0
+
+
+def test_archive_reads_only_the_requested_range(interactions, tmp_path):
+    archive = make_archive(interactions, tmp_path)
+    archive.archive()
+    # A batch archived twice (crash before the delete) is read once
+    archive._append("2026-02", [{"id": "x", "ts": (NOW - timedelta(days=40)).timestamp(), "prompt": "p", "response": "r"}] * 2)
+
+    since = NOW - timedelta(days=75)
+    assert not archive.needed(NOW - timedelta(days=10))
+    assert archive.needed(since)
+    rows = list(archive.read(since))
+    assert [row["prompt"] for row in rows] == ["70 days ago", "40 days ago", "p"]
+    assert rows[0]["response"] == "answer from 70 days ago"
+    assert [row["prompt"] for row in archive.read(since, NOW - timedelta(days=50))] == ["70 days ago"]
+    assert [document["prompt"] for document in interactions.find(id_range(since, None))] == ["5 days ago", "1 days ago"]
+
+
+def test_only_one_worker_archives_at_a_time(interactions, tmp_path):
+    first = make_archive(interactions, tmp_path)
+    second = make_archive(interactions, tmp_path)
+    second.holder = "other"
+    assert first._acquire()
+    assert second.archive() == {"state": "locked"}
+    assert make_archive(interactions, tmp_path, retention_days=0).archive() == {"state": "disabled"}
+
+
+def test_archiving_releases_response_references(interactions, tmp_path):
+    store = ResponseStore(interactions.database, min_bytes=10)
+    # A recent interaction shares its response with an archived one
+    shared = store.reference({"prompt": "again", "response": "answer from 70 days ago"})
+    interactions.insert_one({"_id": ObjectId.from_datetime(NOW - timedelta(days=2)), **shared})
+
+    report = make_archive(interactions, tmp_path).archive()
+
+    responses = interactions.database["responses"]
+    assert report["responses_deleted"] == 2
+    assert sorted(document["refs"] for document in responses.find()) == [1, 1, 1]
+    assert responses.find_one({"text": "answer from 70 days ago"})["refs"] == 1
+    assert responses.find_one({"text": "answer from 100 days ago"}) is None
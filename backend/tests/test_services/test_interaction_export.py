@@ -0,0 +1,78 @@
+from datetime import datetime, timedelta, timezone
+import gzip
+import pytest
+import orjson
+from bson import ObjectId
+from app.services.interaction_archive import InteractionArchive
+from app.services.interaction_export import InteractionExporter, ExportError
+
+mongomock = pytest.importorskip("mongomock")
+
+NOW = datetime(2026, 3, 15, tzinfo=timezone.utc)
+
+
+@pytest.fixture
+def exporter(tmp_path):
+    collection = mongomock.MongoClient()["test"]["interactions"]
+    collection.insert_many([
+        {"_id": ObjectId.from_datetime(NOW - timedelta(days=days)), "prompt": f"p{days}", "response": f"r{days}"}
+        for days in range(60, 0, -5)
+    ])
+    archive = InteractionArchive(collection, directory=str(tmp_path / "archive"), retention_days=30, now=lambda: NOW)
+    archive.archive()
+    return InteractionExporter(collection, archive=archive, batch_size=3)
+
+
+def read_jsonl(data):
+    return [orjson.loads(line) for line in gzip.decompress(data).splitlines()]
+
+
+def test_stream_covers_archive_and_mongodb_in_order(exporter):
+    prompts = [row["prompt"] for row in read_jsonl(b"".join(exporter.jsonl_gzip(exporter.rows())))]
+    assert prompts == [f"p{days}" for days in range(60, 0, -5)]
+
+    since, until = NOW - timedelta(days=42), NOW - timedelta(days=12)
+    rows = list(exporter.rows(since, until))
+    assert [row["prompt"] for row in rows] == ["p40", "p35", "p30", "p25", "p20", "p15"]
+    assert [row["prompt"] for row in exporter.rows(since, until, after=rows[3]["id"])] == ["p20", "p15"]
+    # A range of recent interactions does not read the archive
+    assert [row["prompt"] for row in exporter.rows(NOW - timedelta(days=12))] == ["p10", "p5"]
+    with pytest.raises(ExportError):
+        exporter.rows(after="not-an-id")
+
+
+def test_interrupted_file_export_resumes_from_checkpoint(exporter, tmp_path, monkeypatch):
+    output = str(tmp_path / "export.jsonl.gz")
+    rows = exporter._rows
+
+    def failing_rows(*args):
+        for count, row in enumerate(rows(*args)):
+            if count == 5:
+                raise ConnectionError("cursor lost")
+            yield row
+
+    monkeypatch.setattr(exporter, "_rows", failing_rows)
+    with pytest.raises(ConnectionError):
+        exporter.export_to_file(output, checkpoint_rows=2)
+    with open(output, "ab") as file:
+        file.write(b"partial member")
+    monkeypatch.setattr(exporter, "_rows", rows)
+
+    checkpoint = exporter.export_to_file(output, resume=True, checkpoint_rows=2)
+    assert checkpoint["done"] and checkpoint["rows"] == 12
+    with open(output, "rb") as file:
+        assert [row["prompt"] for row in read_jsonl(file.read())] == [f"p{days}" for days in range(60, 0, -5)]
+    assert exporter.export_to_file(output, resume=True)["rows"] == 12
+    with pytest.raises(ExportError):
+        exporter.export_to_file(output, since=NOW, resume=True)
+
+
+def test_parquet_export_writes_row_groups(exporter):
+    parquet = pytest.importorskip("pyarrow.parquet")
+    import io
+
+    exporter.row_group_size = 5
+    data = b"".join(exporter.parquet(exporter.rows()))
+    table = parquet.ParquetFile(io.BytesIO(data))
+    assert table.metadata.num_row_groups == 3
+    assert table.read().column("prompt").to_pylist() == [f"p{days}" for days in range(60, 0, -5)]
@@ -0,0 +1,198 @@
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+import pytest
+from app.services.llm_scheduler import LLMScheduler, INTERACTIVE, BULK, CallCancelledError
+
+
+@pytest.fixture
+def make_scheduler():
+    """
+    Creates fresh scheduler instances, restoring the app-wide singleton afterwards.
+    """
+    original = LLMScheduler._instance
+
+    def make(**kwargs):
+        LLMScheduler._instance = None
+        return LLMScheduler(**kwargs)
+
+    yield make
+    LLMScheduler._instance = original
+
+
+def run_queued(scheduler, calls):
+    """
+    Blocks the only slot, queues `calls` (name, priority, user) in order, releases the slot and
+    returns the order in which the calls were admitted.
+    """
+    order = []
+    release = threading.Event()
+    holding = threading.Event()
+
+    def hold():
+        with scheduler.slot(BULK, "holder"):
+            holding.set()
+            release.wait()
+
+    def call(name, priority, user):
+        with scheduler.slot(priority, user):
+            order.append(name)
+
+    threads = [threading.Thread(target=hold)]
+    threads[0].start()
+    holding.wait()
+    for queued, (name, priority, user) in enumerate(calls, start=1):
+        thread = threading.Thread(target=call, args=(name, priority, user))
+        thread.start()
+        threads.append(thread)
+        while sum(queue["queued"] for queue in scheduler.snapshot().values()) < queued:
+            time.sleep(0.001)
+    release.set()
+    for thread in threads:
+        thread.join(timeout=5)
+    return order
+
+
+def test_interactive_calls_go_before_queued_bulk_calls(make_scheduler):
+    """
+    Test that an interactive call queued behind bulk calls is admitted first.
+    """
+    scheduler = make_scheduler(max_concurrency=1, interactive_reserved=0, starvation_seconds=60)
+    order = run_queued(scheduler, [("b1", BULK, "u"), ("b2", BULK, "u"), ("i1", INTERACTIVE, "u")])
+    assert order == ["i1", "b1", "b2"]
+    stats = scheduler.snapshot()
+    assert stats[INTERACTIVE]["dispatched"] == 1
+    assert stats[BULK]["max_wait_ms"] > 0
+
+
+def test_users_share_a_class_fairly(make_scheduler):
+    """
+    Test that one user's backlog does not push back another user's call.
+    """
+    scheduler = make_scheduler(max_concurrency=1, interactive_reserved=0, starvation_seconds=60)
+    calls = [(f"a{i}", BULK, "alice") for i in range(6)] + [("b0", BULK, "bob")]
+    order = run_queued(scheduler, calls)
+    assert order.index("b0") <= 1
+
+
+def test_starving_bulk_calls_are_admitted(make_scheduler):
+    """
+    Test that a bulk call waiting past the starvation limit goes ahead of interactive calls.
+    """
+    scheduler = make_scheduler(max_concurrency=1, interactive_reserved=0, starvation_seconds=0.05)
+    order = []
+    release = threading.Event()
+
+    def hold():
+        with scheduler.slot(INTERACTIVE, "holder"):
+            release.wait()
+
+    holder = threading.Thread(target=hold)
+    holder.start()
+
+    def call(name, priority):
+        with scheduler.slot(priority, "u"):
+            order.append(name)
+
+    threads = [threading.Thread(target=call, args=("bulk", BULK))]
+    threads[0].start()
+    time.sleep(0.1)
+    threads.append(threading.Thread(target=call, args=("interactive", INTERACTIVE)))
+    threads[1].start()
+    while scheduler.snapshot()[INTERACTIVE]["queued"] < 1:
+        time.sleep(0.001)
+    release.set()
+    for thread in [holder] + threads:
+        thread.join(timeout=5)
+    assert order == ["bulk", "interactive"]
+
+
+def test_bulk_calls_leave_reserved_slots_free(make_scheduler):
+    """
+    Test that bulk calls never take the slots reserved for interactive calls.
+    """
+    scheduler = make_scheduler(max_concurrency=3, interactive_reserved=1, starvation_seconds=60)
+    peak = []
+    lock = threading.Lock()
+
+    def call():
+        with scheduler.slot(BULK, "u"):
+            with lock:
+                peak.append(scheduler.running[BULK])
+            time.sleep(0.01)
+
+    threads = [threading.Thread(target=call) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(timeout=5)
+    assert max(peak) == 2
+
+
+def test_cancelled_call_leaves_the_queue(make_scheduler):
+    """
+    Test that a queued call gives up its place once cancelled, without waiting for a free slot.
+    """
+    scheduler = make_scheduler(max_concurrency=1, interactive_reserved=0, starvation_seconds=60)
+    cancelled = threading.Event()
+    errors = []
+
+    def call():
+        try:
+            with scheduler.slot(INTERACTIVE, "u", cancelled=cancelled):
+                pass
+        except CallCancelledError as e:
+            errors.append(e)
+
+    with scheduler.slot(INTERACTIVE, "holder"):
+        thread = threading.Thread(target=call)
+        thread.start()
+        while scheduler.snapshot()[INTERACTIVE]["queued"] < 1:
+            time.sleep(0.001)
+        cancelled.set()
+        thread.join(timeout=5)
+        assert len(errors) == 1
+        assert scheduler.snapshot()[INTERACTIVE]["queued"] == 0
+
+
+def test_interactive_call_is_admitted_while_bulk_calls_are_queued(make_scheduler):
+    """
+    Test that calls awaiting their slot hold no executor thread, so an interactive call gets its reserved
+    slot at once however many bulk calls are queued, and that a cancelled waiter leaves the queue.
+    """
+    scheduler = make_scheduler(max_concurrency=3, interactive_reserved=1, starvation_seconds=60)
+
+    async def call(priority):
+        ticket = await scheduler.acquire(priority, "u")
+        try:
+            await asyncio.to_thread(time.sleep, 0.2)
+        finally:
+            scheduler.release(ticket)
+        return ticket.wait_seconds
+
+    async def scenario():
+        executor = ThreadPoolExecutor(max_workers=4)
+        asyncio.get_running_loop().set_default_executor(executor)
+        bulk = [asyncio.create_task(call(BULK)) for _ in range(24)]
+        while scheduler.snapshot()[BULK]["queued"] < 22:
+            await asyncio.sleep(0.001)
+        started = time.monotonic()
+        waited = await call(INTERACTIVE)
+        elapsed = time.monotonic() - started
+
+        queued = scheduler.snapshot()[BULK]["queued"]
+        bulk[-1].cancel()
+        await asyncio.gather(bulk[-1], return_exceptions=True)
+        queued -= scheduler.snapshot()[BULK]["queued"]
+        for task in bulk[:-1]:
+            task.cancel()
+        await asyncio.gather(*bulk, return_exceptions=True)
+        executor.shutdown()
+        return waited, elapsed, queued
+
+    waited, elapsed, queued = asyncio.run(scenario())
+    assert waited < 0.05 and elapsed < 0.35
+    assert queued == 1
+    stats = scheduler.snapshot()
+    assert stats[BULK]["queued"] == 0 and stats[BULK]["running"] == 0 and stats[INTERACTIVE]["running"] == 0
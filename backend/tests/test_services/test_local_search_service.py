@@ -0,0 +1,107 @@
+import threading
+import pytest
+from app.services.local_search_service import LocalSearchService, tokenize
+
+
+@pytest.fixture
+def local_search(tmp_path):
+    """
+    Provide a fresh LocalSearchService backed by a temporary snapshot file.
+    """
+    LocalSearchService._instance = None
+    service = LocalSearchService(snapshot_path=str(tmp_path / "local_search.snapshot"), snapshot_every=0)
+    yield service
+    LocalSearchService._instance = None
+
+
+def test_tokenize_splits_identifiers():
+    """
+    Test that identifiers are kept whole and split on camelCase and snake_case boundaries.
+    """
+    assert tokenize("getUserName") == ["getusername", "get", "user", "name"]
+    assert tokenize("user_id = 42") == ["user_id", "user", "id", "42"]
+    assert tokenize("Route::get('/')") == ["route", "get"]
+
+
+def test_search_ranks_by_bm25(local_search):
+    """
+    Test that the most relevant document is returned first.
+    """
+    local_search.index_document("qa_pairs", {"prompt": "How do I define a route?", "response": "Use Route::get."})
+    local_search.index_document("qa_pairs", {"prompt": "Eloquent model route binding route", "response": "..."})
+    local_search.index_document("qa_pairs", {"prompt": "Blade templates", "response": "Use @extends."})
+
+    results = local_search.search_documents("qa_pairs", {"match": {"prompt": "route binding"}})
+    assert [result["prompt"] for result in results] == ["Eloquent model route binding route", "How do I define a route?"]
+
+
+def test_search_respects_field_and_size(local_search):
+    """
+    Test that match queries only score the requested field, and size caps the results.
+    """
+    for i in range(5):
+        local_search.index_document("qa_pairs", {"prompt": f"question {i}", "response": "middleware"})
+
+    assert local_search.search_documents("qa_pairs", {"match": {"prompt": "middleware"}}) == []
+    results = local_search.search_documents("qa_pairs", {"multi_match": {"query": "middleware", "fields": ["prompt", "response"]}}, size=2)
+    assert len(results) == 2
+
+
+def test_search_filters_by_user(local_search):
+    """
+    Test that filtered searches only return the given user's documents, or those of no user.
+    """
+    local_search.index_document("qa_pairs", {"prompt": "queue workers", "response": "a", "user_id": "alice"})
+    local_search.index_document("qa_pairs", {"prompt": "queue workers", "response": "b", "user_id": "bob"})
+    local_search.index_document("qa_pairs", {"prompt": "queue workers", "response": "c"})
+
+    def responses(filters):
+        return [document["response"] for document in local_search.search_documents("qa_pairs", {"match": {"prompt": "queue"}}, filters=filters)]
+
+    assert responses({"user_id": "alice"}) == ["a"]
+    assert responses({"user_id": None}) == ["c"]
+    assert len(responses(None)) == 3
+
+
+def test_search_unknown_index_or_query(local_search):
+    """
+    Test that unknown indices and unsupported queries return no results, like ElasticsearchService.
+    """
+    assert local_search.search_documents("missing", {"match": {"prompt": "x"}}) == []
+    local_search.index_document("qa_pairs", {"prompt": "x", "response": "y"})
+    assert local_search.search_documents("qa_pairs", {"range": {"timestamp": {}}}) == []
+
+
+def test_snapshot_round_trip(local_search, tmp_path):
+    """
+    Test that a snapshot restores the index after a restart.
+    """
+    local_search.index_document("qa_pairs", {"prompt": "queue workers", "response": "Use Horizon.", "_id": "abc"})
+    assert local_search.snapshot() is True
+
+    LocalSearchService._instance = None
+    restored = LocalSearchService(snapshot_path=str(tmp_path / "local_search.snapshot"))
+    assert restored.count("qa_pairs") == 1
+    assert restored.search_documents("qa_pairs", {"match": {"prompt": "workers"}}) == [
+        {"prompt": "queue workers", "response": "Use Horizon."}
+    ]
+
+
+def test_automatic_snapshot_runs_in_background(tmp_path):
+    """
+    Test that reaching snapshot_every writes the snapshot on a background thread.
+    """
+    LocalSearchService._instance = None
+    path = tmp_path / "local_search.snapshot"
+    service = LocalSearchService(snapshot_path=str(path), snapshot_every=2)
+    service.index_document("qa_pairs", {"prompt": "queue workers", "response": "Use Horizon."})
+    service.index_document("qa_pairs", {"prompt": "route caching", "response": "Run route:cache."})
+    for thread in threading.enumerate():
+        if thread.name == "local-search-snapshot":
+            thread.join()
+
+    LocalSearchService._instance = None
+    restored = LocalSearchService(snapshot_path=str(path), snapshot_every=0)
+    assert restored.count("qa_pairs") == 2
+    assert service.pending_writes == 0 and not service.snapshot_due
+    LocalSearchService._instance = None
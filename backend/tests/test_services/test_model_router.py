@@ -0,0 +1,55 @@
+from app.services.model_router import ModelRouter, PROBE_EVERY
+
+
+def make_router():
+    return ModelRouter("small", "large", large_prompt_tokens=1000, large_languages=["php"], latency_slo_ms=5000)
+
+
+def test_route_by_request_features():
+    """
+    Test that small questions go to the small model and large or code-heavy tasks to the large one.
+    """
+    router = make_router()
+    assert router.route(100).model == "small"
+    assert router.route(1500).model == "large"
+    assert router.route(600, has_code=True, language="python").model == "large"
+    assert router.route(200, has_code=True, language="PHP").model == "large"
+    assert router.route(200, has_code=True, language="python").model == "small"
+    assert "1500 prompt tokens" in router.route(1500).reason
+
+
+def test_route_override():
+    """
+    Test that a known model override wins and an unknown one is ignored with an explanation.
+    """
+    router = make_router()
+    assert router.route(5000, override="small").model == "small"
+    decision = router.route(100, override="gpt-unknown")
+    assert decision.model == "small"
+    assert "unknown override" in decision.reason
+
+
+def test_route_away_from_slow_or_failing_models_with_probes():
+    """
+    Test that a model over its latency SLO or error budget is avoided, except for periodic probes.
+    """
+    router = make_router()
+    for _ in range(5):
+        router.record("large", 9000, ok=True)
+    decision = router.route(1500)
+    assert decision.model == "small"
+    assert "latency" in decision.reason
+
+    models = [router.route(1500).model for _ in range(PROBE_EVERY)]
+    assert models.count("large") == 1
+
+    # The preferred model stays when the alternative is unhealthy too
+    for _ in range(10):
+        router.record("small", 100, ok=False)
+    assert router.route(100).model == "small"
+
+    router = make_router()
+    for _ in range(10):
+        router.record("small", 100, ok=False)
+    assert router.route(100).model == "large"
+    assert router.snapshot()["small"]["error_rate"] == 1.0
@@ -1,6 +1,10 @@
+import threading
 import pytest
 from unittest.mock import MagicMock
-from app.services.openai_service import OpenAIService
+from langchain_core.messages import AIMessageChunk
+from app.services.circuit_breaker import CircuitBreaker, CLOSED, HALF_OPEN
+from app.services.llm_scheduler import CallCancelledError
+from app.services.openai_service import OpenAIService, PromptTooLargeError
 
 @pytest.fixture
 def mock_openai_service():
@@ -30,3 +34,108 @@ def test_generate_response(mock_openai_service):
     # Assertions
     mock_openai_service.generate_response.assert_called_once_with(prompt=prompt)
     assert response == "Sample response"
+
+
+def test_build_prompt_trims_code_and_rejects_oversized_requests():
+    """
+    Test that code context is trimmed to the prompt budget and oversized requests are rejected up front.
+    """
+    service = OpenAIService(api_key="test", redis_service=MagicMock(), prompt_budget=600)
+    code = "\n\n".join(f"function f{i}()\n{{\n    return {i};\n}}" for i in range(100))
+
+    messages, trimmed_lines = service.build_prompt("Explain f42", code, "php")
+    content = messages[-1]["content"]
+    assert trimmed_lines > 0
+    assert "function f42()" in content
+    assert content.startswith("Explain f42\n\n```php\n")
+
+    with pytest.raises(PromptTooLargeError):
+        service.build_prompt("word " * 1000)
+    with pytest.raises(PromptTooLargeError):
+        service.build_prompt("Explain", "x = 1;\n" * 100000)
+
+
+def test_generate_records_provider_token_usage():
+    """
+    Test that the provider's token counts are reported, and max_tokens caps the output.
+    """
+    service = OpenAIService(api_key="test", redis_service=MagicMock(), max_tokens=256)
+    service.redis_service.get.return_value = None
+    service.llm = MagicMock()
+    service.llm.invoke.return_value = MagicMock(content="Answer", usage_metadata={"input_tokens": 12, "output_tokens": 3})
+
+    completion = service.generate("Question")
+    assert (completion.text, completion.prompt_tokens, completion.completion_tokens) == ("Answer", 12, 3)
+    assert OpenAIService(api_key="test", redis_service=MagicMock(), max_tokens=256).llm.max_tokens == 256
+
+
+def test_generate_with_history_places_it_before_the_request_and_skips_the_cache():
+    """
+    Test that conversation history sits between the system message and the request, and that
+    answers depending on it are neither read from nor written to the shared cache.
+    """
+    service = OpenAIService(api_key="test", redis_service=MagicMock())
+    service.llm = MagicMock()
+    service.llm.invoke.return_value = MagicMock(content="Use with()", usage_metadata={})
+    history = [{"role": "user", "content": "Why is my page slow?"}, {"role": "assistant", "content": "An N+1 query."}]
+
+    completion = service.generate("How do I fix it?", history=history)
+    messages = service.llm.invoke.call_args.args[0]
+    assert [message["role"] for message in messages] == ["system", "user", "assistant", "user"]
+    assert messages[1:3] == history and messages[-1]["content"] == "How do I fix it?"
+    assert completion.text == "Use with()"
+    service.redis_service.get.assert_not_called()
+    service.redis_service.set.assert_not_called()
+
+
+def test_generate_streams_deltas_and_stops_when_cancelled():
+    """
+    Test that a streamed response reaches the callback piece by piece with the provider's token counts,
+    and that cancelling closes the stream without caching the partial response.
+    """
+    service = OpenAIService(api_key="test", redis_service=MagicMock())
+    service.redis_service.get.return_value = None
+    service.llm = MagicMock()
+    pieces = [AIMessageChunk(content="Use "), AIMessageChunk(content="with()"),
+              AIMessageChunk(content="", usage_metadata={"input_tokens": 20, "output_tokens": 2, "total_tokens": 22})]
+    service.llm.stream.return_value = (piece for piece in pieces)
+    deltas = []
+
+    completion = service.generate("How do I avoid N+1 queries?", on_delta=deltas.append)
+    assert deltas == ["Use ", "with()"]
+    assert (completion.text, completion.prompt_tokens, completion.completion_tokens) == ("Use with()", 20, 2)
+    service.llm.invoke.assert_not_called()
+
+    cancelled = threading.Event()
+    stream = MagicMock()
+    stream.__iter__.return_value = iter([AIMessageChunk(content="Use "), AIMessageChunk(content="with()")])
+    service.llm.stream.return_value = stream
+    service.redis_service.set.reset_mock()
+    with pytest.raises(CallCancelledError):
+        service.generate("How do I eager load?", on_delta=lambda text: cancelled.set(), cancelled=cancelled)
+    stream.close.assert_called_once()
+    service.redis_service.set.assert_not_called()
+
+
+def test_cancelled_calls_give_back_their_half_open_probe():
+    """
+    Test that calls cancelled while streaming do not use up a half-open circuit's probes.
+    """
+    service = OpenAIService(api_key="test", redis_service=MagicMock())
+    service.redis_service.get.return_value = None
+    now = [0.0]
+    service.breaker = CircuitBreaker("llm", min_calls=1, failure_rate=0.5, open_seconds=10, half_open_calls=1, clock=lambda: now[0])
+    service.breaker.record(False)
+    now[0] = 11.0
+    service.llm = MagicMock()
+
+    for _ in range(3):
+        cancelled = threading.Event()
+        service.llm.stream.return_value = (piece for piece in [AIMessageChunk(content="Use "), AIMessageChunk(content="with()")])
+        with pytest.raises(CallCancelledError):
+            service.generate("How do I eager load?", on_delta=lambda text: cancelled.set(), cancelled=cancelled)
+    assert service.breaker.state == HALF_OPEN and not service.breaker.rejecting()
+
+    service.llm.invoke.return_value = MagicMock(content="Use with()", usage_metadata={})
+    assert service.generate("How do I eager load?").text == "Use with()"
+    assert service.breaker.state == CLOSED
@@ -0,0 +1,70 @@
+import pytest
+from unittest.mock import MagicMock
+from app.services.openai_service import OpenAIService
+from app.services.prompt_templates import TEMPLATES, PromptTemplate, get_template, register_template
+
+# Digests of the stable prefix of every registered template version. A failure here means a template's
+# system text changed: register the change as a new version instead of editing the existing one.
+PREFIX_DIGESTS = {
+    "submit@1": "043e8822fb745fcbf0624c10f5019e4e77e704375ec0853df66ee105e5f28544",
+    "analysis@1": "b4e8b9415c923be8e63685b69d4b3ac28c9f0e53960d96db115e6c90726d52ee",
+    "summary@1": "22984c3fa902772e4a4c76e9cd505c81be35d5f08ca54d7316d39a05652eca26",
+}
+
+
+def test_prefix_digests_are_pinned():
+    """
+    Test that no registered template version changed its stable prefix.
+    """
+    digests = {template.key: template.prefix_digest() for versions in TEMPLATES.values() for template in versions.values()}
+    assert digests == PREFIX_DIGESTS
+
+
+@pytest.mark.parametrize("template", ["submit", "analysis"])
+def test_prefix_is_byte_stable_across_requests(template):
+    """
+    Test that requests rendered with the same template share the system message byte for byte,
+    and that all request data lands in the last message.
+    """
+    service = OpenAIService(api_key="test", redis_service=MagicMock())
+    requests = [
+        ("How do I eager load posts?", "", "", {"file_path": "a.php", "start_line": 1, "end_line": 9}),
+        ("Why is this slow?", "$users = User::all();", "php", {"file_path": "b.php", "start_line": 40, "end_line": 80}),
+    ]
+    rendered = [service.build_prompt(prompt, code, language, template, fields)[0] for prompt, code, language, fields in requests]
+
+    prefixes = [[message for message in messages[:-1]] for messages in rendered]
+    assert prefixes[0] == prefixes[1]
+    assert prefixes[0][0]["role"] == "system"
+    assert prefixes[0][0]["content"].encode("utf-8") == get_template(template).system.encode("utf-8")
+    for (prompt, code, _, fields), messages in zip(requests, rendered):
+        assert all(str(value) not in prefixes[0][0]["content"] for value in [prompt, fields["file_path"]])
+        assert code in messages[-1]["content"]
+
+
+def test_register_template_rejects_edits_without_version_bump():
+    """
+    Test that a registered version cannot be replaced with different content.
+    """
+    submit = get_template("submit")
+    with pytest.raises(ValueError):
+        register_template(PromptTemplate(submit.name, submit.version, submit.instruction + " ", submit.user))
+    assert get_template("submit", "1") is submit
+
+
+def test_generate_records_cached_prompt_tokens():
+    """
+    Test that the provider's cached-token count and the template are reported with the completion.
+    """
+    service = OpenAIService(api_key="test", redis_service=MagicMock())
+    service.redis_service.get.return_value = None
+    service.llm = MagicMock()
+    service.llm.invoke.return_value = MagicMock(
+        content="Answer",
+        usage_metadata={"input_tokens": 1500, "output_tokens": 20, "input_token_details": {"cache_read": 1024}},
+    )
+
+    completion = service.generate("Question")
+    assert completion.cached_prompt_tokens == 1024
+    assert completion.template == "submit@1"
+    assert service.llm.invoke.call_args.kwargs["prompt_cache_key"] == "submit@1"
@@ -0,0 +1,58 @@
+import pytest
+from app.services.response_store import ResponseStore, response_hash
+
+mongomock = pytest.importorskip("mongomock")
+
+LONG_ANSWER = "def sort(items):\n    return sorted(items)\n" * 20
+
+
+@pytest.fixture
+def database(replay_bulk_write):
+    database = mongomock.MongoClient()["test"]
+    replay_bulk_write(database["responses"])
+    replay_bulk_write(database["interactions"])
+    return database
+
+
+def test_identical_responses_are_stored_once(database):
+    store = ResponseStore(database, min_bytes=100)
+    interactions = database["interactions"]
+    for user in ("alice", "bob", "carol"):
+        interactions.insert_one(store.reference({"prompt": "sort a list", "response": LONG_ANSWER, "user": user}))
+    interactions.insert_one(store.reference({"prompt": "hi", "response": "hello"}))
+
+    assert database["responses"].count_documents({}) == 1
+    assert database["responses"].find_one()["refs"] == 3
+    assert interactions.count_documents({"response_hash": response_hash(LONG_ANSWER), "response": {"$exists": False}}) == 3
+    assert interactions.find_one({"prompt": "hi"})["response"] == "hello"
+
+    rows = list(store.resolve_all(interactions.find({}, {"_id": 0})))
+    assert [row["response"] for row in rows] == [LONG_ANSWER] * 3 + ["hello"]
+
+
+def test_resolve_queries_once_per_page(database, mocker):
+    store = ResponseStore(database, min_bytes=1, page_size=2)
+    documents = [store.reference({"prompt": str(index), "response": f"answer {index % 2}"}) for index in range(5)]
+    find = mocker.spy(database["responses"], "find")
+    resolved = list(store.resolve_all(documents))
+    assert [row["response"] for row in resolved] == [f"answer {index % 2}" for index in range(5)]
+    assert find.call_count == 3
+
+
+def test_migration_converts_inline_responses_and_reports_savings(database):
+    interactions = database["interactions"]
+    interactions.insert_many(
+        [{"prompt": f"p{index}", "response": LONG_ANSWER} for index in range(10)] + [{"prompt": "short", "response": "ok"}]
+    )
+    store = ResponseStore(database, min_bytes=100)
+
+    report = store.migrate(interactions, batch_size=4)
+    assert report == {"scanned": 11, "converted": 10, "responses_upserted": 1}
+    assert store.migrate(interactions)["converted"] == 0
+
+    savings = store.savings(interactions)
+    size = len(LONG_ANSWER.encode("utf-8"))
+    assert savings["referenced_responses"] == 10
+    assert savings["inline_responses"] == 1
+    assert (savings["logical_bytes"], savings["stored_bytes"], savings["saved_bytes"]) == (10 * size, size, 9 * size)
+    assert savings["saved_ratio"] == 0.9
@@ -0,0 +1,149 @@
+from datetime import datetime, timedelta, timezone
+from unittest.mock import MagicMock
+import pytest
+from bson import ObjectId
+from pymongo.errors import OperationFailure
+from app.services.hybrid_search_service import HybridSearchService
+from app.services.search_sync import SearchSync, CHANGE_STREAM, OUTBOX, PENDING_FIELD, SYNC_ID
+
+mongomock = pytest.importorskip("mongomock")
+
+NOW = datetime(2026, 6, 15, 12, 0, tzinfo=timezone.utc)
+
+
+def interaction(seconds_ago, prompt):
+    return {"_id": ObjectId.from_datetime(NOW - timedelta(seconds=seconds_ago)), "prompt": prompt, "response": "answer"}
+
+
+@pytest.fixture
+def interactions():
+    return mongomock.MongoClient()["test"]["interactions"]
+
+
+@pytest.fixture
+def indexed(mocker):
+    indexed = {}
+
+    def bulk(client, actions, **kwargs):
+        for action in actions:
+            indexed[action["_id"]] = action["_source"]
+        return len(actions), []
+
+    mocker.patch("app.services.hybrid_search_service.helpers.bulk", side_effect=bulk)
+    return indexed
+
+
+class FakeStream:
+    """
+    Change stream returning the given changes, then stopping the sync once drained.
+    """
+
+    def __init__(self, changes, sync, post_batch_token=None):
+        self.changes = list(changes)
+        self.sync = sync
+        self.resume_token = post_batch_token
+        self.post_batch_token = post_batch_token
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def try_next(self):
+        if not self.changes:
+            self.resume_token = self.post_batch_token or self.resume_token
+            self.sync.stopping.set()
+            return None
+        change = self.changes.pop(0)
+        self.resume_token = change["_id"]
+        return change
+
+
+def test_outbox_indexes_marked_interactions_once(interactions, indexed):
+    sync = SearchSync(interactions, HybridSearchService(MagicMock()), mode="auto", batch_size=2, now=lambda: NOW)
+    assert sync.detect_mode() == OUTBOX
+    sync.mode = OUTBOX
+    for index in range(3):
+        interactions.insert_one({**interaction(30 - index, f"q{index}"), **sync.pending_marker()})
+    interactions.insert_one(interaction(5, "indexed before"))
+
+    assert sync.poll() == 2
+    assert sync.lag_seconds() == 29.0
+    assert sync.poll() == 1
+    assert sync.poll() == 0
+    assert sync.lag_seconds() == 0.0
+    assert sorted(source["prompt"] for source in indexed.values()) == ["q0", "q1", "q2"]
+    assert interactions.count_documents({PENDING_FIELD: True}) == 0
+    assert sync.snapshot()["indexed"] == 3 and sync.snapshot()["pending"] == 0
+
+
+def test_failed_bulk_keeps_interactions_pending(interactions, mocker):
+    sync = SearchSync(interactions, HybridSearchService(MagicMock()), mode=OUTBOX, now=lambda: NOW)
+    interactions.insert_one({**interaction(10, "q"), **sync.pending_marker()})
+    mocker.patch("app.services.hybrid_search_service.helpers.bulk", side_effect=ConnectionError("refused"))
+    with pytest.raises(ConnectionError):
+        sync.poll()
+    assert interactions.count_documents({PENDING_FIELD: True}) == 1
+    assert sync.lag_seconds() is None
+
+
+def test_change_stream_saves_and_resumes_from_token(interactions, indexed):
+    sync = SearchSync(interactions, HybridSearchService(MagicMock()), mode=CHANGE_STREAM, batch_size=2, now=lambda: NOW)
+    assert sync.pending_marker() == {}
+    changes = [{"_id": {"_data": str(index)}, "fullDocument": interaction(10 - index, f"q{index}")} for index in range(3)]
+    stream_kwargs = []
+
+    def watch(pipeline, **kwargs):
+        stream_kwargs.append(kwargs)
+        return FakeStream(changes if len(stream_kwargs) == 1 else [], sync)
+
+    interactions.watch = watch
+    assert sync.tail(NOW + timedelta(seconds=30)) == 3
+    assert len(indexed) == 3
+    assert sync.lag_seconds() == 0.0
+    assert interactions.database["sync_state"].find_one({"_id": SYNC_ID})["resume_token"] == {"_data": "2"}
+
+    sync.stopping.clear()
+    assert sync.tail(NOW + timedelta(seconds=30)) == 0
+    assert stream_kwargs[1]["resume_after"] == {"_data": "2"}
+
+
+def test_change_stream_saves_its_position_before_the_first_insert(interactions, indexed):
+    sync = SearchSync(interactions, HybridSearchService(MagicMock()), mode=CHANGE_STREAM, now=lambda: NOW)
+    stream_kwargs = []
+
+    def watch(pipeline, **kwargs):
+        stream_kwargs.append(kwargs)
+        return FakeStream([], sync, post_batch_token={"_data": f"empty{len(stream_kwargs)}"})
+
+    interactions.watch = watch
+    assert sync.tail(NOW + timedelta(seconds=30)) == 0
+    assert interactions.database["sync_state"].find_one({"_id": SYNC_ID})["resume_token"] == {"_data": "empty1"}
+
+    # A stream reopened to renew the lease resumes where the empty one stopped, not from now
+    sync.stopping.clear()
+    sync.tail(NOW + timedelta(seconds=30))
+    assert stream_kwargs[0]["resume_after"] is None and stream_kwargs[1]["resume_after"] == {"_data": "empty1"}
+
+
+def test_lost_change_stream_history_restarts_from_now(interactions):
+    sync = SearchSync(interactions, HybridSearchService(MagicMock()), mode=CHANGE_STREAM, now=lambda: NOW)
+    interactions.database["sync_state"].insert_one({"_id": SYNC_ID, "resume_token": {"_data": "old"}})
+
+    def watch(pipeline, **kwargs):
+        raise OperationFailure("resume point no longer in the oplog", code=286)
+
+    interactions.watch = watch
+    assert sync.tail(NOW + timedelta(seconds=30)) == 0
+    assert "resume_token" not in interactions.database["sync_state"].find_one({"_id": SYNC_ID})
+
+
+def test_only_one_worker_syncs_at_a_time(interactions):
+    first = SearchSync(interactions, HybridSearchService(MagicMock()), mode=OUTBOX, now=lambda: NOW)
+    second = SearchSync(interactions, HybridSearchService(MagicMock()), mode=OUTBOX, now=lambda: NOW)
+    second.holder = "other"
+    assert first._acquire()
+    assert not second._acquire()
+    second.now = lambda: NOW + timedelta(seconds=first.lease_seconds + 1)
+    assert second._acquire()
@@ -0,0 +1,86 @@
+import time
+import pytest
+from app.services.suggestion_service import SuggestionService, PrefixIndex, prompt_counts
+
+
+@pytest.fixture
+def suggestion_service():
+    """
+    Provide a fresh SuggestionService with a small merge threshold.
+    """
+    SuggestionService._instance = None
+    service = SuggestionService(max_prompts=100, delta_limit=3)
+    yield service
+    SuggestionService._instance = None
+
+
+def test_prefix_index_ranks_by_count():
+    """
+    Test that the prefix index returns matching prompts, most frequent first.
+    """
+    index = PrefixIndex([("how to a", "How to A", 1), ("how to b", "How to B", 5), ("how to c", "How to C", 3), ("why", "Why", 9)])
+    assert index.top("how", 2) == [(5, "How to B"), (3, "How to C")]
+    assert index.top("zzz", 5) == []
+
+
+def test_build_merges_normalized_prompts(suggestion_service):
+    """
+    Test that prompts differing only in case and spacing are counted together.
+    """
+    suggestion_service.build([("How to  define a route", 2), ("how to define a route", 3), ("How to seed", 1)])
+    assert suggestion_service.suggest("how to") == [
+        {"prompt": "How to  define a route", "count": 5},
+        {"prompt": "How to seed", "count": 1},
+    ]
+
+
+def test_rebuild_from_mongodb_leaves_out_private_prompts(suggestion_service):
+    """
+    Test that prompts cached under a user's private namespace are not rebuilt into the shared index.
+    """
+    mongomock = pytest.importorskip("mongomock")
+    collection = mongomock.MongoClient()["test"]["interactions"]
+    collection.insert_many([
+        {"prompt": "How to seed", "cache_key": "How to seed"},
+        {"prompt": "How to seed", "cache_key": "How to seed"},
+        {"prompt": "How to sign our secret API", "cache_key": "user:alice:How to sign our secret API"},
+        {"prompt": "How to route", "cache_key": "submit:0f3a"},
+        {"prompt": "How to test"},
+    ])
+    suggestion_service.build(prompt_counts(collection))
+    assert [row["prompt"] for row in suggestion_service.suggest("how to")] == ["How to seed", "How to route", "How to test"]
+
+
+def test_add_updates_counts_incrementally(suggestion_service):
+    """
+    Test that new and repeated prompts are reflected immediately.
+    """
+    suggestion_service.build([("Blade slots", 1)])
+    suggestion_service.add("Blade components")
+    suggestion_service.add("Blade components")
+    suggestion_service.add("blade slots")
+    suggestion_service.add("blade slots")
+    assert suggestion_service.suggest("blade", limit=1) == [{"prompt": "Blade slots", "count": 3}]
+    assert suggestion_service.suggest("blade c") == [{"prompt": "Blade components", "count": 2}]
+
+
+def test_delta_is_merged_in_background(suggestion_service):
+    """
+    Test that the delta is merged into the main index once it reaches its limit.
+    """
+    for prompt in ("queue a", "queue b", "queue c"):
+        suggestion_service.add(prompt)
+    for _ in range(100):
+        if suggestion_service.replay is None:
+            break
+        time.sleep(0.01)
+    assert suggestion_service.main.size == 3
+    assert [s["prompt"] for s in suggestion_service.suggest("queue")] == ["queue a", "queue b", "queue c"]
+
+
+def test_long_prompts_are_not_suggested(suggestion_service):
+    """
+    Test that pasted code and other long prompts stay out of the index.
+    """
+    suggestion_service.add("x" * 10000)
+    assert suggestion_service.suggest("x") == []
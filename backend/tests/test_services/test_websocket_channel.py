@@ -0,0 +1,127 @@
+import asyncio
+import time
+import orjson
+from app.services.llm_scheduler import CallCancelledError
+from app.services.websocket_channel import WebSocketChannel
+
+
+class FakeWebSocket:
+    """
+    In-memory stand-in for an accepted WebSocket: the test feeds client messages and reads what was sent.
+    """
+
+    def __init__(self):
+        self.incoming = asyncio.Queue()
+        self.sent = []
+        self.can_send = asyncio.Event()
+        self.can_send.set()
+
+    def client_sends(self, message):
+        self.incoming.put_nowait({"type": "websocket.receive", "text": orjson.dumps(message).decode()})
+
+    def disconnect(self):
+        self.incoming.put_nowait({"type": "websocket.disconnect"})
+
+    async def receive(self):
+        return await self.incoming.get()
+
+    async def send_text(self, text):
+        await self.can_send.wait()
+        self.sent.append(orjson.loads(text))
+
+    def messages(self, request_id):
+        return [(message["type"], message.get("data")) for message in self.sent if message.get("id") == request_id]
+
+
+async def wait_for(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "condition not met in time"
+        await asyncio.sleep(0.005)
+
+
+def streaming_handler(pieces, pause=0.0):
+    """
+    Handler streaming `pieces` from a worker thread, as the LLM callback does, stopping when cancelled.
+    """
+    async def handle(request):
+        def work():
+            for piece in pieces:
+                time.sleep(pause)
+                if request.cancelled.is_set():
+                    raise CallCancelledError("cancelled")
+                request.send_threadsafe("delta", data=piece)
+            return "".join(pieces)
+        return {"response": await asyncio.to_thread(work)}
+    return handle
+
+
+def test_requests_are_multiplexed_and_streamed():
+    async def scenario():
+        websocket = FakeWebSocket()
+        channel = WebSocketChannel(websocket, {
+            "slow": streaming_handler(["a", "b", "c"], pause=0.05),
+            "fast": streaming_handler(["x"]),
+        })
+        serving = asyncio.create_task(channel.serve())
+        websocket.client_sends({"id": "1", "type": "slow"})
+        websocket.client_sends({"id": "2", "type": "fast"})
+        websocket.client_sends({"id": "3", "type": "unknown"})
+        websocket.client_sends({"type": "fast"})
+        await wait_for(lambda: ("done", {"response": "abc"}) in websocket.messages("1"))
+        websocket.disconnect()
+        await serving
+        return websocket
+
+    websocket = asyncio.run(scenario())
+    assert websocket.messages("1") == [("delta", "a"), ("delta", "b"), ("delta", "c"), ("done", {"response": "abc"})]
+    assert websocket.messages("2") == [("delta", "x"), ("done", {"response": "x"})]
+    # The fast request finished while the slow one was still streaming
+    order = [(message["id"], message["type"]) for message in websocket.sent]
+    assert order.index(("2", "done")) < order.index(("1", "done"))
+    assert [message["status"] for message in websocket.sent if message["type"] == "error"] == [400, 400]
+
+
+def test_cancel_stops_the_worker_and_disconnect_cancels_the_rest():
+    async def scenario():
+        websocket = FakeWebSocket()
+        channel = WebSocketChannel(websocket, {"stream": streaming_handler(["piece"] * 1000, pause=0.005)})
+        serving = asyncio.create_task(channel.serve())
+        websocket.client_sends({"id": "1", "type": "stream"})
+        websocket.client_sends({"id": "2", "type": "stream"})
+        await wait_for(lambda: len(websocket.messages("1")) >= 3)
+        websocket.client_sends({"id": "1", "type": "cancel"})
+        await wait_for(lambda: ("cancelled", None) in websocket.messages("1"))
+        cancelled_requests = [request for request, _ in channel.requests.values()]
+        websocket.disconnect()
+        await serving
+        return websocket, channel, cancelled_requests
+
+    websocket, channel, remaining = asyncio.run(scenario())
+    streamed = len(websocket.messages("1"))
+    time.sleep(0.05)
+    assert len(websocket.messages("1")) == streamed
+    assert all(request.cancelled.is_set() for request in remaining) and not channel.requests
+
+
+def test_backpressure_limits_requests_and_buffered_messages():
+    async def scenario():
+        websocket = FakeWebSocket()
+        websocket.can_send.clear()
+        channel = WebSocketChannel(websocket, {"stream": streaming_handler(["piece"] * 20)}, max_in_flight=1, send_queue_size=2)
+        serving = asyncio.create_task(channel.serve())
+        websocket.client_sends({"id": "1", "type": "stream"})
+        websocket.client_sends({"id": "2", "type": "stream"})
+        await wait_for(lambda: channel.outbox.full())
+        await asyncio.sleep(0.05)
+        # The client is not reading: the producer waits instead of buffering all 20 pieces
+        assert channel.outbox.qsize() == 2 and "1" in channel.requests
+        websocket.can_send.set()
+        await wait_for(lambda: ("done", {"response": "piece" * 20}) in websocket.messages("1"))
+        websocket.disconnect()
+        await serving
+        return websocket
+
+    websocket = asyncio.run(scenario())
+    assert [message["status"] for message in websocket.sent if message["id"] == "2"] == [429]
+    assert len(websocket.messages("1")) == 21
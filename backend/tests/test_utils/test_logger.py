@@ -0,0 +1,55 @@
+import logging
+import queue
+from app.utils.logger import DroppingQueueHandler, SamplingFilter, LoggingPipeline, parse_sample_rates, preview
+
+
+def make_record(name: str, level: int) -> logging.LogRecord:
+    return logging.LogRecord(name, level, __file__, 1, "message", None, None)
+
+
+def test_preview_truncates_long_payloads():
+    """
+    Test that preview caps the payload and reports how much was cut.
+    """
+    assert preview("short", limit=10) == "short"
+    assert preview("x" * 25, limit=10) == "xxxxxxxxxx...(+15 chars)"
+
+
+def test_parse_sample_rates():
+    """
+    Test parsing of the LOG_SAMPLE_RATES configuration string.
+    """
+    assert parse_sample_rates("redis_service=0.1, openai_service=0.5") == {"redis_service": 0.1, "openai_service": 0.5}
+    assert parse_sample_rates("") == {}
+
+
+def test_sampling_filter_keeps_warnings():
+    """
+    Test that sampling only applies to INFO/DEBUG records of the configured loggers.
+    """
+    sampling = SamplingFilter({"redis_service": 0.0})
+    assert sampling.filter(make_record("redis_service", logging.INFO)) is False
+    assert sampling.filter(make_record("redis_service", logging.WARNING)) is True
+    assert sampling.filter(make_record("openai_service", logging.INFO)) is True
+
+
+def test_dropping_queue_handler_never_blocks():
+    """
+    Test that a full queue drops records instead of raising or blocking.
+    """
+    handler = DroppingQueueHandler(queue.Queue(maxsize=1))
+    handler.handle(make_record("main", logging.INFO))
+    handler.handle(make_record("main", logging.INFO))
+    assert handler.queue.qsize() == 1
+    assert handler.dropped == 1
+
+
+def test_pipeline_attaches_single_root_handler():
+    """
+    Test that the pipeline is configured once, no matter how many loggers are requested.
+    """
+    LoggingPipeline()
+    LoggingPipeline()
+    root_handlers = [h for h in logging.getLogger().handlers if isinstance(h, DroppingQueueHandler)]
+    assert len(root_handlers) == 1
+    assert logging.getLogger("redis_service").handlers == []
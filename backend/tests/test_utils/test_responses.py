@@ -0,0 +1,27 @@
+import orjson
+from app.utils.responses import ORJSONResponse, history_rows
+
+
+def test_history_rows_keeps_only_history_fields():
+    """
+    Test that history_rows drops storage fields such as _id and timestamp.
+    """
+    documents = [{"_id": "abc", "prompt": "Q", "response": "A", "timestamp": "2024-01-01"}]
+    assert history_rows(documents) == [{"prompt": "Q", "response": "A"}]
+
+
+def test_history_rows_skips_malformed_rows():
+    """
+    Test that rows missing a field or carrying a non-string value are skipped.
+    """
+    documents = [{"prompt": "Q1", "response": "A1"}, {"prompt": "Q2"}, {"prompt": "Q3", "response": None}]
+    assert history_rows(documents) == [{"prompt": "Q1", "response": "A1"}]
+
+
+def test_orjson_response_renders_json():
+    """
+    Test that ORJSONResponse renders content with orjson.
+    """
+    response = ORJSONResponse([{"prompt": "Q", "response": "Á"}])
+    assert response.media_type == "application/json"
+    assert orjson.loads(response.body) == [{"prompt": "Q", "response": "Á"}]
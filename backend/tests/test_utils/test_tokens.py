@@ -0,0 +1,37 @@
+from app.utils.tokens import approximate_tokens, count_tokens, trim_code
+
+HELPERS = "\n\n".join(
+    f"function helper{i}($value)\n{{\n" + "    $value = $value * 2;\n" * 10 + "    return $value;\n}"
+    for i in range(30)
+)
+CODE = "<?php\n\nnamespace App\\Http;\n\n" + HELPERS + "\n\nfunction storeUser($request)\n{\n    return User::create($request->all());\n}\n"
+
+
+def test_approximate_tokens_errs_high_on_words():
+    """
+    Test that the approximation counts symbols and whitespace runs and rounds word pieces up.
+    """
+    assert approximate_tokens("") == 0
+    assert approximate_tokens("return $value;") == 5
+    assert approximate_tokens("what does this do") == 4
+    assert approximate_tokens("internationalization") == 4
+
+
+def test_trim_code_keeps_code_within_budget_unchanged():
+    """
+    Test that code fitting the budget is returned as is.
+    """
+    assert trim_code("echo 1;", 100) == ("echo 1;", 0)
+
+
+def test_trim_code_prioritizes_blocks_mentioned_in_the_question():
+    """
+    Test that blocks mentioning the question's identifiers and the header survive trimming, in file order.
+    """
+    trimmed, omitted = trim_code(CODE, 300, "Why does storeUser fail?")
+    assert count_tokens(trimmed) <= 300
+    assert omitted > 0
+    assert trimmed.startswith("<?php")
+    assert "function storeUser($request)" in trimmed
+    assert "lines omitted" in trimmed
+    assert trimmed.index("namespace") < trimmed.index("storeUser")
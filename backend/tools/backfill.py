@@ -0,0 +1,94 @@
+"""
+Bulk-loads interactions into MongoDB, the Elasticsearch question-answer index and the Redis response
+cache, e.g. to seed a new environment from an export or to rebuild the index from MongoDB. Batches
+are written in parallel and checkpointed; after an interruption, run the same command with --resume.
+
+Usage:
+    python -m tools.backfill (--jsonl PATH | --mongo [URI]) [--targets mongodb,elasticsearch,redis]
+        [--workers N] [--batch-size N] [--checkpoint PATH] [--resume]
+"""
+import argparse
+import os
+
+import orjson
+from pymongo import MongoClient
+
+from app.constants import MONGODB_COLLECTION_NAME, STALE_CACHE_TTL_SECONDS, BACKFILL_BATCH_SIZE, BACKFILL_WORKERS
+from app.services.adaptive_ttl import get_adaptive_ttl
+from app.services.backfill import Backfill, JsonlSource, MongoSource
+from app.services.hybrid_search_service import HybridSearchService
+from app.services.redis_service import RedisService
+from app.services.response_store import ResponseStore
+from app.utils.database import get_database
+from app.utils.elasticsearch import get_elasticsearch_client
+
+TARGETS = ("mongodb", "elasticsearch", "redis")
+# Prefix of the stale copies of cached responses, as written by /submit
+STALE_PREFIX = "stale:"
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument("--jsonl", help="JSONL file to import, plain or .gz (e.g. an export or archive file).")
+    source.add_argument(
+        "--mongo", nargs="?", const="", metavar="URI",
+        help="Read the interactions of a MongoDB deployment; without a URI, those of the configured one.",
+    )
+    parser.add_argument("--targets", default=",".join(TARGETS), help="Comma-separated targets to write to.")
+    parser.add_argument("--workers", type=int, default=BACKFILL_WORKERS, help="Batches written in parallel.")
+    parser.add_argument("--batch-size", type=int, default=BACKFILL_BATCH_SIZE, help="Documents per batch.")
+    parser.add_argument("--checkpoint", help="Checkpoint file; defaults to backfill.checkpoint in the current directory.")
+    parser.add_argument("--resume", action="store_true", help="Continue from the checkpoint of an interrupted backfill.")
+    args = parser.parse_args()
+
+    targets = [target.strip() for target in args.targets.split(",") if target.strip()]
+    unknown = set(targets) - set(TARGETS)
+    if unknown or not targets:
+        parser.error(f"--targets must be a subset of {', '.join(TARGETS)}.")
+
+    database = get_database()[MONGODB_COLLECTION_NAME]
+    response_store = ResponseStore(database)
+    if args.jsonl is not None:
+        backfill_source = JsonlSource(args.jsonl)
+    elif args.mongo:
+        source_database = MongoClient(args.mongo)[MONGODB_COLLECTION_NAME]
+        backfill_source = MongoSource(source_database["interactions"], ResponseStore(source_database), args.batch_size)
+    else:
+        if "mongodb" in targets:
+            parser.error("Reading the configured MongoDB, the targets can only be elasticsearch and redis.")
+        backfill_source = MongoSource(database["interactions"], response_store, args.batch_size)
+
+    hybrid_search = None
+    if "elasticsearch" in targets:
+        elastic_client = get_elasticsearch_client()
+        if elastic_client is None:
+            parser.error("Elasticsearch is not available.")
+        hybrid_search = HybridSearchService(elastic_client)
+        hybrid_search.ensure_index()
+    redis_client = None
+    if "redis" in targets:
+        try:
+            redis_client = RedisService(host=os.getenv("REDIS_HOST", "localhost"), port=int(os.getenv("REDIS_PORT", 6379))).client
+        except RuntimeError:
+            parser.error("Redis is not available.")
+
+    backfill = Backfill(
+        backfill_source,
+        collection=database["interactions"] if "mongodb" in targets else None,
+        hybrid_search=hybrid_search,
+        redis_client=redis_client,
+        response_store=response_store,
+        ttl=get_adaptive_ttl().ttl,
+        extra_keys=lambda prompt, response: {STALE_PREFIX + prompt: (response, STALE_CACHE_TTL_SECONDS)},
+        batch_size=args.batch_size,
+        workers=args.workers,
+    )
+    report = backfill.run(args.checkpoint or "backfill.checkpoint", resume=args.resume)
+    print(orjson.dumps(report, option=orjson.OPT_INDENT_2).decode())
+    if report["state"] == "failed":
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,39 @@
+"""
+Exports interactions, including archived ones, to a gzip JSONL file or a directory of Parquet part
+files, with constant memory use. The export checkpoints its progress next to the output; after an
+interruption, run the same command with --resume to continue where it stopped.
+
+Usage:
+    python -m tools.export_interactions OUTPUT [--format jsonl|parquet] [--since ISO] [--until ISO] [--resume]
+"""
+import argparse
+from datetime import datetime
+
+import orjson
+
+from app.constants import MONGODB_COLLECTION_NAME
+from app.services.interaction_archive import InteractionArchive
+from app.services.interaction_export import FORMATS, InteractionExporter
+from app.services.response_store import ResponseStore
+from app.utils.database import get_database
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("output", help="Output file (jsonl) or directory (parquet).")
+    parser.add_argument("--format", choices=FORMATS, default="jsonl")
+    parser.add_argument("--since", type=datetime.fromisoformat, help="Export interactions created at or after this time.")
+    parser.add_argument("--until", type=datetime.fromisoformat, help="Export interactions created before this time.")
+    parser.add_argument("--resume", action="store_true", help="Continue from the checkpoint of an interrupted export.")
+    args = parser.parse_args()
+
+    database = get_database()[MONGODB_COLLECTION_NAME]
+    interactions = database["interactions"]
+    response_store = ResponseStore(database)
+    exporter = InteractionExporter(interactions, response_store, InteractionArchive(interactions, response_store))
+    checkpoint = exporter.export_to_file(args.output, args.format, args.since, args.until, resume=args.resume)
+    print(orjson.dumps(checkpoint).decode())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,34 @@
+"""
+Moves the inline responses of the interactions collection into the deduplicated responses
+collection, then reports the storage saved. Safe to interrupt and run again; new interactions are
+written by reference as soon as the API runs this version, so the migration only covers older ones.
+
+Usage:
+    python -m tools.migrate_responses [--batch-size N] [--report-only]
+"""
+import argparse
+
+import orjson
+
+from app.constants import MONGODB_COLLECTION_NAME
+from app.services.response_store import ResponseStore
+from app.utils.database import get_database
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--batch-size", type=int, default=1000, help="Interactions converted per round of bulk writes.")
+    parser.add_argument("--report-only", action="store_true", help="Only report the current storage savings.")
+    args = parser.parse_args()
+
+    database = get_database()[MONGODB_COLLECTION_NAME]
+    interactions = database["interactions"]
+    store = ResponseStore(database)
+
+    if not args.report_only:
+        print(orjson.dumps({"migration": store.migrate(interactions, args.batch_size)}).decode())
+    print(orjson.dumps({"savings": store.savings(interactions)}, option=orjson.OPT_INDENT_2).decode())
+
+
+if __name__ == "__main__":
+    main()
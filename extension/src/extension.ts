@@ -1,6 +1,6 @@
 import * as vscode from 'vscode';
 import { getActiveFileContent, getFilesWithContent } from './utils/fileUtils';
-import { sendPrompt, analyzeFiles } from './utils/apiUtils';
+import { sendPrompt, analyzeFiles, analyzeFileIncrementally } from './utils/apiUtils';
 import { handleAxiosError } from './utils/errorUtils';
 
 export function activate(context: vscode.ExtensionContext) {
@@ -33,7 +33,7 @@ export function activate(context: vscode.ExtensionContext) {
         }
 
         try {
-            const response = await sendPrompt(fileData.content);
+            const response = await analyzeFileIncrementally(fileData.filePath, fileData.content);
             vscode.window.showInformationMessage(`Analysis for ${fileData.filePath}: ${response}`);
         } catch (error) {
             handleAxiosError(error);
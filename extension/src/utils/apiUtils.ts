@@ -1,5 +1,7 @@
 import axios, { AxiosInstance, AxiosError } from 'axios';
+import { randomUUID } from 'crypto';
 import * as vscode from 'vscode';
+import { chunkFile } from './chunkUtils';
 
 // Create an Axios instance with default configuration
 const apiClient: AxiosInstance = axios.create({
@@ -23,11 +25,25 @@ export function handleApiError(error: unknown): void {
     }
 }
 
+// Attempts per prompt; retries reuse the idempotency key, so the backend runs the prompt once
+const SUBMIT_ATTEMPTS = 3;
+
 // Utility function to send a prompt to the API
 export async function sendPrompt(prompt: string): Promise<string> {
+    const headers = { 'Idempotency-Key': randomUUID() };
     try {
-        const response = await apiClient.post<{ response: string }>('/submit', { prompt });
-        return response.data.response;
+        for (let attempt = 1; ; attempt++) {
+            try {
+                const response = await apiClient.post<{ response: string }>('/submit', { prompt }, { headers });
+                return response.data.response;
+            } catch (error) {
+                // Retry timeouts, dropped connections and 409 (the first attempt is still running)
+                const retryable = axios.isAxiosError(error) && (!error.response || error.response.status === 409);
+                if (!retryable || attempt === SUBMIT_ATTEMPTS) {
+                    throw error;
+                }
+            }
+        }
     } catch (error) {
         handleApiError(error);
         throw error; // Rethrow the error for further handling if needed
@@ -36,21 +52,90 @@ export async function sendPrompt(prompt: string): Promise<string> {
 
 // Utility function to analyze multiple files or folder content
 export async function analyzeFiles(files: { filePath: string; content: string }[]): Promise<void> {
-    const analysisResults: { filePath: string; response: string }[] = [];
-    for (const file of files) {
-        try {
-            const response = await apiClient.post<{ response: string }>('/submit', { prompt: file.content });
-            analysisResults.push({ filePath: file.filePath, response: response.data.response });
-        } catch (error) {
-            handleApiError(error);
-            vscode.window.showErrorMessage(`Error analyzing ${file.filePath}.`);
-        }
+    try {
+        // The backend chunks and analyzes all files in one request, streaming one JSON line per file
+        const response = await apiClient.post<string>(
+            '/analyze',
+            { files: files.map(file => ({ file_path: file.filePath, content: file.content })) },
+            { responseType: 'text', transformResponse: (data: string) => data, timeout: 0 },
+        );
+
+        response.data
+            .split('\n')
+            .filter(line => line.trim())
+            .map(line => JSON.parse(line) as { file_path: string; response: string })
+            .forEach(result => {
+                vscode.window.showInformationMessage(`Analyzed ${result.file_path}: ${result.response}`);
+            });
+    } catch (error) {
+        handleApiError(error);
+        vscode.window.showErrorMessage('Error analyzing files.');
     }
+}
+
+interface IncrementalResult {
+    file_path: string;
+    response?: string;
+    missing?: string[];
+    chunks?: { hash: string }[];
+}
+
+// Chunk hashes the backend holds results for, per file, learned from its responses
+const knownHashes = new Map<string, Set<string>>();
+
+function workspaceId(): string {
+    return vscode.workspace.workspaceFolders?.[0]?.uri.toString() ?? 'default';
+}
 
-    // Display the analysis results collectively
-    analysisResults.forEach(result => {
-        vscode.window.showInformationMessage(`Analyzed ${result.filePath}: ${result.response}`);
-    });
+async function loadKnownHashes(workspace: string, filePath: string): Promise<Set<string>> {
+    const known = knownHashes.get(filePath);
+    if (known) {
+        return known;
+    }
+    try {
+        const response = await apiClient.get<{ chunks: { hash: string }[] }>('/analyze/manifest', {
+            params: { workspace, file_path: filePath },
+        });
+        return new Set(response.data.chunks.map(chunk => chunk.hash));
+    } catch {
+        return new Set();
+    }
+}
+
+// Utility function to (re-)analyze a file, sending only the content of chunks the backend has not seen
+export async function analyzeFileIncrementally(filePath: string, content: string): Promise<string> {
+    try {
+        const workspace = workspaceId();
+        const chunks = chunkFile(content);
+        const known = await loadKnownHashes(workspace, filePath);
+
+        const send = (withContent: Set<string>) => apiClient.post<IncrementalResult>(
+            '/analyze/incremental',
+            {
+                workspace,
+                file_path: filePath,
+                language: '',
+                chunks: chunks.map(chunk => ({
+                    hash: chunk.hash,
+                    start_line: chunk.startLine,
+                    end_line: chunk.endLine,
+                    content: known.has(chunk.hash) && !withContent.has(chunk.hash) ? undefined : chunk.text,
+                })),
+            },
+            { timeout: 0 },
+        );
+
+        let response = await send(new Set());
+        if (response.data.missing?.length) {
+            // The backend no longer holds some results; resend those chunks with their content
+            response = await send(new Set(response.data.missing));
+        }
+        knownHashes.set(filePath, new Set((response.data.chunks ?? []).map(chunk => chunk.hash)));
+        return response.data.response ?? '';
+    } catch (error) {
+        handleApiError(error);
+        throw error;
+    }
 }
 
 export default apiClient;
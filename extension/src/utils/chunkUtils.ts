@@ -0,0 +1,121 @@
+import { createHash } from 'crypto';
+
+/**
+ * Mirror of the backend chunker (backend/app/services/analysis_service.py).
+ * The backend verifies every chunk sent with content and asks for the content of unknown
+ * hashes, so any drift between the two only costs a resend, never a wrong result.
+ */
+
+// Must match ANALYSIS_PROMPT_VERSION and ANALYZE_CHUNK_TOKENS on the backend
+export const ANALYSIS_PROMPT_VERSION = '1';
+export const ANALYZE_CHUNK_TOKENS = 1000;
+const CHARS_PER_TOKEN = 4;
+
+export interface Chunk {
+    startLine: number;
+    endLine: number;
+    text: string;
+    hash: string;
+}
+
+export function chunkHash(text: string, language: string): string {
+    return createHash('sha256').update(`${ANALYSIS_PROMPT_VERSION}\0${language}\0${text}`, 'utf8').digest('hex');
+}
+
+class Lines {
+    readonly lines: string[];
+    private readonly offsets: number[] = [0];
+
+    constructor(content: string) {
+        this.lines = content.split(/\r\n|\r|\n/);
+        if (this.lines[this.lines.length - 1] === '') {
+            this.lines.pop();
+        }
+        for (const line of this.lines) {
+            // Count code points like Python's len()
+            this.offsets.push(this.offsets[this.offsets.length - 1] + Array.from(line).length + 1);
+        }
+    }
+
+    tokens(start: number, end: number): number {
+        return Math.ceil((this.offsets[end] - this.offsets[start]) / CHARS_PER_TOKEN);
+    }
+
+    indent(index: number): number {
+        const line = this.lines[index];
+        return Array.from(line).length - Array.from(line.trimStart()).length;
+    }
+
+    startsBlock(index: number): boolean {
+        return this.lines[index].trim() !== '' && this.lines[index - 1].trim() === '';
+    }
+}
+
+function split(lines: Lines, start: number, end: number, budget: number): [number, number][] {
+    if (lines.tokens(start, end) <= budget) {
+        return [[start, end]];
+    }
+
+    const starters: number[] = [];
+    for (let index = start + 1; index < end; index++) {
+        if (lines.startsBlock(index)) {
+            starters.push(index);
+        }
+    }
+    if (starters.length) {
+        const level = Math.min(...starters.map(index => lines.indent(index)));
+        const cuts = [start, ...starters.filter(index => lines.indent(index) === level), end];
+        if (cuts.length > 2) {
+            const ranges: [number, number][] = [];
+            for (let i = 0; i + 1 < cuts.length; i++) {
+                ranges.push(...split(lines, cuts[i], cuts[i + 1], budget));
+            }
+            return ranges;
+        }
+    }
+
+    const ranges: [number, number][] = [];
+    let rangeStart = start;
+    for (let index = start + 1; index < end; index++) {
+        if (lines.tokens(rangeStart, index + 1) > budget) {
+            ranges.push([rangeStart, index]);
+            rangeStart = index;
+        }
+    }
+    ranges.push([rangeStart, end]);
+    return ranges;
+}
+
+/**
+ * Split a file into the same chunks, with the same hashes, as the backend.
+ */
+export function chunkFile(content: string, language = '', budget = ANALYZE_CHUNK_TOKENS): Chunk[] {
+    const lines = new Lines(content);
+    if (!lines.lines.length) {
+        return [];
+    }
+
+    const packed: [number, number][] = [];
+    for (const [rangeStart, rangeEnd] of split(lines, 0, lines.lines.length, budget)) {
+        const last = packed[packed.length - 1];
+        if (last) {
+            const combined = lines.tokens(last[0], rangeEnd);
+            const tiny = lines.tokens(last[0], last[1]) < Math.floor(budget / 10);
+            if (combined <= budget || (tiny && combined <= budget * 1.1)) {
+                last[1] = rangeEnd;
+                continue;
+            }
+        }
+        packed.push([rangeStart, rangeEnd]);
+    }
+
+    return packed
+        .map(([rangeStart, rangeEnd]) => ({ rangeStart, rangeEnd, text: lines.lines.slice(rangeStart, rangeEnd).join('\n') }))
+        .filter(range => range.text.trim() !== '')
+        .map(range => ({
+            startLine: range.rangeStart + 1,
+            endLine: range.rangeEnd,
+            text: range.text,
+            hash: chunkHash(range.text, language),
+        }));
+}